@@ -5,7 +5,6 @@ import logging
 import tqdm
 import concurrent.futures
 import contextlib
-import re
 
 import polars as pl
 
@@ -14,7 +13,7 @@ from pathlib import Path
 from web3.exceptions import ContractLogicError
 
 
-from bins.configuration import CONFIGURATION
+from bins.configuration import CONFIGURATION, get_price_cadence_blocks
 from bins.database.db_user_status import user_status_hypervisor_builder
 from bins.general.general_utilities import (
     convert_string_datetime,
@@ -32,9 +31,47 @@ from bins.w3.onchain_utilities.protocols import (
 from bins.w3.onchain_utilities.basic import erc20_cached
 
 from bins.database.common.db_collections_common import database_local, database_global
+from bins.converters.onchain import (
+    convert_hypervisor_toStorage,
+    convert_operation_toStorage,
+)
 from bins.mixed.price_utilities import price_scraper
 
 from bins.w3.builders import build_db_hypervisor
+from bins.log.log_scanner import log_checkpoint, log_pattern, log_scanner
+from apps.database_feeder import feed_prices, get_price_cadence_gaps
+from apps.feeds.status import add_saved_timeframe, update_status_rollups
+
+# failures found in logs ( regex groups-> network, address, block )
+FAILED_PRICE_PATTERNS = [
+    log_pattern(
+        name="price",
+        regex=r"\-\s\s(?P<network>.*)'s\stoken\s(?P<address>.*)\sprice\sat\sblock\s(?P<block>\d*)\snot\sfound",
+        keyword="price at block",
+    ),
+    log_pattern(
+        name="price",
+        regex=r"No\sprice\sfor\s(?P<address>.*)\sat\sblock\s(?P<block>\d*).*\[(?P<network>.*)\s(?P<dex>.*)\]",
+        keyword="No price for",
+    ),
+    log_pattern(
+        name="price",
+        regex=r"No\sprice\sfor\s(?P<network>.*)'s\s(?P<symbol>.*)\s\((?P<address>.*)\).*at\sblock\s(?P<block>\d*)",
+        keyword="No price for",
+    ),
+    log_pattern(
+        name="price",
+        regex=r"Can't\sfind\s(?P<network>.*?)'s\s(?P<hype_address>.*?)\susd\sprice\sfor\s(?P<address>.*?)\sat\sblock\s(?P<block>\d*?)\.\sReturn\sZero",
+        keyword="usd price for",
+    ),
+]
+FAILED_STATUS_PATTERNS = [
+    log_pattern(
+        name="hypervisor_status",
+        regex=r"No\shypervisor\sstatus\sfound\sfor\s(?P<network>.*)'s\s(?P<address>.*)\sat\sblock\s(?P<block>\d*)",
+        keyword="No hypervisor status found",
+    ),
+]
 
 
 # repair apps
@@ -52,7 +89,9 @@ def repair_all():
 
 
 def repair_prices(min_count: int = 1):
-    repair_prices_from_logs(min_count=min_count)
+    # failed prices are tracked in the price jobs queue: add the ones found in new log content
+    enqueue_log_failures()
+    repair_prices_from_jobs()
 
     repair_prices_from_status(
         max_repair_per_network=50
@@ -60,70 +99,21 @@ def repair_prices(min_count: int = 1):
     )
 
 
-def repair_prices_from_logs(min_count: int = 1):
-    """Check price errors from debug and price logs and try to scrape again"""
-    try:
-        network_token_blocks = {}
-        for log_file in get_all_logfiles():
-            network_token_blocks.update(get_failed_prices_from_log(log_file=log_file))
-
-        with tqdm.tqdm(total=len(network_token_blocks)) as progress_bar:
-            for network, addresses in network_token_blocks.items():
-                logging.getLogger(__name__).info(
-                    f" > Trying to repair {len(addresses)} tokens price from {network}"
-                )
-                for address, blocks_data in addresses.items():
-                    for block, counter in blocks_data.items():
-                        # block is string
-                        block = int(block)
-
-                        # check if price isnot already in database
-                        if (
-                            get_price_of_token(
-                                network=network, token_address=address, block=block
-                            )
-                            != 0
-                        ):
-                            logging.getLogger(__name__).debug(
-                                f" Price for {network}'s {address} at block {block} is already in database..."
-                            )
-                            continue
-
-                        progress_bar.set_description(
-                            f" Check & solve {network}'s price error log entries for {address[-4:]} at block {block}"
-                        )
-                        progress_bar.update(0)
-
-                        # counter = number of times found in logs
-                        if counter >= min_count:
-                            if price := get_price(
-                                network=network, token_address=address, block=block
-                            ):
-                                logging.getLogger(__name__).debug(
-                                    f" Added {price} as price for {network}'s {address} at block {block}  (found {counter} times in log)"
-                                )
-                                add_price_to_token(
-                                    network=network,
-                                    token_address=address,
-                                    block=block,
-                                    price=price,
-                                )
-                            else:
-                                logging.getLogger(__name__).debug(
-                                    f" Could not find price for {network}'s {address} at block {block}  (found {counter} times in log)"
-                                )
-                        else:
-                            logging.getLogger(__name__).debug(
-                                f" Not procesing price for {network}'s {address} at block {block} bc it has been found only {counter} times in log."
-                            )
-
-                # update progress
-                progress_bar.update(1)
-
-    except Exception:
-        logging.getLogger(__name__).exception(
-            " unexpected error checking prices from log"
+def repair_prices_from_jobs():
+    """Scrape the price jobs due for retry of all networks"""
+    for protocol in CONFIGURATION["script"]["protocols"]:
+        # override networks if specified in cml
+        networks = (
+            CONFIGURATION["_custom_"]["cml_parameters"].networks
+            or CONFIGURATION["script"]["protocols"][protocol]["networks"]
         )
+        for network in networks:
+            try:
+                feed_prices(protocol=protocol, network=network, price_ids=set())
+            except Exception as e:
+                logging.getLogger(__name__).exception(
+                    f" Unexpected error while repairing {network}'s price jobs  error-> {e}"
+                )
 
 
 def repair_prices_from_status(
@@ -162,8 +152,15 @@ def repair_prices_from_status(
                 logging.getLogger(__name__).info(
                     f" Getting hypervisor status token addresses and blocks for {network}"
                 )
-                for hype_status in _db().get_items_from_database(
-                    collection_name="status", find={}, batch_size=batch_size
+                for hype_status in _db().get_items_from_database_iter(
+                    collection_name="status",
+                    find={},
+                    projection={
+                        "block": 1,
+                        "pool.token0.address": 1,
+                        "pool.token1.address": 1,
+                    },
+                    batch_size=batch_size,
                 ):
                     # add token addresses
                     price_ids_shouldBe.add(
@@ -184,9 +181,10 @@ def repair_prices_from_status(
                 logging.getLogger(__name__).info(
                     f" Getting rewarder status token addresses and blocks for {network}"
                 )
-                for rewarder_status in _db().get_items_from_database(
+                for rewarder_status in _db().get_items_from_database_iter(
                     collection_name="rewards_status",
-                    find={"blocks": {"$nin": list(blocks_shouldBe)}},
+                    find={},
+                    projection={"block": 1, "rewardToken": 1},
                     batch_size=batch_size,
                 ):
                     # add token addresses
@@ -207,17 +205,18 @@ def repair_prices_from_status(
                     f" Checking if there are {len(price_ids_shouldBe)} prices for {network} in the price database"
                 )
 
-                if price_ids_diffs := price_ids_shouldBe - set(
-                    [
-                        id["id"]
-                        for id in database_global(
-                            mongo_url=mongo_url
-                        ).get_items_from_database(
+                # prices in between price series samples are interpolated: only repair cadence gaps
+                if price_ids_diffs := get_price_cadence_gaps(
+                    global_db_manager=database_global(mongo_url=mongo_url),
+                    network=network,
+                    price_ids=set(
+                        database_global(mongo_url=mongo_url).get_missing_keys(
                             collection_name="usd_prices",
-                            find={"network": network},
-                            batch_size=batch_size,
+                            field="id",
+                            keys=price_ids_shouldBe,
                         )
-                    ]
+                    ),
+                    cadence_blocks=get_price_cadence_blocks(network),
                 ):
                     logging.getLogger(__name__).info(
                         f" Found {len(price_ids_diffs)} missing prices for {network}"
@@ -232,7 +231,7 @@ def repair_prices_from_status(
                         )
                         # choose to repair the first max_repair_per_network
                         price_ids_diffs = random.sample(
-                            price_ids_diffs, max_repair_per_network
+                            list(price_ids_diffs), max_repair_per_network
                         )
 
                     progress_bar.total += len(price_ids_diffs)
@@ -350,6 +349,7 @@ def repair_missing_hypervisor_status(
             )
             # scrape missing status
             _errors = 0
+            saved_timeframes = {}
             with tqdm.tqdm(total=len(difference_blocks)) as progress_bar:
                 with concurrent.futures.ThreadPoolExecutor() as ex:
                     for result in ex.map(lambda p: build_db_hypervisor(*p), args):
@@ -362,6 +362,7 @@ def repair_missing_hypervisor_status(
                             database_local(
                                 mongo_url=mongo_url, db_name=db_name
                             ).set_status(data=result)
+                            add_saved_timeframe(saved_timeframes, result)
                             # progress
                             progress_bar.set_description(
                                 f' {result.get("address", "")}  {result.get("block", " ")} processed'
@@ -369,21 +370,33 @@ def repair_missing_hypervisor_status(
                         # update progress
                         progress_bar.update(1)
 
+            # repaired status are placed anywhere in the history
+            update_status_rollups(
+                local_db=database_local(mongo_url=mongo_url, db_name=db_name),
+                saved_timeframes=saved_timeframes,
+            )
+
 
 def repair_hype_status_from_user(min_count: int = 1):
     protocol = "gamma"
 
-    network_token_blocks = {}
-    for log_file in get_all_logfiles():
-        network_token_blocks.update(get_failed_status_from_log(log_file=log_file))
+    # hypervisor status not found while scraping user data ( new log content only)
+    enqueue_log_failures()
 
-    # for log_file in get_all_logfiles():
-    # hypervisor status not found while scrpaing user data
-    # network_token_blocks = get_failed_status_from_log(log_file)
+    global_db = database_global(
+        mongo_url=CONFIGURATION["sources"]["database"]["mongo_server_url"]
+    )
+    network_jobs = {}
+    for job in global_db.get_repair_jobs(
+        type="hypervisor_status", min_count=min_count
+    ):
+        network_jobs.setdefault(job["network"], []).append(job)
 
     try:
-        with tqdm.tqdm(total=len(network_token_blocks)) as progress_bar:
-            for network, addresses in network_token_blocks.items():
+        with tqdm.tqdm(
+            total=sum(len(x) for x in network_jobs.values())
+        ) as progress_bar:
+            for network, jobs in network_jobs.items():
                 # set local database name and create manager
                 db_name = f"{network}_{protocol}"
                 local_db = database_local(
@@ -391,73 +404,79 @@ def repair_hype_status_from_user(min_count: int = 1):
                     db_name=db_name,
                 )
                 logging.getLogger(__name__).info(
-                    f" > Trying to repair {len(addresses)} hypervisors status from {network}"
+                    f" > Trying to repair {len(jobs)} hypervisors status from {network}"
                 )
 
-                for address, blocks_data in addresses.items():
-                    for block, counter in blocks_data.items():
-                        # block is string
-                        block = int(block)
+                done_ids = []
+                failures = []
+                saved_timeframes = {}
+                for job in jobs:
+                    address = job["address"]
+                    block = job["block"]
+                    progress_bar.update(1)
+
+                    # make sure hypervisor status is not in db
+                    if local_db.get_items(
+                        collection_name="status",
+                        find={"address": address.lower(), "block": block},
+                        projection={"dex": 1},
+                    ):
+                        logging.getLogger(__name__).debug(
+                            f" Status for {network}'s {address} at block {block} is already in database..."
+                        )
+                        done_ids.append(job["id"])
+                        continue
 
-                        # make sure hypervisor status is not in db
-                        if local_db.get_items(
-                            collection_name="status",
-                            find={"address": address.lower(), "block": block},
-                            projection={"dex": 1},
-                        ):
-                            logging.getLogger(__name__).debug(
-                                f" Status for {network}'s {address} at block {block} is already in database..."
-                            )
-                            continue
+                    progress_bar.set_description(
+                        f" Repair {network}'s hype status not found log entries for {address} at block {block}"
+                    )
+                    progress_bar.update(0)
 
-                        progress_bar.set_description(
-                            f" Repair {network}'s hype status not found log entries for {address} at block {block}"
+                    # need dex to be able to build hype
+                    if dex := local_db.get_items(
+                        collection_name="static",
+                        find={"address": address.lower()},
+                        projection={"dex": 1},
+                    ):
+                        dex = dex[0]["dex"]
+                    else:
+                        logging.getLogger(__name__).error(
+                            f"{protocol}'s {network} hyperivisor {address} not fount in static db collection. May not be present in registry. (cant solve err.)"
                         )
-                        progress_bar.update(0)
-
-                        # counter = number of times found in logs
-                        if counter >= min_count:
-                            # need dex to be able to build hype
-
-                            if dex := local_db.get_items(
-                                collection_name="static",
-                                find={"address": address.lower()},
-                                projection={"dex": 1},
-                            ):
-                                dex = dex[0]["dex"]
-                            else:
-                                logging.getLogger(__name__).error(
-                                    f"{protocol}'s {network} hyperivisor {address} not fount in static db collection. May not be present in registry. (cant solve err.)"
-                                )
-                                # loop to next address
-                                continue
-
-                            # scrape hypervisor status at block
-                            hype_status = build_db_hypervisor(
-                                address=address,
-                                network=network,
-                                block=block,
-                                dex=dex,
-                                cached=False,
-                            )
-                            if hype_status:
-                                # add hypervisor status to database
-                                local_db.set_status(data=hype_status)
-
-                                logging.getLogger(__name__).info(
-                                    f" Added status for {network}'s {address} at block {block}  (found {counter} times in log)"
-                                )
-                            else:
-                                logging.getLogger(__name__).debug(
-                                    f" Could not find status for {network}'s {address} at block {block}  (found {counter} times in log)"
-                                )
-                        else:
-                            logging.getLogger(__name__).debug(
-                                f" Not procesing status for {network}'s {address} at block {block} bc it has been found only {counter} times in log."
-                            )
+                        failures.append((job, "hypervisor not found in static"))
+                        # loop to next address
+                        continue
+
+                    # scrape hypervisor status at block
+                    hype_status = build_db_hypervisor(
+                        address=address,
+                        network=network,
+                        block=block,
+                        dex=dex,
+                        cached=False,
+                    )
+                    if hype_status:
+                        # add hypervisor status to database
+                        local_db.set_status(data=hype_status)
+                        add_saved_timeframe(saved_timeframes, hype_status)
+                        done_ids.append(job["id"])
+
+                        logging.getLogger(__name__).info(
+                            f" Added status for {network}'s {address} at block {block}  (found {job['count']} times in log)"
+                        )
+                    else:
+                        logging.getLogger(__name__).debug(
+                            f" Could not find status for {network}'s {address} at block {block}  (found {job['count']} times in log)"
+                        )
+                        failures.append((job, "hypervisor status could not be built"))
+
+                # repaired jobs leave the queue, failed ones are retried later
+                global_db.set_repair_jobs_done(ids=done_ids)
+                global_db.set_repair_jobs_failed(failures=failures)
+                update_status_rollups(
+                    local_db=local_db, saved_timeframes=saved_timeframes
+                )
 
-                # update progress
-                progress_bar.update(1)
     except Exception as e:
         logging.getLogger(__name__).error(
             f" Error repairing hypervisor status not found {e}"
@@ -492,67 +511,43 @@ def repair_blocks():
 
 
 def repair_missing_blocks(protocol: str, network: str, batch_size: int = 100000):
-    # get a list of blocks from global database
-    database_blocks = [
-        x["block"]
-        for x in database_global(
-            mongo_url=CONFIGURATION["sources"]["database"]["mongo_server_url"]
-        ).get_items_from_database(
-            collection_name="blocks",
-            find={"network": network},
-            projection={"block": 1},
-            batch_size=batch_size,
-        )
-    ]
-
-    # get a list of status blocks from local database
-    todo_blocks = {
-        x["block"]: {
-            "id": f"{network}_{x['block']}",
-            "network": network,
-            "block": x["block"],
-            "timestamp": x["timestamp"],
-        }
-        for x in database_local(
-            mongo_url=CONFIGURATION["sources"]["database"]["mongo_server_url"],
-            db_name=f"{network}_{protocol}",
-        ).get_items_from_database(
-            collection_name="status",
-            find={"block": {"$nin": database_blocks}},
+    # global and local databases differ: stream both sides sorted by block ( no $nin list )
+    global_db = database_global(
+        mongo_url=CONFIGURATION["sources"]["database"]["mongo_server_url"]
+    )
+    local_db = database_local(
+        mongo_url=CONFIGURATION["sources"]["database"]["mongo_server_url"],
+        db_name=f"{network}_{protocol}",
+    )
+
+    # get status and status rewards blocks not present in global database
+    todo_blocks = {}
+    for collection_name in ["status", "rewards_status"]:
+        for x in local_db.get_missing_items(
+            collection_name=collection_name,
+            field="block",
+            other_collection_name="blocks",
+            other_find={"network": network},
             projection={"block": 1, "timestamp": 1},
+            other_database=global_db,
+            unique=True,
             batch_size=batch_size,
-        )
-    }
-
-    # get a list of status rewards from local database
-    todo_blocks.update(
-        {
-            x["block"]: {
+        ):
+            todo_blocks[x["block"]] = {
                 "id": f"{network}_{x['block']}",
                 "network": network,
                 "block": x["block"],
                 "timestamp": x["timestamp"],
             }
-            for x in database_local(
-                mongo_url=CONFIGURATION["sources"]["database"]["mongo_server_url"],
-                db_name=f"{network}_{protocol}",
-            ).get_items_from_database(
-                collection_name="rewards_status",
-                find={"block": {"$nin": database_blocks}},
-                projection={"block": 1, "timestamp": 1},
-                batch_size=batch_size,
-            )
-        }
-    )
 
     if todo_blocks:
         logging.getLogger(__name__).info(
             f" Found {len(todo_blocks)} missing blocks in {network}. Adding to global database..."
         )
         # add missing blocks to global database
-        database_global(
-            mongo_url=CONFIGURATION["sources"]["database"]["mongo_server_url"]
-        ).replace_items_to_database(data=todo_blocks.values(), collection_name="blocks")
+        global_db.replace_items_to_database(
+            data=list(todo_blocks.values()), collection_name="blocks"
+        )
     else:
         logging.getLogger(__name__).info(f" No missing blocks found in {network}.")
 
@@ -610,6 +605,43 @@ def replace_blocks_to_int():
                 progress_bar.update(1)
 
 
+def migrate_storage_schema(batch_size: int = 5000):
+    """convert status and operations documents of all databases to native numeric storage ( one-time )"""
+    mongo_url = CONFIGURATION["sources"]["database"]["mongo_server_url"]
+
+    for protocol, networks in CONFIGURATION["script"]["protocols"].items():
+        for network in networks["networks"]:
+            local_db_manager = database_local(
+                mongo_url=mongo_url, db_name=f"{network}_{protocol}"
+            )
+            for collection_name, converter in [
+                ("status", convert_hypervisor_toStorage),
+                ("operations", convert_operation_toStorage),
+            ]:
+                total = local_db_manager.migrate_items(
+                    collection_name=collection_name,
+                    converter=converter,
+                    batch_size=batch_size,
+                )
+                logging.getLogger(__name__).info(
+                    f" {total} {network}'s {collection_name} items migrated to native numeric storage"
+                )
+
+
+def rebuild_status_rollups():
+    """rebuild daily and hourly status rollups of all databases"""
+    mongo_url = CONFIGURATION["sources"]["database"]["mongo_server_url"]
+
+    for protocol, networks in CONFIGURATION["script"]["protocols"].items():
+        for network in networks["networks"]:
+            logging.getLogger(__name__).info(
+                f" Rebuilding {network}'s {protocol} status rollups"
+            )
+            database_local(
+                mongo_url=mongo_url, db_name=f"{network}_{protocol}"
+            ).update_status_rollups()
+
+
 def replace_quickswap_pool_dex_to_algebra(network: str, protocol: str = "gamma"):
     logging.getLogger(__name__).debug("    Convert quickswap pool dex to algebra")
 
@@ -630,14 +662,18 @@ def replace_quickswap_pool_dex_to_algebra(network: str, protocol: str = "gamma")
             local_db_manager.set_status(data=status)
             return status
 
+        saved_timeframes = {}
         with concurrent.futures.ThreadPoolExecutor(max_workers=10) as ex:
             for status in ex.map(loopme, status_to_modify):
+                add_saved_timeframe(saved_timeframes, status)
                 progress_bar.set_description(
                     f" Convert {network}'s status quickswap pool dex to algebra  id: {status['id']}"
                 )
                 # update progress
                 progress_bar.update(1)
 
+    update_status_rollups(local_db=local_db_manager, saved_timeframes=saved_timeframes)
+
 
 def add_timestamps_to_status(network: str, protocol: str = "gamma"):
     # setup database managers
@@ -659,8 +695,8 @@ def add_timestamps_to_status(network: str, protocol: str = "gamma"):
 
         def loopme(status):
             if "timestamp" in status:
-                # item already with data
-                return status, True
+                # item already with data ( not saved )
+                return status, None
 
             # control var
             saveit = False
@@ -698,10 +734,13 @@ def add_timestamps_to_status(network: str, protocol: str = "gamma"):
                 )
                 return status, False
 
+        saved_timeframes = {}
         with concurrent.futures.ThreadPoolExecutor(max_workers=10) as ex:
             for status, result in ex.map(loopme, all_status):
-                if not result:
+                if result is False:
                     _errors += 1
+                elif result:
+                    add_saved_timeframe(saved_timeframes, status)
 
                 progress_bar.set_description(
                     f"[{_errors}]  Updating status database {network}'s {status['address']} block {status['block']}"
@@ -710,6 +749,8 @@ def add_timestamps_to_status(network: str, protocol: str = "gamma"):
                 # update progress
                 progress_bar.update(1)
 
+    update_status_rollups(local_db=local_db_manager, saved_timeframes=saved_timeframes)
+
 
 # helpers
 def add_price_to_token(network: str, token_address: str, block: int, price: float):
@@ -755,9 +796,12 @@ def get_price_of_token(network: str, token_address: str, block: int) -> float:
     mongo_url = CONFIGURATION["sources"]["database"]["mongo_server_url"]
     global_db_manager = database_global(mongo_url=mongo_url)
 
-    # get price from database
+    # get price from database ( interpolated between price samples )
     price = global_db_manager.get_price_usd(
-        network=network, block=block, address=token_address
+        network=network,
+        block=block,
+        address=token_address,
+        interpolate_distance=get_price_cadence_blocks(network),
     )
 
     if price:
@@ -874,20 +918,6 @@ def get_all_logfiles() -> list:
     return logfiles
 
 
-def load_logFile(logfile: str) -> str:
-    """load logfile and return list of lines"""
-
-    # load file
-    result = ""
-    if os.path.isfile(logfile):
-        with open(logfile, mode="r", encoding="utf8") as f:
-            result = f.read()
-    else:
-        logging.getLogger(__name__).error(f"Error: File not found {logfile}")
-
-    return result
-
-
 # checks
 def check_database():
     # setup global database manager
@@ -933,6 +963,19 @@ def check_database():
         chek_globaldb_blocks(global_db_manager=global_db_manager)
 
 
+def check_query_plans(slow_ms: int = 1000):
+    """explain the registered query shapes of all databases, logging collection scans and slow plans"""
+    mongo_url = CONFIGURATION["sources"]["database"]["mongo_server_url"]
+
+    for protocol, networks in CONFIGURATION["script"]["protocols"].items():
+        for network in networks["networks"]:
+            database_local(
+                mongo_url=mongo_url, db_name=f"{network}_{protocol}"
+            ).explain_query_shapes(slow_ms=slow_ms)
+
+    database_global(mongo_url=mongo_url).explain_query_shapes(slow_ms=slow_ms)
+
+
 def chek_localdb_blocks(local_db_manager: database_local):
     """check if blocks are typed correctly
 
@@ -1062,70 +1105,88 @@ def get_failed_prices_from_log(log_file: str) -> dict:
     Return: {  <network>: {<address>: {<block>:<counter>}}}
 
     """
-    pricelog_regx = "\-\s\s(?P<network>.*)'s\stoken\s(?P<address>.*)\sprice\sat\sblock\s(?P<block>\d*)\snot\sfound"
-    debug_regx = "No\sprice\sfor\s(?P<address>.*)\sat\sblock\s(?P<block>\d*).*\[(?P<network>.*)\s(?P<dex>.*)\]"
-    debug_regx2 = "No\sprice\sfor\s(?P<network>.*)'s\s(?P<symbol>.*)\s\((?P<address>.*)\).*at\sblock\s(?P<block>\d*)"
-    user_status_regx = "Can't\sfind\s(?P<network>.*?)'s\s(?P<hype_address>.*?)\susd\sprice\sfor\s(?P<address>.*?)\sat\sblock\s(?P<block>\d*?)\.\sReturn\sZero"
-    # groups->  network, symbol, address, block
+    return _count_log_records(
+        log_file=log_file, scanner=log_scanner(patterns=FAILED_PRICE_PATTERNS)
+    )
 
-    # load file
-    log_file_content = load_logFile(logfile=log_file)
 
-    # set a var
-    network_token_blocks = {}
+def get_failed_status_from_log(log_file: str) -> dict:
+    return _count_log_records(
+        log_file=log_file, scanner=log_scanner(patterns=FAILED_STATUS_PATTERNS)
+    )
 
-    for regx_txt in [debug_regx, pricelog_regx, debug_regx2, user_status_regx]:
-        if matches := re.finditer(regx_txt, log_file_content):
-            for match in matches:
-                network = match.group("network")
-                address = match.group("address")
-                block = match.group("block")
-
-                # network
-                if network not in network_token_blocks:
-                    network_token_blocks[network] = {}
-                # address
-                if address not in network_token_blocks[network]:
-                    network_token_blocks[network][address] = {}
-                # block
-                if block not in network_token_blocks[network][address]:
-                    network_token_blocks[network][address][block] = 0
-
-                # counter ( times encountered)
-                network_token_blocks[network][address][block] += 1
+
+def _count_log_records(log_file: str, scanner: log_scanner) -> dict:
+    """count records found streaming the log file
+
+    Return: {  <network>: {<address>: {<block>:<counter>}}}
+    """
+    network_token_blocks = {}
+    for records in scanner.scan(log_file=log_file):
+        for record in records:
+            # counter ( times encountered)
+            blocks = network_token_blocks.setdefault(record["network"], {}).setdefault(
+                record["address"], {}
+            )
+            blocks[record["block"]] = blocks.get(record["block"], 0) + 1
 
     return network_token_blocks
 
 
-def get_failed_status_from_log(log_file: str) -> dict:
-    # load file
-    log_file_content = load_logFile(logfile=log_file)
+def get_log_checkpoint() -> log_checkpoint:
+    """log content already scanned for failures"""
+    return log_checkpoint(
+        filename=os.path.join(CONFIGURATION["cache"]["save_path"], "log_checkpoint.json")
+    )
 
-    regx_txt = "No\shypervisor\sstatus\sfound\sfor\s(?P<network>.*)'s\s(?P<address>.*)\sat\sblock\s(?P<block>\d*)"
-    # set a var
-    network_token_blocks = {}
 
-    # find hypervisor status not found
-    if matches := re.finditer(regx_txt, log_file_content):
-        for match in matches:
-            network = match.group("network")
-            address = match.group("address")
-            block = match.group("block")
-
-            # network
-            if network not in network_token_blocks:
-                network_token_blocks[network] = {}
-            # address
-            if address not in network_token_blocks[network]:
-                network_token_blocks[network][address] = {}
-            # block
-            if block not in network_token_blocks[network][address]:
-                network_token_blocks[network][address][block] = 0
+def enqueue_log_failures(batch_size: int = 5000):
+    """Scan log content not scanned before and enqueue the failures found:
+        prices to the price jobs queue and hypervisor status to the repair jobs queue
 
-            # counter ( times encountered)
-            network_token_blocks[network][address][block] += 1
+    Args:
+        batch_size (int, optional): records enqueued at once. Defaults to 5000.
+    """
+    global_db = database_global(
+        mongo_url=CONFIGURATION["sources"]["database"]["mongo_server_url"]
+    )
+    scanner = log_scanner(
+        patterns=FAILED_PRICE_PATTERNS + FAILED_STATUS_PATTERNS,
+        checkpoint=get_log_checkpoint(),
+        batch_size=batch_size,
+    )
+    for log_file in get_all_logfiles():
+        _found = 0
+        for records in scanner.scan(log_file=log_file):
+            # discard partial matches
+            records = [x for x in records if x["block"].isdigit() and x["network"]]
+            _found += len(records)
+
+            price_ids = {}
+            for record in records:
+                if record["type"] == "price":
+                    price_ids.setdefault(record["network"], set()).add(
+                        f"{record['network']}_{record['block']}_{record['address'].lower()}"
+                    )
+            for network, ids in price_ids.items():
+                # one price per token and cadence bucket not already sampled ( the rest is interpolated )
+                if ids := get_price_cadence_gaps(
+                    global_db_manager=global_db,
+                    network=network,
+                    price_ids=ids,
+                    cadence_blocks=get_price_cadence_blocks(network),
+                ):
+                    global_db.set_price_jobs(network=network, price_ids=list(ids))
 
-    return network_token_blocks
+            global_db.set_repair_jobs(
+                type="hypervisor_status",
+                items=[x for x in records if x["type"] == "hypervisor_status"],
+            )
+
+        if _found:
+            logging.getLogger(__name__).info(
+                f" {_found} failures found in {log_file} enqueued to be repaired"
+            )
 
 
 def main(option: str, **kwargs):
@@ -1137,6 +1198,12 @@ def main(option: str, **kwargs):
         repair_hypervisor_status()
     if option == "repair":
         repair_all()
+    if option == "queries":
+        check_query_plans()
+    if option == "migrate":
+        migrate_storage_schema()
+    if option == "rollups":
+        rebuild_status_rollups()
     if option == "special":
         # used to check for special cases
         pass
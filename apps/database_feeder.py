@@ -1,5 +1,6 @@
 import os
 import sys
+import time
 import logging
 import tqdm
 import concurrent.futures
@@ -17,12 +18,14 @@ from bins.configuration import (
     STATIC_REGISTRY_ADDRESSES,
     add_to_memory,
     get_from_memory,
+    get_price_cadence_blocks,
 )
 from bins.general.general_utilities import (
     convert_string_datetime,
     differences,
     log_time_passed,
 )
+from bins.general.metrics_utilities import METRICS
 from bins.w3.onchain_data_helper import onchain_data_helper2
 from bins.w3.onchain_utilities.protocols import (
     gamma_hypervisor,
@@ -321,6 +324,9 @@ def feed_prices(
     rewrite: bool = False,
     threaded: bool = True,
     coingecko: bool = True,  # TODO: create configuration var
+    exact: bool = False,
+    priority: int = 1,
+    process_queue: bool = True,
 ):
     """Feed database with prices of tokens and blocks specified in token_blocks
 
@@ -328,6 +334,9 @@ def feed_prices(
         protocol (str):
         network (str):
         price_ids (set): list of database ids to be scraped --> "<network>_<block>_<token address>"
+        exact (bool, optional): scrape all price ids instead of only filling the token price series cadence gaps. Defaults to False.
+        priority (int, optional): price jobs priority, lower first. Defaults to 1.
+        process_queue (bool, optional): process all due price jobs of the network, not only the ones of price_ids. Defaults to True.
     """
     logging.getLogger(__name__).info(f">Feeding {protocol}'s {network} token prices")
 
@@ -337,87 +346,183 @@ def feed_prices(
     # local_db_manager = database_local(mongo_url=mongo_url, db_name=db_name)
     global_db_manager = database_global(mongo_url=mongo_url)
 
-    # get already processed prices #TODO: limit to last 20000 blocks?
-    already_processed_prices = get_not_to_process_prices(
-        global_db_manager=global_db_manager, network=network
+    # discard already processed prices
+    price_ids = get_to_process_prices(
+        global_db_manager=global_db_manager, network=network, price_ids=price_ids
+    )
+    if not exact:
+        # prices in between samples are interpolated: only fill price series gaps
+        price_ids = get_price_cadence_gaps(
+            global_db_manager=global_db_manager,
+            network=network,
+            price_ids=price_ids,
+            cadence_blocks=get_price_cadence_blocks(network),
+        )
+
+    # enqueue price jobs ( already existing jobs keep their attempts and retry time )
+    global_db_manager.set_price_jobs(
+        network=network, price_ids=list(price_ids), priority=priority
     )
 
     # create items to process
     logging.getLogger(__name__).debug(
-        "   Building a list of addresses and blocks to be scraped"
-    )
-    # list of usd price ids sorted by descending block number
-    items_to_process = sorted(
-        list(price_ids - already_processed_prices),
-        key=lambda x: int(x.split("_")[1]),
-        reverse=True,
+        "   Building a list of price jobs due to be scraped"
     )
+    # due price jobs in batches, sorted by priority and descending block number
+    processed = 0
+    price_helper = None
+    for items_to_process in iter_price_job_batches(
+        global_db_manager=global_db_manager,
+        network=network,
+        price_ids=None if process_queue else list(price_ids),
+    ):
+        if price_helper is None:
+            # create price helper
+            logging.getLogger(__name__).debug(
+                "   Get {}'s prices using {} database".format(network, db_name)
+            )
 
-    if items_to_process:
-        # create price helper
-        logging.getLogger(__name__).debug(
-            "   Get {}'s prices using {} database".format(network, db_name)
+            logging.getLogger(__name__).debug("   Force disable price cache ")
+            price_helper = price_scraper(
+                cache=False,
+                cache_filename="uniswapv3_price_cache",
+                coingecko=coingecko,
+            )
+        # sources known to be unable to price each token
+        negative_cache = global_db_manager.get_price_negative_cache(
+            network=network, addresses={x["address"] for x in items_to_process}
         )
+        now = time.time()
+
+        def _cached(job: dict) -> dict:
+            """negative cache of the job token at its block range {<source>: item}"""
+            return negative_cache.get(
+                (
+                    job["address"],
+                    global_db_manager.get_price_negative_cache_range(job["block"]),
+                ),
+                {},
+            )
 
-        logging.getLogger(__name__).debug("   Force disable price cache ")
-        price_helper = price_scraper(
-            cache=False,
-            cache_filename="uniswapv3_price_cache",
-            coingecko=coingecko,
+        exclude_sources = {
+            (x["address"], x["block"]): [
+                source for source, item in _cached(x).items() if item["until"] > now
+            ]
+            for x in items_to_process
+        }
+        # get subgraph prices in batches
+        thegraph_prices = price_helper.get_prices_thegraph(
+            network=network,
+            items=[(x["address"], x["block"]) for x in items_to_process],
+            exclude_sources=exclude_sources,
         )
         # log errors
         _errors = 0
 
         with tqdm.tqdm(total=len(items_to_process)) as progress_bar:
 
-            def loopme(db_id: str):
+            def loopme(job: dict):
                 """loopme
 
                 Args:
-                    network (str):
-                    db_id (str): "<network>_<block>_<token address>"
+                    job (dict): price job
 
                 Returns:
-                    tuple: price, token address, block
+                    tuple: price, source, failed sources, error, price job
                 """
                 try:
-                    tmp_var = db_id.split("_")
-                    network = tmp_var[0]
-                    block = int(tmp_var[1])
-                    token = tmp_var[2]
+                    price, source, thegraph_failed = thegraph_prices.get(
+                        (job["address"], job["block"]), (None, None, [])
+                    )
+                    if price:
+                        return price, source, thegraph_failed, None, job
 
-                    # get price
-                    return (
-                        price_helper.get_price(
-                            network=network, token_id=token, block=block, of="USD"
-                        ),
-                        token,
-                        block,
+                    # get price from the rest of sources
+                    price, source, failed_sources = price_helper.get_price_detailed(
+                        network=network,
+                        token_id=job["address"],
+                        block=job["block"],
+                        of="USD",
+                        exclude_sources=exclude_sources.get(
+                            (job["address"], job["block"]), []
+                        )
+                        + thegraph_failed,
                     )
-                except Exception:
+                    return price, source, thegraph_failed + failed_sources, None, job
+                except Exception as e:
                     logging.getLogger(__name__).exception(
-                        f"Unexpected error while geting {token} usd price at block {block}"
+                        f"Unexpected error while geting {job['address']} usd price at block {job['block']}"
+                    )
+                    return None, None, [], str(e), job
+
+            def save_result(
+                price_usd: float | None,
+                source: str | None,
+                failed_sources: list[str],
+                error: str | None,
+                job: dict,
+            ) -> bool:
+                """save price and price job result
+
+                Returns:
+                    bool: price found
+                """
+                token = job["address"]
+                cached = _cached(job)
+                if failed_sources:
+                    # negative cache failed sources
+                    global_db_manager.set_price_negative_cache(
+                        network=network,
+                        address=token,
+                        block=job["block"],
+                        sources=failed_sources,
+                    )
+                if price_usd:
+                    # save price to database
+                    global_db_manager.set_price_usd(
+                        network=network,
+                        block=job["block"],
+                        token_address=token,
+                        price_usd=price_usd,
+                    )
+                    if source in cached:
+                        global_db_manager.delete_price_negative_cache(
+                            network=network,
+                            address=token,
+                            block=job["block"],
+                            source=source,
+                        )
+                    global_db_manager.set_price_job_result(job=job, price_usd=price_usd)
+                    return True
+
+                if not failed_sources and error is None and cached:
+                    # all sources are negative cached: wait without spending an attempt
+                    global_db_manager.set_price_job_result(
+                        job=job,
+                        price_usd=None,
+                        error="all price sources negative cached",
+                        next_retry=min(x["until"] for x in cached.values()),
+                    )
+                else:
+                    global_db_manager.set_price_job_result(
+                        job=job,
+                        price_usd=None,
+                        error=error
+                        or f"price not found in {', '.join(failed_sources) or 'any source'}",
                     )
-                return None
+                return False
 
             if threaded:
                 # threaded
                 with concurrent.futures.ThreadPoolExecutor(max_workers=4) as ex:
-                    for price_usd, token, block in ex.map(loopme, items_to_process):
-                        if price_usd:
+                    for result in ex.map(loopme, items_to_process):
+                        job = result[-1]
+                        if save_result(*result):
                             # progress
                             progress_bar.set_description(
-                                f"[er:{_errors}] Retrieved USD price of 0x..{token[-3:]} at block {block}   "
+                                f"[er:{_errors}] Retrieved USD price of 0x..{job['address'][-3:]} at block {job['block']}   "
                             )
                             progress_bar.refresh()
-                            # add hypervisor status to database
-                            # save price to database
-                            global_db_manager.set_price_usd(
-                                network=network,
-                                block=block,
-                                token_address=token,
-                                price_usd=price_usd,
-                            )
                         else:
                             # error found
                             _errors += 1
@@ -426,27 +531,29 @@ def feed_prices(
                         progress_bar.update(1)
             else:
                 # loop blocks to gather info
-                for db_id in items_to_process:
-                    price_usd, token, block = loopme(db_id)
+                for item in items_to_process:
                     progress_bar.set_description(
-                        f"[er:{_errors}] Retrieving USD price of 0x..{token[-3:]} at block {block}"
+                        f"[er:{_errors}] Retrieving USD price of 0x..{item['address'][-3:]} at block {item['block']}"
                     )
                     progress_bar.refresh()
-                    if price_usd:
-                        # save price to database
-                        global_db_manager.set_price_usd(
-                            network=network,
-                            block=block,
-                            token_address=token,
-                            price_usd=price_usd,
-                        )
-                    else:
+                    if not save_result(*loopme(item)):
                         # error found
                         _errors += 1
 
                     # add one
                     progress_bar.update(1)
 
+        METRICS.inc(
+            "items_total",
+            len(items_to_process) - _errors,
+            stage="prices",
+            network=network,
+            result="ok",
+        )
+        METRICS.inc(
+            "items_total", _errors, stage="prices", network=network, result="error"
+        )
+
         with contextlib.suppress(Exception):
             if _errors > 0:
                 logging.getLogger(__name__).info(
@@ -456,31 +563,132 @@ def feed_prices(
                         (_errors / len(items_to_process)) if items_to_process else 0,
                     )
                 )
+        processed += len(items_to_process)
+
+    if processed:
         return True
-    else:
-        logging.getLogger(__name__).info(
-            "   No new {}'s prices to process for {} database".format(network, db_name)
-        )
-        return False
 
+    logging.getLogger(__name__).info(
+        "   No new {}'s prices to process for {} database".format(network, db_name)
+    )
+    return False
 
-def get_not_to_process_prices(global_db_manager: database_global, network: str) -> set:
-    already_processed_prices = [
-        x["id"]
-        for x in global_db_manager.get_items_from_database(
-            collection_name="usd_prices",
-            find={"network": network, "price": {"$gt": 0}},
-            projection={"id": 1, "_id": 0},
+
+def iter_price_job_batches(
+    global_db_manager: database_global,
+    network: str,
+    price_ids: list[str] | None = None,
+    batch_size: int = 1000,
+):
+    """Yield due price jobs in batches till none is due.
+        Processed jobs leave the due set ( done or retried later ), so each batch is read after the previous one is processed
+
+    Args:
+        global_db_manager (database_global):
+        network (str):
+        price_ids (list[str] | None, optional): only these jobs. Defaults to None.
+        batch_size (int, optional): . Defaults to 1000.
+
+    Returns:
+        generator: list[dict] price jobs
+    """
+    seen = set()
+    while batch := [
+        x
+        for x in global_db_manager.get_price_jobs(
+            network=network, price_ids=price_ids, limit=batch_size
         )
-    ]
+        if x["id"] not in seen
+    ]:
+        # jobs whose result could not be saved are not processed twice
+        seen.update(x["id"] for x in batch)
+        yield batch
+
 
+def get_to_process_prices(
+    global_db_manager: database_global, network: str, price_ids
+) -> set:
+    """Return the price ids not already processed, querying the database only for the candidates
+
+    Args:
+        global_db_manager (database_global):
+        network (str):
+        price_ids (iterable): candidate database ids --> "<network>_<block>_<token address>"
+
+    Returns:
+        set: price ids to process
+    """
     # get zero sqrtPriceX96 ( unsalvable errors found in the past)
-    already_processed_prices += [
+    zero_sqrtPriceX96 = {
         f'{network}_{x["block"]}_{x["pool"]["token0"]["address"]}'
         for x in get_from_memory(key="zero_sqrtPriceX96")
-    ]
+    }
 
-    return set(already_processed_prices)
+    return set(
+        global_db_manager.get_missing_keys(
+            collection_name="usd_prices",
+            field="id",
+            keys=(x for x in price_ids if x not in zero_sqrtPriceX96),
+            find={"price": {"$gt": 0}},
+        )
+    )
+
+
+def get_price_cadence_gaps(
+    global_db_manager: database_global,
+    network: str,
+    price_ids: set,
+    cadence_blocks: int,
+) -> set:
+    """Reduce price ids to one per token and cadence bucket (blocks) with no price sample in the database
+
+    Args:
+        global_db_manager (database_global):
+        network (str):
+        price_ids (set): "<network>_<block>_<token address>"
+        cadence_blocks (int): blocks between price samples
+
+    Returns:
+        set: price ids to process
+    """
+    # {<token address>: {<bucket>: <lowest block>}}
+    token_buckets = {}
+    for price_id in price_ids:
+        _, block, address = price_id.rsplit("_", 2)
+        block = int(block)
+        buckets = token_buckets.setdefault(address, {})
+        bucket = block // cadence_blocks
+        if bucket not in buckets or block < buckets[bucket]:
+            buckets[bucket] = block
+
+    result = set()
+    for address, buckets in token_buckets.items():
+        sampled_buckets = {
+            x["block"] // cadence_blocks
+            for x in global_db_manager.get_items_from_database_iter(
+                collection_name="usd_prices",
+                find={
+                    "network": network,
+                    "address": address,
+                    "price": {"$gt": 0},
+                    "block": {
+                        "$gte": min(buckets) * cadence_blocks,
+                        "$lt": (max(buckets) + 1) * cadence_blocks,
+                    },
+                },
+                projection={"block": 1, "_id": 0},
+            )
+        }
+        result.update(
+            f"{network}_{block}_{address}"
+            for bucket, block in buckets.items()
+            if bucket not in sampled_buckets
+        )
+
+    logging.getLogger(__name__).debug(
+        f"   {len(result)} of {len(price_ids)} {network} price ids are price series cadence gaps"
+    )
+    return result
 
 
 def create_tokenBlocks_allTokensButWeth(protocol: str, network: str) -> set:
@@ -721,7 +929,7 @@ def create_tokenBlocks_rewards(protocol: str, network: str) -> set:
     return set(
         [
             f'{network}_{item["block"]}_{item["rewardToken"]}'
-            for item in local_db_manager.get_items_from_database(
+            for item in local_db_manager.get_items_from_database_iter(
                 collection_name="rewards_status",
                 find={},
                 projection={"rewardToken": 1, "block": 1},
@@ -751,29 +959,33 @@ def feed_prices_force_sqrtPriceX96(protocol: str, network: str, threaded: bool =
     local_db_manager = database_local(mongo_url=mongo_url, db_name=db_name)
     global_db_manager = database_global(mongo_url=mongo_url)
 
-    # get already processed prices
-    already_processed_prices = get_not_to_process_prices(
-        global_db_manager=global_db_manager, network=network
-    )
-
     # get a list of the top used tokens1 symbols
     top_tokens = [x["symbol"] for x in local_db_manager.get_mostUsed_tokens1()]
 
     # get all hype status where token1 == top tokens1 and not already processed
     # avoid top_tokens at token0
+    status_list = local_db_manager.get_items(
+        collection_name="status",
+        find={
+            "pool.token1.symbol": {"$in": top_tokens},
+            "pool.token0.symbol": {"$nin": top_tokens},
+        },
+        projection={"block": 1, "pool": 1, "_id": 0},
+        sort=[("block", 1)],
+    )
+    to_process_prices = get_to_process_prices(
+        global_db_manager=global_db_manager,
+        network=network,
+        price_ids={
+            "{}_{}_{}".format(network, x["block"], x["pool"]["token0"]["address"])
+            for x in status_list
+        },
+    )
     status_list = [
         x
-        for x in local_db_manager.get_items(
-            collection_name="status",
-            find={
-                "pool.token1.symbol": {"$in": top_tokens},
-                "pool.token0.symbol": {"$nin": top_tokens},
-            },
-            projection={"block": 1, "pool": 1, "_id": 0},
-            sort=[("block", 1)],
-        )
+        for x in status_list
         if "{}_{}_{}".format(network, x["block"], x["pool"]["token0"]["address"])
-        not in already_processed_prices
+        in to_process_prices
     ]
 
     # log errors
@@ -804,11 +1016,12 @@ def feed_prices_force_sqrtPriceX96(protocol: str, network: str, threaded: bool =
                 #     token1_decimals=status["pool"]["token1"]["decimals"],
                 # )
 
-                # get weth usd price
+                # get weth usd price ( interpolated between price samples )
                 usdPrice_token1 = global_db_manager.get_price_usd(
                     network=network,
                     block=status["block"],
                     address=status["pool"]["token1"]["address"],
+                    interpolate_distance=get_price_cadence_blocks(network),
                 )
 
                 # calc token usd price
@@ -979,17 +1192,19 @@ def feed_timestamp_blocks(network: str, protocol: str, threaded: bool = True):
         address="0x0000000000000000000000000000000000000000", network=network
     )
 
-    # get a list of blocks already in the database
-    blocks_indb = [
-        x["block"] for x in global_db_manager.get_all_block_timestamp(network=network)
+    # create a list of status blocks not already in the global database
+    items_to_process = [
+        x["block"]
+        for x in local_db_manager.get_missing_items(
+            collection_name="status",
+            field="block",
+            other_collection_name="blocks",
+            other_find={"network": network},
+            projection={"block": 1, "_id": 0},
+            other_database=global_db_manager,
+            unique=True,
+        )
     ]
-    # create a list of items to process
-    items_to_process = []
-    for block in local_db_manager.get_distinct_items_from_database(
-        collection_name="status", field="block"
-    ):
-        if block not in blocks_indb:
-            items_to_process.append(block)
 
     _errors = 0
 
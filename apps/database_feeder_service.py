@@ -12,6 +12,9 @@ from datetime import datetime, timedelta, timezone
 import time
 
 from bins.configuration import CONFIGURATION
+from bins.general.metrics_utilities import METRICS
+from bins.general.scheduler_utilities import job_scheduler, scheduled_job
+from bins.database.common.db_managers import MongoDbManager
 
 from apps.database_feeder import (
     feed_operations,
@@ -30,8 +33,7 @@ from apps.feeds.status import (
     feed_rewards_status,
     feed_hypervisor_status,
 )
-
-from apps.database_checker import repair_all
+from apps.feeds.events import feed_events_loop
 
 
 def network_sequence_loop(
@@ -49,17 +51,23 @@ def network_sequence_loop(
         network (str):
     """
 
+    labels = {"protocol": protocol, "network": network}
+
     # feed database with all operations from static hypervisor addresses
-    feed_operations(protocol=protocol, network=network)
+    with METRICS.timer("stage", stage="operations", **labels):
+        feed_operations(protocol=protocol, network=network)
 
     # feed database with status
-    feed_hypervisor_status(protocol=protocol, network=network, threaded=True)
+    with METRICS.timer("stage", stage="status", **labels):
+        feed_hypervisor_status(protocol=protocol, network=network, threaded=True)
 
     # feed global blocks data with status
-    feed_timestamp_blocks(network=network, protocol=protocol)
+    with METRICS.timer("stage", stage="timestamp_blocks", **labels):
+        feed_timestamp_blocks(network=network, protocol=protocol)
 
     # feed global blocks data with daily
-    feed_blocks_timestamp(network=network)
+    with METRICS.timer("stage", stage="blocks_timestamp", **labels):
+        feed_blocks_timestamp(network=network)
 
     if do_prices:
         # feed network prices ( before user status to avoid price related errors)
@@ -67,57 +75,73 @@ def network_sequence_loop(
 
     if do_userStatus:
         # feed user_status data
-        feed_user_operations(protocol=protocol, network=network)
+        with METRICS.timer("stage", stage="user_operations", **labels):
+            feed_user_operations(protocol=protocol, network=network)
 
     if do_repairs:
-        # try to repair all errors found in logs
-        repair_all()
+        # try to repair all errors found in logs ( checker dependencies are only loaded when used)
+        from apps.database_checker import repair_all
+
+        with METRICS.timer("stage", stage="repairs", **labels):
+            repair_all()
 
     # feed rewards status ( needs prices and blocks)
-    feed_rewards_status(protocol=protocol, network=network)
+    with METRICS.timer("stage", stage="rewards_status", **labels):
+        feed_rewards_status(protocol=protocol, network=network)
 
 
 def price_sequence_loop(protocol: str, network: str):
+    labels = {"protocol": protocol, "network": network}
+
     # feed most used token proces
     logging.getLogger(__name__).info(f">   top token prices")
-    feed_prices(
-        protocol=protocol,
-        network=network,
-        price_ids=create_tokenBlocks_topTokens(protocol=protocol, network=network),
-        coingecko=True,
-    )
+    with METRICS.timer("stage", stage="top_prices", **labels):
+        feed_prices(
+            protocol=protocol,
+            network=network,
+            price_ids=create_tokenBlocks_topTokens(protocol=protocol, network=network),
+            coingecko=True,
+            priority=0,
+        )
 
     # force feed prices from already known using conversion
     logging.getLogger(__name__).info(f">   all token prices from already known/top")
-    feed_prices_force_sqrtPriceX96(protocol=protocol, network=network)
+    with METRICS.timer("stage", stage="sqrtPriceX96_prices", **labels):
+        feed_prices_force_sqrtPriceX96(protocol=protocol, network=network)
 
     # feed all token prices left but weth
     logging.getLogger(__name__).info(f">   all token prices left but weth")
-    feed_prices(
-        protocol=protocol,
-        network=network,
-        price_ids=create_tokenBlocks_allTokensButWeth(
-            protocol=protocol, network=network
-        ),
-        coingecko=False,
-    )
+    with METRICS.timer("stage", stage="butWeth_prices", **labels):
+        feed_prices(
+            protocol=protocol,
+            network=network,
+            price_ids=create_tokenBlocks_allTokensButWeth(
+                protocol=protocol, network=network
+            ),
+            coingecko=False,
+            priority=1,
+        )
     # feed all token prices left
     logging.getLogger(__name__).info(f">   all token prices left")
-    feed_prices(
-        protocol=protocol,
-        network=network,
-        price_ids=create_tokenBlocks_allTokens(protocol=protocol, network=network),
-        coingecko=True,
-    )
+    with METRICS.timer("stage", stage="all_prices", **labels):
+        feed_prices(
+            protocol=protocol,
+            network=network,
+            price_ids=create_tokenBlocks_allTokens(protocol=protocol, network=network),
+            coingecko=True,
+            priority=2,
+        )
 
     # feed rewards token prices
     logging.getLogger(__name__).info(f">   rewards token prices")
-    feed_prices(
-        protocol=protocol,
-        network=network,
-        price_ids=create_tokenBlocks_rewards(protocol=protocol, network=network),
-        coingecko=True,
-    )
+    with METRICS.timer("stage", stage="rewards_prices", **labels):
+        feed_prices(
+            protocol=protocol,
+            network=network,
+            price_ids=create_tokenBlocks_rewards(protocol=protocol, network=network),
+            coingecko=True,
+            priority=1,
+        )
 
 
 # services
@@ -233,11 +257,242 @@ def network_db_service(
     )
 
 
+def network_events_service(
+    protocol: str,
+    network: str,
+    do_prices: bool = False,
+    do_userStatus: bool = False,
+):
+    """feed one local database reacting to new operations and status items ( instead of full loops )"""
+
+    logging.getLogger("telegram").info(
+        f" {protocol}'s {network} event driven database feeding started"
+    )
+    # get minimum time between operation scrapes ( defaults to 5 minutes)
+    min_loop_time = 60 * (
+        CONFIGURATION["_custom_"]["cml_parameters"].min_loop_time
+        or CONFIGURATION["script"].get("min_loop_time", 5)
+    )
+    try:
+        feed_events_loop(
+            protocol=protocol,
+            network=network,
+            do_prices=do_prices,
+            do_userStatus=do_userStatus,
+            min_loop_time=min_loop_time,
+        )
+    except KeyboardInterrupt:
+        logging.getLogger(__name__).debug(
+            f" {protocol}'s {network} event driven database feeding stoped by user"
+        )
+    except Exception:
+        logging.getLogger(__name__).exception(
+            f" Unexpected error while event feeding {protocol}'s {network} database data. error {sys.exc_info()[0]}"
+        )
+
+    # telegram messaging
+    logging.getLogger("telegram").info(
+        f" {protocol}'s {network} event driven database feeding stoped"
+    )
+
+
+# scheduler stages: interval in minutes ( None: use min_loop_time ), priority ( lower first)
+#   and the stages of the same network that must succeed before each run ( network_sequence_loop order)
+SCHEDULER_STAGES = {
+    "operations": {"interval": None, "priority": 0, "after": []},
+    "status": {"interval": None, "priority": 0, "after": ["operations"]},
+    "timestamp_blocks": {"interval": 30, "priority": 2, "after": ["status"]},
+    "blocks_timestamp": {"interval": 60, "priority": 2, "after": []},
+    # before user status to avoid price related errors
+    "prices": {
+        "interval": 15,
+        "priority": 1,
+        "after": ["status", "timestamp_blocks"],
+    },
+    "user_operations": {
+        "interval": None,
+        "priority": 2,
+        "after": ["status", "prices"],
+    },
+    # needs prices and blocks
+    "rewards_status": {
+        "interval": 30,
+        "priority": 1,
+        "after": ["prices", "timestamp_blocks"],
+    },
+    "repairs": {"interval": 120, "priority": 3, "after": []},
+}
+
+
+def create_scheduler_jobs(
+    do_prices: bool = False,
+    do_userStatus: bool = False,
+    do_repairs: bool = False,
+) -> list[scheduled_job]:
+    """one job per protocol, network and stage ( repairs are not network specific)
+
+    Args:
+        do_prices (bool, optional): . Defaults to False.
+        do_userStatus (bool, optional): . Defaults to False.
+        do_repairs (bool, optional): . Defaults to False.
+
+    Returns:
+        list[scheduled_job]:
+    """
+    config = CONFIGURATION["script"].get("scheduler") or {}
+    min_loop_time = (
+        CONFIGURATION["_custom_"]["cml_parameters"].min_loop_time
+        or CONFIGURATION["script"].get("min_loop_time", 5)
+    )
+
+    def _job(
+        name: str,
+        stage: str,
+        func,
+        groups: list[str],
+        after: list[str] | None = None,
+        **kwargs,
+    ):
+        stage_config = {
+            **SCHEDULER_STAGES[stage],
+            **((config.get("stages") or {}).get(stage) or {}),
+        }
+        return scheduled_job(
+            name=name,
+            func=func,
+            interval=60 * (stage_config.get("interval") or min_loop_time),
+            priority=stage_config.get("priority", 1),
+            groups=groups,
+            labels={"stage": stage, **kwargs},
+            after=after,
+            **kwargs,
+        )
+
+    network_stages = {
+        "operations": feed_operations,
+        "status": lambda protocol, network: feed_hypervisor_status(
+            protocol=protocol, network=network, threaded=True
+        ),
+        "timestamp_blocks": feed_timestamp_blocks,
+        "blocks_timestamp": lambda protocol, network: feed_blocks_timestamp(
+            network=network
+        ),
+        "rewards_status": feed_rewards_status,
+    }
+    if do_prices:
+        network_stages["prices"] = price_sequence_loop
+    if do_userStatus:
+        network_stages["user_operations"] = feed_user_operations
+
+    result = []
+    for protocol in CONFIGURATION["script"]["protocols"]:
+        # override networks if specified in cml
+        networks = (
+            CONFIGURATION["_custom_"]["cml_parameters"].networks
+            or CONFIGURATION["script"]["protocols"][protocol]["networks"]
+        )
+        for network in networks:
+            for stage, func in network_stages.items():
+                result.append(
+                    _job(
+                        name=f"{protocol}_{network}_{stage}",
+                        stage=stage,
+                        func=func,
+                        groups=[network],
+                        # stages not scheduled ( like prices when disabled ) are not waited for
+                        after=[
+                            f"{protocol}_{network}_{x}"
+                            for x in SCHEDULER_STAGES[stage]["after"]
+                            if x in network_stages
+                        ],
+                        protocol=protocol,
+                        network=network,
+                    )
+                )
+
+    if do_repairs:
+        from apps.database_checker import repair_all
+
+        result.append(
+            _job(
+                name="repairs",
+                stage="repairs",
+                func=lambda protocol, network: repair_all(),
+                groups=["repairs"],
+                protocol="",
+                network="",
+            )
+        )
+
+    return result
+
+
+def scheduler_service(
+    do_prices: bool = False,
+    do_userStatus: bool = False,
+    do_repairs: bool = False,
+):
+    """feed all networks in one process: each protocol, network and stage is an independent job
+    with its own cadence, so a slow network does not delay the others"""
+    config = CONFIGURATION["script"].get("scheduler") or {}
+
+    # share database connection pools between jobs
+    MongoDbManager.share_clients = True
+
+    jobs = create_scheduler_jobs(
+        do_prices=do_prices, do_userStatus=do_userStatus, do_repairs=do_repairs
+    )
+    # limit concurrent jobs per network ( repairs run one at a time)
+    scheduler = job_scheduler(
+        max_workers=config.get("max_workers", 8),
+        group_limits={
+            group: 1 if group == "repairs" else config.get("max_workers_network", 2)
+            for job in jobs
+            for group in job.groups
+        },
+    )
+    for job in jobs:
+        scheduler.add_job(job)
+
+    logging.getLogger("telegram").info(
+        f" Scheduled database feeding started with {len(scheduler.jobs)} jobs"
+    )
+    try:
+        scheduler.run_forever()
+    except KeyboardInterrupt:
+        logging.getLogger(__name__).debug(" Scheduled database feeding stoped by user")
+    except Exception:
+        logging.getLogger(__name__).exception(
+            f" Unexpected error while scheduling database feeding. error {sys.exc_info()[0]}"
+        )
+    finally:
+        scheduler.stop()
+        MongoDbManager.close_shared_clients()
+
+    # telegram messaging
+    logging.getLogger("telegram").info(" Scheduled database feeding stoped")
+
+
 def main(option: str, **kwargs):
     if option == "local":
         local_db_service()
     elif option == "global":
         global_db_service()
+    elif option == "scheduler":
+        scheduler_service(
+            do_prices=CONFIGURATION["_custom_"]["cml_parameters"].do_prices or False,
+            do_userStatus=CONFIGURATION["_custom_"]["cml_parameters"].do_userStatus
+            or False,
+            do_repairs=CONFIGURATION["_custom_"]["cml_parameters"].do_repairs or False,
+        )
+    elif option == "network" and CONFIGURATION["_custom_"]["cml_parameters"].events:
+        network_events_service(
+            protocol=kwargs["protocol"],
+            network=kwargs["network"],
+            do_prices=CONFIGURATION["_custom_"]["cml_parameters"].do_prices or False,
+            do_userStatus=CONFIGURATION["_custom_"]["cml_parameters"].do_userStatus
+            or False,
+        )
     elif option == "network":
         network_db_service(
             protocol=kwargs["protocol"],
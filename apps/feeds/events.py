@@ -0,0 +1,345 @@
+### Events ######################
+#   incremental pipeline: new items in operations and status enqueue exactly their downstream work
+#       operations  ->  hypervisor status at the operation block and block-1
+#       status      ->  block timestamp, token usd prices, user operations replay
+#   new items are discovered using Mongo change streams or, on standalone servers, the outbox collection
+import logging
+import threading
+import time
+import concurrent.futures
+from pymongo.errors import OperationFailure, PyMongoError
+
+from bins.configuration import CONFIGURATION
+from bins.database.common.db_collections_common import database_global, database_local
+from bins.database.db_user_operations import user_operations_hypervisor_builder
+from bins.w3.builders import build_db_hypervisor
+
+from apps.database_feeder import feed_operations, feed_prices
+from apps.feeds.status import add_saved_timeframe, update_status_rollups
+
+# operation topics changing the hypervisor status
+STATUS_TOPICS = ["deposit", "withdraw", "zeroBurn", "rebalance"]
+
+
+def feed_events_loop(
+    protocol: str,
+    network: str,
+    do_prices: bool = True,
+    do_userStatus: bool = False,
+    min_loop_time: int = 60 * 5,
+    batch_size: int = 500,
+):
+    """Event driven network feed: operations are scraped periodically in the background
+        while every new operation/status item is processed as soon as it is saved.
+
+    Args:
+        protocol (str):
+        network (str):
+        do_prices (bool, optional): feed usd prices of new status. Defaults to True.
+        do_userStatus (bool, optional): replay user operations of hypervisors with new status. Defaults to False.
+        min_loop_time (int, optional): seconds between operations scrapes. Defaults to 5 minutes.
+        batch_size (int, optional): maximum events processed at once. Defaults to 500.
+    """
+    mongo_url = CONFIGURATION["sources"]["database"]["mongo_server_url"]
+    local_db = database_local(mongo_url=mongo_url, db_name=f"{network}_{protocol}")
+
+    # open the event source before anything is written
+    events = get_events(local_db=local_db)
+
+    # operations producer
+    threading.Thread(
+        target=_operations_producer,
+        kwargs={
+            "protocol": protocol,
+            "network": network,
+            "min_loop_time": min_loop_time,
+        },
+        daemon=True,
+    ).start()
+
+    static_info = {}
+    batch = []
+    for event in events:
+        if event is not None:
+            batch.append(event)
+            if len(batch) < batch_size:
+                continue
+        if not batch:
+            continue
+
+        # no more pending events or batch full
+        try:
+            process_events(
+                protocol=protocol,
+                network=network,
+                events=[(collection_name, item) for collection_name, item, _ in batch],
+                static_info=static_info,
+                do_prices=do_prices,
+                do_userStatus=do_userStatus,
+            )
+            # outbox references are removed only once processed
+            if outbox_ids := [x for _, _, x in batch if x]:
+                local_db.delete_outbox(ids=outbox_ids)
+        except Exception:
+            logging.getLogger(__name__).exception(
+                f" Unexpected error while processing {len(batch)} {network}'s events"
+            )
+        batch = []
+
+
+def get_events(local_db: database_local, poll_time: int = 2):
+    """Yield (collection name, item, outbox id) of new or updated operations and status, or None when there is nothing new.
+        Uses change streams when supported by the server, falling back to the outbox collection otherwise.
+        Outbox ids ( None for change streams ) must be deleted once their items are processed.
+
+    Args:
+        local_db (database_local):
+        poll_time (int, optional): outbox polling seconds. Defaults to 2.
+
+    Returns:
+        generator:
+    """
+    stream = _change_stream_events(local_db=local_db)
+    try:
+        # the stream is opened on first iteration
+        first = next(stream)
+    except OperationFailure as e:
+        logging.getLogger(__name__).info(
+            f" Change streams not supported by {local_db._db_name} database server ({e}). Using the outbox collection."
+        )
+        local_db.enable_outbox()
+        return _outbox_events(local_db=local_db, poll_time=poll_time)
+
+    def _events():
+        yield first
+        yield from stream
+
+    return _events()
+
+
+def _change_stream_events(local_db: database_local, max_backoff: int = 60):
+    resume_token = None
+    # set when events may have been missed ( resume token dropped )
+    rescan = False
+    opened = False
+    errors = 0
+    while True:
+        try:
+            for event in local_db.watch_items(
+                collection_names=["operations", "status"], resume_after=resume_token
+            ):
+                opened = True
+                errors = 0
+                if rescan:
+                    # stream is open again: operations saved meanwhile are processed now
+                    rescan = False
+                    yield from _rescan_events(local_db=local_db)
+                if event is None:
+                    yield None
+                    continue
+                collection_name, item, resume_token = event
+                yield collection_name, item, None
+        except OperationFailure as e:
+            if not opened:
+                # not supported
+                raise e
+            # non resumable ( pymongo already retried resumable errors), like history lost:
+            #   the token is dropped and all operations are rescanned once the stream is open
+            logging.getLogger(__name__).exception(
+                f" Change stream error on {local_db._db_name}. Reopening and rescanning operations."
+            )
+            resume_token = None
+            rescan = True
+        except PyMongoError:
+            logging.getLogger(__name__).exception(
+                f" Change stream error on {local_db._db_name}. Resuming."
+            )
+        # back off
+        errors += 1
+        time.sleep(min(max_backoff, 2**errors))
+
+
+def _rescan_events(local_db: database_local):
+    """Yield all operations changing the hypervisor status
+    ( status already present are not processed again)"""
+    for item in local_db.get_items_from_database_iter(
+        collection_name="operations",
+        find={"topic": {"$in": STATUS_TOPICS}},
+        batch_size=1000,
+    ):
+        yield "operations", item, None
+
+
+def _outbox_events(local_db: database_local, poll_time: int = 2, limit: int = 1000):
+    last_ids = None
+    while True:
+        outbox = local_db.get_outbox(limit=limit)
+        if not outbox:
+            yield None
+            time.sleep(poll_time)
+            continue
+
+        if (ids := [x["id"] for x in outbox]) == last_ids:
+            # same references as before: processing them failed, wait before retrying
+            time.sleep(poll_time)
+        last_ids = ids
+
+        # references to items no longer present
+        if orphans := [x["id"] for x in outbox if not x.get("item")]:
+            local_db.delete_outbox(ids=orphans)
+
+        for x in outbox:
+            if x.get("item"):
+                yield x["collection"], x["item"], x["id"]
+        # the consumer processes the pending batch ( deleting its references )
+        yield None
+
+
+def _operations_producer(protocol: str, network: str, min_loop_time: int):
+    while True:
+        _startime = time.time()
+        try:
+            feed_operations(protocol=protocol, network=network)
+        except Exception:
+            logging.getLogger(__name__).exception(
+                f" Unexpected error while feeding {network}'s operations"
+            )
+        if (sleep_time := min_loop_time - (time.time() - _startime)) > 0:
+            time.sleep(sleep_time)
+
+
+def process_events(
+    protocol: str,
+    network: str,
+    events: list[tuple],
+    static_info: dict,
+    do_prices: bool = True,
+    do_userStatus: bool = False,
+):
+    """Process the downstream work of a batch of new items
+
+    Args:
+        protocol (str):
+        network (str):
+        events (list[tuple]): (collection name, item)
+        static_info (dict): hypervisor static cache  {<address>: static item}
+        do_prices (bool, optional): . Defaults to True.
+        do_userStatus (bool, optional): . Defaults to False.
+    """
+    operations = [
+        item
+        for collection_name, item in events
+        if collection_name == "operations" and item.get("topic") in STATUS_TOPICS
+    ]
+    status_list = [item for collection_name, item in events if collection_name == "status"]
+
+    logging.getLogger(__name__).debug(
+        f" Processing {network}'s events: {len(operations)} operations {len(status_list)} status"
+    )
+
+    if operations:
+        feed_status_from_operations(
+            protocol=protocol,
+            network=network,
+            operations=operations,
+            static_info=static_info,
+        )
+
+    if status_list:
+        feed_blocks_from_status(network=network, status_list=status_list)
+
+        if do_prices:
+            feed_prices(
+                protocol=protocol,
+                network=network,
+                price_ids={
+                    f"{network}_{status['block']}_{status['pool'][token]['address']}"
+                    for status in status_list
+                    for token in ["token0", "token1"]
+                },
+                threaded=False,
+                process_queue=False,
+            )
+
+        if do_userStatus:
+            for address in {status["address"] for status in status_list}:
+                try:
+                    user_operations_hypervisor_builder(
+                        hypervisor_address=address, network=network, protocol=protocol
+                    )._process_operations()
+                except Exception as e:
+                    logging.getLogger(__name__).exception(
+                        f" Unexpected error while feeding user status of {network}'s  {address} -> error {e}"
+                    )
+
+
+def feed_status_from_operations(
+    protocol: str, network: str, operations: list[dict], static_info: dict
+):
+    """save the hypervisor status at the operations block and block-1, when not already present
+
+    Args:
+        protocol (str):
+        network (str):
+        operations (list[dict]):
+        static_info (dict): hypervisor static cache  {<address>: static item}
+    """
+    mongo_url = CONFIGURATION["sources"]["database"]["mongo_server_url"]
+    local_db = database_local(mongo_url=mongo_url, db_name=f"{network}_{protocol}")
+
+    address_blocks = {}
+    for operation in operations:
+        for block in [operation["blockNumber"], operation["blockNumber"] - 1]:
+            address_blocks[f"{operation['address']}_{block}"] = (
+                operation["address"],
+                block,
+            )
+
+    to_process = [
+        address_blocks[x]
+        for x in local_db.get_missing_keys(
+            collection_name="status", field="id", keys=list(address_blocks.keys())
+        )
+    ]
+
+    # refresh static cache when new hypervisors appear
+    if any(address not in static_info for address, block in to_process):
+        static_info.update(
+            {x["address"]: x for x in local_db.get_items(collection_name="static")}
+        )
+
+    args = (
+        (address, network, block, static_info[address]["dex"], False)
+        for address, block in to_process
+        if address in static_info
+    )
+    saved_timeframes = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as ex:
+        for result in ex.map(lambda p: build_db_hypervisor(*p), args):
+            if result is not None:
+                local_db.set_status(data=result)
+                add_saved_timeframe(saved_timeframes, result)
+
+    update_status_rollups(local_db=local_db, saved_timeframes=saved_timeframes)
+
+
+def feed_blocks_from_status(network: str, status_list: list[dict]):
+    """save block timestamps of status not present in the global blocks collection
+
+    Args:
+        network (str):
+        status_list (list[dict]):
+    """
+    global_db = database_global(
+        mongo_url=CONFIGURATION["sources"]["database"]["mongo_server_url"]
+    )
+    timestamps = {
+        f"{network}_{status['block']}": (status["block"], status["timestamp"])
+        for status in status_list
+        if "timestamp" in status
+    }
+    for block_id in global_db.get_missing_keys(
+        collection_name="blocks", field="id", keys=list(timestamps.keys())
+    ):
+        block, timestamp = timestamps[block_id]
+        global_db.set_block(network=network, block=block, timestamp=timestamp)
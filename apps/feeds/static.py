@@ -5,7 +5,7 @@ import concurrent.futures
 import tqdm
 
 from bins.configuration import CONFIGURATION, STATIC_REGISTRY_ADDRESSES
-from bins.database.common.db_collections_common import database_local
+from bins.database.common.db_collections_common import database_local, database_global
 from bins.w3.builders import build_hypervisor
 from bins.w3.onchain_utilities import rewarders
 from bins.w3.onchain_utilities.basic import erc20
@@ -43,6 +43,12 @@ def feed_hypervisor_static(
         protocol=protocol, network=network, dex=dex, rewrite=rewrite
     )
 
+    # creation block and timestamp of all hypervisors at once
+    #   ( not found ones are not searched again: empty dict )
+    creation_data = _get_contracts_creation_block(
+        network=network, contract_addresses=hypervisor_addresses_to_process
+    )
+
     # set log list of hypervisors with errors
     _errors = 0
     with tqdm.tqdm(
@@ -51,7 +57,8 @@ def feed_hypervisor_static(
         if threaded:
             # threaded
             args = (
-                (address, network, dex) for address in hypervisor_addresses_to_process
+                (address, network, dex, creation_data.get(address.lower(), {}))
+                for address in hypervisor_addresses_to_process
             )
             with concurrent.futures.ThreadPoolExecutor(max_workers=4) as ex:
                 for result in ex.map(
@@ -80,6 +87,7 @@ def feed_hypervisor_static(
                     address=address,
                     network=network,
                     dex=dex,
+                    creation_data=creation_data.get(address.lower(), {}),
                 ):
                     # add hypervisor static data to database
                     local_db.set_static(data=result)
@@ -105,6 +113,7 @@ def _create_hypervisor_static_dbObject(
     address: str,
     network: str,
     dex: str,
+    creation_data: dict | None = None,
 ) -> dict:
     """Create a hypervisor object with static data:
          block = creation block
@@ -115,6 +124,8 @@ def _create_hypervisor_static_dbObject(
         network (str):
         block (int):
         dex (str):
+        creation_data (dict | None, optional): already searched creation block and timestamp ( empty when not found ).
+                            None to search it now. Defaults to None.
 
     Returns:
         dict: hypervisor object ready to be saved in database
@@ -133,9 +144,11 @@ def _create_hypervisor_static_dbObject(
     hypervisor_data = hypervisor.as_dict(convert_bint=True, static_mode=True)
 
     # add contract block and timestamp at creation
-    if creation_data := _get_contract_creation_block(
-        network=network, contract_address=address
-    ):
+    if creation_data is None:
+        creation_data = _get_contract_creation_block(
+            network=network, contract_address=address
+        )
+    if creation_data:
         logging.getLogger(__name__).debug(
             f"     setting creation block and timestamp for {network}'s {address}"
         )
@@ -345,36 +358,97 @@ def _get_contract_creation_block(network: str, contract_address: str) -> dict:
         dict: "block":
               "timestamp":
     """
-    # create an etherescan helper
-    cg_helper = etherscan_helper(api_keys=CONFIGURATION["sources"]["api_keys"])
-
-    if contract_creation_data := cg_helper.get_contract_creation(
+    return _get_contracts_creation_block(
         network=network, contract_addresses=[contract_address]
-    ):
-        for item in contract_creation_data:
+    ).get(contract_address.lower())
+
+
+def _get_contracts_creation_block(network: str, contract_addresses: list[str]) -> dict:
+    """Get the block and timestamp where contracts were created using, in order:
+        the database cache, etherscan batched calls and an onchain eth_getCode binary search
+        ( when no explorer key is configured or the explorer does not know the contract ).
+
+    Args:
+        network (str):
+        contract_addresses (list[str]):
+
+    Returns:
+        dict: {<contract address lower>: {"block":, "timestamp":}}  ( not found contracts are not present )
+    """
+    global_db = database_global(
+        mongo_url=CONFIGURATION["sources"]["database"]["mongo_server_url"]
+    )
+    contract_addresses = list(dict.fromkeys(x.lower() for x in contract_addresses))
+
+    # cached
+    result = {
+        address: {"block": item["block"], "timestamp": item["timestamp"]}
+        for address, item in global_db.get_contract_creation(
+            network=network, addresses=contract_addresses
+        ).items()
+    }
+    if not (missing := [x for x in contract_addresses if x not in result]):
+        return result
+
+    # create dummy web3 object
+    dummyw3 = erc20(
+        address="0x0000000000000000000000000000000000000000",
+        network=network,
+        block=0,
+    )
+
+    # explorer
+    ether_helper = etherscan_helper(api_keys=CONFIGURATION["sources"]["api_keys"])
+    if ether_helper.has_api_key(network=network):
+        for address, item in ether_helper.get_contracts_creation(
+            network=network, contract_addresses=missing
+        ).items():
             try:
-                if (
-                    "contractAddress" in item
-                    and item["contractAddress"].lower() == contract_address.lower()
-                ):
-                    # this is the contract creation transaction
-
-                    # create dummy web3 object
-                    dummyw3 = erc20(
-                        address="0x0000000000000000000000000000000000000000",
-                        network=network,
-                        block=0,
-                    )
-                    # retrieve block data
-                    creation_tx = dummyw3._getTransactionReceipt(txHash=item["txHash"])
-                    block_data = dummyw3._getBlockData(block=creation_tx.blockNumber)
-                    return {
-                        "block": block_data.number,
-                        "timestamp": block_data.timestamp,
-                    }
+                # retrieve block data
+                creation_tx = dummyw3._getTransactionReceipt(txHash=item["txHash"])
+                block_data = dummyw3._getBlockData(block=creation_tx.blockNumber)
+                result[address] = {
+                    "block": block_data.number,
+                    "timestamp": block_data.timestamp,
+                }
+                global_db.set_contract_creation(
+                    network=network,
+                    address=address,
+                    block=block_data.number,
+                    timestamp=block_data.timestamp,
+                    txHash=item["txHash"],
+                )
             except Exception as e:
                 logging.getLogger(__name__).error(
                     f" Error while fetching contract creation data from etherscan. error: {e}"
                 )
 
-    return None
+    # onchain
+    if missing := [x for x in contract_addresses if x not in result]:
+        # search midpoints are moved to the nearest known block
+        def _nearest_known_block(block: int, lo: int, hi: int) -> int | None:
+            return global_db.get_nearest_known_block(
+                network=network, block=block, lo=lo, hi=hi
+            )
+
+        for address in missing:
+            if (
+                block := dummyw3.find_contract_creation_block(
+                    address=address, nearest_known_block=_nearest_known_block
+                )
+            ) is not None and (block_data := dummyw3._getBlockData(block=block)):
+                logging.getLogger(__name__).debug(
+                    f" {network}'s {address} creation block {block} found onchain"
+                )
+                result[address] = {
+                    "block": block_data.number,
+                    "timestamp": block_data.timestamp,
+                }
+                global_db.set_contract_creation(
+                    network=network,
+                    address=address,
+                    block=block_data.number,
+                    timestamp=block_data.timestamp,
+                )
+
+    return result
@@ -6,10 +6,11 @@ import random
 import tqdm
 from web3 import Web3
 
-from bins.configuration import CONFIGURATION
+from bins.configuration import CONFIGURATION, get_price_cadence_blocks
 from bins.database.common.db_collections_common import database_global, database_local
 from bins.formulas.apr import calculate_rewards_apr
 from bins.general.general_utilities import differences
+from bins.general.metrics_utilities import METRICS, rpc_accounting
 from bins.w3.onchain_utilities import rewarders
 
 from bins.w3.builders import (
@@ -147,6 +148,8 @@ def feed_hypervisor_status(
 
     # set log list of hypervisors with errors
     _errors = 0
+    # timeframe of saved status by hypervisor ( to maintain rollups )
+    saved_timeframes = {}
 
     with tqdm.tqdm(total=len(toProcess_block_address), leave=False) as progress_bar:
         if threaded:
@@ -175,6 +178,7 @@ def feed_hypervisor_status(
                         progress_bar.refresh()
                         # add hypervisor status to database
                         local_db.set_status(data=result)
+                        add_saved_timeframe(saved_timeframes, result)
                     # update progress
                     progress_bar.update(1)
         else:
@@ -195,12 +199,25 @@ def feed_hypervisor_status(
                 if result != None:
                     # add hypervisor status to database
                     local_db.set_status(data=result)
+                    add_saved_timeframe(saved_timeframes, result)
                 else:
                     # error found
                     _errors += 1
                 # update progress
                 progress_bar.update(1)
 
+    METRICS.inc(
+        "items_total",
+        len(toProcess_block_address) - _errors,
+        stage="status",
+        network=network,
+        result="ok",
+    )
+    METRICS.inc("items_total", _errors, stage="status", network=network, result="error")
+
+    # update daily/hourly rollups of the new status
+    update_status_rollups(local_db=local_db, saved_timeframes=saved_timeframes)
+
     with contextlib.suppress(Exception):
         if _errors > 0:
             logging.getLogger(__name__).info(
@@ -214,6 +231,46 @@ def feed_hypervisor_status(
             )
 
 
+def add_saved_timeframe(saved_timeframes: dict, status: dict):
+    """add a saved status timestamp to its hypervisor timeframe
+
+    Args:
+        saved_timeframes (dict): {<hypervisor address>: [ini timestamp, end timestamp]}
+        status (dict):
+    """
+    if status.get("timestamp") is None:
+        return
+    if status["address"] not in saved_timeframes:
+        saved_timeframes[status["address"]] = [status["timestamp"], status["timestamp"]]
+    else:
+        saved_timeframes[status["address"]][0] = min(
+            saved_timeframes[status["address"]][0], status["timestamp"]
+        )
+        saved_timeframes[status["address"]][1] = max(
+            saved_timeframes[status["address"]][1], status["timestamp"]
+        )
+
+
+def update_status_rollups(local_db: database_local, saved_timeframes: dict):
+    """update the status rollup buckets touched by newly saved status
+
+    Args:
+        local_db (database_local):
+        saved_timeframes (dict): {<hypervisor address>: [ini timestamp, end timestamp]}
+    """
+    for address, (timestamp_ini, timestamp_end) in saved_timeframes.items():
+        try:
+            local_db.update_status_rollups(
+                hypervisor_address=address,
+                timestamp_ini=timestamp_ini,
+                timestamp_end=timestamp_end,
+            )
+        except Exception:
+            logging.getLogger(__name__).exception(
+                f" Unexpected error while updating status rollups of {address}"
+            )
+
+
 ## Rewards status
 
 
@@ -260,74 +317,172 @@ def feed_rewards_status_loop(rewarder_static: dict):
 
     batch_size = 50000
 
-    # already processed blocks for this hype rewarder combination
-    processed_blocks = database_local(
-        mongo_url=mongo_url, db_name=db_name
-    ).get_distinct_items_from_database(
-        collection_name="rewards_status",
-        field="block",
-        condition={
-            "hypervisor_address": rewarder_static["hypervisor_address"],
-            "rewarder_address": rewarder_static["rewarder_address"],
-        },
+    # to be processed as per the hypervisor status: anti-join against already processed blocks for this hype rewarder combination
+    to_process_hypervisor_status = list(
+        database_local(mongo_url=mongo_url, db_name=db_name).get_missing_items(
+            collection_name="status",
+            field="block",
+            other_collection_name="rewards_status",
+            find={
+                "address": rewarder_static["hypervisor_address"],
+                "block": {"$gte": rewarder_static["block"]},
+            },
+            other_find={
+                "hypervisor_address": rewarder_static["hypervisor_address"],
+                "rewarder_address": rewarder_static["rewarder_address"],
+            },
+            batch_size=batch_size,
+        )
     )
 
-    # to be processed as per the hypervisor status
-    to_process_hypervisor_status = database_local(
-        mongo_url=mongo_url, db_name=db_name
-    ).get_items_from_database(
-        collection_name="status",
-        find={
-            "address": rewarder_static["hypervisor_address"],
-            "$and": [
-                {"block": {"$gte": rewarder_static["block"]}},
-                {"block": {"$nin": processed_blocks}},
-            ],
-        },
-        batch_size=batch_size,
+    if not to_process_hypervisor_status:
+        return []
+
+    # rewards data only changes when the rewarder emits events:  chain is called at those change points only
+    anchor_blocks = get_rewards_anchor_blocks(
+        rewarder_static=rewarder_static,
+        blocks=[x["block"] for x in to_process_hypervisor_status],
     )
+    timestamps = {x["block"]: x["timestamp"] for x in to_process_hypervisor_status}
+    unique_anchor_blocks = sorted(set(anchor_blocks.values()))
 
-    # get the last 20 hype status to process
-    if len(to_process_hypervisor_status) > 20:
-        logging.getLogger(__name__).debug(
-            f"  Found {len(to_process_hypervisor_status)} status blocks to be scraped  but only the last 20 will be processed << TODO: change this >>"
-        )
-        to_process_hypervisor_status = to_process_hypervisor_status[-20:]
+    logging.getLogger(__name__).debug(
+        f"    -> {len(to_process_hypervisor_status)} status blocks to be scraped for {network}'s rewarder {rewarder_static['rewarder_address']} on hype {rewarder_static['hypervisor_address']} using {len(unique_anchor_blocks)} rewarder calls"
+    )
+
+    rewards_data_by_block = {}
+    with concurrent.futures.ThreadPoolExecutor() as ex:
+        for block, rewards_data in zip(
+            unique_anchor_blocks,
+            ex.map(
+                lambda block: get_rewards_data(
+                    rewarder_static=rewarder_static,
+                    block=block,
+                    timestamp=timestamps.get(block, 0),
+                ),
+                unique_anchor_blocks,
+            ),
+        ):
+            rewards_data_by_block[block] = rewards_data
+
+    logging.getLogger(__name__).debug(
+        f"    -> Filling prices and APR for {network}'s rewarder {rewarder_static['rewarder_address']}"
+    )
 
     result = []
-    # process
+    for hypervisor_status in to_process_hypervisor_status:
+        for reward_data in rewards_data_by_block.get(
+            anchor_blocks[hypervisor_status["block"]], []
+        ):
+            # same rewards data, at the status block
+            reward_data = reward_data.copy()
+            reward_data["block"] = hypervisor_status["block"]
+            reward_data["timestamp"] = hypervisor_status["timestamp"]
+
+            if reward_data := add_apr_to_rewards_data(
+                reward_data=reward_data,
+                hypervisor_status=hypervisor_status,
+                rewarder_static=rewarder_static,
+            ):
+                result.append(reward_data)
+
     logging.getLogger(__name__).debug(
-        f"    -> {len(to_process_hypervisor_status)} status blocks to be scraped for {network}'s rewarder {rewarder_static['rewarder_address']} on hype {rewarder_static['hypervisor_address']}"
+        f"    -> Done processing {network}'s rewarder {rewarder_static['rewarder_address']}"
+    )
+
+    return result
+
+
+def get_rewards_anchor_blocks(rewarder_static: dict, blocks: list[int]) -> dict:
+    """Link each block to the block where its rewards data should be read from:
+        the last rewarder change block before it or the first block
+
+    Args:
+        rewarder_static (dict):
+        blocks (list[int]): sorted blocks to be processed
+
+    Returns:
+        dict: { <block>: <anchor block> }
+    """
+    try:
+        rewarder = build_rewarder(rewarder_static=rewarder_static, block=blocks[-1])
+        change_blocks = rewarder.get_change_blocks(
+            block_ini=blocks[0] + 1,
+            block_end=blocks[-1],
+            refIds=rewarder_static["rewarder_refIds"] or None,
+        )
+    except Exception as e:
+        logging.getLogger(__name__).error(
+            f" Could not get {rewarder_static['network']}'s rewarder {rewarder_static['rewarder_address']} change blocks. Each block will be scraped. error-> {e}"
+        )
+        return {block: block for block in blocks}
+
+    result = {}
+    idx = 0
+    anchor = blocks[0]
+    for block in blocks:
+        while idx < len(change_blocks) and change_blocks[idx] <= block:
+            anchor = change_blocks[idx]
+            idx += 1
+        result[block] = anchor
+    return result
+
+
+def build_rewarder(rewarder_static: dict, block: int, timestamp: int = 0):
+    """Create a rewarder object from its static database data
+
+    Returns:
+        gamma_rewarder: or raises NotImplementedError when type is not supported
+    """
+    if rewarder_static["rewarder_type"] == "zyberswap_masterchef_v1":
+        return rewarders.zyberswap_masterchef_v1(
+            address=rewarder_static["rewarder_address"],
+            network=rewarder_static["network"],
+            block=block,
+            timestamp=timestamp,
+        )
+    elif rewarder_static["rewarder_type"] == "thena_gauge_v2":
+        return rewarders.thena_gauge_v2(
+            address=rewarder_static["rewarder_address"],
+            network=rewarder_static["network"],
+            block=block,
+            timestamp=timestamp,
+        )
+
+    raise NotImplementedError(
+        f" Rewarder type {rewarder_static['rewarder_type']} not implemented"
     )
 
-    def loop(hypervisor_status):
-        rewards_data = []
+
+def get_rewards_data(rewarder_static: dict, block: int, timestamp: int = 0) -> list:
+    """Scrape rewards data from chain at the specified block
+
+    Returns:
+        list: rewards data list
+    """
+    rewards_data = []
+    with rpc_accounting(
+        stage="rewards",
+        network=rewarder_static["network"],
+        address=rewarder_static["rewarder_address"],
+        block=block,
+    ):
         try:
+            rewarder = build_rewarder(
+                rewarder_static=rewarder_static, block=block, timestamp=timestamp
+            )
+
             if rewarder_static["rewarder_type"] == "zyberswap_masterchef_v1":
-                # create masterchef object
-                zyberswap_masterchef = rewarders.zyberswap_masterchef_v1(
-                    address=rewarder_static["rewarder_address"],
-                    network=network,
-                    block=hypervisor_status["block"],
-                    timestamp=hypervisor_status["timestamp"],
-                )
                 # get rewards status
-                rewards_data = zyberswap_masterchef.get_rewards(
+                rewards_data = rewarder.get_rewards(
                     hypervisor_addresses=[rewarder_static["hypervisor_address"]],
                     pids=rewarder_static["rewarder_refIds"],
                     convert_bint=True,
                 )
 
             elif rewarder_static["rewarder_type"] == "thena_gauge_v2":
-                thena_gauge = rewarders.thena_gauge_v2(
-                    address=rewarder_static["rewarder_address"],
-                    network=network,
-                    block=hypervisor_status["block"],
-                    timestamp=hypervisor_status["timestamp"],
-                )
-
                 # get rewards directly from gauge ( rewarder ).  Warning-> will not contain rewarder_registry field!!
-                if rewards_from_gauge := thena_gauge.get_rewards(convert_bint=True):
+                if rewards_from_gauge := rewarder.get_rewards(convert_bint=True):
                     # add rewarder registry address
                     for reward in rewards_from_gauge:
                         reward["rewarder_registry"] = rewarder_static[
@@ -338,91 +493,82 @@ def feed_rewards_status_loop(rewarder_static: dict):
                     rewards_data += rewards_from_gauge
         except Exception as e:
             logging.getLogger(__name__).exception(
-                f" Unexpected error constructing {network}'s {rewarder_static['rewarder_address']} rewarder data. error-> {e}"
+                f" Unexpected error constructing {rewarder_static['network']}'s {rewarder_static['rewarder_address']} rewarder data. error-> {e}"
             )
 
-        logging.getLogger(__name__).debug(
-            f"    -> Filling prices and APR for {network}'s rewarder {rewarder_static['rewarder_address']}"
-        )
+    return rewards_data
 
-        for reward_data in rewards_data:
-            # token_prices
-            try:
-                rewardToken_price = get_price_from_db(
-                    network=network,
-                    block=hypervisor_status["block"],
-                    token_address=rewarder_static["rewardToken"],
-                )
-                hype_token0_price = get_price_from_db(
-                    network=network,
-                    block=hypervisor_status["block"],
-                    token_address=hypervisor_status["pool"]["token0"]["address"],
-                )
-                hype_token1_price = get_price_from_db(
-                    network=network,
-                    block=hypervisor_status["block"],
-                    token_address=hypervisor_status["pool"]["token1"]["address"],
-                )
-                # hypervisor price per share
-                hype_total0 = int(hypervisor_status["totalAmounts"]["total0"]) / (
-                    10 ** hypervisor_status["pool"]["token0"]["decimals"]
-                )
-                hype_total1 = int(hypervisor_status["totalAmounts"]["total1"]) / (
-                    10 ** hypervisor_status["pool"]["token1"]["decimals"]
-                )
-                hype_price_per_share = (
-                    hype_token0_price * hype_total0 + hype_token1_price * hype_total1
-                ) / (
-                    int(hypervisor_status["totalSupply"])
-                    / (10 ** hypervisor_status["decimals"])
-                )
-
-                if (
-                    int(reward_data["total_hypervisorToken_qtty"])
-                    and hype_price_per_share
-                ):
-                    # if there is hype qtty staked and price per share
-                    apr = calculate_rewards_apr(
-                        token_price=rewardToken_price,
-                        token_reward_rate=int(reward_data["rewards_perSecond"])
-                        / (10 ** reward_data["rewardToken_decimals"]),
-                        total_lp_locked=int(reward_data["total_hypervisorToken_qtty"])
-                        / (10 ** hypervisor_status["decimals"]),
-                        lp_token_price=hype_price_per_share,
-                    )
-                else:
-                    # no apr if no hype qtty staked or no price per share
-                    apr = 0
-
-                # add status fields ( APR )
-                reward_data["hypervisor_symbol"] = hypervisor_status["symbol"]
-                reward_data["dex"] = hypervisor_status["dex"]
-                reward_data["apr"] = apr
-                reward_data["rewardToken_price_usd"] = rewardToken_price
-                reward_data["token0_price_usd"] = hype_token0_price
-                reward_data["token1_price_usd"] = hype_token1_price
-                reward_data["hypervisor_share_price_usd"] = hype_price_per_share
-
-                # add to result
-                result.append(reward_data)
 
-            except Exception as e:
-                logging.getLogger(__name__).error(
-                    f" Rewards-> {network}'s {rewarder_static['rewardToken']} price at block {hypervisor_status['block']} could not be calculated. Error: {e}"
-                )
-                logging.getLogger(__name__).debug(
-                    f" Rewards last err debug data -> rewarder_static {rewarder_static}           hype status {hypervisor_status}"
-                )
+def add_apr_to_rewards_data(
+    reward_data: dict, hypervisor_status: dict, rewarder_static: dict
+) -> dict | None:
+    """Add prices and APR to rewards data using the hypervisor status at the same block
 
+    Returns:
+        dict | None: reward data or None when prices could not be found
+    """
+    network = rewarder_static["network"]
+    try:
+        rewardToken_price = get_price_from_db(
+            network=network,
+            block=hypervisor_status["block"],
+            token_address=rewarder_static["rewardToken"],
+        )
+        hype_token0_price = get_price_from_db(
+            network=network,
+            block=hypervisor_status["block"],
+            token_address=hypervisor_status["pool"]["token0"]["address"],
+        )
+        hype_token1_price = get_price_from_db(
+            network=network,
+            block=hypervisor_status["block"],
+            token_address=hypervisor_status["pool"]["token1"]["address"],
+        )
+        # hypervisor price per share
+        hype_total0 = int(hypervisor_status["totalAmounts"]["total0"]) / (
+            10 ** hypervisor_status["pool"]["token0"]["decimals"]
+        )
+        hype_total1 = int(hypervisor_status["totalAmounts"]["total1"]) / (
+            10 ** hypervisor_status["pool"]["token1"]["decimals"]
+        )
+        hype_price_per_share = (
+            hype_token0_price * hype_total0 + hype_token1_price * hype_total1
+        ) / (int(hypervisor_status["totalSupply"]) / (10 ** hypervisor_status["decimals"]))
+
+        if int(reward_data["total_hypervisorToken_qtty"]) and hype_price_per_share:
+            # if there is hype qtty staked and price per share
+            apr = calculate_rewards_apr(
+                token_price=rewardToken_price,
+                token_reward_rate=int(reward_data["rewards_perSecond"])
+                / (10 ** reward_data["rewardToken_decimals"]),
+                total_lp_locked=int(reward_data["total_hypervisorToken_qtty"])
+                / (10 ** hypervisor_status["decimals"]),
+                lp_token_price=hype_price_per_share,
+            )
+        else:
+            # no apr if no hype qtty staked or no price per share
+            apr = 0
+
+        # add status fields ( APR )
+        reward_data["hypervisor_symbol"] = hypervisor_status["symbol"]
+        reward_data["dex"] = hypervisor_status["dex"]
+        reward_data["apr"] = apr
+        reward_data["rewardToken_price_usd"] = rewardToken_price
+        reward_data["token0_price_usd"] = hype_token0_price
+        reward_data["token1_price_usd"] = hype_token1_price
+        reward_data["hypervisor_share_price_usd"] = hype_price_per_share
+
+        return reward_data
+
+    except Exception as e:
+        logging.getLogger(__name__).error(
+            f" Rewards-> {network}'s {rewarder_static['rewardToken']} price at block {hypervisor_status['block']} could not be calculated. Error: {e}"
+        )
         logging.getLogger(__name__).debug(
-            f"    -> Done processing {network}'s rewarder {rewarder_static['rewarder_address']}"
+            f" Rewards last err debug data -> rewarder_static {rewarder_static}           hype status {hypervisor_status}"
         )
 
-    with concurrent.futures.ThreadPoolExecutor() as ex:
-        for result_item in ex.map(loop, to_process_hypervisor_status):
-            result.append(result_item)
-
-    return result
+    return None
 
 
 def get_price_from_db(
@@ -435,7 +581,10 @@ def get_price_from_db(
         mongo_url=CONFIGURATION["sources"]["database"]["mongo_server_url"]
     )
     if token_price := global_db.get_price_usd(
-        network=network, block=block, address=token_address
+        network=network,
+        block=block,
+        address=token_address,
+        interpolate_distance=get_price_cadence_blocks(network),
     ):
         return token_price[0]["price"]
 
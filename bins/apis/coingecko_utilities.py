@@ -212,7 +212,9 @@ class geckoterminal_price_helper:
         self.retries = retries
         self.request_timeout = request_timeout
 
-        self.__RATE_LIMIT = net_utilities.rate_limit(rate_max_sec=0.4)  #  rate limiter
+        self.__RATE_LIMIT = net_utilities.get_rate_limit(
+            self._main_url
+        )  #  rate limiter ( shared by host)
 
     @property
     def networks(self) -> list[str]:
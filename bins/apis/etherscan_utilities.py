@@ -22,6 +22,9 @@ class etherscan_helper:
         "zkevmpolygonscan": "polygon_zkevm",
     }
 
+    # getcontractcreation addresses per call limit
+    CONTRACT_CREATION_MAX_ADDRESSES = 5
+
     def __init__(self, api_keys: dict):
         """Etherscan minimal API wrapper
         Args:
@@ -30,8 +33,6 @@ class etherscan_helper:
 
         self._api_keys = self.__setup_apiKeys(api_keys)
 
-        self.__RATE_LIMIT = net_utilities.rate_limit(rate_max_sec=5)  #  rate limiter
-
         # api network keys must be present in any case
         for k in self._urls.keys():
             if k not in self._api_keys.keys():
@@ -101,14 +102,14 @@ class etherscan_helper:
                 )
 
                 # rate control
-                self.__RATE_LIMIT.continue_when_safe()
+                net_utilities.get_rate_limit(url).continue_when_safe()
 
                 # get data
                 _data = net_utilities.get_request(
                     url
                 )  #  {"status":"1","message":"OK-Missing/Invalid API Key, rate limit of 1/5sec applied","result":....}
 
-                if _data["status"] == "1":
+                if _data.get("status") == "1":
                     # query when thru ok
                     if _data["result"]:
                         # Add data to result
@@ -126,15 +127,15 @@ class etherscan_helper:
                 else:
                     logging.getLogger(__name__).debug(
                         " {} for {} in {}  . error message: {}".format(
-                            _data["message"], contract_address, network
+                            _data.get("message"), contract_address, network
                         )
                     )
                     break
 
-            except Exception:
+            except Exception as e:
                 # do not continue
                 logging.getLogger(__name__).error(
-                    f' Unexpected error while querying url {url}    . error message: {_data["message"]}'
+                    f" Unexpected error while querying url {url}    . error message: {e}"
                 )
 
                 break
@@ -194,14 +195,14 @@ class etherscan_helper:
                 )
 
                 # rate control
-                self.__RATE_LIMIT.continue_when_safe()
+                net_utilities.get_rate_limit(url).continue_when_safe()
 
                 # get data
                 _data = net_utilities.get_request(
                     url
                 )  #  {"status":"1","message":"OK-Missing/Invalid API Key, rate limit of 1/5sec applied","result":....}
 
-                if _data["status"] == "1":
+                if _data.get("status") == "1":
                     # query when thru ok
                     if _data["result"]:
                         # Add data to result
@@ -219,7 +220,7 @@ class etherscan_helper:
                 else:
                     logging.getLogger(__name__).debug(
                         " {} for {} in {}  . error message: {}".format(
-                            _data["message"], contract_addresses, network
+                            _data.get("message"), contract_addresses, network
                         )
                     )
                     break
@@ -227,7 +228,7 @@ class etherscan_helper:
             except Exception as e:
                 # do not continue
                 logging.getLogger(__name__).error(
-                    f' Unexpected error while querying url {url}    . error message: {_data["message"] if _data else e}'
+                    f" Unexpected error while querying url {url}    . error message: {e}"
                 )
 
                 break
@@ -235,10 +236,38 @@ class etherscan_helper:
         # return result
         return result
 
+    def get_contracts_creation(
+        self, network: str, contract_addresses: list[str]
+    ) -> dict:
+        """Contract creation transactions in batches of the maximum addresses allowed per call
+
+        Args:
+            network (str):
+            contract_addresses (list[str]):
+
+        Returns:
+            dict: {<contract address lower>: { contractAddress, contractCreator, txHash }}
+        """
+        result = {}
+        contract_addresses = list(dict.fromkeys(x.lower() for x in contract_addresses))
+        for i in range(0, len(contract_addresses), self.CONTRACT_CREATION_MAX_ADDRESSES):
+            for item in self.get_contract_creation(
+                network=network,
+                contract_addresses=contract_addresses[
+                    i : i + self.CONTRACT_CREATION_MAX_ADDRESSES
+                ],
+            ):
+                if "contractAddress" in item:
+                    result[item["contractAddress"].lower()] = item
+        return result
+
+    def has_api_key(self, network: str) -> bool:
+        return bool(self._api_keys.get(network.lower()))
+
     def _request_data(self, url):
-        self.__RATE_LIMIT.continue_when_safe()
+        net_utilities.get_rate_limit(url).continue_when_safe()
         _data = net_utilities.get_request(url)
-        if _data["status"] == "1":
+        if _data.get("status") == "1":
             return int(_data["result"])
 
         logging.getLogger(__name__).error(
@@ -3,17 +3,25 @@ import sys
 import datetime as dt
 import logging
 import time
+import queue
+import threading
+import contextlib
+import concurrent.futures
 
 from bins.general import net_utilities
 from bins.cache import cache_utilities
 
 
-RATE_LIMIT_THEGRAPH = net_utilities.rate_limit(
-    rate_max_sec=4
+RATE_LIMIT_THEGRAPH = net_utilities.get_rate_limit(
+    "api.thegraph.com"
 )  # thegraph global rate limiter
 
 
 ## GLOBAL ##
+class thegraph_query_error(Exception):
+    """a page could not be retrieved: results are incomplete"""
+
+
 class thegraph_scraper_helper:
     def __init__(
         self,
@@ -56,106 +64,44 @@ class thegraph_scraper_helper:
             orderby:str= "timestamp"
             orderDirection:str= "asc" or "desc"
             block:str = "number: { 15432282 } "
+            cursor:str = "id"  paginate using <cursor>_gt instead of skip ( top level entity only)
+            parallel:int = 4  split cursor pagination in disjoint id ranges queried concurrently
 
+        When a page fails, the items already received are returned but not cached.
         """
         result = None
-        _skip = kwargs.get("skip", 0)
-        _url = self._url_constructor(network, query_name)
-        _filter = self._filter_constructor(**kwargs)
+        # pagination arguments are not part of the cache key
+        cache_kwargs = {
+            k: v for k, v in kwargs.items() if k not in self.PAGINATION_KWARGS
+        }
 
         # check cache, if enabled
         if self._CACHE is not None:
             result = self._CACHE.get_data(
-                network=network, query_name=query_name, **kwargs
+                network=network, query_name=query_name, **cache_kwargs
             )
 
         if result is None:
             # get  data from thegraph
             result = []
-
-            # loop till no more results are retrieved
-            while True:
-                try:
-                    # wait till sufficient time has been passed between queries
-                    RATE_LIMIT_THEGRAPH.continue_when_safe()
-
-                    _query, path_to_data = self._query_constructor(
-                        skip=_skip, name=query_name, filter=_filter
-                    )
-                    _data = net_utilities.post_request(
-                        url=_url,
-                        query=_query,
-                        retry=0,
-                        max_retry=2,
-                        wait_secs=5,
-                        timeout_secs=self.timeout_secs,
-                    )
-
-                    # add it to result
-                    try:
-                        _data = _data[path_to_data[0]]
-
-                        for i in range(1, len(path_to_data)):
-                            _data = _data[path_to_data[i]]
-                    except KeyError as err:
-                        if (
-                            "errors" in err.args
-                            and "message" in err.args["errors"]
-                            and (
-                                err.args["errors"]["message"]
-                                .lower()
-                                .contains("database unavailable")
-                            )
-                        ):
-                            # connection error: wait and loop again
-                            logging.getLogger(__name__).error(
-                                f" Seems like subgraph isnt available temporarily. Retrying in 5sec.  .error: {sys.exc_info()[0]}"
-                            )
-
-                            time.sleep(5)
-                            continue
-
-                        logging.getLogger(__name__).error(
-                            f" Unexpected error retrieving data path  query name:{query_name}   data:{_data}       .error: {sys.exc_info()[0]}"
-                        )
-
-                    except Exception:
-                        logging.getLogger(__name__).error(
-                            f" Unexpected error retrieving data path  query name:{query_name}   data:{_data}       .error: {sys.exc_info()[0]}"
-                        )
-
-                    if not _data:
-                        # exit loop
-                        break
-
-                    # modify pagination var
-                    _skip += len(_data)
-                    # add to result
-                    result.extend(_data)
-                    # check if we are done
-                    if len(_data) < 1000:
-                        # qtty is less than window ("first" var at query)
-                        break  # exit loop
-                except Exception:
-                    logging.getLogger(__name__).exception(
-                        f"Unexpected error while retrieving query {query_name}      .error: {sys.exc_info()[0]}"
-                    )
-
-                    break  # exit loop
-
-            # return empty list if result contains error
-            if "errors" in result:
-                logging.getLogger(__name__).warning(
-                    f"Errors found in thegraph query result--> network:{network}  query:{query_name}  result:{sys.exc_info()[0]}   . Empty list is returned. "
+            complete = True
+            try:
+                for page in self._iter_pages(
+                    network=network, query_name=query_name, **kwargs
+                ):
+                    result.extend(page)
+            except thegraph_query_error as e:
+                complete = False
+                logging.getLogger(__name__).error(
+                    f" Incomplete {query_name} results ( {len(result)} items) from {network} thegraph. Not cached. error-> {e}"
                 )
 
-                return []
-
-            # save it to cache, if enabled
+            # save it to cache, if enabled ( never truncated results)
             if (
-                self._CACHE is not None
+                complete
+                and self._CACHE is not None
                 and not self._CACHE.add_data(
-                    data=result, network=network, query_name=query_name, **kwargs
+                    data=result, network=network, query_name=query_name, **cache_kwargs
                 )
                 and "block" in kwargs
             ):
@@ -172,6 +118,380 @@ class thegraph_scraper_helper:
         # return
         return result
 
+    def iter_all_results(self, network: str, query_name: str, **kwargs):
+        """Same as get_all_results but yielding items as pages are received, without building a full list.
+            Cache is used when present but not filled.
+
+        Raises:
+            thegraph_query_error: when a page can't be retrieved ( items already yielded are incomplete)
+
+        Returns:
+            generator: of items
+        """
+        result = None
+        if self._CACHE is not None:
+            result = self._CACHE.get_data(
+                network=network,
+                query_name=query_name,
+                **{k: v for k, v in kwargs.items() if k not in self.PAGINATION_KWARGS},
+            )
+
+        pages = [result] if result is not None else self._iter_pages(
+            network=network, query_name=query_name, **kwargs
+        )
+        for page in pages:
+            for itm in page:
+                if self._CONVERT:
+                    self._converter(itm, query_name, network)
+                yield itm
+
+    def get_aliased_results(
+        self, network: str, query_name: str, queries: dict, batch_size: int = 100
+    ) -> dict:
+        """Query the first page of many filters at once, packing them in GraphQL documents using aliases
+            ( alias: tokens(where:..., block:...) {...} ).
+            Batches with errors are split in halves to isolate the failing queries.
+
+        Args:
+            network (str):
+            query_name (str): single entity query name, like "tokens"
+            queries (dict): {<alias>: kwargs like get_all_results ( where, block, orderby ...)}
+            batch_size (int, optional): aliases per document. Defaults to 100.
+
+        Returns:
+            dict: {<alias>: list of items}  ( failed aliases are not present )
+        """
+        result = {}
+        aliases = list(queries.keys())
+        for i in range(0, len(aliases), batch_size):
+            result.update(
+                self._query_aliased(
+                    network=network,
+                    query_name=query_name,
+                    queries={x: queries[x] for x in aliases[i : i + batch_size]},
+                )
+            )
+
+        # convert result
+        if self._CONVERT:
+            for items in result.values():
+                for itm in items:
+                    self._converter(itm, query_name, network)
+
+        return result
+
+    def _query_aliased(self, network: str, query_name: str, queries: dict) -> dict:
+        _parts = []
+        for alias, kwargs in queries.items():
+            _query, path_to_data = self._query_constructor(
+                skip=0, name=query_name, filter=self._filter_constructor(**kwargs)
+            )
+            if len(path_to_data) != 2:
+                raise NotImplementedError(
+                    f" {query_name} query can't be aliased ( nested data path {path_to_data})"
+                )
+            # remove document braces and alias the entity query
+            _parts.append(f"{alias}: {_query.strip()[1:-1].strip()}")
+
+        try:
+            # wait till sufficient time has been passed between queries
+            RATE_LIMIT_THEGRAPH.continue_when_safe()
+            _data = net_utilities.post_request(
+                url=self._url_constructor(network, query_name),
+                query="{{ {} }}".format(" ".join(_parts)),
+                retry=0,
+                max_retry=2,
+                wait_secs=5,
+                timeout_secs=self.timeout_secs,
+            )
+        except Exception:
+            logging.getLogger(__name__).exception(
+                f"Unexpected error while retrieving {len(queries)} aliased {query_name} queries      .error: {sys.exc_info()[0]}"
+            )
+            return {}
+
+        if "errors" not in _data and isinstance(_data.get("data"), dict):
+            return {
+                alias: _data["data"][alias]
+                for alias in queries
+                if _data["data"].get(alias) is not None
+            }
+
+        if len(queries) == 1:
+            logging.getLogger(__name__).debug(
+                f" Errors found in aliased {query_name} query {list(queries.keys())[0]} --> {_data.get('errors')}"
+            )
+            return {}
+
+        # isolate failing queries
+        aliases = list(queries.keys())
+        half = len(aliases) // 2
+        return {
+            **self._query_aliased(
+                network=network,
+                query_name=query_name,
+                queries={x: queries[x] for x in aliases[:half]},
+            ),
+            **self._query_aliased(
+                network=network,
+                query_name=query_name,
+                queries={x: queries[x] for x in aliases[half:]},
+            ),
+        }
+
+    # PAGINATION
+    PAGINATION_KWARGS = ["cursor", "parallel", "skip"]
+
+    def _iter_pages(self, network: str, query_name: str, **kwargs):
+        """yield raw data pages
+
+        Returns:
+            generator: of lists
+        """
+        cursor = kwargs.get("cursor")
+        if cursor and kwargs.get("orderby", "") not in ["", cursor]:
+            logging.getLogger(__name__).warning(
+                f" Can't paginate {query_name} by {cursor} cursor when ordered by {kwargs['orderby']}. Using skip pagination."
+            )
+            cursor = None
+
+        if not cursor:
+            yield from self._iter_pages_skip(
+                network=network, query_name=query_name, **kwargs
+            )
+        elif kwargs.get("parallel", 1) > 1 and cursor == "id":
+            yield from self._iter_pages_parallel(
+                network=network, query_name=query_name, **kwargs
+            )
+        else:
+            yield from self._iter_pages_cursor(
+                network=network, query_name=query_name, **kwargs
+            )
+
+    def _iter_pages_skip(self, network: str, query_name: str, **kwargs):
+        _skip = kwargs.get("skip", 0)
+        _filter = self._filter_constructor(**kwargs)
+
+        # loop till no more results are retrieved
+        while True:
+            _data = self._query_page(
+                network=network, query_name=query_name, skip=_skip, filter=_filter
+            )
+            if not _data:
+                # exit loop
+                break
+
+            # modify pagination var
+            _skip += len(_data)
+            yield _data
+            # check if we are done
+            if len(_data) < 1000:
+                # qtty is less than window ("first" var at query)
+                break  # exit loop
+
+    def _iter_pages_cursor(
+        self,
+        network: str,
+        query_name: str,
+        id_gte: str | None = None,
+        id_lt: str | None = None,
+        **kwargs,
+    ):
+        """Paginate filtering by the last cursor value received.
+            Cursor fields other than id may not be unique: the last value is queried again ( gte ) and already seen ids discarded.
+
+        Args:
+            id_gte (str | None, optional): lower id range limit. Defaults to None.
+            id_lt (str | None, optional): upper id range limit ( not included). Defaults to None.
+        """
+        cursor = kwargs["cursor"]
+        where = kwargs.get("where", "").strip()
+        range_filter = ""
+        if id_gte:
+            range_filter += f' id_gte: "{id_gte}"'
+        if id_lt:
+            range_filter += f' id_lt: "{id_lt}"'
+
+        last_value = None
+        last_ids = set()
+        while True:
+            _where = ", ".join(
+                x
+                for x in [
+                    where,
+                    range_filter,
+                    (
+                        f'{cursor}_{"gt" if cursor == "id" else "gte"}: "{last_value}"'
+                        if last_value is not None
+                        else ""
+                    ),
+                ]
+                if x
+            )
+            _filter = self._filter_constructor(
+                **{
+                    **kwargs,
+                    "where": _where,
+                    "orderby": cursor,
+                    "orderDirection": "asc",
+                }
+            )
+            _data = self._query_page(
+                network=network, query_name=query_name, skip=0, filter=_filter
+            )
+            if not _data:
+                break
+
+            full_page = len(_data) >= 1000
+            if cursor != "id":
+                # discard items of the last cursor value already yielded
+                _data = [x for x in _data if x["id"] not in last_ids]
+                if not _data:
+                    logging.getLogger(__name__).error(
+                        f" More than 1000 {query_name} items share the same {cursor} {last_value}. Pagination stopped."
+                    )
+                    break
+                last_value = _data[-1][cursor]
+                last_ids = {x["id"] for x in _data if x[cursor] == last_value}
+            else:
+                last_value = _data[-1]["id"]
+
+            yield _data
+            if not full_page:
+                break
+
+    def _iter_pages_parallel(self, network: str, query_name: str, **kwargs):
+        """Split the id space in disjoint ranges and paginate each one concurrently.
+            All threads share the RATE_LIMIT_THEGRAPH budget.
+        """
+        ranges = self._id_ranges(parts=kwargs["parallel"])
+        pages = queue.Queue(maxsize=kwargs["parallel"] * 2)
+        _finished = object()
+        # set when the consumer stops iterating
+        stop = threading.Event()
+        errors = []
+
+        def _put(item):
+            while not stop.is_set():
+                with contextlib.suppress(queue.Full):
+                    pages.put(item, timeout=1)
+                    return
+
+        def _worker(id_gte: str | None, id_lt: str | None):
+            try:
+                for page in self._iter_pages_cursor(
+                    network=network,
+                    query_name=query_name,
+                    id_gte=id_gte,
+                    id_lt=id_lt,
+                    **kwargs,
+                ):
+                    if stop.is_set():
+                        break
+                    _put(page)
+            except Exception as e:
+                logging.getLogger(__name__).exception(
+                    f" Unexpected error while retrieving {query_name} id range {id_gte}-{id_lt}"
+                )
+                # the consumer stops at the next page received
+                errors.append(e)
+            finally:
+                _put(_finished)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(ranges)) as ex:
+            for id_gte, id_lt in ranges:
+                ex.submit(_worker, id_gte, id_lt)
+
+            try:
+                running = len(ranges)
+                while running and not errors:
+                    page = pages.get()
+                    if page is _finished:
+                        running -= 1
+                    else:
+                        yield page
+            finally:
+                stop.set()
+
+        if errors:
+            raise thegraph_query_error(
+                f"{query_name} id range pagination failed: {errors[0]}"
+            ) from errors[0]
+
+    @staticmethod
+    def _id_ranges(parts: int) -> list[tuple[str | None, str | None]]:
+        """disjoint ranges covering all hex ids ( "0x..." ). First and last ranges are open.
+            Limits are whole bytes ( even length hex, like "0x40"), as Bytes ids require.
+
+        Args:
+            parts (int): number of ranges ( max 16)
+
+        Returns:
+            list[tuple[str | None, str | None]]: [(id_gte, id_lt), ...]
+        """
+        parts = max(1, min(parts, 16))
+        limits = [f"0x{(256 * i) // parts:02x}" for i in range(1, parts)]
+        return list(zip([None] + limits, limits + [None]))
+
+    def _query_page(self, network: str, query_name: str, skip: int, filter: str) -> list:
+        """query one page of data
+
+        Raises:
+            thegraph_query_error: when the page can't be retrieved
+
+        Returns:
+            list: data ( empty when there are no more items )
+        """
+        _url = self._url_constructor(network, query_name)
+        while True:
+            try:
+                # wait till sufficient time has been passed between queries
+                RATE_LIMIT_THEGRAPH.continue_when_safe()
+
+                _query, path_to_data = self._query_constructor(
+                    skip=skip, name=query_name, filter=filter
+                )
+                _data = net_utilities.post_request(
+                    url=_url,
+                    query=_query,
+                    retry=0,
+                    max_retry=2,
+                    wait_secs=5,
+                    timeout_secs=self.timeout_secs,
+                )
+
+                # return empty list if result contains error
+                if "errors" in _data:
+                    if "database unavailable" in str(_data["errors"]).lower():
+                        # connection error: wait and loop again
+                        logging.getLogger(__name__).error(
+                            f" Seems like subgraph isnt available temporarily. Retrying in 5sec."
+                        )
+                        time.sleep(5)
+                        continue
+
+                    logging.getLogger(__name__).warning(
+                        f"Errors found in thegraph query result--> network:{network}  query:{query_name}  errors:{_data['errors']}"
+                    )
+                    raise thegraph_query_error(
+                        f"{network} {query_name} query errors: {_data['errors']}"
+                    )
+
+                # follow data path
+                for key in path_to_data:
+                    _data = _data[key]
+                return _data
+
+            except thegraph_query_error:
+                raise
+            except Exception as e:
+                logging.getLogger(__name__).exception(
+                    f"Unexpected error while retrieving query {query_name}      .error: {sys.exc_info()[0]}"
+                )
+                raise thegraph_query_error(
+                    f"{network} {query_name} query failed: {e}"
+                ) from e
+
     @property
     def networks(self) -> list[str]:
         """available networks
@@ -5,6 +5,7 @@ import logging
 import threading
 
 from bins.general import file_utilities, net_utilities
+from bins.general.metrics_utilities import METRICS
 from bins.database.common.db_collections_common import db_collections_common
 
 CACHE_LOCK = threading.Lock()  ##threading.RLock
@@ -89,6 +90,15 @@ class file_backend:
     def get_data(self, **kwargs):
         pass
 
+    def _count_request(self, result):
+        """record a cache hit or miss and return result unchanged"""
+        METRICS.inc(
+            "cache_requests_total",
+            cache=self.__class__.__name__,
+            result="miss" if result is None else "hit",
+        )
+        return result
+
 
 class db_collections_cache(db_collections_common):
     def __init__(self, mongo_url: str, db_name: str, db_collections: dict = None):
@@ -226,7 +236,7 @@ class standard_property_cache(file_backend):
         key = key.lower()
 
         # use it for key in cache
-        return (
+        return self._count_request(
             self._cache.get(chain_id, {}).get(address, {}).get(block, {}).get(key, None)
         )
 
@@ -290,10 +300,10 @@ class mutable_property_cache(standard_property_cache):
             if result := self.get_anyblock_value(
                 chain_id=chain_id, address=address, key=key
             ):
-                return result
+                return self._count_request(result)
 
         # try return the block asked for
-        return (
+        return self._count_request(
             self._cache.get(chain_id, {}).get(address, {}).get(block, {}).get(key, None)
         )
 
@@ -344,7 +354,9 @@ class standard_thegraph_cache(file_backend):
     """
 
     # THE GRAPH VARS & HELPERS
-    RATE_LIMIT = net_utilities.rate_limit(rate_max_sec=4)  # thegraph rate limiter
+    RATE_LIMIT = net_utilities.get_rate_limit(
+        "api.thegraph.com"
+    )  # thegraph rate limiter
 
     def _init_cache(self):
         # init price cache
@@ -413,9 +425,9 @@ class standard_thegraph_cache(file_backend):
             key = self._build_key(kwargs)
             if key != "":
                 # use it for key in cache
-                return self._cache[network][block][key]
+                return self._count_request(self._cache[network][block][key])
         # not in cache
-        return None
+        return self._count_request(None)
 
     def _build_key(self, args: dict) -> str:
         result = ""
@@ -6,6 +6,7 @@ from bins.general.general_utilities import (
     check_configuration_file,
 )
 from bins.general.command_line import parse_commandLine_args
+from bins.general import metrics_utilities, net_utilities
 from bins.log import log_helper
 
 CONFIGURATION = {}
@@ -39,6 +40,33 @@ if CONFIGURATION["_custom_"]["cml_parameters"].log_subfolder:
 # setup logging
 log_helper.setup_logging(customconf=CONFIGURATION)
 
+# setup api rate limits ( shared between processes when a backend is set)
+#   backends are built when the first request is rate limited, so commands not using apis never connect to them
+if _rate_limits := CONFIGURATION["sources"].get("rate_limits"):
+    net_utilities.configure_rate_limits(
+        hosts=_rate_limits.get("hosts"),
+        backend_factory=(
+            lambda: net_utilities.file_rate_limit_backend(
+                folder=os.path.join(CONFIGURATION["cache"]["save_path"], "rate_limits")
+            )
+        )
+        if _rate_limits.get("backend") == "file"
+        else (
+            lambda: net_utilities.mongo_rate_limit_backend(
+                mongo_url=CONFIGURATION["sources"]["database"]["mongo_server_url"]
+            )
+        )
+        if _rate_limits.get("backend") == "mongo"
+        else None,
+    )
+
+# setup rpc call budgets per work item
+if _rpc_budgets := CONFIGURATION["script"].get("rpc_budgets"):
+    metrics_utilities.configure_rpc_budgets(
+        budgets={k: v for k, v in _rpc_budgets.items() if k != "mode"},
+        mode=_rpc_budgets.get("mode"),
+    )
+
 # add temporal variables while the app is running so memory is kept
 CONFIGURATION["_custom_"]["temporal_memory"] = {}
 
@@ -138,6 +166,39 @@ STATIC_REGISTRY_ADDRESSES = {
 }
 
 
+# multicall3 contract ( same address on all networks ). Used to batch contract calls
+MULTICALL3_ADDRESSES = {
+    "ethereum": "0xcA11bde05977b3631167028862bE2a173976CA11",
+    "polygon": "0xcA11bde05977b3631167028862bE2a173976CA11",
+    "optimism": "0xcA11bde05977b3631167028862bE2a173976CA11",
+    "arbitrum": "0xcA11bde05977b3631167028862bE2a173976CA11",
+    "celo": "0xcA11bde05977b3631167028862bE2a173976CA11",
+    "binance": "0xcA11bde05977b3631167028862bE2a173976CA11",
+    "polygon_zkevm": "0xcA11bde05977b3631167028862bE2a173976CA11",
+    "avalanche": "0xcA11bde05977b3631167028862bE2a173976CA11",
+}
+
+# usd price series cadence: blocks between price samples of a token (~1 hour )
+#   prices at other blocks are interpolated. Override using script.price_cadence_blocks configuration
+PRICE_CADENCE_BLOCKS = {
+    "ethereum": 300,
+    "polygon": 1800,
+    "optimism": 1800,
+    "arbitrum": 14400,
+    "celo": 720,
+    "binance": 1200,
+    "polygon_zkevm": 1200,
+    "avalanche": 1800,
+}
+
+
+def get_price_cadence_blocks(network: str) -> int:
+    """blocks between usd price samples of a token for the network specified"""
+    return (CONFIGURATION["script"].get("price_cadence_blocks") or {}).get(
+        network, PRICE_CADENCE_BLOCKS.get(network, 1000)
+    )
+
+
 KNOWN_VALID_MASTERCHEFS = {
     "polygon": {
         "uniswapv3": ["0x570d60a60baa356d47fda3017a190a48537fcd7d"],
@@ -1,8 +1,216 @@
+import copy
 from decimal import Decimal
+from bson.decimal128 import Decimal128
+
+# storage schema version of status and operations documents:
+#   1: big integers stored as strings
+#   2: numeric fields stored as native int64 / Decimal128 ( strings only when they can't be held exactly )
+#   3: each numeric field stored with a single type ( see *_NUMERIC_FIELDS ), so it sorts and queries the same in all documents
+STORAGE_SCHEMA_VERSION = 3
+
+_INT64_MIN = -(2**63)
+_INT64_MAX = 2**63 - 1
+_DECIMAL128_DIGITS = 34
+
+# storage types:
+#   int64: ticks, indexes and small counters
+#   decimal128: token quantities and liquidity ( exact up to 34 digits )
+#   string: fixed point X96/X128 values and uint256 limits, too big for Decimal128 and never queried numerically
+INT64 = "int64"
+DECIMAL128 = "decimal128"
+STRING = "string"
+
+# numeric fields of a hypervisor status document ( dot separated paths ): storage type
+HYPERVISOR_NUMERIC_FIELDS = {
+    "baseUpper": INT64,
+    "baseLower": INT64,
+    "basePosition.liquidity": DECIMAL128,
+    "basePosition.amount0": DECIMAL128,
+    "basePosition.amount1": DECIMAL128,
+    "limitPosition.liquidity": DECIMAL128,
+    "limitPosition.amount0": DECIMAL128,
+    "limitPosition.amount1": DECIMAL128,
+    "limitUpper": INT64,
+    "limitLower": INT64,
+    "currentTick": INT64,
+    "deposit0Max": STRING,
+    "deposit1Max": STRING,
+    "maxTotalSupply": STRING,
+    "fees_uncollected.qtty_token0": DECIMAL128,
+    "fees_uncollected.qtty_token1": DECIMAL128,
+    "pool.feeGrowthGlobal0X128": STRING,
+    "pool.feeGrowthGlobal1X128": STRING,
+    "pool.liquidity": DECIMAL128,
+    "pool.maxLiquidityPerTick": STRING,
+    "pool.protocolFees.0": DECIMAL128,
+    "pool.protocolFees.1": DECIMAL128,
+    "pool.slot0.sqrtPriceX96": STRING,
+    "pool.slot0.tick": INT64,
+    "pool.slot0.observationIndex": INT64,
+    "pool.slot0.observationCardinality": INT64,
+    "pool.slot0.observationCardinalityNext": INT64,
+    "pool.tickSpacing": INT64,
+    "pool.globalState.sqrtPriceX96": STRING,
+    "pool.globalState.tick": INT64,
+    "pool.globalState.fee": INT64,
+    "pool.globalState.timepointIndex": INT64,
+    "pool.token0.totalSupply": STRING,
+    "pool.token1.totalSupply": STRING,
+    "tickSpacing": INT64,
+    "qtty_depoloyed.qtty_token0": DECIMAL128,
+    "qtty_depoloyed.qtty_token1": DECIMAL128,
+    "qtty_depoloyed.fees_owed_token0": DECIMAL128,
+    "qtty_depoloyed.fees_owed_token1": DECIMAL128,
+    "totalAmounts.total0": DECIMAL128,
+    "totalAmounts.total1": DECIMAL128,
+    "totalSupply": DECIMAL128,
+    "tvl.parked_token0": DECIMAL128,
+    "tvl.parked_token1": DECIMAL128,
+    "tvl.deployed_token0": DECIMAL128,
+    "tvl.deployed_token1": DECIMAL128,
+    "tvl.fees_owed_token0": DECIMAL128,
+    "tvl.fees_owed_token1": DECIMAL128,
+    "tvl.tvl_token0": DECIMAL128,
+    "tvl.tvl_token1": DECIMAL128,
+}
+
+# numeric fields of a hypervisor operation document: storage type
+OPERATION_NUMERIC_FIELDS = {
+    "shares": DECIMAL128,
+    "qtty": DECIMAL128,
+    "qtty_token0": DECIMAL128,
+    "qtty_token1": DECIMAL128,
+    "totalAmount0": DECIMAL128,
+    "totalAmount1": DECIMAL128,
+    "lowerTick": INT64,
+    "upperTick": INT64,
+    "value": DECIMAL128,
+    "amount0": DECIMAL128,
+    "amount1": DECIMAL128,
+}
+
+
+def _int(value) -> int:
+    # native storage docs already hold ints
+    if type(value) is int:
+        return value
+    if isinstance(value, Decimal128):
+        value = value.to_decimal()
+    return int(value)
+
+
+def _decimal(value) -> Decimal:
+    if type(value) is Decimal:
+        return value
+    if isinstance(value, Decimal128):
+        return value.to_decimal()
+    return Decimal(value)
+
+
+def convert_bint_toStorage(value, storage_type: str = DECIMAL128):
+    """convert a big integer ( or its string, Decimal or Decimal128 representation ) to its field storage type
+
+    Args:
+        value (int | str | Decimal | Decimal128):
+        storage_type (str, optional): int64, decimal128 or string. Defaults to decimal128.
+
+    Raises:
+        ValueError: when the value can't be held exactly by the storage type
+
+    Returns:
+        int | Decimal128 | str: ( non numeric values are returned as they are )
+    """
+    if isinstance(value, Decimal128):
+        value = value.to_decimal()
+    if isinstance(value, str):
+        try:
+            value = int(value)
+        except ValueError:
+            return value
+    elif isinstance(value, Decimal) and value == value.to_integral_value():
+        value = int(value)
+
+    if not isinstance(value, int) or isinstance(value, bool):
+        return value
+
+    if storage_type == INT64:
+        if not _INT64_MIN <= value <= _INT64_MAX:
+            raise ValueError(f" {value} does not fit in int64")
+        return value
+    if storage_type == DECIMAL128:
+        if len(str(abs(value))) > _DECIMAL128_DIGITS:
+            raise ValueError(f" {value} can't be held exactly by Decimal128")
+        return Decimal128(str(value))
+    return str(value)
+
+
+def convert_fields_toStorage(item: dict, fields: dict[str, str]) -> dict:
+    """convert the numeric fields of a document to their storage types, setting its schema version.
+        Documents of any previous schema version ( strings, int64, Decimal128 ) end up with the same types.
+
+    Args:
+        item (dict): document ( not modified )
+        fields (dict[str, str]): dot separated paths of numeric fields: storage type ( missing ones are skipped )
+
+    Returns:
+        dict: converted copy of the document
+    """
+    item = copy.deepcopy(item)
+    for field, storage_type in fields.items():
+        *path, key = field.split(".")
+        container = item
+        for part in path:
+            if isinstance(container, dict):
+                container = container.get(part)
+            elif isinstance(container, list) and part.isdigit():
+                container = (
+                    container[int(part)] if int(part) < len(container) else None
+                )
+            else:
+                container = None
+            if container is None:
+                break
+
+        if isinstance(container, dict) and key in container:
+            container[key] = convert_bint_toStorage(container[key], storage_type)
+        elif (
+            isinstance(container, list) and key.isdigit() and int(key) < len(container)
+        ):
+            container[int(key)] = convert_bint_toStorage(
+                container[int(key)], storage_type
+            )
+
+    item["schema_version"] = STORAGE_SCHEMA_VERSION
+    return item
+
+
+def convert_hypervisor_toStorage(hypervisor: dict) -> dict:
+    """convert a hypervisor status dict ( as_dict(convert_bint=True) ) to native numeric storage
+
+    Args:
+        hypervisor (dict):
+
+    Returns:
+        dict:
+    """
+    return convert_fields_toStorage(item=hypervisor, fields=HYPERVISOR_NUMERIC_FIELDS)
+
+
+def convert_operation_toStorage(operation: dict) -> dict:
+    """convert a hypervisor operation dict to native numeric storage
+
+    Args:
+        operation (dict):
+
+    Returns:
+        dict:
+    """
+    return convert_fields_toStorage(item=operation, fields=OPERATION_NUMERIC_FIELDS)
 
 
 def convert_hypervisor_fromDict(hypervisor: dict, toDecimal: bool = True) -> dict:
     """convert hypervisor to numbers.
+        Native storage documents ( schema version 2 ) already hold numbers, so most fields pass through.
 
     Args:
         hypervisor (dict):
@@ -16,206 +224,206 @@ def convert_hypervisor_fromDict(hypervisor: dict, toDecimal: bool = True) -> dic
     decimals_token1 = hypervisor["pool"]["token1"]["decimals"]
     decimals_contract = hypervisor["decimals"]
 
-    hypervisor["baseUpper"] = int(hypervisor["baseUpper"])
-    hypervisor["baseLower"] = int(hypervisor["baseLower"])
+    hypervisor["baseUpper"] = _int(hypervisor["baseUpper"])
+    hypervisor["baseLower"] = _int(hypervisor["baseLower"])
 
-    hypervisor["basePosition"]["liquidity"] = int(
+    hypervisor["basePosition"]["liquidity"] = _int(
         hypervisor["basePosition"]["liquidity"]
     )
-    hypervisor["basePosition"]["amount0"] = int(hypervisor["basePosition"]["amount0"])
-    hypervisor["basePosition"]["amount1"] = int(hypervisor["basePosition"]["amount1"])
-    hypervisor["limitPosition"]["liquidity"] = int(
+    hypervisor["basePosition"]["amount0"] = _int(hypervisor["basePosition"]["amount0"])
+    hypervisor["basePosition"]["amount1"] = _int(hypervisor["basePosition"]["amount1"])
+    hypervisor["limitPosition"]["liquidity"] = _int(
         hypervisor["limitPosition"]["liquidity"]
     )
-    hypervisor["limitPosition"]["amount0"] = int(hypervisor["limitPosition"]["amount0"])
-    hypervisor["limitPosition"]["amount1"] = int(hypervisor["limitPosition"]["amount1"])
+    hypervisor["limitPosition"]["amount0"] = _int(hypervisor["limitPosition"]["amount0"])
+    hypervisor["limitPosition"]["amount1"] = _int(hypervisor["limitPosition"]["amount1"])
 
-    hypervisor["currentTick"] = int(hypervisor["currentTick"])
+    hypervisor["currentTick"] = _int(hypervisor["currentTick"])
 
     if toDecimal:
-        hypervisor["deposit0Max"] = Decimal(hypervisor["deposit0Max"]) / Decimal(
+        hypervisor["deposit0Max"] = _decimal(hypervisor["deposit0Max"]) / Decimal(
             10**decimals_token0
         )
-        hypervisor["deposit1Max"] = Decimal(hypervisor["deposit1Max"]) / Decimal(
+        hypervisor["deposit1Max"] = _decimal(hypervisor["deposit1Max"]) / Decimal(
             10**decimals_token1
         )
 
-        hypervisor["fees_uncollected"]["qtty_token0"] = Decimal(
+        hypervisor["fees_uncollected"]["qtty_token0"] = _decimal(
             hypervisor["fees_uncollected"]["qtty_token0"]
         ) / Decimal(10**decimals_token0)
-        hypervisor["fees_uncollected"]["qtty_token1"] = Decimal(
+        hypervisor["fees_uncollected"]["qtty_token1"] = _decimal(
             hypervisor["fees_uncollected"]["qtty_token1"]
         ) / Decimal(10**decimals_token1)
 
-        hypervisor["maxTotalSupply"] = Decimal(hypervisor["maxTotalSupply"]) / Decimal(
+        hypervisor["maxTotalSupply"] = _decimal(hypervisor["maxTotalSupply"]) / Decimal(
             10**decimals_contract
         )
 
     else:
-        hypervisor["deposit0Max"] = int(hypervisor["deposit0Max"])
-        hypervisor["deposit1Max"] = int(hypervisor["deposit1Max"])
+        hypervisor["deposit0Max"] = _int(hypervisor["deposit0Max"])
+        hypervisor["deposit1Max"] = _int(hypervisor["deposit1Max"])
 
-        hypervisor["fees_uncollected"]["qtty_token0"] = int(
+        hypervisor["fees_uncollected"]["qtty_token0"] = _int(
             hypervisor["fees_uncollected"]["qtty_token0"]
         )
-        hypervisor["fees_uncollected"]["qtty_token1"] = int(
+        hypervisor["fees_uncollected"]["qtty_token1"] = _int(
             hypervisor["fees_uncollected"]["qtty_token1"]
         )
 
-        hypervisor["maxTotalSupply"] = int(hypervisor["maxTotalSupply"])
+        hypervisor["maxTotalSupply"] = _int(hypervisor["maxTotalSupply"])
 
-    hypervisor["limitUpper"] = int(hypervisor["limitUpper"])
-    hypervisor["limitLower"] = int(hypervisor["limitLower"])
+    hypervisor["limitUpper"] = _int(hypervisor["limitUpper"])
+    hypervisor["limitLower"] = _int(hypervisor["limitLower"])
 
-    hypervisor["pool"]["feeGrowthGlobal0X128"] = int(
+    hypervisor["pool"]["feeGrowthGlobal0X128"] = _int(
         hypervisor["pool"]["feeGrowthGlobal0X128"]
     )
-    hypervisor["pool"]["feeGrowthGlobal1X128"] = int(
+    hypervisor["pool"]["feeGrowthGlobal1X128"] = _int(
         hypervisor["pool"]["feeGrowthGlobal1X128"]
     )
-    hypervisor["pool"]["liquidity"] = int(hypervisor["pool"]["liquidity"])
-    hypervisor["pool"]["maxLiquidityPerTick"] = int(
+    hypervisor["pool"]["liquidity"] = _int(hypervisor["pool"]["liquidity"])
+    hypervisor["pool"]["maxLiquidityPerTick"] = _int(
         hypervisor["pool"]["maxLiquidityPerTick"]
     )
 
     # choose by dex
     if hypervisor["pool"]["dex"] == "uniswapv3":
         # uniswap
-        hypervisor["pool"]["protocolFees"][0] = int(
+        hypervisor["pool"]["protocolFees"][0] = _int(
             hypervisor["pool"]["protocolFees"][0]
         )
-        hypervisor["pool"]["protocolFees"][1] = int(
+        hypervisor["pool"]["protocolFees"][1] = _int(
             hypervisor["pool"]["protocolFees"][1]
         )
 
-        hypervisor["pool"]["slot0"]["sqrtPriceX96"] = int(
+        hypervisor["pool"]["slot0"]["sqrtPriceX96"] = _int(
             hypervisor["pool"]["slot0"]["sqrtPriceX96"]
         )
-        hypervisor["pool"]["slot0"]["tick"] = int(hypervisor["pool"]["slot0"]["tick"])
-        hypervisor["pool"]["slot0"]["observationIndex"] = int(
+        hypervisor["pool"]["slot0"]["tick"] = _int(hypervisor["pool"]["slot0"]["tick"])
+        hypervisor["pool"]["slot0"]["observationIndex"] = _int(
             hypervisor["pool"]["slot0"]["observationIndex"]
         )
-        hypervisor["pool"]["slot0"]["observationCardinality"] = int(
+        hypervisor["pool"]["slot0"]["observationCardinality"] = _int(
             hypervisor["pool"]["slot0"]["observationCardinality"]
         )
-        hypervisor["pool"]["slot0"]["observationCardinalityNext"] = int(
+        hypervisor["pool"]["slot0"]["observationCardinalityNext"] = _int(
             hypervisor["pool"]["slot0"]["observationCardinalityNext"]
         )
 
-        hypervisor["pool"]["tickSpacing"] = int(hypervisor["pool"]["tickSpacing"])
+        hypervisor["pool"]["tickSpacing"] = _int(hypervisor["pool"]["tickSpacing"])
     elif hypervisor["pool"]["dex"] == "algebrav3":
         # quickswap
-        hypervisor["pool"]["globalState"]["sqrtPriceX96"] = int(
+        hypervisor["pool"]["globalState"]["sqrtPriceX96"] = _int(
             hypervisor["pool"]["globalState"]["sqrtPriceX96"]
         )
-        hypervisor["pool"]["globalState"]["tick"] = int(
+        hypervisor["pool"]["globalState"]["tick"] = _int(
             hypervisor["pool"]["globalState"]["tick"]
         )
-        hypervisor["pool"]["globalState"]["fee"] = int(
+        hypervisor["pool"]["globalState"]["fee"] = _int(
             hypervisor["pool"]["globalState"]["fee"]
         )
-        hypervisor["pool"]["globalState"]["timepointIndex"] = int(
+        hypervisor["pool"]["globalState"]["timepointIndex"] = _int(
             hypervisor["pool"]["globalState"]["timepointIndex"]
         )
     else:
         raise NotImplementedError(f" dex {hypervisor['dex']} not implemented ")
 
-    hypervisor["tickSpacing"] = int(hypervisor["tickSpacing"])
+    hypervisor["tickSpacing"] = _int(hypervisor["tickSpacing"])
 
     if toDecimal:
-        hypervisor["pool"]["token0"]["totalSupply"] = Decimal(
+        hypervisor["pool"]["token0"]["totalSupply"] = _decimal(
             hypervisor["pool"]["token0"]["totalSupply"]
         ) / Decimal(10**decimals_token0)
-        hypervisor["pool"]["token1"]["totalSupply"] = Decimal(
+        hypervisor["pool"]["token1"]["totalSupply"] = _decimal(
             hypervisor["pool"]["token1"]["totalSupply"]
         ) / Decimal(10**decimals_token1)
 
-        hypervisor["qtty_depoloyed"]["qtty_token0"] = Decimal(
+        hypervisor["qtty_depoloyed"]["qtty_token0"] = _decimal(
             hypervisor["qtty_depoloyed"]["qtty_token0"]
         ) / Decimal(10**decimals_token0)
-        hypervisor["qtty_depoloyed"]["qtty_token1"] = Decimal(
+        hypervisor["qtty_depoloyed"]["qtty_token1"] = _decimal(
             hypervisor["qtty_depoloyed"]["qtty_token1"]
         ) / Decimal(10**decimals_token1)
-        hypervisor["qtty_depoloyed"]["fees_owed_token0"] = Decimal(
+        hypervisor["qtty_depoloyed"]["fees_owed_token0"] = _decimal(
             hypervisor["qtty_depoloyed"]["fees_owed_token0"]
         ) / Decimal(10**decimals_token0)
-        hypervisor["qtty_depoloyed"]["fees_owed_token1"] = Decimal(
+        hypervisor["qtty_depoloyed"]["fees_owed_token1"] = _decimal(
             hypervisor["qtty_depoloyed"]["fees_owed_token1"]
         ) / Decimal(10**decimals_token1)
 
-        hypervisor["totalAmounts"]["total0"] = Decimal(
+        hypervisor["totalAmounts"]["total0"] = _decimal(
             hypervisor["totalAmounts"]["total0"]
         ) / Decimal(10**decimals_token0)
-        hypervisor["totalAmounts"]["total1"] = Decimal(
+        hypervisor["totalAmounts"]["total1"] = _decimal(
             hypervisor["totalAmounts"]["total1"]
         ) / Decimal(10**decimals_token1)
 
-        hypervisor["totalSupply"] = Decimal(hypervisor["totalSupply"]) / Decimal(
+        hypervisor["totalSupply"] = _decimal(hypervisor["totalSupply"]) / Decimal(
             10**decimals_contract
         )
 
-        hypervisor["tvl"]["parked_token0"] = Decimal(
+        hypervisor["tvl"]["parked_token0"] = _decimal(
             hypervisor["tvl"]["parked_token0"]
         ) / Decimal(10**decimals_token0)
-        hypervisor["tvl"]["parked_token1"] = Decimal(
+        hypervisor["tvl"]["parked_token1"] = _decimal(
             hypervisor["tvl"]["parked_token1"]
         ) / Decimal(10**decimals_token1)
-        hypervisor["tvl"]["deployed_token0"] = Decimal(
+        hypervisor["tvl"]["deployed_token0"] = _decimal(
             hypervisor["tvl"]["deployed_token0"]
         ) / Decimal(10**decimals_token0)
-        hypervisor["tvl"]["deployed_token1"] = Decimal(
+        hypervisor["tvl"]["deployed_token1"] = _decimal(
             hypervisor["tvl"]["deployed_token1"]
         ) / Decimal(10**decimals_token1)
-        hypervisor["tvl"]["fees_owed_token0"] = Decimal(
+        hypervisor["tvl"]["fees_owed_token0"] = _decimal(
             hypervisor["tvl"]["fees_owed_token0"]
         ) / Decimal(10**decimals_token0)
-        hypervisor["tvl"]["fees_owed_token1"] = Decimal(
+        hypervisor["tvl"]["fees_owed_token1"] = _decimal(
             hypervisor["tvl"]["fees_owed_token1"]
         ) / Decimal(10**decimals_token1)
-        hypervisor["tvl"]["tvl_token0"] = Decimal(
+        hypervisor["tvl"]["tvl_token0"] = _decimal(
             hypervisor["tvl"]["tvl_token0"]
         ) / Decimal(10**decimals_token0)
-        hypervisor["tvl"]["tvl_token1"] = Decimal(
+        hypervisor["tvl"]["tvl_token1"] = _decimal(
             hypervisor["tvl"]["tvl_token1"]
         ) / Decimal(10**decimals_token1)
 
     else:
-        hypervisor["pool"]["token0"]["totalSupply"] = int(
+        hypervisor["pool"]["token0"]["totalSupply"] = _int(
             hypervisor["pool"]["token0"]["totalSupply"]
         )
-        hypervisor["pool"]["token1"]["totalSupply"] = int(
+        hypervisor["pool"]["token1"]["totalSupply"] = _int(
             hypervisor["pool"]["token1"]["totalSupply"]
         )
 
-        hypervisor["qtty_depoloyed"]["qtty_token0"] = int(
+        hypervisor["qtty_depoloyed"]["qtty_token0"] = _int(
             hypervisor["qtty_depoloyed"]["qtty_token0"]
         )
-        hypervisor["qtty_depoloyed"]["qtty_token1"] = int(
+        hypervisor["qtty_depoloyed"]["qtty_token1"] = _int(
             hypervisor["qtty_depoloyed"]["qtty_token1"]
         )
-        hypervisor["qtty_depoloyed"]["fees_owed_token0"] = int(
+        hypervisor["qtty_depoloyed"]["fees_owed_token0"] = _int(
             hypervisor["qtty_depoloyed"]["fees_owed_token0"]
         )
-        hypervisor["qtty_depoloyed"]["fees_owed_token1"] = int(
+        hypervisor["qtty_depoloyed"]["fees_owed_token1"] = _int(
             hypervisor["qtty_depoloyed"]["fees_owed_token1"]
         )
 
-        hypervisor["totalAmounts"]["total0"] = int(hypervisor["totalAmounts"]["total0"])
-        hypervisor["totalAmounts"]["total1"] = int(hypervisor["totalAmounts"]["total1"])
+        hypervisor["totalAmounts"]["total0"] = _int(hypervisor["totalAmounts"]["total0"])
+        hypervisor["totalAmounts"]["total1"] = _int(hypervisor["totalAmounts"]["total1"])
 
-        hypervisor["totalSupply"] = int(hypervisor["totalSupply"])
+        hypervisor["totalSupply"] = _int(hypervisor["totalSupply"])
 
-        hypervisor["tvl"]["parked_token0"] = int(hypervisor["tvl"]["parked_token0"])
-        hypervisor["tvl"]["parked_token1"] = int(hypervisor["tvl"]["parked_token1"])
-        hypervisor["tvl"]["deployed_token0"] = int(hypervisor["tvl"]["deployed_token0"])
-        hypervisor["tvl"]["deployed_token1"] = int(hypervisor["tvl"]["deployed_token1"])
-        hypervisor["tvl"]["fees_owed_token0"] = int(
+        hypervisor["tvl"]["parked_token0"] = _int(hypervisor["tvl"]["parked_token0"])
+        hypervisor["tvl"]["parked_token1"] = _int(hypervisor["tvl"]["parked_token1"])
+        hypervisor["tvl"]["deployed_token0"] = _int(hypervisor["tvl"]["deployed_token0"])
+        hypervisor["tvl"]["deployed_token1"] = _int(hypervisor["tvl"]["deployed_token1"])
+        hypervisor["tvl"]["fees_owed_token0"] = _int(
             hypervisor["tvl"]["fees_owed_token0"]
         )
-        hypervisor["tvl"]["fees_owed_token1"] = int(
+        hypervisor["tvl"]["fees_owed_token1"] = _int(
             hypervisor["tvl"]["fees_owed_token1"]
         )
-        hypervisor["tvl"]["tvl_token0"] = int(hypervisor["tvl"]["tvl_token0"])
-        hypervisor["tvl"]["tvl_token1"] = int(hypervisor["tvl"]["tvl_token1"])
+        hypervisor["tvl"]["tvl_token0"] = _int(hypervisor["tvl"]["tvl_token0"])
+        hypervisor["tvl"]["tvl_token1"] = _int(hypervisor["tvl"]["tvl_token1"])
 
     return hypervisor
@@ -1,20 +1,58 @@
 import logging
+import time
 
 from bson.decimal128 import Decimal128, create_decimal128_context
 from decimal import Decimal, localcontext
-from datetime import datetime
+from datetime import datetime, timezone
 from pymongo.errors import ConnectionFailure, BulkWriteError
 from pymongo import DESCENDING, ASCENDING
 from bins.database.common.db_managers import MongoDbManager
+from bins.converters.onchain import (
+    STORAGE_SCHEMA_VERSION,
+    convert_hypervisor_toStorage,
+    convert_operation_toStorage,
+)
 
 
 class db_collections_common:
+    # query shapes used by this class methods:
+    #   { <method name>: {
+    #           "collection": <collection name>,
+    #           "index": [(<field>, ORDER), ...],   compound index serving the query
+    #           "find": {...}, "sort": [...]   or   "aggregate": [...]   sample query used by explain
+    #   }}
+    query_shapes = {}
+
     def __init__(self, mongo_url: str, db_name: str, db_collections: dict = None):
         if db_collections is None:
             db_collections = {"static": {"id": True}}
         self._db_mongo_url = mongo_url
         self._db_name = db_name
-        self._db_collections = db_collections
+        self._db_collections = self._add_query_shape_indexes(db_collections)
+
+    def _add_query_shape_indexes(self, db_collections: dict) -> dict:
+        """Add the compound indexes of the registered query shapes to the collections configuration
+
+        Args:
+            db_collections (dict): collections configuration
+
+        Returns:
+            dict: collections configuration
+        """
+        for shape in self.query_shapes.values():
+            if (
+                not shape.get("index")
+                or shape["collection"] not in db_collections
+                or not isinstance(db_collections[shape["collection"]], dict)
+            ):
+                continue
+            multi_indexes = db_collections[shape["collection"]].setdefault(
+                "multi_indexes", []
+            )
+            if shape["index"] not in multi_indexes:
+                multi_indexes.append(shape["index"])
+
+        return db_collections
 
     def delete_item(self, collection_name: str, item_id: str):
         """Delete an item from a collection
@@ -31,6 +69,20 @@ class db_collections_common:
             _db_manager.del_item(coll_name=collection_name, dbFilter={"id": item_id})
 
     # actual db saving
+    def delete_items(self, collection_name: str, find: dict):
+        """Delete all items matching a filter from a collection
+
+        Args:
+            collection_name (str): _description_
+            find (dict): _description_
+        """
+        with MongoDbManager(
+            url=self._db_mongo_url,
+            db_name=self._db_name,
+            collections=self._db_collections,
+        ) as _db_manager:
+            _db_manager.del_items(coll_name=collection_name, dbFilter=find)
+
     def save_items_to_database(
         self,
         data: list[dict],
@@ -66,6 +118,35 @@ class db_collections_common:
                 f" Unable to save multiple items to mongo's {collection_name} collection. Items qtty: {len(data)}  error-> {e}"
             )
 
+    def update_items_to_database(
+        self,
+        data: list[dict],
+        collection_name: str,
+    ):
+        """Apply multiple update operations in a collection at once ( in bulk)
+
+        Args:
+            data (list[dict]): [{"filter": <filter>, "data": <update operators like $set, $inc, $setOnInsert...>}]
+            collection_name (str): _description_
+        """
+        try:
+            with MongoDbManager(
+                url=self._db_mongo_url,
+                db_name=self._db_name,
+                collections=self._db_collections,
+            ) as _db_manager:
+                _db_manager.add_items_bulk(
+                    coll_name=collection_name, data=data, upsert=True
+                )
+        except BulkWriteError as bwe:
+            logging.getLogger(__name__).error(
+                f"  Error while updating multiple items of {collection_name} collection database. Items qtty: {len(data)}  error-> {bwe.details}"
+            )
+        except Exception as e:
+            logging.getLogger(__name__).error(
+                f" Unable to update multiple items of mongo's {collection_name} collection. Items qtty: {len(data)}  error-> {e}"
+            )
+
     def save_item_to_database(
         self,
         data: dict,
@@ -167,6 +248,99 @@ class db_collections_common:
                 )
             ]
 
+    def query_items_from_database_iter(
+        self,
+        query: list[dict],
+        collection_name: str,
+        batch_size: int | None = None,
+        raw: bool = False,
+    ):
+        """Yield aggregation results keeping the database connection open while the cursor is being consumed
+
+        Args:
+            query (list[dict]): aggregation pipeline
+            collection_name (str):
+            batch_size (int | None, optional): cursor batch size. Defaults to None.
+            raw (bool, optional): yield RawBSONDocument items ( lazy decoding ). Defaults to False.
+
+        Yields:
+            dict | RawBSONDocument:
+        """
+        kwargs = {"aggregate": query, "allowDiskUse": True}
+        if batch_size:
+            kwargs["batch_size"] = batch_size
+        yield from self.get_items_from_database_iter(
+            collection_name=collection_name, raw=raw, **kwargs
+        )
+
+    def get_items_from_database_iter(
+        self, collection_name: str, raw: bool = False, **kwargs
+    ):
+        """Yield items keeping the database connection open while the cursor is being consumed
+            ( get_items_from_database without materializing the whole result )
+
+        Args:
+            collection_name (str):
+            raw (bool, optional): yield RawBSONDocument items ( lazy decoding ). Defaults to False.
+            kwargs: find, projection, sort, limit, batch_size   or   aggregate, allowDiskUse, batch_size
+
+        Yields:
+            dict | RawBSONDocument:
+        """
+        if "aggregate" not in kwargs and "find" not in kwargs:
+            kwargs["find"] = {}
+        with MongoDbManager(
+            url=self._db_mongo_url,
+            db_name=self._db_name,
+            collections=self._db_collections,
+            raw_documents=raw,
+        ) as _db_manager:
+            yield from self.get_cursor(
+                db_manager=_db_manager, collection_name=collection_name, **kwargs
+            )
+
+    def watch_items(
+        self,
+        collection_names: list[str],
+        resume_after: dict | None = None,
+        max_await_time_ms: int = 1000,
+    ):
+        """Yield inserted, updated or replaced items of the collections specified, as they happen ( Mongo change streams )
+            Yields None every max_await_time_ms without changes, so callers may do other work.
+
+        Args:
+            collection_names (list[str]):
+            resume_after (dict | None, optional): resume token of a previous stream. Defaults to None.
+            max_await_time_ms (int, optional): Defaults to 1000.
+
+        Raises:
+            OperationFailure: when the server does not support change streams ( standalone servers )
+
+        Yields:
+            tuple | None: (collection name, item, resume token)
+        """
+        with MongoDbManager(
+            url=self._db_mongo_url,
+            db_name=self._db_name,
+            collections=self._db_collections,
+        ) as _db_manager:
+            with _db_manager.watch(
+                coll_names=collection_names,
+                operation_types=["insert", "update", "replace"],
+                resume_after=resume_after,
+                max_await_time_ms=max_await_time_ms,
+                full_document="updateLookup",
+            ) as stream:
+                while stream.alive:
+                    change = stream.try_next()
+                    if change is None:
+                        yield None
+                        continue
+                    if change.get("fullDocument") is None:
+                        # updated item deleted since
+                        continue
+                    yield change["ns"]["coll"], change["fullDocument"], change["_id"]
+
     def get_distinct_items_from_database(
         self, collection_name: str, field: str, condition: dict = None
     ):
@@ -184,6 +358,402 @@ class db_collections_common:
             )
         return result
 
+    def get_missing_items(
+        self,
+        collection_name: str,
+        field: str,
+        other_collection_name: str,
+        other_field: str | None = None,
+        find: dict | None = None,
+        other_find: dict | None = None,
+        projection: dict | None = None,
+        other_database: "db_collections_common | None" = None,
+        unique: bool = False,
+        batch_size: int = 10000,
+    ):
+        """Yield items from a collection with no matching field value in another collection ( anti-join ).
+            When both collections live in the same database, the work is done server side using a $lookup.
+            Otherwise both cursors are streamed sorted by field and merged, so no key list is ever held in memory.
+            Items are always yielded sorted by field ( ascending ).
+
+        Args:
+            collection_name (str): collection to yield items from
+            field (str): top level field of collection_name to match
+            other_collection_name (str): collection where matching items are searched
+            other_field (str | None, optional): field of other_collection_name to match. Defaults to field.
+            find (dict | None, optional): filter for collection_name items. Defaults to None.
+            other_find (dict | None, optional): filter for other_collection_name items. Defaults to None.
+            projection (dict | None, optional): projection of the items yielded. Defaults to None.
+            other_database (db_collections_common | None, optional): database of other_collection_name, when different from this one. Defaults to None.
+            unique (bool, optional): yield only the first item of each field value. Defaults to False.
+            batch_size (int, optional): cursor batch size. Defaults to 10000.
+
+        Yields:
+            dict: items without a match
+        """
+        if other_field is None:
+            other_field = field
+        if find is None:
+            find = {}
+        if other_find is None:
+            other_find = {}
+
+        if other_database is None or (
+            other_database._db_mongo_url == self._db_mongo_url
+            and other_database._db_name == self._db_name
+        ):
+            items = self._get_missing_items_lookup(
+                collection_name=collection_name,
+                field=field,
+                other_collection_name=other_collection_name,
+                other_field=other_field,
+                find=find,
+                other_find=other_find,
+                projection=projection,
+            )
+        else:
+            items = self._get_missing_items_merge(
+                collection_name=collection_name,
+                field=field,
+                other_collection_name=other_collection_name,
+                other_field=other_field,
+                find=find,
+                other_find=other_find,
+                projection=projection,
+                other_database=other_database,
+                batch_size=batch_size,
+            )
+
+        last_key = None
+        for item in items:
+            if unique and last_key is not None and item[field] == last_key:
+                continue
+            last_key = item[field]
+            yield item
+
+    def _get_missing_items_lookup(
+        self,
+        collection_name: str,
+        field: str,
+        other_collection_name: str,
+        other_field: str,
+        find: dict,
+        other_find: dict,
+        projection: dict | None,
+    ):
+        query = [
+            {"$match": find},
+            {"$sort": {field: 1}},
+            {
+                "$lookup": {
+                    "from": other_collection_name,
+                    "let": {"key": f"${field}"},
+                    "pipeline": [
+                        {
+                            "$match": {
+                                "$and": [
+                                    other_find,
+                                    {"$expr": {"$eq": [f"${other_field}", "$$key"]}},
+                                ]
+                            }
+                        },
+                        {"$limit": 1},
+                        {"$project": {"_id": 1}},
+                    ],
+                    "as": "_matched",
+                }
+            },
+            {"$match": {"_matched": {"$size": 0}}},
+        ]
+        if projection and any(projection.values()):
+            # inclusion projection: _matched is dropped already
+            query.append({"$project": {**projection, field: 1}})
+        else:
+            query.append({"$project": {**(projection or {}), "_matched": 0}})
+
+        with MongoDbManager(
+            url=self._db_mongo_url,
+            db_name=self._db_name,
+            collections=self._db_collections,
+        ) as _db_manager:
+            yield from _db_manager.get_items(
+                coll_name=collection_name, aggregate=query, allowDiskUse=True
+            )
+
+    def _get_missing_items_merge(
+        self,
+        collection_name: str,
+        field: str,
+        other_collection_name: str,
+        other_field: str,
+        find: dict,
+        other_find: dict,
+        projection: dict | None,
+        other_database: "db_collections_common",
+        batch_size: int,
+    ):
+        if projection and any(projection.values()):
+            projection = {**projection, field: 1}
+
+        with MongoDbManager(
+            url=self._db_mongo_url,
+            db_name=self._db_name,
+            collections=self._db_collections,
+        ) as _db_manager, MongoDbManager(
+            url=other_database._db_mongo_url,
+            db_name=other_database._db_name,
+            collections=other_database._db_collections,
+        ) as _other_db_manager:
+            other_keys = (
+                x[other_field]
+                for x in _other_db_manager.get_items(
+                    coll_name=other_collection_name,
+                    find=other_find,
+                    projection={other_field: 1, "_id": 0},
+                    sort=[(other_field, ASCENDING)],
+                    batch_size=batch_size,
+                )
+            )
+            other_key = next(other_keys, None)
+
+            for item in _db_manager.get_items(
+                coll_name=collection_name,
+                find=find,
+                projection=projection,
+                sort=[(field, ASCENDING)],
+                batch_size=batch_size,
+            ):
+                # advance the other cursor up to this item's key
+                while other_key is not None and other_key < item[field]:
+                    other_key = next(other_keys, None)
+                if other_key is None or other_key != item[field]:
+                    yield item
+
+    def get_missing_keys(
+        self,
+        collection_name: str,
+        field: str,
+        keys,
+        find: dict | None = None,
+        batch_size: int = 10000,
+    ):
+        """Yield the keys not present in a collection field, querying the candidates in chunks
+            ( instead of loading the whole collection to discard processed keys in memory )
+
+        Args:
+            collection_name (str): collection name
+            field (str): field to match keys against ( should be indexed )
+            keys (iterable): candidate keys
+            find (dict | None, optional): additional filter. Defaults to None.
+            batch_size (int, optional): keys queried at once. Defaults to 10000.
+
+        Yields:
+            keys not found in the collection
+        """
+        if find is None:
+            find = {}
+
+        with MongoDbManager(
+            url=self._db_mongo_url,
+            db_name=self._db_name,
+            collections=self._db_collections,
+        ) as _db_manager:
+            chunk = []
+            for key in keys:
+                chunk.append(key)
+                if len(chunk) >= batch_size:
+                    yield from self._get_missing_keys_chunk(
+                        _db_manager, collection_name, field, chunk, find
+                    )
+                    chunk = []
+            if chunk:
+                yield from self._get_missing_keys_chunk(
+                    _db_manager, collection_name, field, chunk, find
+                )
+
+    def _get_missing_keys_chunk(
+        self,
+        db_manager: MongoDbManager,
+        collection_name: str,
+        field: str,
+        chunk: list,
+        find: dict,
+    ):
+        found = {
+            x[field]
+            for x in db_manager.get_items(
+                coll_name=collection_name,
+                find={**find, field: {"$in": chunk}},
+                projection={field: 1, "_id": 0},
+            )
+        }
+        for key in chunk:
+            if key not in found:
+                yield key
+
+    # storage schema
+    def migrate_items(
+        self,
+        collection_name: str,
+        converter,
+        find: dict | None = None,
+        batch_size: int = 5000,
+    ) -> int:
+        """Stream a collection converting its items, replacing them in bulk every batch
+
+        Args:
+            collection_name (str): collection name
+            converter (function): item -> converted item
+            find (dict | None, optional): items to migrate. Defaults to items not at the current storage schema version.
+            batch_size (int, optional): cursor batch size and bulk replace size. Defaults to 5000.
+
+        Returns:
+            int: total items migrated
+        """
+        if find is None:
+            find = {"schema_version": {"$ne": STORAGE_SCHEMA_VERSION}}
+
+        total = 0
+        with MongoDbManager(
+            url=self._db_mongo_url,
+            db_name=self._db_name,
+            collections=self._db_collections,
+        ) as _db_manager:
+            bulk_data = []
+            for item in _db_manager.get_items(
+                coll_name=collection_name, find=find, batch_size=batch_size
+            ):
+                try:
+                    data = converter(item)
+                except ValueError as e:
+                    # left at its schema version: migrated again next time
+                    logging.getLogger(__name__).error(
+                        f" {self._db_name}'s {collection_name} item {item.get('id')} could not be migrated: {e}"
+                    )
+                    continue
+                bulk_data.append({"filter": {"_id": item["_id"]}, "data": data})
+                if len(bulk_data) >= batch_size:
+                    _db_manager.replace_items_bulk(
+                        coll_name=collection_name, data=bulk_data
+                    )
+                    total += len(bulk_data)
+                    bulk_data = []
+            if bulk_data:
+                _db_manager.replace_items_bulk(coll_name=collection_name, data=bulk_data)
+                total += len(bulk_data)
+
+        return total
+
+    # query plans
+    def explain_query_shapes(
+        self, methods: list[str] | None = None, slow_ms: int = 1000
+    ) -> dict:
+        """Explain the registered query shapes and report collection scans and slow plans
+
+        Args:
+            methods (list[str] | None, optional): method names to explain. Defaults to all registered.
+            slow_ms (int, optional): execution time considered slow. Defaults to 1000.
+
+        Returns:
+            dict: { <method name>: {
+                        "collection": ,
+                        "stages": [ winning plan stages ],
+                        "indexes": [ index names used ],
+                        "collscan": bool,
+                        "slow": bool,
+                        "executionTimeMillis": ,
+                        "totalDocsExamined": ,
+                        "nReturned": ,
+                        }
+                    }
+        """
+        result = {}
+        with MongoDbManager(
+            url=self._db_mongo_url,
+            db_name=self._db_name,
+            collections=self._db_collections,
+        ) as _db_manager:
+            for method, shape in self.query_shapes.items():
+                if methods and method not in methods:
+                    continue
+                kwargs = {
+                    k: shape[k]
+                    for k in ["find", "sort", "projection", "limit", "aggregate"]
+                    if k in shape
+                }
+                try:
+                    explain = _db_manager.explain(
+                        coll_name=shape["collection"], **kwargs
+                    )
+                except Exception as e:
+                    logging.getLogger(__name__).error(
+                        f" Unable to explain {method} query shape on {self._db_name}'s {shape['collection']}  error-> {e}"
+                    )
+                    continue
+
+                report = self._parse_explain(explain)
+                report["collection"] = shape["collection"]
+                report["collscan"] = "COLLSCAN" in report["stages"]
+                report["slow"] = report["executionTimeMillis"] >= slow_ms
+                result[method] = report
+
+                if report["collscan"] or report["slow"]:
+                    logging.getLogger(__name__).warning(
+                        f" {self._db_name}'s {method} query on {shape['collection']}: stages {report['stages']} indexes {report['indexes']} -> {report['executionTimeMillis']} ms, {report['totalDocsExamined']} docs examined for {report['nReturned']} returned"
+                    )
+
+        return result
+
+    @staticmethod
+    def _parse_explain(explain: dict) -> dict:
+        """Extract winning plan stages and execution stats from an explain result ( find or aggregate )
+
+        Args:
+            explain (dict): explain command result
+
+        Returns:
+            dict: stages, indexes, executionTimeMillis, totalDocsExamined, nReturned
+        """
+        result = {
+            "stages": [],
+            "indexes": [],
+            "executionTimeMillis": 0,
+            "totalDocsExamined": 0,
+            "nReturned": 0,
+        }
+
+        def _walk_plan(plan):
+            if isinstance(plan, dict):
+                if "stage" in plan and plan["stage"] not in result["stages"]:
+                    result["stages"].append(plan["stage"])
+                if "indexName" in plan and plan["indexName"] not in result["indexes"]:
+                    result["indexes"].append(plan["indexName"])
+                for v in plan.values():
+                    _walk_plan(v)
+            elif isinstance(plan, list):
+                for v in plan:
+                    _walk_plan(v)
+
+        def _walk(item):
+            if isinstance(item, dict):
+                for k, v in item.items():
+                    if k == "winningPlan":
+                        _walk_plan(v)
+                    elif k == "executionStats" and isinstance(v, dict):
+                        result["executionTimeMillis"] += v.get(
+                            "executionTimeMillis", 0
+                        )
+                        result["totalDocsExamined"] += v.get("totalDocsExamined", 0)
+                        result["nReturned"] += v.get("nReturned", 0)
+                    elif k != "rejectedPlans":
+                        _walk(v)
+            elif isinstance(item, list):
+                for v in item:
+                    _walk(v)
+
+        _walk(explain)
+        return result
+
     def get_cursor(self, db_manager: MongoDbManager, collection_name: str, **kwargs):
         return db_manager.get_items(coll_name=collection_name, **kwargs)
 
@@ -265,56 +835,602 @@ class db_collections_common:
             elif isinstance(v, Decimal):
                 item[k] = float(v)
 
-        return item
+        return item
+
+
+class database_global(db_collections_common):
+    """global database helper
+    "blocks":
+        item-> {id: <network>_<block_number>
+                network:
+                block:
+                timestamp:
+                }
+    "usd_prices":
+        item-> {id: <network>_<block_number>_<address>
+                network:
+                block:
+                address:
+                price:
+                }
+    "price_jobs":  usd price scraping queue
+        item-> {id: <network>_<block_number>_<address>
+                network:
+                block:
+                address:
+                priority:     lower first
+                status:       pending, done or failed
+                attempts:
+                last_error:
+                next_retry:   timestamp
+                created:
+                updated:
+                }
+    "repair_jobs":  failures found in logs waiting to be repaired
+        item-> {id: <type>_<network>_<block_number>_<address>
+                type:         hypervisor_status
+                network:
+                block:
+                address:
+                count:        times found in logs
+                status:       pending, done or failed
+                attempts:
+                last_error:
+                next_retry:   timestamp
+                created:
+                updated:
+                }
+    "price_negative_cache":  price sources unable to price a token within a block range
+        item-> {id: <network>_<address>_<source>_<block range>
+                network:
+                address:
+                source:       geckoterminal, thegraph_<dex>, coingecko
+                block_range:  block // price_negative_cache_blocks
+                failures:
+                until:        timestamp
+                }
+    "contract_creation":  contract creation data never changes
+        item-> {id: <network>_<address>
+                network:
+                address:
+                block:
+                timestamp:
+                txHash:       None when found onchain
+                }
+    """
+
+    # price jobs retry scheduling ( seconds ): exponential back-off
+    price_retry_seconds = 60 * 30
+    price_retry_max_seconds = 60 * 60 * 24 * 7
+    # pending jobs are set to failed after this many attempts
+    price_job_max_attempts = 10
+    repair_job_max_attempts = 10
+    # a price source failing at a block is only excluded for blocks in the same range
+    price_negative_cache_blocks = 100_000
+
+    query_shapes = {
+        "get_timestamp": {
+            "collection": "blocks",
+            "index": [("network", ASCENDING), ("block", ASCENDING)],
+            "find": {"network": "", "block": 0},
+        },
+        "get_all_block_timestamp": {
+            "collection": "blocks",
+            "index": [("network", ASCENDING), ("block", ASCENDING)],
+            "find": {"network": ""},
+            "sort": [("block", 1)],
+        },
+        "get_nearest_known_block": {
+            "collection": "blocks",
+            "index": [("network", ASCENDING), ("block", ASCENDING)],
+            "find": {"network": "", "block": {"$gte": 0, "$lt": 0}},
+            "sort": [("block", 1)],
+            "limit": 1,
+        },
+        "get_block": {
+            "collection": "blocks",
+            "index": [("network", ASCENDING), ("timestamp", ASCENDING)],
+            "find": {"network": "", "timestamp": 0},
+        },
+        "get_price_usd_interpolated": {
+            "collection": "usd_prices",
+            "index": [
+                ("network", ASCENDING),
+                ("address", ASCENDING),
+                ("block", ASCENDING),
+            ],
+            "find": {"network": "", "address": "", "block": {"$lte": 0, "$gte": 0}},
+            "sort": [("block", -1)],
+            "limit": 1,
+        },
+        "get_unique_prices_addressBlock": {
+            "collection": "usd_prices",
+            "index": [("network", ASCENDING), ("price", ASCENDING)],
+            "find": {"network": "", "price": {"$gt": 0}},
+        },
+        "get_price_jobs": {
+            "collection": "price_jobs",
+            "index": [
+                ("network", ASCENDING),
+                ("status", ASCENDING),
+                ("priority", ASCENDING),
+                ("block", DESCENDING),
+            ],
+            "find": {"network": "", "status": "pending", "next_retry": {"$lte": 0}},
+            "sort": [("priority", 1), ("block", -1)],
+        },
+        "get_repair_jobs": {
+            "collection": "repair_jobs",
+            "index": [
+                ("type", ASCENDING),
+                ("network", ASCENDING),
+                ("status", ASCENDING),
+                ("block", DESCENDING),
+            ],
+            "find": {
+                "type": "",
+                "network": "",
+                "status": "pending",
+                "next_retry": {"$not": {"$gt": 0}},
+            },
+            "sort": [("block", -1)],
+        },
+        "get_price_negative_cache": {
+            "collection": "price_negative_cache",
+            "index": [("network", ASCENDING), ("address", ASCENDING)],
+            "find": {"network": "", "address": {"$in": [""]}},
+        },
+    }
+
+    def __init__(
+        self, mongo_url: str, db_name: str = "global", db_collections: dict = None
+    ):
+        if db_collections is None:
+            db_collections = {
+                "blocks": {
+                    "mono_indexes": {"id": True, "network": False, "block": False},
+                    "multi_indexes": [],
+                },
+                "usd_prices": {
+                    "mono_indexes": {"id": True, "address": False},
+                    "multi_indexes": [],
+                },
+                "price_jobs": {
+                    "mono_indexes": {"id": True},
+                    "multi_indexes": [],
+                },
+                "price_negative_cache": {
+                    "mono_indexes": {"id": True},
+                    "multi_indexes": [],
+                },
+                "repair_jobs": {
+                    "mono_indexes": {"id": True},
+                    "multi_indexes": [],
+                },
+                "contract_creation": {
+                    "mono_indexes": {"id": True},
+                    "multi_indexes": [],
+                },
+            }
+        super().__init__(
+            mongo_url=mongo_url, db_name=db_name, db_collections=db_collections
+        )
+
+    def set_price_usd(
+        self, network: str, block: int, token_address: str, price_usd: float
+    ):
+        data = {
+            "id": f"{network}_{block}_{token_address}",
+            "network": network,
+            "block": int(block),
+            "address": token_address,
+            "price": float(price_usd),
+        }
+
+        self.save_item_to_database(data=data, collection_name="usd_prices")
+
+    def set_price_jobs(self, network: str, price_ids: list[str], priority: int = 1):
+        """Enqueue price jobs. Existing jobs keep their state, only raising their priority when lower.
+            Failed jobs are set back to pending when their back-off time has passed.
+
+        Args:
+            network (str):
+            price_ids (list[str]): "<network>_<block>_<token address>"
+            priority (int, optional): lower is processed first. Defaults to 1.
+        """
+        now = int(time.time())
+        data = []
+        for price_id in price_ids:
+            _network, block, address = price_id.rsplit("_", 2)
+            data.append(
+                {
+                    "filter": {"id": price_id},
+                    "data": {
+                        "$setOnInsert": {
+                            "id": price_id,
+                            "network": network,
+                            "block": int(block),
+                            "address": address,
+                            "status": "pending",
+                            "attempts": 0,
+                            "last_error": None,
+                            "next_retry": now,
+                            "created": now,
+                        },
+                        "$min": {"priority": priority},
+                        "$set": {"updated": now},
+                    },
+                }
+            )
+        if data:
+            self.update_items_to_database(data=data, collection_name="price_jobs")
+            # failed jobs requested again get a new chance once their back-off time has passed
+            self.reset_price_jobs(network=network, price_ids=price_ids, due_only=True)
+
+    def get_price_jobs(
+        self,
+        network: str,
+        price_ids: list[str] | None = None,
+        limit: int | None = None,
+    ) -> list[dict]:
+        """get pending price jobs due for processing, sorted by priority and descending block
+
+        Args:
+            network (str):
+            price_ids (list[str] | None, optional): only these jobs. Defaults to None.
+            limit (int | None, optional): . Defaults to None.
+
+        Returns:
+            list[dict]:
+        """
+        find = {
+            "network": network,
+            "status": "pending",
+            "next_retry": {"$lte": int(time.time())},
+        }
+        if price_ids is not None:
+            find["id"] = {"$in": list(price_ids)}
+        kwargs = {"find": find, "sort": [("priority", 1), ("block", -1)]}
+        if limit:
+            kwargs["limit"] = limit
+        return self.get_items_from_database(collection_name="price_jobs", **kwargs)
+
+    def set_price_job_result(
+        self,
+        job: dict,
+        price_usd: float | None,
+        error: str | None = None,
+        next_retry: int | None = None,
+    ):
+        """Mark a price job done or schedule its retry using exponential back-off
+
+        Args:
+            job (dict): price job as returned by get_price_jobs
+            price_usd (float | None): price found
+            error (str | None, optional): reason of the failure. Defaults to None.
+            next_retry (int | None, optional): retry timestamp without counting an attempt
+                        ( no source was available ). Defaults to None.
+        """
+        now = int(time.time())
+        if price_usd:
+            update = {"status": "done", "last_error": None, "updated": now}
+        elif next_retry:
+            update = {"next_retry": next_retry, "last_error": error, "updated": now}
+        else:
+            attempts = job.get("attempts", 0) + 1
+            update = {
+                "status": "failed"
+                if attempts >= self.price_job_max_attempts
+                else "pending",
+                "attempts": attempts,
+                "last_error": error,
+                "next_retry": now + self.get_retry_seconds(failures=attempts),
+                "updated": now,
+            }
+        self.update_items_to_database(
+            data=[{"filter": {"id": job["id"]}, "data": {"$set": update}}],
+            collection_name="price_jobs",
+        )
+
+    def reset_price_jobs(
+        self,
+        network: str,
+        status: str = "failed",
+        price_ids: list[str] | None = None,
+        due_only: bool = False,
+    ):
+        """Set jobs back to pending with no attempts
+
+        Args:
+            network (str):
+            status (str, optional): jobs status to reset. Defaults to "failed".
+            price_ids (list[str] | None, optional): only these jobs. Defaults to None.
+            due_only (bool, optional): only jobs whose retry time has passed. Defaults to False.
+        """
+        now = int(time.time())
+        find = {"network": network, "status": status}
+        if price_ids is not None:
+            find["id"] = {"$in": list(price_ids)}
+        if due_only:
+            find["next_retry"] = {"$lte": now}
+        jobs = self.get_items_from_database(
+            collection_name="price_jobs",
+            find=find,
+            projection={"id": 1, "_id": 0},
+        )
+        if not jobs:
+            return
+        self.update_items_to_database(
+            data=[
+                {
+                    "filter": {"id": x["id"]},
+                    "data": {
+                        "$set": {
+                            "status": "pending",
+                            "attempts": 0,
+                            "next_retry": now,
+                            "updated": now,
+                        }
+                    },
+                }
+                for x in jobs
+            ],
+            collection_name="price_jobs",
+        )
+
+    def set_repair_jobs(self, type: str, items: list[dict]):
+        """Enqueue failures found in logs, counting the times each one is found
+
+        Args:
+            type (str): failure type, like "hypervisor_status"
+            items (list[dict]): [{"network":, "address":, "block":}]
+        """
+        now = int(time.time())
+        counts = {}
+        for item in items:
+            key = (item["network"], int(item["block"]), item["address"].lower())
+            counts[key] = counts.get(key, 0) + 1
+
+        data = [
+            {
+                "filter": {"id": f"{type}_{network}_{block}_{address}"},
+                "data": {
+                    "$setOnInsert": {
+                        "id": f"{type}_{network}_{block}_{address}",
+                        "type": type,
+                        "network": network,
+                        "block": block,
+                        "address": address,
+                        "attempts": 0,
+                        "next_retry": now,
+                        "created": now,
+                    },
+                    "$inc": {"count": count},
+                    "$set": {"status": "pending", "updated": now},
+                },
+            }
+            for (network, block, address), count in counts.items()
+        ]
+        if data:
+            self.update_items_to_database(data=data, collection_name="repair_jobs")
+
+    def get_repair_jobs(
+        self, type: str, network: str | None = None, min_count: int = 1
+    ) -> list[dict]:
+        """get pending repair jobs due for a retry sorted by descending block
+
+        Args:
+            type (str): failure type
+            network (str | None, optional): . Defaults to all.
+            min_count (int, optional): minimum times found in logs. Defaults to 1.
+
+        Returns:
+            list[dict]:
+        """
+        find = {
+            "type": type,
+            "status": "pending",
+            "count": {"$gte": min_count},
+            # jobs enqueued before retries were scheduled have no next_retry
+            "next_retry": {"$not": {"$gt": int(time.time())}},
+        }
+        if network:
+            find["network"] = network
+        return self.get_items_from_database(
+            collection_name="repair_jobs", find=find, sort=[("block", -1)]
+        )
+
+    def set_repair_jobs_done(self, ids: list[str]):
+        if not ids:
+            return
+        now = int(time.time())
+        self.update_items_to_database(
+            data=[
+                {
+                    "filter": {"id": id},
+                    "data": {"$set": {"status": "done", "updated": now}},
+                }
+                for id in ids
+            ],
+            collection_name="repair_jobs",
+        )
+
+    def set_repair_jobs_failed(self, failures: list[tuple[dict, str]]):
+        """Count a failed attempt of each job, scheduling its retry with exponential back-off.
+            Jobs are set to failed after <repair_job_max_attempts> attempts.
+
+        Args:
+            failures (list[tuple[dict, str]]): (job, reason of the failure)
+        """
+        if not failures:
+            return
+        now = int(time.time())
+        data = []
+        for job, error in failures:
+            attempts = job.get("attempts", 0) + 1
+            data.append(
+                {
+                    "filter": {"id": job["id"]},
+                    "data": {
+                        "$set": {
+                            "status": "failed"
+                            if attempts >= self.repair_job_max_attempts
+                            else "pending",
+                            "attempts": attempts,
+                            "last_error": error,
+                            "next_retry": now
+                            + self.get_retry_seconds(failures=attempts),
+                            "updated": now,
+                        }
+                    },
+                }
+            )
+        self.update_items_to_database(data=data, collection_name="repair_jobs")
+
+    def get_price_negative_cache_range(self, block: int) -> int:
+        return int(block) // self.price_negative_cache_blocks
+
+    def set_price_negative_cache(
+        self,
+        network: str,
+        address: str,
+        block: int,
+        sources: list[str],
+    ):
+        """Add a failure to token price sources, excluding them at the block range until their back-off time passes
+            ( failures are counted in the database: concurrent and repeated failures all count )
+
+        Args:
+            network (str):
+            address (str): token address
+            block (int): block the sources failed at
+            sources (list[str]): failed sources
+        """
+        block_range = self.get_price_negative_cache_range(block)
+        now = int(time.time())
+        # get_retry_seconds of the updated failures
+        retry_seconds = {
+            "$min": [
+                {
+                    "$multiply": [
+                        self.price_retry_seconds,
+                        {"$pow": [2, {"$subtract": ["$failures", 1]}]},
+                    ]
+                },
+                self.price_retry_max_seconds,
+            ]
+        }
+        data = []
+        for source in sources:
+            data.append(
+                {
+                    "filter": {"id": f"{network}_{address}_{source}_{block_range}"},
+                    # update pipeline: failures are incremented before the back-off is calculated
+                    "data": [
+                        {
+                            "$set": {
+                                "id": f"{network}_{address}_{source}_{block_range}",
+                                "network": network,
+                                "address": address,
+                                "source": source,
+                                "block_range": block_range,
+                                "failures": {
+                                    "$add": [{"$ifNull": ["$failures", 0]}, 1]
+                                },
+                            }
+                        },
+                        {
+                            "$set": {
+                                "until": {"$toLong": {"$add": [now, retry_seconds]}}
+                            }
+                        },
+                    ],
+                }
+            )
+        if data:
+            self.update_items_to_database(
+                data=data, collection_name="price_negative_cache"
+            )
+
+    def get_price_negative_cache(self, network: str, addresses: list[str]) -> dict:
+        """get the negative cache of token price sources
 
+        Args:
+            network (str):
+            addresses (list[str]): token addresses
 
-class database_global(db_collections_common):
-    """global database helper
-    "blocks":
-        item-> {id: <network>_<block_number>
-                network:
-                block:
-                timestamp:
-                }
-    "usd_prices":
-        item-> {id: <network>_<block_number>_<address>
-                network:
-                block:
-                address:
-                price:
-                }
-    """
+        Returns:
+            dict: {(<address>, <block range>): {<source>: item}}
+        """
+        result = {}
+        for item in self.get_items_from_database(
+            collection_name="price_negative_cache",
+            find={"network": network, "address": {"$in": list(addresses)}},
+        ):
+            result.setdefault((item["address"], item["block_range"]), {})[
+                item["source"]
+            ] = item
+        return result
 
-    def __init__(
-        self, mongo_url: str, db_name: str = "global", db_collections: dict = None
+    def delete_price_negative_cache(
+        self, network: str, address: str, block: int, source: str
     ):
-        if db_collections is None:
-            db_collections = {
-                "blocks": {
-                    "mono_indexes": {"id": True, "network": False, "block": False},
-                    "multi_indexes": [],
-                },
-                "usd_prices": {
-                    "mono_indexes": {"id": True, "address": False},
-                    "multi_indexes": [],
-                },
-            }
-        super().__init__(
-            mongo_url=mongo_url, db_name=db_name, db_collections=db_collections
+        self.delete_item(
+            collection_name="price_negative_cache",
+            item_id=f"{network}_{address}_{source}_{self.get_price_negative_cache_range(block)}",
         )
 
-    def set_price_usd(
-        self, network: str, block: int, token_address: str, price_usd: float
+    def get_retry_seconds(self, failures: int) -> int:
+        """exponential back-off seconds
+
+        Args:
+            failures (int): number of failures
+
+        Returns:
+            int:
+        """
+        return min(
+            self.price_retry_seconds * 2 ** max(failures - 1, 0),
+            self.price_retry_max_seconds,
+        )
+
+    def set_contract_creation(
+        self,
+        network: str,
+        address: str,
+        block: int,
+        timestamp: int,
+        txHash: str | None = None,
     ):
         data = {
-            "id": f"{network}_{block}_{token_address}",
+            "id": f"{network}_{address.lower()}",
             "network": network,
+            "address": address.lower(),
             "block": int(block),
-            "address": token_address,
-            "price": float(price_usd),
+            "timestamp": timestamp,
+            "txHash": txHash,
         }
+        self.save_item_to_database(data=data, collection_name="contract_creation")
 
-        self.save_item_to_database(data=data, collection_name="usd_prices")
+    def get_contract_creation(self, network: str, addresses: list[str]) -> dict:
+        """get cached contract creation data
+
+        Args:
+            network (str):
+            addresses (list[str]): contract addresses
+
+        Returns:
+            dict: {<address>: {block, timestamp, ...}}
+        """
+        return {
+            x["address"]: x
+            for x in self.get_items_from_database(
+                collection_name="contract_creation",
+                find={
+                    "id": {"$in": [f"{network}_{x.lower()}" for x in addresses]}
+                },
+            )
+        }
 
     def set_block(self, network: str, block: int, timestamp: datetime.timestamp):
         data = {
@@ -344,6 +1460,7 @@ class database_global(db_collections_common):
         network: str,
         block: int,
         address: str,
+        interpolate_distance: int | None = None,
     ) -> list[dict]:
         """get usd price from block
 
@@ -351,14 +1468,91 @@ class database_global(db_collections_common):
             network (str): ethereum, optimism, polygon....
             block (int): number
             address (str): token address
+            interpolate_distance (int | None, optional): when set and there is no price at block, interpolate it
+                            using the price samples within this distance (blocks). Defaults to None.
 
         Returns:
             list[dict]: list of price dict obj
         """
-        return self.get_items_from_database(
+        result = self.get_items_from_database(
             collection_name="usd_prices",
             find={"id": f"{network}_{block}_{address}"},
         )
+        if not result and interpolate_distance:
+            if interpolated := self.get_price_usd_interpolated(
+                network=network,
+                block=block,
+                address=address,
+                max_distance=interpolate_distance,
+            ):
+                result = [interpolated]
+        return result
+
+    def get_price_usd_interpolated(
+        self, network: str, block: int, address: str, max_distance: int
+    ) -> dict | None:
+        """get usd price at block interpolating linearly between the closest price samples
+
+        Args:
+            network (str):
+            block (int):
+            address (str): token address
+            max_distance (int): maximum blocks between block and the samples used
+
+        Returns:
+            dict | None: price dict obj with
+                    "error": maximum absolute price error when prices move monotonically between samples
+                            ( None when only one side sample is available )
+                    "block_lo", "block_hi": sample blocks used
+                    "interpolated": True
+        """
+        find = {"network": network, "address": address, "price": {"$gt": 0}}
+        block = int(block)
+
+        samples_lo = self.get_items_from_database(
+            collection_name="usd_prices",
+            find={**find, "block": {"$lte": block, "$gte": block - max_distance}},
+            projection={"block": 1, "price": 1, "_id": 0},
+            sort=[("block", -1)],
+            limit=1,
+        )
+        samples_hi = self.get_items_from_database(
+            collection_name="usd_prices",
+            find={**find, "block": {"$gte": block, "$lte": block + max_distance}},
+            projection={"block": 1, "price": 1, "_id": 0},
+            sort=[("block", 1)],
+            limit=1,
+        )
+        if not samples_lo and not samples_hi:
+            return None
+
+        result = {
+            "id": f"{network}_{block}_{address}",
+            "network": network,
+            "block": block,
+            "address": address,
+            "interpolated": True,
+        }
+        if samples_lo and samples_hi:
+            lo, hi = samples_lo[0], samples_hi[0]
+            if hi["block"] == lo["block"]:
+                position = 0
+            else:
+                position = (block - lo["block"]) / (hi["block"] - lo["block"])
+            result["price"] = lo["price"] + (hi["price"] - lo["price"]) * position
+            result["error"] = abs(hi["price"] - lo["price"]) * max(
+                position, 1 - position
+            )
+            result["block_lo"] = lo["block"]
+            result["block_hi"] = hi["block"]
+        else:
+            # one side only: closest sample price
+            sample = samples_lo[0] if samples_lo else samples_hi[0]
+            result["price"] = sample["price"]
+            result["error"] = None
+            result["block_lo"] = result["block_hi"] = sample["block"]
+
+        return result
 
     def get_price_usd_closestBlock(
         self,
@@ -392,6 +1586,37 @@ class database_global(db_collections_common):
             find={"network": network, "block": block},
         )
 
+    def get_nearest_known_block(
+        self, network: str, block: int, lo: int, hi: int
+    ) -> int | None:
+        """get the known block number nearest to <block> within [lo, hi)
+            ( two indexed lookups instead of loading the whole blocks collection )
+
+        Args:
+            network (str):
+            block (int): block to search around
+            lo (int): lowest block allowed
+            hi (int): highest block allowed ( excluded )
+
+        Returns:
+            int | None: block number or None when no block is known in range
+        """
+        candidates = [
+            x["block"]
+            for find, sort in [
+                ({"$gte": block, "$lt": hi}, 1),
+                ({"$gte": lo, "$lt": block}, -1),
+            ]
+            for x in self.get_items_from_database(
+                collection_name="blocks",
+                find={"network": network, "block": find},
+                projection={"block": 1, "_id": 0},
+                sort=[("block", sort)],
+                limit=1,
+            )
+        ]
+        return min(candidates, key=lambda x: abs(x - block)) if candidates else None
+
     def get_closest_timestamp(self, network: str, block: int) -> dict:
         return self.query_items_from_database(
             query=self.query_blocks_closest(network=network, block=block),
@@ -542,6 +1767,72 @@ class database_local(db_collections_common):
                 }
     """
 
+    query_shapes = {
+        "get_all_status": {
+            "collection": "status",
+            "index": [("address", ASCENDING), ("block", ASCENDING)],
+            "find": {"address": ""},
+            "sort": [("block", 1)],
+        },
+        "get_hype_status_btwn_blocks": {
+            "collection": "status",
+            "index": [("address", ASCENDING), ("block", ASCENDING)],
+            "aggregate": [
+                {"$match": {"address": "", "block": {"$gte": 0, "$lte": 0}}},
+                {"$sort": {"block": -1}},
+            ],
+        },
+        "total_hypervisor_supply": {
+            "collection": "status",
+            "index": [("address", ASCENDING), ("block", ASCENDING)],
+            "find": {"address": "", "block": 0},
+            "projection": {"totalSupply": 1, "decimals": 1},
+        },
+        "query_status_feeReturn_data": {
+            "collection": "status",
+            "index": [("address", ASCENDING), ("timestamp", ASCENDING)],
+            "aggregate": [
+                {
+                    "$match": {
+                        "address": "",
+                        "$and": [
+                            {"timestamp": {"$lte": 0}},
+                            {"timestamp": {"$gte": 0}},
+                        ],
+                    }
+                },
+                {"$sort": {"block": 1}},
+            ],
+        },
+        "last_user_status_list": {
+            "collection": "user_status",
+            "index": [
+                ("hypervisor_address", ASCENDING),
+                ("block", DESCENDING),
+                ("logIndex", DESCENDING),
+            ],
+            "aggregate": [
+                {"$match": {"hypervisor_address": "", "block": {"$lte": 0}}},
+                {"$sort": {"block": -1, "logIndex": -1}},
+                {
+                    "$group": {
+                        "_id": {"address": "$address"},
+                        "last_doc": {"$first": "$$ROOT"},
+                    }
+                },
+            ],
+        },
+        "feed_rewards_status": {
+            "collection": "rewards_status",
+            "index": [
+                ("hypervisor_address", ASCENDING),
+                ("rewarder_address", ASCENDING),
+                ("block", ASCENDING),
+            ],
+            "find": {"hypervisor_address": "", "rewarder_address": "", "block": 0},
+        },
+    }
+
     def __init__(self, mongo_url: str, db_name: str, db_collections: dict = None):
         if db_collections is None:
             db_collections = {
@@ -614,12 +1905,89 @@ class database_local(db_collections_common):
                     },
                     "multi_indexes": [],
                 },
+                "outbox": {
+                    "mono_indexes": {"id": True, "created": False},
+                    "multi_indexes": [],
+                },
+                "status_daily": {
+                    "mono_indexes": {"id": True, "address": False},
+                    "multi_indexes": [
+                        [("address", ASCENDING), ("timestamp", ASCENDING)],
+                    ],
+                },
+                "status_hourly": {
+                    "mono_indexes": {"id": True, "address": False},
+                    "multi_indexes": [
+                        [("address", ASCENDING), ("timestamp", ASCENDING)],
+                    ],
+                },
             }
 
         super().__init__(
             mongo_url=mongo_url, db_name=db_name, db_collections=db_collections
         )
 
+    # outbox
+    #   when enabled, status and operations writes also save a reference item in the outbox collection
+    #   so downstream work can be discovered incrementally on servers without change streams
+    # database names with outbox enabled
+    _outbox_databases = set()
+
+    @property
+    def outbox_enabled(self) -> bool:
+        return self._db_name in database_local._outbox_databases
+
+    def enable_outbox(self):
+        """save outbox references on writes to this database ( any database_local instance of this process )"""
+        database_local._outbox_databases.add(self._db_name)
+
+    def set_outbox(self, collection_name: str, item_id: str):
+        self.save_item_to_database(
+            data={
+                "id": f"{collection_name}_{item_id}",
+                "collection": collection_name,
+                "item_id": item_id,
+                "created": datetime.now(timezone.utc).timestamp(),
+            },
+            collection_name="outbox",
+        )
+
+    def get_outbox(self, limit: int = 1000) -> list[dict]:
+        """get the oldest outbox references, with the referenced items
+
+        Args:
+            limit (int, optional): . Defaults to 1000.
+
+        Returns:
+            list[dict]: {"id":<outbox id>, "collection":<collection name>, "item": <referenced item> ... }
+        """
+        result = self.get_items_from_database(
+            collection_name="outbox", find={}, sort=[("created", 1)], limit=limit
+        )
+        for collection_name in {x["collection"] for x in result}:
+            items = {
+                x["id"]: x
+                for x in self.get_items_from_database(
+                    collection_name=collection_name,
+                    find={
+                        "id": {
+                            "$in": [
+                                x["item_id"]
+                                for x in result
+                                if x["collection"] == collection_name
+                            ]
+                        }
+                    },
+                )
+            }
+            for x in result:
+                if x["collection"] == collection_name:
+                    x["item"] = items.get(x["item_id"])
+        return result
+
+    def delete_outbox(self, ids: list[str]):
+        self.delete_items(collection_name="outbox", find={"id": {"$in": ids}})
+
     # static
 
     def set_static(self, data: dict):
@@ -671,7 +2039,11 @@ class database_local(db_collections_common):
     # operation
 
     def set_operation(self, data: dict):
+        # store numbers natively
+        data = convert_operation_toStorage(operation=data)
         self.replace_item_to_database(data=data, collection_name="operations")
+        if self.outbox_enabled:
+            self.set_outbox(collection_name="operations", item_id=data["id"])
 
     def get_all_operations(self, hypervisor_address: str) -> list:
         """find all hypervisor operations from db
@@ -787,7 +2159,11 @@ class database_local(db_collections_common):
     def set_status(self, data: dict):
         # define database id
         data["id"] = f"{data['address']}_{data['block']}"
+        # store numbers natively
+        data = convert_hypervisor_toStorage(hypervisor=data)
         self.save_item_to_database(data=data, collection_name="status")
+        if self.outbox_enabled:
+            self.set_outbox(collection_name="status", item_id=data["id"])
 
     def get_all_status(self, hypervisor_address: str) -> list:
         """find all hypervisor status from db
@@ -882,6 +2258,230 @@ class database_local(db_collections_common):
             ),
         )
 
+    # status rollups
+    #   status_daily and status_hourly hold, for each hypervisor and period bucket:
+    #       first/last block, timestamp and status id, numeric fields converted and fee deltas
+
+    status_rollup_periods = {"daily": 60 * 60 * 24, "hourly": 60 * 60}
+
+    def update_status_rollups(
+        self,
+        hypervisor_address: str | None = None,
+        timestamp_ini: int | None = None,
+        timestamp_end: int | None = None,
+        periods: list[str] | None = None,
+    ):
+        """(Re)build status rollup buckets touched by the timeframe specified ( all when not specified )
+            Call it with the timeframe of newly saved status to maintain rollups incrementally.
+
+        Args:
+            hypervisor_address (str | None, optional): Defaults to all hypervisors.
+            timestamp_ini (int | None, optional): Defaults to None.
+            timestamp_end (int | None, optional): Defaults to None.
+            periods (list[str] | None, optional): "daily", "hourly". Defaults to all.
+        """
+        for period in periods or self.status_rollup_periods.keys():
+            seconds = self.status_rollup_periods[period]
+            self.query_items_from_database(
+                collection_name="status",
+                query=self.query_status_rollup(
+                    period_seconds=seconds,
+                    collection_name=f"status_{period}",
+                    hypervisor_address=hypervisor_address,
+                    # expand timeframe to whole buckets
+                    timestamp_ini=(int(timestamp_ini) - int(timestamp_ini) % seconds)
+                    if timestamp_ini
+                    else None,
+                    timestamp_end=(
+                        int(timestamp_end) - int(timestamp_end) % seconds + seconds - 1
+                    )
+                    if timestamp_end
+                    else None,
+                ),
+            )
+
+    def get_status_rollups(
+        self,
+        hypervisor_address: str,
+        period: str = "daily",
+        timestamp_ini: int | None = None,
+        timestamp_end: int | None = None,
+    ) -> list[dict]:
+        """get status rollup buckets, sorted from past to present
+
+        Args:
+            hypervisor_address (str):
+            period (str, optional): "daily" or "hourly". Defaults to "daily".
+            timestamp_ini (int | None, optional): Defaults to None.
+            timestamp_end (int | None, optional): Defaults to None.
+
+        Returns:
+            list[dict]:
+        """
+        find = {"address": hypervisor_address}
+        if timestamp_ini or timestamp_end:
+            find["timestamp"] = {}
+            if timestamp_ini:
+                find["timestamp"]["$gte"] = (
+                    int(timestamp_ini)
+                    - int(timestamp_ini) % self.status_rollup_periods[period]
+                )
+            if timestamp_end:
+                find["timestamp"]["$lte"] = int(timestamp_end)
+        return self.get_items_from_database(
+            collection_name=f"status_{period}",
+            find=find,
+            sort=[("timestamp", 1)],
+        )
+
+    def get_stale_status_rollups(
+        self,
+        rollups: list[dict],
+        hypervisor_address: str,
+        period: str = "daily",
+        timestamp_ini: int | None = None,
+        timestamp_end: int | None = None,
+    ) -> list[int]:
+        """status buckets of the timeframe whose rollup is missing or does not match its status
+            ( status count, first and last block of every bucket are compared)
+
+        Args:
+            rollups (list[dict]): as returned by get_status_rollups
+            hypervisor_address (str):
+            period (str, optional): . Defaults to "daily".
+            timestamp_ini (int | None, optional): Defaults to None.
+            timestamp_end (int | None, optional): Defaults to None.
+
+        Returns:
+            list[int]: sorted bucket start timestamps
+        """
+        seconds = self.status_rollup_periods[period]
+        match = {"address": hypervisor_address}
+        if timestamp_ini or timestamp_end:
+            match["timestamp"] = {}
+            if timestamp_ini:
+                # whole buckets
+                match["timestamp"]["$gte"] = (
+                    int(timestamp_ini) - int(timestamp_ini) % seconds
+                )
+            if timestamp_end:
+                match["timestamp"]["$lte"] = int(timestamp_end)
+
+        rollups = {
+            x["timestamp"]: (x["count"], x["first_block"], x["last_block"])
+            for x in rollups
+        }
+        return sorted(
+            int(x["timestamp"])
+            for x in self.get_items_from_database(
+                collection_name="status",
+                aggregate=[
+                    {"$match": match},
+                    {
+                        "$group": {
+                            "_id": {
+                                "$subtract": [
+                                    "$timestamp",
+                                    {"$mod": ["$timestamp", seconds]},
+                                ]
+                            },
+                            "count": {"$sum": 1},
+                            "first_block": {"$min": "$block"},
+                            "last_block": {"$max": "$block"},
+                        }
+                    },
+                    {
+                        "$project": {
+                            "_id": 0,
+                            "timestamp": {"$toLong": "$_id"},
+                            "count": 1,
+                            "first_block": 1,
+                            "last_block": 1,
+                        }
+                    },
+                ],
+            )
+            if rollups.get(int(x["timestamp"]))
+            != (x["count"], x["first_block"], x["last_block"])
+        )
+
+    def get_status_byPeriod(
+        self,
+        hypervisor_address: str,
+        period: str = "daily",
+        timestamp_ini: int | None = None,
+        timestamp_end: int | None = None,
+    ) -> list[dict] | None:
+        """get the first hypervisor status of each period, sorted from past to present, using rollups
+
+        Args:
+            hypervisor_address (str):
+            period (str, optional): "daily" or "hourly". Defaults to "daily".
+            timestamp_ini (int | None, optional): Defaults to None.
+            timestamp_end (int | None, optional): Defaults to None.
+
+        Returns:
+            list[dict] | None: None when no status exist for the hypervisor
+        """
+        rollups = self.get_status_rollups(
+            hypervisor_address=hypervisor_address,
+            period=period,
+            timestamp_ini=timestamp_ini,
+            timestamp_end=timestamp_end,
+        )
+        # rebuild buckets not matching their status ( status saved without updating rollups)
+        if stale := self.get_stale_status_rollups(
+            rollups=rollups,
+            hypervisor_address=hypervisor_address,
+            period=period,
+            timestamp_ini=timestamp_ini,
+            timestamp_end=timestamp_end,
+        ):
+            logging.getLogger(__name__).debug(
+                f" {len(stale)} {period} status rollups of {hypervisor_address} do not match its status. Building them"
+            )
+            self.update_status_rollups(
+                hypervisor_address=hypervisor_address,
+                timestamp_ini=stale[0],
+                timestamp_end=stale[-1],
+                periods=[period],
+            )
+            rollups = self.get_status_rollups(
+                hypervisor_address=hypervisor_address,
+                period=period,
+                timestamp_ini=timestamp_ini,
+                timestamp_end=timestamp_end,
+            )
+
+        if not rollups:
+            return None
+
+        result = self.get_items_from_database(
+            collection_name="status",
+            find={"id": {"$in": [x["first_status_id"] for x in rollups]}},
+            sort=[("block", 1)],
+        )
+
+        # the first bucket may start before timestamp_ini: use its first status from timestamp_ini
+        if timestamp_ini and result and result[0]["timestamp"] < int(timestamp_ini):
+            result = result[1:]
+            if first := self.get_items_from_database(
+                collection_name="status",
+                find={
+                    "address": hypervisor_address,
+                    "timestamp": {
+                        "$gte": int(timestamp_ini),
+                        "$lt": rollups[0]["timestamp"]
+                        + self.status_rollup_periods[period],
+                    },
+                },
+                sort=[("block", 1)],
+                limit=1,
+            ):
+                result = first + result
+
+        return result
+
     # user status
 
     def set_user_status(self, data: dict):
@@ -1176,6 +2776,129 @@ class database_local(db_collections_common):
             {"$sort": {"block": -1}},
         ]
 
+    @staticmethod
+    def query_status_rollup(
+        period_seconds: int,
+        collection_name: str,
+        hypervisor_address: str | None = None,
+        timestamp_ini: int | None = None,
+        timestamp_end: int | None = None,
+    ) -> list[dict]:
+        """group status by hypervisor and period bucket, merging the result into the rollup collection
+
+        Args:
+            period_seconds (int): bucket size
+            collection_name (str): rollup collection to merge into
+            hypervisor_address (str | None, optional): . Defaults to None.
+            timestamp_ini (int | None, optional): . Defaults to None.
+            timestamp_end (int | None, optional): . Defaults to None.
+
+        Returns:
+            list[dict]:
+        """
+
+        def _numbers(prefix: str) -> dict:
+            def _field(field: str, decimals: str) -> dict:
+                return {
+                    "$divide": [
+                        {"$toDecimal": f"${prefix}.{field}"},
+                        {"$pow": [10, f"${prefix}.{decimals}"]},
+                    ]
+                }
+
+            return {
+                "totalSupply": _field("totalSupply", "decimals"),
+                "tvl0": _field("totalAmounts.total0", "pool.token0.decimals"),
+                "tvl1": _field("totalAmounts.total1", "pool.token1.decimals"),
+                "fees_uncollected0": _field(
+                    "fees_uncollected.qtty_token0", "pool.token0.decimals"
+                ),
+                "fees_uncollected1": _field(
+                    "fees_uncollected.qtty_token1", "pool.token1.decimals"
+                ),
+                "fees_owed0": _field("tvl.fees_owed_token0", "pool.token0.decimals"),
+                "fees_owed1": _field("tvl.fees_owed_token1", "pool.token1.decimals"),
+            }
+
+        def _fees(prefix: str, token: int) -> dict:
+            return {
+                "$add": [
+                    f"${prefix}.fees_uncollected{token}",
+                    f"${prefix}.fees_owed{token}",
+                ]
+            }
+
+        match = {}
+        if hypervisor_address:
+            match["address"] = hypervisor_address
+        if timestamp_ini or timestamp_end:
+            match["timestamp"] = {}
+            if timestamp_ini:
+                match["timestamp"]["$gte"] = timestamp_ini
+            if timestamp_end:
+                match["timestamp"]["$lte"] = timestamp_end
+
+        return [
+            {"$match": match},
+            {"$sort": {"block": 1}},
+            {
+                "$group": {
+                    "_id": {
+                        "address": "$address",
+                        "timestamp": {
+                            "$subtract": [
+                                "$timestamp",
+                                {"$mod": ["$timestamp", period_seconds]},
+                            ]
+                        },
+                    },
+                    "first": {"$first": "$$ROOT"},
+                    "last": {"$last": "$$ROOT"},
+                    "count": {"$sum": 1},
+                }
+            },
+            {
+                "$project": {
+                    "_id": 0,
+                    "id": {
+                        "$concat": [
+                            "$_id.address",
+                            "_",
+                            {"$toString": {"$toLong": "$_id.timestamp"}},
+                        ]
+                    },
+                    "address": "$_id.address",
+                    "period": {"$literal": period_seconds},
+                    "timestamp": {"$toLong": "$_id.timestamp"},
+                    "count": "$count",
+                    "first_block": "$first.block",
+                    "last_block": "$last.block",
+                    "first_timestamp": "$first.timestamp",
+                    "last_timestamp": "$last.timestamp",
+                    "first_status_id": "$first.id",
+                    "last_status_id": "$last.id",
+                    "first": _numbers("first"),
+                    "last": _numbers("last"),
+                }
+            },
+            {
+                # fees generated between the first and last status of the bucket
+                #   ( not accurate when a rebalance/collect happened in between )
+                "$addFields": {
+                    "fees_delta0": {"$subtract": [_fees("last", 0), _fees("first", 0)]},
+                    "fees_delta1": {"$subtract": [_fees("last", 1), _fees("first", 1)]},
+                }
+            },
+            {
+                "$merge": {
+                    "into": collection_name,
+                    "on": "id",
+                    "whenMatched": "replace",
+                    "whenNotMatched": "insert",
+                }
+            },
+        ]
+
     @staticmethod
     def query_status_mostUsed_token1(limit: int = 5) -> list[dict]:
         """return the top most used token1 address of static database
@@ -1,15 +1,86 @@
-from pymongo import MongoClient
+import os
+import threading
+
+from pymongo import MongoClient, monitoring
 from pymongo.errors import ConnectionFailure, BulkWriteError
 from pymongo import InsertOne, DeleteMany, ReplaceOne, UpdateOne
+from bson.codec_options import CodecOptions, TypeCodec, TypeRegistry
+from bson.raw_bson import RawBSONDocument
+from bson.decimal128 import Decimal128, create_decimal128_context
+from decimal import Decimal, localcontext
+
+from bins.general.metrics_utilities import METRICS
+
+
+class decimal_codec(TypeCodec):
+    """Decimal <-> Decimal128 codec: numeric fields are read as Decimal, with no per document conversion"""
+
+    python_type = Decimal
+    bson_type = Decimal128
+
+    def transform_python(self, value: Decimal) -> Decimal128:
+        with localcontext(create_decimal128_context()) as ctx:
+            return Decimal128(ctx.create_decimal(value))
+
+    def transform_bson(self, value: Decimal128) -> Decimal:
+        return value.to_decimal()
+
+
+CODEC_OPTIONS = CodecOptions(type_registry=TypeRegistry([decimal_codec()]))
+# lazy decoding: documents are only decoded when ( and where ) accessed
+RAW_CODEC_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+
+class metrics_command_listener(monitoring.CommandListener):
+    """record mongo command latency and failures ( cursors getMore included)"""
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        METRICS.observe(
+            "mongo_operation_seconds",
+            event.duration_micros / 1_000_000,
+            command=event.command_name,
+            database=event.database_name,
+        )
+
+    def failed(self, event):
+        METRICS.observe(
+            "mongo_operation_seconds",
+            event.duration_micros / 1_000_000,
+            command=event.command_name,
+            database=event.database_name,
+        )
+        METRICS.inc(
+            "mongo_operation_errors_total",
+            command=event.command_name,
+            database=event.database_name,
+        )
+
+
+METRICS_COMMAND_LISTENER = metrics_command_listener()
 
 
 class MongoDbManager:
-    def __init__(self, url: str, db_name: str, collections: dict):
+    # databases with collections and indexes already configured in this process
+    _configured_databases = set()
+
+    # reuse one client ( and its connection pool) per url and process instead of
+    # connecting on each operation: enabled by long running multi job services
+    share_clients = False
+    _clients = {}  # {(url, pid): MongoClient}
+    _clients_lock = threading.Lock()
+
+    def __init__(
+        self, url: str, db_name: str, collections: dict, raw_documents: bool = False
+    ):
         """Mongo database helper
 
         Args:
            url (str): full mongodb url
            db_name (str): database name
+           raw_documents (bool, optional): return RawBSONDocument items ( lazy decoding ). Defaults to False.
            collections (dict): {
                              <collection name>: {
                                 "mono_indexes": { <field>:<uniqueness>, ...} ...}
@@ -26,10 +97,16 @@ class MongoDbManager:
 
         # connect to mongo database
         try:
-            self.mongo_client = MongoClient(url)
+            self.mongo_client = (
+                self.get_shared_client(url)
+                if MongoDbManager.share_clients
+                else MongoClient(url, event_listeners=[METRICS_COMMAND_LISTENER])
+            )
         except ConnectionFailure as e:
             raise ValueError(f"Failed not connect to {url}") from e
-        self.database = self.mongo_client[db_name]
+        self.database = self.mongo_client.get_database(
+            db_name, codec_options=RAW_CODEC_OPTIONS if raw_documents else CODEC_OPTIONS
+        )
 
         # Retrieve database collection names
         self.database_collections = self.database.list_collection_names()
@@ -37,15 +114,42 @@ class MongoDbManager:
         # define collection configurations
         self.collections_config = collections
 
-        # Setup collections and their indexes
-        self.configure_collections()
+        # Setup collections and their indexes ( once per process and database )
+        _configuration_key = (url, db_name, tuple(sorted(collections.keys())))
+        if _configuration_key not in MongoDbManager._configured_databases:
+            self.configure_collections()
+            MongoDbManager._configured_databases.add(_configuration_key)
 
     def __enter__(self):
         return self
 
     def __exit__(self, type, value, traceback):
         # xception handling here
-        self.mongo_client.close()
+        if not self.is_shared_client(self.mongo_client):
+            self.mongo_client.close()
+
+    @classmethod
+    def get_shared_client(cls, url: str) -> MongoClient:
+        """process wide client of the url ( clients are not fork safe: one per process)"""
+        key = (url, os.getpid())
+        with cls._clients_lock:
+            if key not in cls._clients:
+                cls._clients[key] = MongoClient(
+                    url, event_listeners=[METRICS_COMMAND_LISTENER]
+                )
+            return cls._clients[key]
+
+    @classmethod
+    def is_shared_client(cls, client: MongoClient) -> bool:
+        with cls._clients_lock:
+            return any(x is client for x in cls._clients.values())
+
+    @classmethod
+    def close_shared_clients(cls):
+        with cls._clients_lock:
+            for client in cls._clients.values():
+                client.close()
+            cls._clients.clear()
 
     def configure_collections(self):
         """define collection names and create indexes"""
@@ -83,6 +187,14 @@ class MongoDbManager:
         # add/ update to database (add or replace)
         self.database[coll_name].delete_one(filter=dbFilter)
 
+    def del_items(self, coll_name: str, dbFilter: dict):
+        # check collection configuration exists
+        if coll_name not in self.collections_config.keys():
+            raise ValueError(
+                f" No configuration found for {coll_name} database collection."
+            )
+        self.database[coll_name].delete_many(filter=dbFilter)
+
     def add_item(self, coll_name: str, dbFilter: dict, data: dict, upsert=True):
         """Add or Update item
 
@@ -338,12 +450,79 @@ class MongoDbManager:
                 return self.database[coll_name].find(kwargs["find"])
 
         elif "aggregate" in kwargs:
+            aggregate_kwargs = {}
             if "allowDiskUse" in kwargs:
-                return self.database[coll_name].aggregate(
-                    kwargs["aggregate"], allowDiskUse=kwargs["allowDiskUse"]
-                )
-            else:
-                return self.database[coll_name].aggregate(kwargs["aggregate"])
+                aggregate_kwargs["allowDiskUse"] = kwargs["allowDiskUse"]
+            if "batch_size" in kwargs:
+                aggregate_kwargs["batchSize"] = kwargs["batch_size"]
+            return self.database[coll_name].aggregate(
+                kwargs["aggregate"], **aggregate_kwargs
+            )
+
+    def explain(self, coll_name: str, verbosity: str = "executionStats", **kwargs):
+        """explain a find or aggregate query
+
+        Args:
+            coll_name (str): collection name
+            verbosity (str, optional): queryPlanner, executionStats or allPlansExecution. Defaults to "executionStats".
+            kwargs: find, sort, projection, limit   or   aggregate
+
+        Returns:
+            dict: explain command result
+        """
+        if "aggregate" in kwargs:
+            command = {
+                "aggregate": coll_name,
+                "pipeline": kwargs["aggregate"],
+                "cursor": {},
+            }
+        else:
+            command = {"find": coll_name, "filter": kwargs.get("find", {})}
+            if "sort" in kwargs:
+                command["sort"] = dict(kwargs["sort"])
+            if "projection" in kwargs:
+                command["projection"] = kwargs["projection"]
+            if "limit" in kwargs:
+                command["limit"] = kwargs["limit"]
+
+        return self.database.command("explain", command, verbosity=verbosity)
+
+    def watch(
+        self,
+        coll_names: list[str],
+        operation_types: list[str] | None = None,
+        resume_after: dict | None = None,
+        max_await_time_ms: int | None = None,
+        full_document: str | None = None,
+    ):
+        """open a change stream over the database collections specified
+            ( only available on replica sets and sharded clusters )
+
+        Args:
+            coll_names (list[str]): collection names to watch
+            operation_types (list[str] | None, optional): Defaults to ["insert"].
+            resume_after (dict | None, optional): resume token. Defaults to None.
+            max_await_time_ms (int | None, optional): maximum wait for new changes. Defaults to None.
+            full_document (str | None, optional): "updateLookup" to receive the current item of updates. Defaults to None.
+
+        Returns:
+            change stream
+        """
+        if operation_types is None:
+            operation_types = ["insert"]
+        return self.database.watch(
+            pipeline=[
+                {
+                    "$match": {
+                        "operationType": {"$in": operation_types},
+                        "ns.coll": {"$in": coll_names},
+                    }
+                }
+            ],
+            resume_after=resume_after,
+            max_await_time_ms=max_await_time_ms,
+            full_document=full_document,
+        )
 
     def get_distinct(self, coll_name: str, field: str, condition: dict = None):
         """get distinct items of a database field
@@ -1,9 +1,10 @@
+import contextlib
 import datetime
 import logging
 import sys
 
 from decimal import Decimal, getcontext
-from bins.configuration import CONFIGURATION
+from bins.configuration import CONFIGURATION, get_price_cadence_blocks
 from bins.database.common.db_collections_common import database_local, database_global
 from bins.converters.onchain import convert_hypervisor_fromDict
 
@@ -218,6 +219,16 @@ class direct_db_hypervisor_info:
         Returns:
             list[int]:
         """
+        # use materialized daily rollups when available
+        if (
+            status_list := self.local_db_manager.get_status_byPeriod(
+                hypervisor_address=self.address,
+                period="daily",
+                timestamp_ini=ini_timestamp,
+                timestamp_end=end_timestamp,
+            )
+        ) is not None:
+            return status_list
 
         # get a list of status blocks separated at least by 1 hour
         query = [
@@ -774,33 +785,17 @@ class direct_db_hypervisor_info:
             logging.getLogger(__name__).error(" total token 1 ini differs from end ")
 
         # usd prices
-        ini_price_usd_token0 = Decimal(
-            str(
-                self._prices[ini_status["block"]][
-                    ini_status["pool"]["token0"]["address"]
-                ]
-            )
+        ini_price_usd_token0 = self.get_price(
+            block=ini_status["block"], address=ini_status["pool"]["token0"]["address"]
         )
-        ini_price_usd_token1 = Decimal(
-            str(
-                self._prices[ini_status["block"]][
-                    ini_status["pool"]["token1"]["address"]
-                ]
-            )
+        ini_price_usd_token1 = self.get_price(
+            block=ini_status["block"], address=ini_status["pool"]["token1"]["address"]
         )
-        end_price_usd_token0 = Decimal(
-            str(
-                self._prices[end_status["block"]][
-                    end_status["pool"]["token0"]["address"]
-                ]
-            )
+        end_price_usd_token0 = self.get_price(
+            block=end_status["block"], address=end_status["pool"]["token0"]["address"]
         )
-        end_price_usd_token1 = Decimal(
-            str(
-                self._prices[end_status["block"]][
-                    end_status["pool"]["token1"]["address"]
-                ]
-            )
+        end_price_usd_token1 = self.get_price(
+            block=end_status["block"], address=end_status["pool"]["token1"]["address"]
         )
 
         # calcs
@@ -885,10 +880,27 @@ class direct_db_hypervisor_info:
         }
 
     def get_price(self, block: int, address: str) -> Decimal:
+        with contextlib.suppress(Exception):
+            return Decimal(str(self._prices[block][address]))
 
-        ##
+        # prices are sampled once per cadence: interpolate the ones in between
+        global_db_manager = database_global(
+            mongo_url=CONFIGURATION["sources"]["database"]["mongo_server_url"]
+        )
         try:
-            return Decimal(self._prices[block][address])
+            price = Decimal(
+                str(
+                    global_db_manager.get_price_usd(
+                        network=self.network,
+                        block=block,
+                        address=address,
+                        interpolate_distance=get_price_cadence_blocks(self.network),
+                    )[0]["price"]
+                )
+            )
+            # keep it for the next status using this block
+            self._prices.setdefault(block, {})[address] = price
+            return price
         except Exception:
             logging.getLogger(__name__).error(
                 f" Can't find {self.network}'s {self.address} usd price for {address} at block {block}. Return Zero"
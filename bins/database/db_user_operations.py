@@ -8,7 +8,7 @@ import concurrent.futures
 from decimal import Decimal, getcontext
 from datetime import datetime, timedelta
 
-from bins.configuration import CONFIGURATION
+from bins.configuration import CONFIGURATION, get_price_cadence_blocks
 from bins.general.general_utilities import log_execution_time
 from bins.database.common.db_collections_common import database_local, database_global
 
@@ -801,8 +801,8 @@ class user_operations_hypervisor_builder:
         # build find and sort
         match = {
             "address": self.address.lower(),
-            "qtty_token0": {"$ne": "0"},
-            "qtty_token1": {"$ne": "0"},
+            "qtty_token0": {"$nin": ["0", 0]},
+            "qtty_token1": {"$nin": ["0", 0]},
             "src": {"$ne": "0x0000000000000000000000000000000000000000"},
             "dst": {"$ne": "0x0000000000000000000000000000000000000000"},
             "topic": {"$in": topics},
@@ -1063,7 +1063,10 @@ class user_operations_hypervisor_builder:
         try:
             return Decimal(
                 global_db_manager.get_price_usd(
-                    network=self.network, block=block, address=address
+                    network=self.network,
+                    block=block,
+                    address=address,
+                    interpolate_distance=get_price_cadence_blocks(self.network),
                 )[0]["price"]
             )
         except Exception:
@@ -9,7 +9,7 @@ from bson.decimal128 import Decimal128
 from decimal import Decimal, getcontext
 from datetime import datetime, timedelta
 
-from bins.configuration import CONFIGURATION
+from bins.configuration import CONFIGURATION, get_price_cadence_blocks
 from bins.general.general_utilities import log_execution_time
 from bins.database.common.db_collections_common import database_local, database_global
 
@@ -1065,8 +1065,8 @@ class user_status_hypervisor_builder:
                     condition={
                         "address": self.address,
                         "blockNumber": {"$nin": user_status_blocks_processed},
-                        "qtty_token0": {"$ne": "0"},
-                        "qtty_token1": {"$ne": "0"},
+                        "qtty_token0": {"$nin": ["0", 0]},
+                        "qtty_token1": {"$nin": ["0", 0]},
                         "src": {"$ne": "0x0000000000000000000000000000000000000000"},
                         "dst": {"$ne": "0x0000000000000000000000000000000000000000"},
                         "topic": {
@@ -2166,8 +2166,8 @@ class user_status_hypervisor_builder:
         # build find and sort
         find = {
             "address": self.address.lower(),
-            "qtty_token0": {"$ne": "0"},
-            "qtty_token1": {"$ne": "0"},
+            "qtty_token0": {"$nin": ["0", 0]},
+            "qtty_token1": {"$nin": ["0", 0]},
             "src": {"$ne": "0x0000000000000000000000000000000000000000"},
             "dst": {"$ne": "0x0000000000000000000000000000000000000000"},
         }
@@ -2197,8 +2197,8 @@ class user_status_hypervisor_builder:
         # build find and sort
         find = {
             "address": self.address.lower(),
-            "qtty_token0": {"$ne": "0"},
-            "qtty_token1": {"$ne": "0"},
+            "qtty_token0": {"$nin": ["0", 0]},
+            "qtty_token1": {"$nin": ["0", 0]},
             "src": {"$ne": "0x0000000000000000000000000000000000000000"},
             "dst": {"$ne": "0x0000000000000000000000000000000000000000"},
             "topic": {
@@ -2245,6 +2245,13 @@ class user_status_hypervisor_builder:
         Returns:
             list[int]:
         """
+        # use materialized daily rollups when available
+        if (
+            status_list := self.local_db_manager.get_status_byPeriod(
+                hypervisor_address=self.address, period="daily"
+            )
+        ) is not None:
+            return status_list
 
         # get a list of status blocks separated at least by 1 hour
         query = [
@@ -2320,14 +2327,17 @@ class user_status_hypervisor_builder:
         try:
             return Decimal(
                 global_db_manager.get_price_usd(
-                    network=self.network, block=block, address=address
+                    network=self.network,
+                    block=block,
+                    address=address,
+                    interpolate_distance=get_price_cadence_blocks(self.network),
                 )[0]["price"]
             )
         except Exception:
             logging.getLogger(__name__).error(
                 f" Can't find {self.network}'s {self.address} usd price for {address} at block {block}. Return Zero"
             )
-            Decimal("0")
+            return Decimal("0")
 
     # Transformers
     def convert_user_status_toDb(self, status: user_status) -> dict:
@@ -3439,7 +3449,10 @@ class user_status_hypervisor_builderV2:
         try:
             return Decimal(
                 global_db_manager.get_price_usd(
-                    network=self.network, block=block, address=address
+                    network=self.network,
+                    block=block,
+                    address=address,
+                    interpolate_distance=get_price_cadence_blocks(self.network),
                 )[0]["price"]
             )
         except Exception:
@@ -3559,7 +3572,7 @@ class user_status_hypervisor_builderV2:
     ) -> list[dict] | None:
         match_query = {
             "topic": {"$in": ["zeroBurn", "rebalance"]},
-            "$or": [{"qtty_token0": {"$ne": "0"}}, {"qtty_token1": {"$ne": "0"}}],
+            "$or": [{"qtty_token0": {"$nin": ["0", 0]}}, {"qtty_token1": {"$nin": ["0", 0]}}],
             "address": hypervisor_address,
         }
         if timestamp_ini and timestamp_end:
@@ -1,3 +1,5 @@
+import numpy as np
+
 from web3 import Web3
 from decimal import Decimal
 
@@ -317,6 +319,40 @@ class LiquidityAmounts:
 
         return amount0, amount1
 
+    @staticmethod
+    def getAmountsForLiquidity_batch(
+        sqrtRatioX96, sqrtRatioAX96, sqrtRatioBX96, liquidity
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Vectorized getAmountsForLiquidity.
+            Arguments are broadcasted against each other ( scalars, lists or arrays ) and
+            computed as python integers ( object dtype ), flooring as the LiquidityAmounts contract library does
+
+        Args:
+           sqrtRatioX96: current pool sqrt prices
+           sqrtRatioAX96: first tick boundary sqrt prices
+           sqrtRatioBX96: second tick boundary sqrt prices
+           liquidity: liquidities being valued
+
+        Returns:
+           tuple[np.ndarray, np.ndarray]: amount0, amount1  ( object dtype )
+        """
+        sqrtRatioX96, sqrtRatioAX96, sqrtRatioBX96, liquidity = np.broadcast_arrays(
+            *(
+                np.asarray(x, dtype=object)
+                for x in (sqrtRatioX96, sqrtRatioAX96, sqrtRatioBX96, liquidity)
+            )
+        )
+        RA = np.minimum(sqrtRatioAX96, sqrtRatioBX96)
+        RB = np.maximum(sqrtRatioAX96, sqrtRatioBX96)
+
+        # price clipped to the range: below range is all token0, above is all token1
+        price = np.minimum(np.maximum(sqrtRatioX96, RA), RB)
+
+        amount0 = ((liquidity << X96_RESOLLUTION) * (RB - price)) // RB // price
+        amount1 = (liquidity * (price - RA)) // X96
+
+        return amount0, amount1
+
 
 class TickMath:
     """TickMath is a library for computing the sqrt ratio at a given tick, and the tick corresponding to a given sqrt ratio
@@ -330,6 +366,31 @@ class TickMath:
         1461446703485210103287273052203988822378723970342  # sqrt ratio of the max tick
     )
 
+    # (tick bit, Q128.128 multiplier) used to compute sqrt(1.0001^tick) bit by bit
+    _SQRT_RATIO_MULTIPLIERS: tuple = (
+        (0x2, 0xFFF97272373D413259A46990580E213A),
+        (0x4, 0xFFF2E50F5F656932EF12357CF3C7FDCC),
+        (0x8, 0xFFE5CACA7E10E4E61C3624EAA0941CD0),
+        (0x10, 0xFFCB9843D60F6159C9DB58835C926644),
+        (0x20, 0xFF973B41FA98C081472E6896DFB254C0),
+        (0x40, 0xFF2EA16466C96A3843EC78B326B52861),
+        (0x80, 0xFE5DEE046A99A2A811C461F1969C3053),
+        (0x100, 0xFCBE86C7900A88AEDCFFC83B479AA3A4),
+        (0x200, 0xF987A7253AC413176F2B074CF7815E54),
+        (0x400, 0xF3392B0822B70005940C7A398E4B70F3),
+        (0x800, 0xE7159475A2C29B7443B29C7FA6E889D9),
+        (0x1000, 0xD097F3BDFD2022B8845AD8F792AA5825),
+        (0x2000, 0xA9F746462D870FDF8A65DC1F90E061E5),
+        (0x4000, 0x70D869A156D2A1B890BB3DF62BAF32F7),
+        (0x8000, 0x31BE135F97D08FD981231505542FCFA6),
+        (0x10000, 0x9AA508B5B7A84E1C677DE54F3E99BC9),
+        (0x20000, 0x5D6AF8DEDB81196699C329225EE604),
+        (0x40000, 0x2216E584F5FA1EA926041BEDFE98),
+        (0x80000, 0x48A170391F7DC42444E8FA2),
+    )
+    # { tickSpacing: sqrtRatioX96 lookup table }
+    _sqrt_ratio_tables: dict = {}
+
     @staticmethod
     def getSqrtRatioAtTick(tick: int) -> int:
         """Calculates sqrt(1.0001^tick) * 2^96
@@ -352,68 +413,83 @@ class TickMath:
             else 0x100000000000000000000000000000000
         )
 
-        if (absTick & 0x2) != 0:
-            ratio = (ratio * 0xFFF97272373D413259A46990580E213A) >> 128
-
-        if (absTick & 0x4) != 0:
-            ratio = (ratio * 0xFFF2E50F5F656932EF12357CF3C7FDCC) >> 128
+        for mask, multiplier in TickMath._SQRT_RATIO_MULTIPLIERS:
+            if (absTick & mask) != 0:
+                ratio = (ratio * multiplier) >> 128
 
-        if (absTick & 0x8) != 0:
-            ratio = (ratio * 0xFFE5CACA7E10E4E61C3624EAA0941CD0) >> 128
-
-        if (absTick & 0x10) != 0:
-            ratio = (ratio * 0xFFCB9843D60F6159C9DB58835C926644) >> 128
-
-        if (absTick & 0x20) != 0:
-            ratio = (ratio * 0xFF973B41FA98C081472E6896DFB254C0) >> 128
-
-        if (absTick & 0x40) != 0:
-            ratio = (ratio * 0xFF2EA16466C96A3843EC78B326B52861) >> 128
+        if tick > 0:
+            ratio = ((2**256) - 1) // ratio
 
-        if (absTick & 0x80) != 0:
-            ratio = (ratio * 0xFE5DEE046A99A2A811C461F1969C3053) >> 128
+        # back to Q96
+        return (ratio // X32) + 1 if ratio % X32 > 0 else ratio // X32
 
-        if (absTick & 0x100) != 0:
-            ratio = (ratio * 0xFCBE86C7900A88AEDCFFC83B479AA3A4) >> 128
+    @staticmethod
+    def getSqrtRatioAtTick_batch(ticks, tickSpacing: int | None = None) -> np.ndarray:
+        """Vectorized getSqrtRatioAtTick ( exact, object dtype )
 
-        if (absTick & 0x200) != 0:
-            ratio = (ratio * 0xF987A7253AC413176F2B074CF7815E54) >> 128
+        Args:
+             ticks: ticks as a list or array
+             tickSpacing (int | None, optional): when set, values are taken from the tick spacing lookup table. Defaults to None.
 
-        if (absTick & 0x400) != 0:
-            ratio = (ratio * 0xF3392B0822B70005940C7A398E4B70F3) >> 128
+        Returns:
+             np.ndarray: sqrtRatioX96 for each tick ( same shape )
+        """
+        ticks = np.asarray(ticks, dtype=np.int64)
 
-        if (absTick & 0x800) != 0:
-            ratio = (ratio * 0xE7159475A2C29B7443B29C7FA6E889D9) >> 128
+        if ticks.size and (
+            ticks.min() < TickMath.MIN_TICK or ticks.max() > TickMath.MAX_TICK
+        ):
+            raise ValueError(" Tick is not within uniswap's min-max parameters")
 
-        if (absTick & 0x1000) != 0:
-            ratio = (ratio * 0xD097F3BDFD2022B8845AD8F792AA5825) >> 128
+        if tickSpacing:
+            if np.any(ticks % tickSpacing):
+                raise ValueError(f" Ticks are not multiple of tick spacing {tickSpacing}")
+            return TickMath.getSqrtRatioAtTick_table(tickSpacing)[
+                (ticks - TickMath._min_usable_tick(tickSpacing)) // tickSpacing
+            ]
 
-        if (absTick & 0x2000) != 0:
-            ratio = (ratio * 0xA9F746462D870FDF8A65DC1F90E061E5) >> 128
+        absTick = np.abs(ticks)
 
-        if (absTick & 0x4000) != 0:
-            ratio = (ratio * 0x70D869A156D2A1B890BB3DF62BAF32F7) >> 128
+        ratio = np.full(ticks.shape, 0x100000000000000000000000000000000, dtype=object)
+        ratio[(absTick & 0x1) != 0] = 0xFFFCB933BD6FAD37AA2D162D1A594001
 
-        if (absTick & 0x8000) != 0:
-            ratio = (ratio * 0x31BE135F97D08FD981231505542FCFA6) >> 128
+        for mask, multiplier in TickMath._SQRT_RATIO_MULTIPLIERS:
+            selected = (absTick & mask) != 0
+            if selected.any():
+                ratio[selected] = (ratio[selected] * multiplier) >> 128
 
-        if (absTick & 0x10000) != 0:
-            ratio = (ratio * 0x9AA508B5B7A84E1C677DE54F3E99BC9) >> 128
+        positive = ticks > 0
+        if positive.any():
+            ratio[positive] = ((2**256) - 1) // ratio[positive]
 
-        if (absTick & 0x20000) != 0:
-            ratio = (ratio * 0x5D6AF8DEDB81196699C329225EE604) >> 128
+        # back to Q96 rounding up
+        return (ratio + (X32 - 1)) // X32
 
-        if (absTick & 0x40000) != 0:
-            ratio = (ratio * 0x2216E584F5FA1EA926041BEDFE98) >> 128
+    @staticmethod
+    def getSqrtRatioAtTick_table(tickSpacing: int) -> np.ndarray:
+        """tick -> sqrtRatioX96 lookup table for all usable ticks of a tick spacing.
+            Built once per tick spacing and kept in memory
+            ( index of a tick is  (tick - min usable tick) // tickSpacing )
 
-        if (absTick & 0x80000) != 0:
-            ratio = (ratio * 0x48A170391F7DC42444E8FA2) >> 128
+        Args:
+            tickSpacing (int):
 
-        if tick > 0:
-            ratio = ((2**256) - 1) // ratio
+        Returns:
+            np.ndarray: sqrtRatioX96 ( object dtype )
+        """
+        if tickSpacing not in TickMath._sqrt_ratio_tables:
+            TickMath._sqrt_ratio_tables[tickSpacing] = TickMath.getSqrtRatioAtTick_batch(
+                np.arange(
+                    TickMath._min_usable_tick(tickSpacing),
+                    -TickMath._min_usable_tick(tickSpacing) + 1,
+                    tickSpacing,
+                )
+            )
+        return TickMath._sqrt_ratio_tables[tickSpacing]
 
-        # back to Q96
-        return (ratio // X32) + 1 if ratio % X32 > 0 else ratio // X32
+    @staticmethod
+    def _min_usable_tick(tickSpacing: int) -> int:
+        return -(TickMath.MAX_TICK // tickSpacing) * tickSpacing
 
     @staticmethod
     def getTickAtSqrtRatio(sqrtRatioX96: int) -> int:
@@ -475,6 +551,74 @@ class TickMath:
         return msb
 
 
+def mulDiv(a: int, b: int, denominator: int) -> int:
+    """floor(a*b/denominator) with full precision ( as FullMath.mulDiv )"""
+    return (a * b) // denominator
+
+
+def mulDivRoundingUp(a: int, b: int, denominator: int) -> int:
+    """ceil(a*b/denominator) with full precision ( as FullMath.mulDivRoundingUp )"""
+    result, remainder = divmod(a * b, denominator)
+    return result + 1 if remainder > 0 else result
+
+
+class SqrtPriceMath:
+    """Integer token deltas between two sqrt prices, rounding as the uniswap v3 SqrtPriceMath library does
+    ( LiquidityAmounts floors through float divisions and can't be used to replay swaps )
+    """
+
+    @staticmethod
+    def getAmount0Delta(
+        sqrtRatioAX96: int, sqrtRatioBX96: int, liquidity: int, roundUp: bool
+    ) -> int:
+        """Amount of token0 needed to move between two prices:  liquidity / sqrt(lower) - liquidity / sqrt(upper)
+
+        Args:
+            sqrtRatioAX96 (int): a sqrt price
+            sqrtRatioBX96 (int): another sqrt price
+            liquidity (int): the amount of usable liquidity
+            roundUp (bool): round the amount up or down
+
+        Returns:
+            int: amount of token0
+        """
+        if sqrtRatioAX96 > sqrtRatioBX96:
+            sqrtRatioAX96, sqrtRatioBX96 = sqrtRatioBX96, sqrtRatioAX96
+
+        numerator1 = liquidity << X96_RESOLLUTION
+        numerator2 = sqrtRatioBX96 - sqrtRatioAX96
+
+        if roundUp:
+            return mulDivRoundingUp(
+                mulDivRoundingUp(numerator1, numerator2, sqrtRatioBX96),
+                1,
+                sqrtRatioAX96,
+            )
+        return mulDiv(numerator1, numerator2, sqrtRatioBX96) // sqrtRatioAX96
+
+    @staticmethod
+    def getAmount1Delta(
+        sqrtRatioAX96: int, sqrtRatioBX96: int, liquidity: int, roundUp: bool
+    ) -> int:
+        """Amount of token1 needed to move between two prices:  liquidity * (sqrt(upper) - sqrt(lower))
+
+        Args:
+            sqrtRatioAX96 (int): a sqrt price
+            sqrtRatioBX96 (int): another sqrt price
+            liquidity (int): the amount of usable liquidity
+            roundUp (bool): round the amount up or down
+
+        Returns:
+            int: amount of token1
+        """
+        if sqrtRatioAX96 > sqrtRatioBX96:
+            sqrtRatioAX96, sqrtRatioBX96 = sqrtRatioBX96, sqrtRatioAX96
+
+        if roundUp:
+            return mulDivRoundingUp(liquidity, sqrtRatioBX96 - sqrtRatioAX96, X96)
+        return mulDiv(liquidity, sqrtRatioBX96 - sqrtRatioAX96, X96)
+
+
 ######### (for comparison purposes)
 ######### def as defined at : https://github.com/GammaStrategies/uniswap-v3-performance
 def get_uncollected_fees_vGammawire(
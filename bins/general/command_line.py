@@ -35,8 +35,8 @@ def parse_commandLine_args():
     # auto database feed service
     par_service = exGroup.add_argument(
         "--service",
-        choices=["local", "global"],
-        help=" execute an infinite loop service",
+        choices=["local", "global", "scheduler"],
+        help=" execute an infinite loop service ( scheduler: all networks and stages as concurrent jobs)",
     )
     par_network_service = exGroup.add_argument(
         "--service_network",
@@ -47,7 +47,16 @@ def parse_commandLine_args():
     # checks
     par_check = exGroup.add_argument(
         "--check",
-        choices=["prices", "database", "repair", "hypervisor_status", "special"],
+        choices=[
+            "prices",
+            "database",
+            "repair",
+            "hypervisor_status",
+            "queries",
+            "migrate",
+            "rollups",
+            "special",
+        ],
         help=" execute checks ",
     )
 
@@ -116,6 +125,11 @@ def parse_commandLine_args():
         action="store_true",
         help=" execute auto error repair inside the network feed loop",
     )
+    par_main.add_argument(
+        "--events",
+        action="store_true",
+        help=" event driven network feed: process new operations and status as soon as they are saved",
+    )
     par_main.add_argument(
         "--networks",
         choices=[
@@ -146,6 +160,11 @@ def parse_commandLine_args():
         action="store_true",
         help=" rewrite information in database",
     )
+    par_main.add_argument(
+        "--metrics_port",
+        type=int,
+        help=" serve prometheus metrics at http://127.0.0.1:<metrics_port>/metrics while running",
+    )
 
     # print helpwhen no command is passed
     return par_main.parse_args(args=None if sys.argv[1:] else ["--help"])
@@ -0,0 +1,367 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests import exceptions as req_exceptions
+
+# brotli is decoded by urllib3/aiohttp only when installed
+try:
+    import brotli  # noqa: F401
+
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+# http status codes worth retrying
+RETRY_STATUS = [429, 500, 502, 503, 504]
+
+# url query parameters never saved to fixtures ( lower case )
+SECRET_PARAMS = [
+    "apikey",
+    "api_key",
+    "key",
+    "token",
+    "access_token",
+    "x_cg_pro_api_key",
+]
+
+
+class circuit_open_error(Exception):
+    """endpoint is failing: requests are not sent till the cooldown passes"""
+
+
+class circuit_breaker:
+    def __init__(self, failure_threshold: int = 5, cooldown_secs: float = 30):
+        """Open the circuit after <failure_threshold> consecutive failed requests to an endpoint ( host and path ),
+            rejecting requests for <cooldown_secs>. One request is let through afterwards to test the endpoint.
+
+        Args:
+            failure_threshold (int, optional): . Defaults to 5.
+            cooldown_secs (float, optional): . Defaults to 30.
+        """
+        self.failure_threshold = failure_threshold
+        self.cooldown_secs = cooldown_secs
+        self._failures = {}
+        self._opened = {}
+        self.lock = threading.Lock()
+
+    def allow(self, key: str) -> bool:
+        with self.lock:
+            if (opened := self._opened.get(key)) is None:
+                return True
+            if time.monotonic() - opened >= self.cooldown_secs:
+                # half open: let one request test the endpoint
+                self._opened[key] = time.monotonic()
+                return True
+            return False
+
+    def success(self, key: str):
+        with self.lock:
+            self._failures.pop(key, None)
+            self._opened.pop(key, None)
+
+    def failure(self, key: str):
+        with self.lock:
+            self._failures[key] = self._failures.get(key, 0) + 1
+            if self._failures[key] >= self.failure_threshold:
+                if key not in self._opened:
+                    logging.getLogger(__name__).warning(
+                        f" {key} failed {self._failures[key]} consecutive times. Pausing its requests for {self.cooldown_secs} seconds."
+                    )
+                self._opened[key] = time.monotonic()
+
+
+def endpoint(url: str) -> str:
+    """host and path of the url ( circuit breaker key: one failing subgraph does not pause the host)"""
+    parsed = urlparse(url)
+    return f"{parsed.netloc}{parsed.path}"
+
+
+def redact_url(url: str) -> str:
+    """url without secret query parameters ( api keys ), usable as fixture key"""
+    parsed = urlparse(url)
+    if not parsed.query:
+        return url
+    return parsed._replace(
+        query=urlencode(
+            [
+                (k, v)
+                for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+                if k.lower() not in SECRET_PARAMS
+            ]
+        )
+    ).geturl()
+
+
+def get_retry_wait(
+    attempt: int, wait_secs: float, retry_after: str | None = None, max_wait: float = 60
+) -> float:
+    """seconds to wait before retrying: Retry-After header when present or jittered exponential back-off
+
+    Args:
+        attempt (int): retry number ( 0 first)
+        wait_secs (float): base wait
+        retry_after (str | None, optional): Retry-After header value ( seconds or http date). Defaults to None.
+        max_wait (float, optional): . Defaults to 60.
+
+    Returns:
+        float:
+    """
+    if retry_after:
+        try:
+            return min(float(retry_after), max_wait)
+        except ValueError:
+            try:
+                return min(
+                    max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0),
+                    max_wait,
+                )
+            except (TypeError, ValueError):
+                pass
+    # full jitter
+    return random.uniform(0, min(wait_secs * 2**attempt, max_wait))
+
+
+class http_client:
+    def __init__(
+        self,
+        pool_maxsize: int = 20,
+        breaker: circuit_breaker | None = None,
+    ):
+        """Pooled http client: one keep-alive session per host, compression, retries and circuit breaking
+
+        Args:
+            pool_maxsize (int, optional): connections kept per host. Defaults to 20.
+            breaker (circuit_breaker | None, optional): . Defaults to a new circuit_breaker.
+        """
+        self.pool_maxsize = pool_maxsize
+        self.breaker = breaker or circuit_breaker()
+        self._sessions = {}
+        self.lock = threading.Lock()
+
+        # responses fixture when recording or replaying ( see bins.w3.rpc_replay_helper )
+        self.fixture = None
+        self.replay = False
+
+    def session(self, host: str) -> requests.Session:
+        """keep-alive session of the host"""
+        with self.lock:
+            if host not in self._sessions:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.pool_maxsize
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers.update({"Accept-Encoding": ACCEPT_ENCODING})
+                self._sessions[host] = session
+            return self._sessions[host]
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        json: dict | None = None,
+        max_retry: int = 2,
+        wait_secs: float = 5,
+        timeout_secs: float = 10,
+    ) -> dict | list | None:
+        """request url and return its json response
+
+        Args:
+            method (str): "GET" or "POST"
+            url (str):
+            json (dict | None, optional): body. Defaults to None.
+            max_retry (int, optional): . Defaults to 2.
+            wait_secs (float, optional): back-off base seconds. Defaults to 5.
+            timeout_secs (float, optional): . Defaults to 10.
+
+        Returns:
+            dict | list | None: None when all tries failed, the response is not json or the endpoint circuit is open
+        """
+        if self.fixture is not None and self.replay:
+            self.fixture.wait()
+            return self.fixture.get(method, [redact_url(url), json])
+
+        host = urlparse(url).netloc
+        breaker_key = endpoint(url)
+        for attempt in range(max_retry + 1):
+            if not self.breaker.allow(breaker_key):
+                logging.getLogger(__name__).debug(
+                    f" Circuit open for {breaker_key}. Request to {url} not sent."
+                )
+                return None
+
+            retry_after = None
+            try:
+                response = self.session(host).request(
+                    method=method, url=url, json=json, timeout=timeout_secs
+                )
+                if response.status_code not in RETRY_STATUS:
+                    self.breaker.success(breaker_key)
+                    result = response.json()
+                    if self.fixture is not None:
+                        self.fixture.set(method, [redact_url(url), json], result)
+                    return result
+
+                retry_after = response.headers.get("Retry-After")
+                logging.getLogger(__name__).warning(
+                    f"{url} returned status {response.status_code}..."
+                )
+            except (req_exceptions.ConnectionError, ConnectionError):
+                # blocking us?  wait and try as many times as defined
+                logging.getLogger(__name__).warning(
+                    f"Connection to {url} has been closed..."
+                )
+            except req_exceptions.Timeout:
+                logging.getLogger(__name__).warning(
+                    f"Connection to {url} has timed out..."
+                )
+            except ValueError:
+                # not json
+                self.breaker.success(breaker_key)
+                logging.getLogger(__name__).warning(
+                    f"Non json response received from {url}"
+                )
+                return None
+            except Exception as e:
+                logging.getLogger(__name__).exception(
+                    f"Unexpected error while requesting {url} .error: {e}"
+                )
+
+            self.breaker.failure(breaker_key)
+            if attempt < max_retry:
+                wait = get_retry_wait(
+                    attempt=attempt, wait_secs=wait_secs, retry_after=retry_after
+                )
+                logging.getLogger(__name__).debug(
+                    f"    Waiting {wait:.1f} seconds to retry {url} query for the {attempt} time."
+                )
+                time.sleep(wait)
+
+        return None
+
+    def get(self, url: str, **kwargs) -> dict | list | None:
+        return self.request(method="GET", url=url, **kwargs)
+
+    def post(self, url: str, json: dict, **kwargs) -> dict | list | None:
+        return self.request(method="POST", url=url, json=json, **kwargs)
+
+
+class async_http_client:
+    def __init__(
+        self,
+        pool_maxsize: int = 20,
+        breaker: circuit_breaker | None = None,
+    ):
+        """asyncio version of http_client ( same interface, awaitable). Use it as an async context manager.
+
+        Args:
+            pool_maxsize (int, optional): connections kept per host. Defaults to 20.
+            breaker (circuit_breaker | None, optional): . Defaults to a new circuit_breaker.
+        """
+        self.pool_maxsize = pool_maxsize
+        self.breaker = breaker or circuit_breaker()
+        self._session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def session(self):
+        import aiohttp
+
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=self.pool_maxsize),
+                headers={"Accept-Encoding": ACCEPT_ENCODING},
+            )
+        return self._session
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        json: dict | None = None,
+        max_retry: int = 2,
+        wait_secs: float = 5,
+        timeout_secs: float = 10,
+    ) -> dict | list | None:
+        import aiohttp
+
+        breaker_key = endpoint(url)
+        for attempt in range(max_retry + 1):
+            if not self.breaker.allow(breaker_key):
+                logging.getLogger(__name__).debug(
+                    f" Circuit open for {breaker_key}. Request to {url} not sent."
+                )
+                return None
+
+            retry_after = None
+            try:
+                async with self.session().request(
+                    method=method,
+                    url=url,
+                    json=json,
+                    timeout=aiohttp.ClientTimeout(total=timeout_secs),
+                ) as response:
+                    if response.status not in RETRY_STATUS:
+                        self.breaker.success(breaker_key)
+                        return await response.json(content_type=None)
+
+                    retry_after = response.headers.get("Retry-After")
+                    logging.getLogger(__name__).warning(
+                        f"{url} returned status {response.status}..."
+                    )
+            except (aiohttp.ClientConnectionError, ConnectionError):
+                logging.getLogger(__name__).warning(
+                    f"Connection to {url} has been closed..."
+                )
+            except asyncio.TimeoutError:
+                logging.getLogger(__name__).warning(
+                    f"Connection to {url} has timed out..."
+                )
+            except ValueError:
+                # not json
+                self.breaker.success(breaker_key)
+                logging.getLogger(__name__).warning(
+                    f"Non json response received from {url}"
+                )
+                return None
+            except Exception as e:
+                logging.getLogger(__name__).exception(
+                    f"Unexpected error while requesting {url} .error: {e}"
+                )
+
+            self.breaker.failure(breaker_key)
+            if attempt < max_retry:
+                await asyncio.sleep(
+                    get_retry_wait(
+                        attempt=attempt, wait_secs=wait_secs, retry_after=retry_after
+                    )
+                )
+
+        return None
+
+    async def get(self, url: str, **kwargs) -> dict | list | None:
+        return await self.request(method="GET", url=url, **kwargs)
+
+    async def post(self, url: str, json: dict, **kwargs) -> dict | list | None:
+        return await self.request(method="POST", url=url, json=json, **kwargs)
+
+
+# process wide client
+HTTP_CLIENT = http_client()
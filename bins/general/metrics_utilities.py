@@ -0,0 +1,338 @@
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# histogram buckets ( seconds )
+DEFAULT_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300]
+# histogram buckets ( calls )
+COUNT_BUCKETS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+
+class metrics_registry:
+    def __init__(self, prefix: str = "gamma_"):
+        """Thread safe in memory counters, gauges and histograms with labels
+
+        Args:
+            prefix (str, optional): metric names prefix. Defaults to "gamma_".
+        """
+        self.prefix = prefix
+        self._counters = {}  # {name: {labels: value}}
+        self._gauges = {}  # {name: {labels: value}}
+        self._histograms = {}  # {name: {labels: {"buckets": [], "sum":, "count":}}}
+        self._help = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _labels(labels: dict) -> tuple:
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def describe(self, name: str, help: str):
+        self._help[name] = help
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """add value to counter"""
+        key = self._labels(labels)
+        with self.lock:
+            counter = self._counters.setdefault(name, {})
+            counter[key] = counter.get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels):
+        """set gauge value"""
+        with self.lock:
+            self._gauges.setdefault(name, {})[self._labels(labels)] = value
+
+    def observe(
+        self, name: str, value: float, buckets: list[float] | None = None, **labels
+    ):
+        """add an observation to histogram ( buckets are fixed by the first observation)"""
+        key = self._labels(labels)
+        with self.lock:
+            histogram = self._histograms.setdefault(name, {})
+            if key not in histogram:
+                histogram[key] = {
+                    "limits": buckets or DEFAULT_BUCKETS,
+                    "buckets": [0] * len(buckets or DEFAULT_BUCKETS),
+                    "sum": 0,
+                    "count": 0,
+                }
+            item = histogram[key]
+            for i, limit in enumerate(item["limits"]):
+                if value <= limit:
+                    item["buckets"][i] += 1
+            item["sum"] += value
+            item["count"] += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """observe the seconds spent in the block at <name>_seconds histogram and
+        count exceptions at <name>_errors_total"""
+        _start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc(f"{name}_errors_total", **labels)
+            raise
+        finally:
+            self.observe(f"{name}_seconds", time.perf_counter() - _start, **labels)
+
+    def timed(self, name: str, **labels):
+        """decorator version of timer"""
+
+        def decorator(f):
+            @wraps(f)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return f(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def reset(self):
+        with self.lock:
+            self._counters = {}
+            self._gauges = {}
+            self._histograms = {}
+
+    # EXPORT
+    def as_dict(self) -> dict:
+        """metrics as a json serializable dict
+
+        Returns:
+            dict: {"counters": {name: [{labels, value}]}, "gauges": ..., "histograms": {name: [{labels, count, sum, avg, buckets}]}}
+        """
+        with self.lock:
+            return {
+                "counters": {
+                    name: [{"labels": dict(k), "value": v} for k, v in values.items()]
+                    for name, values in self._counters.items()
+                },
+                "gauges": {
+                    name: [{"labels": dict(k), "value": v} for k, v in values.items()]
+                    for name, values in self._gauges.items()
+                },
+                "histograms": {
+                    name: [
+                        {
+                            "labels": dict(k),
+                            "count": v["count"],
+                            "sum": v["sum"],
+                            "avg": v["sum"] / v["count"] if v["count"] else 0,
+                            "buckets": dict(zip(v["limits"], v["buckets"])),
+                        }
+                        for k, v in values.items()
+                    ]
+                    for name, values in self._histograms.items()
+                },
+            }
+
+    def as_prometheus(self) -> str:
+        """metrics in prometheus text exposition format"""
+
+        def _labels_str(labels: tuple, extra: tuple = ()) -> str:
+            items = list(labels) + list(extra)
+            if not items:
+                return ""
+            return "{{{}}}".format(
+                ",".join(
+                    '{}="{}"'.format(
+                        k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+                    )
+                    for k, v in items
+                )
+            )
+
+        lines = []
+        with self.lock:
+            for _type, metrics in [("counter", self._counters), ("gauge", self._gauges)]:
+                for name, values in sorted(metrics.items()):
+                    if name in self._help:
+                        lines.append(f"# HELP {self.prefix}{name} {self._help[name]}")
+                    lines.append(f"# TYPE {self.prefix}{name} {_type}")
+                    lines.extend(
+                        f"{self.prefix}{name}{_labels_str(k)} {v}"
+                        for k, v in values.items()
+                    )
+            for name, values in sorted(self._histograms.items()):
+                if name in self._help:
+                    lines.append(f"# HELP {self.prefix}{name} {self._help[name]}")
+                lines.append(f"# TYPE {self.prefix}{name} histogram")
+                for k, v in values.items():
+                    lines.extend(
+                        f"{self.prefix}{name}_bucket{_labels_str(k, (('le', str(limit)),))} {count}"
+                        for limit, count in zip(v["limits"], v["buckets"])
+                    )
+                    lines.append(
+                        f"{self.prefix}{name}_bucket{_labels_str(k, (('le', '+Inf'),))} {v['count']}"
+                    )
+                    lines.append(f"{self.prefix}{name}_sum{_labels_str(k)} {v['sum']}")
+                    lines.append(
+                        f"{self.prefix}{name}_count{_labels_str(k)} {v['count']}"
+                    )
+        return "\n".join(lines) + "\n"
+
+    def dump_json(self, filename: str):
+        with open(filename, "w", encoding="utf8") as f:
+            json.dump(self.as_dict(), f, indent=2, default=str)
+
+    def start_http_server(self, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """serve metrics at http://<host>:<port>/metrics in a background thread
+
+        Args:
+            port (int):
+            host (str, optional): . Defaults to "127.0.0.1".
+
+        Returns:
+            ThreadingHTTPServer:
+        """
+        registry = self
+
+        class _handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ["/metrics", "/"]:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = registry.as_prometheus().encode("utf8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), _handler)
+        threading.Thread(
+            target=server.serve_forever, name="metrics_http", daemon=True
+        ).start()
+        logging.getLogger(__name__).info(
+            f" Serving metrics at http://{host}:{port}/metrics"
+        )
+        return server
+
+
+# process wide registry
+METRICS = metrics_registry()
+METRICS.describe("stage_seconds", "feeder stage duration")
+METRICS.describe("stage_errors_total", "feeder stages ended with an exception")
+METRICS.describe("items_total", "items processed by feeder stage and result")
+METRICS.describe("rpc_calls_total", "web3 calls by method and endpoint")
+METRICS.describe("rpc_call_seconds", "web3 call duration by method and endpoint")
+METRICS.describe("cache_requests_total", "cache lookups by cache and result ( hit or miss)")
+METRICS.describe("mongo_operation_seconds", "mongo operation duration")
+METRICS.describe("mongo_operation_errors_total", "mongo operations ended with an exception")
+METRICS.describe("rpc_calls_per_item", "rpc calls spent building one work item")
+METRICS.describe("rpc_seconds_per_item", "rpc seconds spent building one work item")
+METRICS.describe("rpc_budget_exceeded_total", "work items exceeding their rpc call budget")
+
+
+# RPC CALL ACCOUNTING
+# maximum rpc calls per work item by stage ( stages not present have no budget)
+RPC_BUDGETS = {}
+# "warn" or "raise" when a budget is exceeded
+RPC_BUDGET_MODE = "warn"
+
+# accountings open in the current thread ( innermost last )
+_ACCOUNTINGS = contextvars.ContextVar("rpc_accountings", default=())
+
+
+class rpc_budget_exceeded(Exception):
+    """work item spent more rpc calls than its budget"""
+
+
+class rpc_accounting:
+    def __init__(
+        self,
+        stage: str,
+        budget: int | None = None,
+        on_exceed: str | None = None,
+        network: str = "",
+        **item,
+    ):
+        """Attribute the rpc calls made inside the block to one work item, reporting
+            calls and latency per item and enforcing a call budget. Nested accountings all count the calls.
+
+            with rpc_accounting(stage="status", network=network, address=address, block=block) as acc:
+                build_db_hypervisor(...)
+            acc.calls
+
+        Args:
+            stage (str): work stage, like "status" or "rewards"
+            budget (int | None, optional): maximum calls. Defaults to RPC_BUDGETS[stage].
+            on_exceed (str | None, optional): "warn" or "raise" ( rpc_budget_exceeded ). Defaults to RPC_BUDGET_MODE.
+            network (str, optional): . Defaults to "".
+            item: work item identification, like address and block ( used in messages only)
+        """
+        self.stage = stage
+        self.budget = budget if budget is not None else RPC_BUDGETS.get(stage)
+        self.on_exceed = on_exceed or RPC_BUDGET_MODE
+        self.network = network
+        self.item = item
+
+        self.calls = 0
+        self.seconds = 0
+        self.methods = {}  # {method: calls}
+        self._token = None
+
+    def __enter__(self):
+        self._token = _ACCOUNTINGS.set(_ACCOUNTINGS.get() + (self,))
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        _ACCOUNTINGS.reset(self._token)
+
+        labels = {"stage": self.stage, "network": self.network}
+        METRICS.observe("rpc_calls_per_item", self.calls, buckets=COUNT_BUCKETS, **labels)
+        METRICS.observe("rpc_seconds_per_item", self.seconds, **labels)
+
+        if self.budget is None or self.calls <= self.budget:
+            return False
+
+        METRICS.inc("rpc_budget_exceeded_total", **labels)
+        message = f" {self.network}'s {self.stage} {self.item} used {self.calls} rpc calls ( budget {self.budget}): {self.methods}"
+        if self.on_exceed == "raise" and exc_type is None:
+            raise rpc_budget_exceeded(message)
+        logging.getLogger(__name__).warning(message)
+        return False
+
+    def record(self, method: str, seconds: float):
+        self.calls += 1
+        self.seconds += seconds
+        self.methods[method] = self.methods.get(method, 0) + 1
+
+    def as_dict(self) -> dict:
+        return {
+            "stage": self.stage,
+            "network": self.network,
+            "item": self.item,
+            "calls": self.calls,
+            "seconds": self.seconds,
+            "methods": self.methods,
+            "budget": self.budget,
+        }
+
+
+def record_rpc_call(method: str, seconds: float):
+    """add one rpc call to the accountings open in the current thread"""
+    for accounting in _ACCOUNTINGS.get():
+        accounting.record(method=method, seconds=seconds)
+
+
+def configure_rpc_budgets(budgets: dict | None = None, mode: str | None = None):
+    """set rpc call budgets by stage
+
+    Args:
+        budgets (dict | None, optional): {<stage>: <maximum calls>}. Defaults to None.
+        mode (str | None, optional): "warn" or "raise". Defaults to None.
+    """
+    global RPC_BUDGET_MODE
+    RPC_BUDGETS.update({k: int(v) for k, v in (budgets or {}).items() if v})
+    if mode:
+        RPC_BUDGET_MODE = mode
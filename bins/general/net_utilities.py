@@ -1,14 +1,15 @@
-import sys
-from datetime import datetime, timezone, timedelta
-import requests
+import os
+import json
+import asyncio
+from abc import ABC, abstractmethod
+from urllib.parse import urlparse
 import logging
 import time
 import threading
 
-from requests import exceptions as req_exceptions
+from bins.general.http_utilities import HTTP_CLIENT
 
 
-# TODO: implement httpx + any concurrency manager
 # TODO: implement requests-cache
 
 
@@ -21,38 +22,21 @@ def post_request(
     wait_secs: int = 5,
     timeout_secs: int = 10,
 ) -> dict:
-    try:
-        request = requests.post(url=url, json={"query": query}, timeout=timeout_secs)
-        return request.json()
-    except (req_exceptions.ConnectionError, ConnectionError) as err:
-        # blocking us?  wait and try as many times as defined
-        logging.getLogger(__name__).warning(f"Connection to {url} has been closed...")
-    except req_exceptions.ReadTimeout as err:
-        logging.getLogger(__name__).warning(f"Connection to {url} has timed out...")
-    except Exception:
-        logging.getLogger(__name__).exception(
-            f"Unexpected error while posting request at {url} .error: {sys.exc_info()[0]}"
-        )
-
-    # check if retry is needed
-    if retry < max_retry:
-        logging.getLogger(__name__).warning(
-            f"    Waiting {wait_secs} seconds to retry {url} query for the {retry} time."
-        )
+    """post a graphql query using the pooled http client
 
-        time.sleep(wait_secs)
-        # retry
-        return post_request(
+    Returns:
+        dict: json response or empty dict when all tries failed
+    """
+    return (
+        HTTP_CLIENT.post(
             url=url,
-            query=query,
-            retry=retry + 1,
-            max_retry=max_retry,
+            json={"query": query},
+            max_retry=max(max_retry - retry, 0),
             wait_secs=wait_secs,
             timeout_secs=timeout_secs,
         )
-
-    # return empty dict
-    return {}
+        or {}
+    )
 
 
 def get_request(
@@ -62,44 +46,108 @@ def get_request(
     wait_secs: int = 5,
     timeout_secs: int = 10,
 ) -> dict:
-    result = {}
-    # query url
-    try:
-        result = requests.get(url=url, timeout=timeout_secs).json()
-        return result
-
-    except (req_exceptions.ConnectionError, ConnectionError) as err:
-        # thegraph blocking us?
-        # wait and try one last time
-        logging.getLogger(__name__).warning(f"Connection error to {url}...")
-    except Exception:
-        logging.getLogger(__name__).exception(
-            f"Unexpected error while retrieving json from {url}     .error: {sys.exc_info()[0]}"
-        )
-
-    if retry < max_retry:
-        logging.getLogger(__name__).debug(
-            f"    Waiting {wait_secs} seconds to retry {url} query for the {retry} time."
-        )
+    """get json from url using the pooled http client
 
-        time.sleep(wait_secs)
-        return get_request(
+    Returns:
+        dict: json response or empty dict when all tries failed
+    """
+    return (
+        HTTP_CLIENT.get(
             url=url,
-            retry=retry + 1,
-            max_retry=max_retry,
+            max_retry=max(max_retry - retry, 0),
             wait_secs=wait_secs,
             timeout_secs=timeout_secs,
         )
+        or {}
+    )
 
 
 class rate_limit:
-    def __init__(self, rate_max_sec: float):
+    def __init__(
+        self,
+        rate_max_sec: float,
+        burst: float | None = None,
+        key: str | None = None,
+        backend: "rate_limit_backend | None" = None,
+        shared: bool = False,
+    ):
+        """Token bucket rate limiter: <rate_max_sec> tokens are added every second up to <burst>.
+            Thread safe. When a shared backend is set, all processes using the same backend and key share the budget.
+
+        Args:
+            rate_max_sec (float): requests per second
+            burst (float | None, optional): bucket capacity. Defaults to max(1, rate_max_sec).
+            key (str | None, optional): shared backend bucket name. Defaults to None.
+            backend (rate_limit_backend | None, optional): shared state backend. Defaults to None ( this process only).
+            shared (bool, optional): when no backend is set, use the one set with configure_rate_limits
+                            ( resolved at first use, not when created ). Defaults to False.
+        """
         self.rate_max_sec: float = rate_max_sec
-        self.rate_sec: int = 0
-        self.rate_count_lastupdate: datetime = datetime.now(timezone.utc) - timedelta(
-            hours=8
-        )
-        self.lock = threading.Lock()  # threading.RLock
+        self.burst: float = burst or max(1, rate_max_sec)
+        self.key = key or f"rate_limit_{id(self)}"
+        self.backend = backend
+        self.shared = shared
+
+        self._tokens: float = self.burst
+        self._updated: float = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _get_backend(self) -> "rate_limit_backend | None":
+        if self.backend is None and self.shared:
+            return _get_shared_backend()
+        return self.backend
+
+    def _reserve(self, tokens: float = 1) -> float:
+        """Take tokens when available
+
+        Returns:
+            float: 0 when taken or seconds to wait till they are available
+        """
+        if (backend := self._get_backend()) is not None:
+            return backend.reserve(
+                key=self.key, rate=self.rate_max_sec, burst=self.burst, tokens=tokens
+            )
+
+        with self.lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate_max_sec
+            )
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0
+            return (tokens - self._tokens) / self.rate_max_sec
+
+    def acquire(self, tokens: float = 1, timeout: float | None = None) -> bool:
+        """Wait till tokens are available and take them
+
+        Args:
+            tokens (float, optional): . Defaults to 1.
+            timeout (float | None, optional): max seconds to wait. Defaults to None ( forever).
+
+        Returns:
+            bool: tokens taken
+        """
+        _start = time.monotonic()
+        while (wait := self._reserve(tokens)) > 0:
+            if timeout is not None:
+                if (remaining := timeout - (time.monotonic() - _start)) <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+        return True
+
+    async def acquire_async(self, tokens: float = 1, timeout: float | None = None) -> bool:
+        """asyncio version of acquire"""
+        _start = time.monotonic()
+        while (wait := self._reserve(tokens)) > 0:
+            if timeout is not None:
+                if (remaining := timeout - (time.monotonic() - _start)) <= 0:
+                    return False
+                wait = min(wait, remaining)
+            await asyncio.sleep(wait)
+        return True
 
     def hit(self) -> bool:
         """Report a query to rate limit and
@@ -108,20 +156,7 @@ class rate_limit:
         Returns:
            [bool] -- Im I safe ??
         """
-        with self.lock:
-            # update qtty rate per second so sum only if 1 sec has not yet passed
-            if (
-                datetime.now(timezone.utc) - self.rate_count_lastupdate
-            ).total_seconds() <= 1:
-                # set current rate
-                self.rate_sec += 1
-            else:
-                self.rate_sec = 1
-                # update last date
-                self.rate_count_lastupdate = datetime.now(timezone.utc)
-
-        # return if i'm save to go
-        return self.im_safe()
+        return self._reserve() == 0
 
     def im_safe(self) -> bool:
         """Is it safe to continue
@@ -129,27 +164,238 @@ class rate_limit:
         Returns:
            bool -- [description]
         """
-        return self.rate_sec <= self.rate_max_sec
+        if self._get_backend() is not None:
+            return True
+        with self.lock:
+            return (
+                self._tokens
+                + (time.monotonic() - self._updated) * self.rate_max_sec
+                >= 1
+            )
 
     def continue_when_safe(self):
         """Wait here till rate is in bounds"""
-        _safe_break = datetime.now(timezone.utc)
-        while (self.im_safe) == False:
-            if (datetime.now(timezone.utc) - _safe_break).total_seconds() >= 30:
-                logging.getLogger(__name__).error(
-                    f"Waited for 30 seconds for rate limit to be safe.  Breaking."
+        if not self.acquire(timeout=30):
+            logging.getLogger(__name__).error(
+                f"Waited for 30 seconds for rate limit to be safe.  Breaking."
+            )
+            return True
+
+
+class rate_limit_backend(ABC):
+    """Shared token bucket state"""
+
+    @abstractmethod
+    def reserve(self, key: str, rate: float, burst: float, tokens: float) -> float:
+        """Take tokens from the key bucket when available
+
+        Returns:
+            float: 0 when taken or seconds to wait till they are available
+        """
+
+    @staticmethod
+    def _refill(
+        state: dict | None, rate: float, burst: float, tokens: float, now: float
+    ) -> tuple[dict, float]:
+        """token bucket step
+
+        Returns:
+            tuple[dict, float]: new state, seconds to wait ( state is not modified when > 0)
+        """
+        available = (
+            burst
+            if not state
+            else min(burst, state["tokens"] + (now - state["updated"]) * rate)
+        )
+        if available >= tokens:
+            return {"tokens": available - tokens, "updated": now}, 0
+        return state, (tokens - available) / rate
+
+
+class file_rate_limit_backend(rate_limit_backend):
+    """Bucket state saved in files locked while updated: processes in the same host share the budget"""
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def reserve(self, key: str, rate: float, burst: float, tokens: float) -> float:
+        import fcntl
+
+        with open(os.path.join(self.folder, f"{key}.ratelimit"), "a+") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                try:
+                    state = json.loads(f.read() or "null")
+                except ValueError:
+                    state = None
+                new_state, wait = self._refill(
+                    state=state, rate=rate, burst=burst, tokens=tokens, now=time.time()
                 )
-                return True
-            with self.lock:
-                if (
-                    datetime.now(timezone.utc) - self.rate_count_lastupdate
-                ).total_seconds() <= 1:
-                    # set current rate
-                    self.rate_sec += 1
-                else:
-                    self.rate_sec = 1
-                    # update last date
-                    self.rate_count_lastupdate = datetime.now(timezone.utc)
-
-        # keep track
-        self.hit()
+                if wait == 0:
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps(new_state))
+                    f.flush()
+                return wait
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+class mongo_rate_limit_backend(rate_limit_backend):
+    """Bucket state saved in a mongo collection, refilled using the server clock in one atomic update:
+    processes in different hosts share the budget ( their clocks may differ)"""
+
+    def __init__(
+        self, mongo_url: str, db_name: str = "global", collection_name: str = "rate_limits"
+    ):
+        from pymongo import MongoClient
+
+        self.collection = MongoClient(mongo_url)[db_name][collection_name]
+
+    def reserve(self, key: str, rate: float, burst: float, tokens: float) -> float:
+        from pymongo import ReturnDocument
+
+        # new buckets ( or not updated at server time ) start full
+        available = {
+            "$cond": [
+                {"$eq": [{"$type": "$updated"}, "date"]},
+                {
+                    "$min": [
+                        burst,
+                        {
+                            "$add": [
+                                "$tokens",
+                                {
+                                    "$multiply": [
+                                        {
+                                            "$divide": [
+                                                {"$subtract": ["$$NOW", "$updated"]},
+                                                1000,
+                                            ]
+                                        },
+                                        rate,
+                                    ]
+                                },
+                            ]
+                        },
+                    ]
+                },
+                burst,
+            ]
+        }
+        taken = {"$gte": ["$_available", tokens]}
+        state = self.collection.find_one_and_update(
+            {"_id": key},
+            [
+                {"$set": {"_available": available}},
+                {
+                    "$set": {
+                        "tokens": {
+                            "$cond": [
+                                taken,
+                                {"$subtract": ["$_available", tokens]},
+                                "$tokens",
+                            ]
+                        },
+                        "updated": {"$cond": [taken, "$$NOW", "$updated"]},
+                        "wait": {
+                            "$cond": [
+                                taken,
+                                0,
+                                {
+                                    "$divide": [
+                                        {"$subtract": [tokens, "$_available"]},
+                                        rate,
+                                    ]
+                                },
+                            ]
+                        },
+                    }
+                },
+                {"$unset": "_available"},
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        return float(state["wait"])
+
+
+# requests per second by host ( override using configure_rate_limits )
+RATE_LIMITS = {
+    "api.thegraph.com": 4,
+    "api.geckoterminal.com": 0.4,
+    "api.coingecko.com": 0.4,
+    "api.etherscan.io": 5,
+    "api.polygonscan.com": 5,
+    "api-optimistic.etherscan.io": 5,
+    "api.arbiscan.io": 5,
+    "api.celoscan.io": 5,
+    "api-zkevm.polygonscan.com": 5,
+    "api.bscscan.com": 5,
+}
+# hosts not found in RATE_LIMITS
+RATE_LIMIT_DEFAULT = 5
+
+_RATE_LIMITERS = {}
+_RATE_LIMITERS_LOCK = threading.Lock()
+_RATE_LIMIT_BACKEND = None
+# builds _RATE_LIMIT_BACKEND when a limiter takes its first tokens ( deferred configuration)
+_RATE_LIMIT_BACKEND_FACTORY = None
+
+
+def _get_shared_backend() -> rate_limit_backend | None:
+    """backend of host rate limiters, built on first use when configured with a factory"""
+    global _RATE_LIMIT_BACKEND, _RATE_LIMIT_BACKEND_FACTORY
+    if _RATE_LIMIT_BACKEND_FACTORY is None:
+        return _RATE_LIMIT_BACKEND
+    with _RATE_LIMITERS_LOCK:
+        if _RATE_LIMIT_BACKEND_FACTORY is not None:
+            _RATE_LIMIT_BACKEND = _RATE_LIMIT_BACKEND_FACTORY()
+            _RATE_LIMIT_BACKEND_FACTORY = None
+        return _RATE_LIMIT_BACKEND
+
+
+def get_rate_limit(url: str) -> rate_limit:
+    """rate limiter of the host of the url ( shared by all callers).
+        Creating it is cheap ( usable at import time): the shared backend is resolved when tokens are taken
+
+    Args:
+        url (str): full url or host
+
+    Returns:
+        rate_limit:
+    """
+    host = urlparse(url).netloc or url
+    with _RATE_LIMITERS_LOCK:
+        if host not in _RATE_LIMITERS:
+            _RATE_LIMITERS[host] = rate_limit(
+                rate_max_sec=RATE_LIMITS.get(host, RATE_LIMIT_DEFAULT),
+                key=host,
+                shared=True,
+            )
+        return _RATE_LIMITERS[host]
+
+
+def configure_rate_limits(
+    hosts: dict | None = None,
+    backend: rate_limit_backend | None = None,
+    backend_factory=None,
+):
+    """Set host rates and the shared backend of host rate limiters
+
+    Args:
+        hosts (dict | None, optional): {<host>: requests per second}. Defaults to None.
+        backend (rate_limit_backend | None, optional): . Defaults to None ( this process only).
+        backend_factory (callable, optional): function returning the backend, called when a host limiter takes its first tokens
+                            ( processes not calling rate limited apis never connect to it ). Defaults to None.
+    """
+    global _RATE_LIMIT_BACKEND, _RATE_LIMIT_BACKEND_FACTORY
+    with _RATE_LIMITERS_LOCK:
+        RATE_LIMITS.update(hosts or {})
+        _RATE_LIMIT_BACKEND_FACTORY = backend_factory
+        _RATE_LIMIT_BACKEND = backend
+        for host, limiter in _RATE_LIMITERS.items():
+            limiter.rate_max_sec = RATE_LIMITS.get(host, RATE_LIMIT_DEFAULT)
+            limiter.burst = max(1, limiter.rate_max_sec)
@@ -0,0 +1,202 @@
+import concurrent.futures
+import logging
+import threading
+import time
+
+from bins.general.metrics_utilities import METRICS
+
+METRICS.describe("job_lag_seconds", "seconds a scheduled job started after it was due")
+METRICS.describe("job_last_success_timestamp", "unix time of the last successful job run")
+
+
+class scheduled_job:
+    def __init__(
+        self,
+        name: str,
+        func,
+        interval: float,
+        priority: int = 1,
+        groups: list[str] | None = None,
+        labels: dict | None = None,
+        after: list[str] | None = None,
+        **kwargs,
+    ):
+        """Function executed every <interval> seconds by a job_scheduler
+
+        Args:
+            name (str): unique job name ( the same job never runs twice at the same time)
+            func (callable): function to execute with kwargs
+            interval (float): seconds between run starts
+            priority (int, optional): lower values start first when jobs are due at the same time. Defaults to 1.
+            groups (list[str] | None, optional): concurrency groups the job belongs to, like the network. Defaults to None.
+            labels (dict | None, optional): metric labels. Defaults to None.
+            after (list[str] | None, optional): names of jobs that must succeed ( and not be running ) before each run of this one. Defaults to None.
+            kwargs: func arguments
+        """
+        self.name = name
+        self.func = func
+        self.kwargs = kwargs
+        self.interval = interval
+        self.priority = priority
+        self.groups = groups or []
+        self.labels = labels or {}
+        self.after = after or []
+
+        self.next_run = time.time()
+        self.running = False
+        self.runs = 0
+        self.errors = 0
+        self.last_start = None
+        self.last_end = None
+        self.last_success = None
+        self.last_error = None
+
+    def run(self):
+        """execute the job function ( exceptions are logged, not raised)"""
+        try:
+            with METRICS.timer("stage", **self.labels):
+                self.func(**self.kwargs)
+            self.last_success = time.time()
+            METRICS.set("job_last_success_timestamp", self.last_success, **self.labels)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = e
+            logging.getLogger(__name__).exception(
+                f" Unexpected error while running {self.name} job. error {e}"
+            )
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "interval": self.interval,
+            "priority": self.priority,
+            "groups": self.groups,
+            "after": self.after,
+            "next_run": self.next_run,
+            "running": self.running,
+            "runs": self.runs,
+            "errors": self.errors,
+            "last_start": self.last_start,
+            "last_end": self.last_end,
+            "last_success": self.last_success,
+            "last_error": str(self.last_error) if self.last_error else None,
+        }
+
+
+class job_scheduler:
+    def __init__(self, max_workers: int = 4, group_limits: dict | None = None):
+        """Run scheduled jobs concurrently in a thread pool:
+            * each job runs every <interval> seconds, never overlapping with itself
+            * due jobs start by priority, then by how late they are
+            * at most <max_workers> jobs run at the same time, and at most group_limits[<group>] of each group
+            * jobs with dependencies ( after ) wait till those succeeded since their own last start
+
+        Args:
+            max_workers (int, optional): jobs running at the same time. Defaults to 4.
+            group_limits (dict | None, optional): {<group>: <maximum jobs running at the same time>}. Defaults to None.
+        """
+        self.max_workers = max_workers
+        self.group_limits = group_limits or {}
+        self.jobs = {}  # {name: scheduled_job}
+
+        self._running_groups = {}  # {group: running jobs}
+        self._condition = threading.Condition()
+        self._stop = threading.Event()
+
+    def add_job(self, job: scheduled_job):
+        if job.name in self.jobs:
+            raise ValueError(f" Job {job.name} is already scheduled")
+        with self._condition:
+            self.jobs[job.name] = job
+            self._condition.notify()
+
+    def stop(self):
+        self._stop.set()
+        with self._condition:
+            self._condition.notify()
+
+    def _can_start(self, job: scheduled_job) -> bool:
+        return (
+            not job.running
+            and all(
+                self._running_groups.get(group, 0) < self.group_limits[group]
+                for group in job.groups
+                if group in self.group_limits
+            )
+            and all(
+                self._dependency_done(job=job, dependency=self.jobs[name])
+                for name in job.after
+                if name in self.jobs
+            )
+        )
+
+    @staticmethod
+    def _dependency_done(job: scheduled_job, dependency: scheduled_job) -> bool:
+        """the dependency is not running and succeeded since the job last start"""
+        return (
+            not dependency.running
+            and dependency.last_success is not None
+            and (job.last_start is None or dependency.last_success > job.last_start)
+        )
+
+    def _due_jobs(self, now: float) -> list[scheduled_job]:
+        return sorted(
+            [job for job in self.jobs.values() if job.next_run <= now],
+            key=lambda x: (x.priority, x.next_run),
+        )
+
+    def _start(self, executor: concurrent.futures.Executor, job: scheduled_job):
+        now = time.time()
+        METRICS.set("job_lag_seconds", max(0, now - job.next_run), **job.labels)
+        job.running = True
+        job.last_start = now
+        # cadence is kept from the start time
+        job.next_run = now + job.interval
+        for group in job.groups:
+            self._running_groups[group] = self._running_groups.get(group, 0) + 1
+
+        executor.submit(job.run).add_done_callback(lambda _: self._finish(job))
+
+    def _finish(self, job: scheduled_job):
+        with self._condition:
+            job.running = False
+            job.runs += 1
+            job.last_end = time.time()
+            for group in job.groups:
+                self._running_groups[group] -= 1
+            # a job running longer than its interval is due right away
+            self._condition.notify()
+
+    def run_forever(self):
+        """start due jobs until stop() is called or the process is interrupted"""
+        executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="job"
+        )
+        try:
+            with self._condition:
+                while not self._stop.is_set():
+                    now = time.time()
+                    running = sum(1 for x in self.jobs.values() if x.running)
+                    for job in self._due_jobs(now):
+                        if running >= self.max_workers:
+                            break
+                        if self._can_start(job):
+                            self._start(executor=executor, job=job)
+                            running += 1
+
+                    # wait for the next due job or a finished one ( due jobs not started wait for a slot)
+                    waiting = [
+                        x.next_run
+                        for x in self.jobs.values()
+                        if not x.running and x.next_run > now
+                    ]
+                    self._condition.wait(
+                        timeout=max(0.1, min(waiting) - time.time()) if waiting else 60
+                    )
+        finally:
+            # running jobs are not waited for
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def status(self) -> list[dict]:
+        with self._condition:
+            return [job.as_dict() for job in self.jobs.values()]
@@ -1,10 +1,16 @@
 import os
 import yaml
+import atexit
+import queue
 import logging.config
 import logging
+import logging.handlers
 from bins.log import telegram_logger
 from datetime import datetime
 
+# background listeners emitting queued log records
+LISTENERS = []
+
 
 def setup_logging(customconf, default_level=logging.INFO, env_key="LOG_CFG"):
     """Setup logging configuration
@@ -62,6 +68,10 @@ def setup_logging(customconf, default_level=logging.INFO, env_key="LOG_CFG"):
 
                 logging.config.dictConfig(config)
 
+                # move handlers to background threads
+                if customconf["logs"].get("queued", True):
+                    setup_queued_handlers(logger_names=list(config["loggers"].keys()))
+
                 # setup color
                 # coloredlogs.install()
             except Exception as e:
@@ -87,6 +97,67 @@ def setup_logging(customconf, default_level=logging.INFO, env_key="LOG_CFG"):
     logging.getLogger().addFilter(DuplicateFilter())  # add the filter to it
 
 
+class lazyQueueHandler(logging.handlers.QueueHandler):
+    """Queue records as they are: message formatting and tracebacks are rendered in the listener thread"""
+
+    def __init__(self, queue, target_handlers: tuple):
+        super().__init__(queue)
+        # handlers emitting the queued records
+        self.target_handlers = target_handlers
+
+    def prepare(self, record):
+        return record
+
+
+def setup_queued_handlers(logger_names: list[str]):
+    """Replace the handlers of the loggers ( and root ) with a queue handler.
+        Records are emitted by a background listener thread for each distinct set of handlers,
+        so slow handlers ( disk, telegram ) never block the logging thread.
+
+    Args:
+        logger_names (list[str]): configured logger names
+    """
+    stop_queued_handlers()
+
+    listeners = {}
+    for logger in [logging.getLogger(x) for x in logger_names] + [logging.getLogger()]:
+        # already queued loggers are set up again
+        handlers = tuple(
+            y
+            for x in logger.handlers
+            for y in (
+                x.target_handlers if isinstance(x, lazyQueueHandler) else [x]
+            )
+        )
+        if not handlers:
+            continue
+        if handlers not in listeners:
+            _queue = queue.SimpleQueue()
+            listeners[handlers] = (
+                lazyQueueHandler(_queue, target_handlers=handlers),
+                logging.handlers.QueueListener(
+                    _queue, *handlers, respect_handler_level=True
+                ),
+            )
+        logger.handlers = [listeners[handlers][0]]
+
+    for _handler, listener in listeners.values():
+        listener.start()
+        LISTENERS.append(listener)
+
+
+def stop_queued_handlers():
+    """Emit all queued records and stop listeners"""
+    while LISTENERS:
+        LISTENERS.pop().stop()
+    if telegram_logger.TELEGRAM_ENABLED:
+        telegram_logger.TELEGRAM_SENDER.flush()
+
+
+# flush queued records at exit
+atexit.register(stop_queued_handlers)
+
+
 class infoFilter(logging.Filter):
     def filter(self, rec):
         return rec.levelno == logging.INFO
@@ -95,7 +166,7 @@ class infoFilter(logging.Filter):
 class DuplicateFilter(logging.Filter):
     def filter(self, record):
         # add other fields if you need more granular comparison, depends on your app
-        current_log = (record.module, record.levelno, record.msg)
+        current_log = (record.module, record.levelno, record.msg, record.args)
         if current_log != getattr(self, "last_log", None):
             self.last_log = current_log
             return True
@@ -0,0 +1,146 @@
+import json
+import logging
+import os
+import re
+import threading
+
+
+class log_checkpoint:
+    def __init__(self, filename: str):
+        """Byte offsets already scanned of each log file, saved to a json file.
+            Files are identified by device and inode, so renamed ( rotated) files keep their offset
+            and files replaced or truncated are scanned again from the start.
+
+        Args:
+            filename (str): checkpoint json file
+        """
+        self.filename = filename
+        self.lock = threading.Lock()
+        self._items = {}  # {<device>_<inode>: {"path":, "offset":}}
+        if os.path.exists(self.filename):
+            try:
+                with open(self.filename, "r", encoding="utf8") as f:
+                    self._items = json.load(f)
+            except Exception as e:
+                logging.getLogger(__name__).error(
+                    f" Can't load log checkpoint {self.filename}. Scanning logs from start. error-> {e}"
+                )
+
+    @staticmethod
+    def key(stat: os.stat_result) -> str:
+        return f"{stat.st_dev}_{stat.st_ino}"
+
+    def get_offset(self, stat: os.stat_result) -> int:
+        """offset to start scanning from ( 0 when the file is new or was truncated)"""
+        with self.lock:
+            offset = self._items.get(self.key(stat), {}).get("offset", 0)
+        return offset if offset <= stat.st_size else 0
+
+    def set_offset(self, path: str, stat: os.stat_result, offset: int):
+        with self.lock:
+            self._items[self.key(stat)] = {"path": path, "offset": offset}
+
+    def save(self):
+        """save to disk ( files no longer present are removed )"""
+        with self.lock:
+            for key in [
+                key
+                for key, item in self._items.items()
+                if not os.path.exists(item["path"])
+            ]:
+                self._items.pop(key)
+            os.makedirs(os.path.dirname(self.filename) or ".", exist_ok=True)
+            # write and rename: an interrupted save never leaves a corrupt checkpoint
+            with open(f"{self.filename}.tmp", "w", encoding="utf8") as f:
+                json.dump(self._items, f)
+            os.replace(f"{self.filename}.tmp", self.filename)
+
+
+class log_pattern:
+    def __init__(self, name: str, regex: str, keyword: str):
+        """Log line regular expression
+
+        Args:
+            name (str): record type, like "price" or "hypervisor_status"
+            regex (str): named groups become record fields
+            keyword (str): text any matching line contains ( lines without it are not evaluated)
+        """
+        self.name = name
+        self.regex = re.compile(regex)
+        self.keyword = keyword
+
+
+class log_scanner:
+    def __init__(
+        self,
+        patterns: list[log_pattern],
+        checkpoint: log_checkpoint | None = None,
+        batch_size: int = 5000,
+    ):
+        """Stream log files line by line, yielding the records matching the patterns.
+            Memory use does not depend on log file sizes.
+
+        Args:
+            patterns (list[log_pattern]):
+            checkpoint (log_checkpoint | None, optional): only content not scanned before is read. Defaults to None ( all content ).
+            batch_size (int, optional): records per batch. Defaults to 5000.
+        """
+        self.patterns = patterns
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+
+    def match(self, line: str) -> list[dict]:
+        """records found in a line"""
+        result = []
+        for pattern in self.patterns:
+            if pattern.keyword in line:
+                result.extend(
+                    {"type": pattern.name, **match.groupdict()}
+                    for match in pattern.regex.finditer(line)
+                )
+        return result
+
+    def scan(self, log_file: str):
+        """yield batches of records found in the log file.
+            When a checkpoint is set, the offset scanned is saved after the consumer asks for the next batch
+            ( records are never lost when the consumer fails processing a batch )
+
+        Args:
+            log_file (str):
+
+        Returns:
+            generator: list[dict] record batches {"type": <pattern name>, <regex groups>...}
+        """
+        try:
+            stat = os.stat(log_file)
+        except OSError as e:
+            logging.getLogger(__name__).error(f" Can't scan {log_file}. error-> {e}")
+            return
+
+        offset = self.checkpoint.get_offset(stat) if self.checkpoint else 0
+        if offset == stat.st_size:
+            # nothing new
+            return
+
+        batch = []
+        with open(log_file, "rb") as f:
+            f.seek(offset)
+            for raw_line in f:
+                # a line being written is scanned next time
+                if not raw_line.endswith(b"\n"):
+                    break
+                offset += len(raw_line)
+                batch.extend(self.match(raw_line.decode("utf8", errors="replace")))
+                if len(batch) >= self.batch_size:
+                    yield batch
+                    batch = []
+                    self._commit(log_file=log_file, stat=stat, offset=offset)
+
+        if batch:
+            yield batch
+        self._commit(log_file=log_file, stat=stat, offset=offset)
+
+    def _commit(self, log_file: str, stat: os.stat_result, offset: int):
+        if self.checkpoint:
+            self.checkpoint.set_offset(path=log_file, stat=stat, offset=offset)
+            self.checkpoint.save()
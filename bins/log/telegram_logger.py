@@ -2,6 +2,10 @@ import requests
 from logging import Handler, Formatter
 import logging
 import datetime
+import collections
+import sys
+import threading
+import time
 
 TELEGRAM_ENABLED = True
 TELEGRAM_TOKEN = ""
@@ -11,19 +15,123 @@ TELEGRAM_CHAT_ID = ""
 class RequestsHandler(Handler):
     def emit(self, record):
         if TELEGRAM_ENABLED == True:
-            log_entry = self.format(record)
-            payload = {
-                "chat_id": TELEGRAM_CHAT_ID,
-                "text": log_entry,
-                "parse_mode": "HTML",
-            }
             if TELEGRAM_TOKEN != "" and TELEGRAM_CHAT_ID != "":
-                return requests.post(
-                    "https://api.telegram.org/bot{token}/sendMessage".format(
-                        token=TELEGRAM_TOKEN
-                    ),
-                    data=payload,
-                ).content
+                TELEGRAM_SENDER.send(self.format(record))
+
+
+class telegram_sender:
+    # telegram message length limit
+    MAX_MESSAGE_LENGTH = 4096
+
+    def __init__(
+        self,
+        rate_max_sec: float = 0.5,
+        max_queued: int = 200,
+        batch_wait_secs: float = 2,
+    ):
+        """Background telegram sender: messages are batched in as few telegram messages as possible,
+            sent under a rate limit and, when more than <max_queued> are waiting, dropped and counted.
+
+        Args:
+            rate_max_sec (float, optional): telegram messages per second. Defaults to 0.5.
+            max_queued (int, optional): . Defaults to 200.
+            batch_wait_secs (float, optional): seconds to wait for more messages before sending. Defaults to 2.
+        """
+        self.rate_max_sec = rate_max_sec
+        self.max_queued = max_queued
+        self.batch_wait_secs = batch_wait_secs
+
+        self._queue = collections.deque()
+        self._dropped = 0
+        self._condition = threading.Condition()
+        # one batch sent at a time
+        self._send_lock = threading.Lock()
+        self._thread = None
+        self._session = requests.Session()
+
+    def send(self, message: str):
+        """queue a message ( never blocks)"""
+        with self._condition:
+            if len(self._queue) >= self.max_queued:
+                self._dropped += 1
+                return
+            self._queue.append(message)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._loop, name="telegram_sender", daemon=True
+                )
+                self._thread.start()
+            self._condition.notify()
+
+    def flush(self, timeout: float = 10):
+        """send all queued messages"""
+        _start = time.monotonic()
+        while self._queue and time.monotonic() - _start < timeout:
+            self._send_batch()
+        # wait for the batch being sent
+        with self._send_lock:
+            pass
+
+    def _loop(self):
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+            # let messages accumulate
+            time.sleep(self.batch_wait_secs)
+            self._send_batch()
+            time.sleep(1 / self.rate_max_sec)
+
+    def _send_batch(self):
+        with self._send_lock:
+            self._send_batch_locked()
+
+    def _send_batch_locked(self):
+        # build a message with as many whole queued messages as possible ( never cut: HTML tags would break )
+        with self._condition:
+            messages = []
+            length = 0
+            if self._dropped:
+                messages.append(
+                    f"<i>{self._dropped} log messages dropped (too many messages)</i>"
+                )
+                length = len(messages[0])
+                self._dropped = 0
+            while self._queue and (
+                not messages
+                or length + len(self._queue[0]) + 1 <= self.MAX_MESSAGE_LENGTH
+            ):
+                messages.append(self._queue.popleft())
+                length += len(messages[-1]) + 1
+
+        if not messages:
+            return
+
+        data = {
+            "chat_id": TELEGRAM_CHAT_ID,
+            "text": "\n".join(messages),
+            "parse_mode": "HTML",
+        }
+        if len(data["text"]) > self.MAX_MESSAGE_LENGTH:
+            # a single message too long: sent as truncated plain text
+            data["text"] = data["text"][: self.MAX_MESSAGE_LENGTH]
+            data.pop("parse_mode")
+        try:
+            self._session.post(
+                "https://api.telegram.org/bot{token}/sendMessage".format(
+                    token=TELEGRAM_TOKEN
+                ),
+                data=data,
+                timeout=10,
+            )
+        except Exception as e:
+            # do not log using telegram
+            sys.stderr.write(
+                f" Could not send {len(messages)} log messages to telegram: {e}\n"
+            )
+
+
+TELEGRAM_SENDER = telegram_sender()
 
 
 class LogstashFormatter(Formatter):
@@ -33,9 +141,12 @@ class LogstashFormatter(Formatter):
     def format(self, record):
         t = datetime.datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
 
-        return "<i>{datetime}</i><pre>\n{message}</pre>".format(
-            message=record.msg, datetime=t
+        template = "<i>{datetime}</i><pre>\n{message}</pre>"
+        # shorten the message, not the tags, to fit in a telegram message
+        max_length = telegram_sender.MAX_MESSAGE_LENGTH - len(
+            template.format(message="", datetime=t)
         )
+        return template.format(message=record.getMessage()[:max_length], datetime=t)
         # <b>bold</b>, <strong>bold</strong>
         # <i>italic</i>, <em>italic</em>
         # <a href="http://www.example.com/">inline URL</a>
@@ -1,4 +1,5 @@
 import contextlib
+import concurrent.futures
 from datetime import datetime
 import sys
 import logging
@@ -73,9 +74,37 @@ class price_scraper:
         """
         return: price_usd_token
         """
+        return self.get_price_detailed(
+            network=network, token_id=token_id, block=block, of=of
+        )[0]
+
+    def get_price_detailed(
+        self,
+        network: str,
+        token_id: str,
+        block: int = 0,
+        of: str = "USD",
+        exclude_sources: list[str] | None = None,
+    ) -> tuple[float, str | None, list[str]]:
+        """get price skipping the sources specified ( negative cached )
+
+        Args:
+            network (str):
+            token_id (str): token address
+            block (int, optional): . Defaults to 0.
+            of (str, optional): . Defaults to "USD".
+            exclude_sources (list[str] | None, optional): "geckoterminal", "thegraph_<dex>", "coingecko". Defaults to None.
+
+        Returns:
+            tuple[float, str | None, list[str]]: price, source found, sources tried without success
+        """
+        if exclude_sources is None:
+            exclude_sources = []
 
         # result var
         _price = None
+        _source = None
+        _failed_sources = []
 
         # make address lower case
         token_id = token_id.lower()
@@ -85,6 +114,7 @@ class price_scraper:
             _price = self.cache.get_data(
                 chain_id=network, address=token_id, block=block, key=of
             )
+            _source = "cache"
         except Exception:
             _price = None
 
@@ -93,6 +123,7 @@ class price_scraper:
             self.geckoterminal
             and _price in [None, 0]
             and network in self.geckoterminal_price_connector.networks
+            and "geckoterminal" not in exclude_sources
         ):
             # GET FROM GECKOTERMINAL
             logging.getLogger(LOG_NAME).debug(
@@ -102,7 +133,13 @@ class price_scraper:
                 _price = self._get_price_from_geckoterminal(
                     network, token_id, block, of
                 )
+                if _price in [None, 0]:
+                    # answered without a price
+                    _failed_sources.append("geckoterminal")
+                else:
+                    _source = "geckoterminal"
             except Exception as e:
+                # not answered: not a failed source
                 logging.getLogger(LOG_NAME).debug(
                     f" Could not get {network}'s token {token_id} price at block {block} from geckoterminal. error-> {e}"
                 )
@@ -112,10 +149,12 @@ class price_scraper:
             thegraph_connectors = self._get_connector_candidates(network=network)
 
             for dex, connector in thegraph_connectors.items():
+                if f"thegraph_{dex}" in exclude_sources:
+                    continue
                 logging.getLogger(LOG_NAME).debug(
                     f" Trying to get {network}'s token {token_id} price at block {block} from {dex} subgraph"
                 )
-                with contextlib.suppress(Exception):
+                try:
                     _price = self._get_price_from_thegraph(
                         thegraph_connector=connector,
                         dex=dex,
@@ -124,16 +163,26 @@ class price_scraper:
                         block=block,
                         of=of,
                     )
+                except Exception as e:
+                    # the subgraph did not answer: not a failed source
+                    logging.getLogger(LOG_NAME).debug(
+                        f" Could not get {network}'s token {token_id} price at block {block} from {dex} subgraph. error-> {e}"
+                    )
+                    continue
 
-                    if _price not in [None, 0]:
-                        # exit for loop
-                        break
+                if _price not in [None, 0]:
+                    _source = f"thegraph_{dex}"
+                    # exit for loop
+                    break
+                # answered without a price
+                _failed_sources.append(f"thegraph_{dex}")
 
         # coingecko
         if (
             self.coingecko
             and _price in [None, 0]
             and network in self.coingecko_price_connector.networks
+            and "coingecko" not in exclude_sources
         ):
             # GET FROM COINGECKO
             logging.getLogger(LOG_NAME).debug(
@@ -142,7 +191,13 @@ class price_scraper:
 
             try:
                 _price = self._get_price_from_coingecko(network, token_id, block, of)
+                if _price in [None, 0]:
+                    # answered without a price
+                    _failed_sources.append("coingecko")
+                else:
+                    _source = "coingecko"
             except Exception as e:
+                # not answered: not a failed source
                 logging.getLogger(LOG_NAME).debug(
                     f" Could not get {network}'s token {token_id} price at block {block} from coingecko. error-> {e}"
                 )
@@ -172,9 +227,133 @@ class price_scraper:
             logging.getLogger(LOG_NAME).warning(
                 f" {network}'s token {token_id} price at block {block} not found"
             )
+            _source = None
 
         # return result
-        return _price
+        return _price, _source, _failed_sources
+
+    def get_prices_thegraph(
+        self,
+        network: str,
+        items: list[tuple[str, int]],
+        exclude_sources: dict | None = None,
+        batch_size: int = 100,
+    ) -> dict:
+        """get many token prices from subgraphs at once: tokens and blocks are packed in aliased
+            GraphQL documents and all dex connectors are queried concurrently.
+            The first connector in candidates order with a price is used.
+            Cached prices are not queried and prices found are cached.
+            Queries not answered ( transport or subgraph errors ) are not reported as failed sources.
+
+        Args:
+            network (str):
+            items (list[tuple[str, int]]): token address and block ( zero for current)
+            exclude_sources (dict | None, optional): {(<token address>, <block>): list of sources}. Defaults to None.
+            batch_size (int, optional): tokens per query. Defaults to 100.
+
+        Returns:
+            dict: {(token address, block): (price, source, failed sources)}
+        """
+        exclude_sources = {
+            (token.lower(), int(block)): sources
+            for (token, block), sources in (exclude_sources or {}).items()
+        }
+
+        prices = {}
+        items = list({(token.lower(), int(block)) for token, block in items})
+
+        # try return prices from cached values ( current prices, block zero, are not cached)
+        if self.cache is not None:
+            for token, block in items:
+                if not block:
+                    continue
+                with contextlib.suppress(Exception):
+                    if _price := self.cache.get_data(
+                        chain_id=network, address=token, block=block, key="USD"
+                    ):
+                        prices[(token, block)] = (_price, "cache", [])
+            items = [x for x in items if x not in prices]
+
+        thegraph_connectors = self._get_connector_candidates(network=network)
+
+        def _query_connector(dex: str, connector) -> tuple[str, dict, dict]:
+            queries = {}
+            aliases = {}
+            for i, (token, block) in enumerate(items):
+                if f"thegraph_{dex}" in exclude_sources.get((token, block), []):
+                    continue
+                alias = f"t{i}_b{block}"
+                aliases[alias] = (token, block)
+                queries[alias] = {"where": f""" id: "{token}" """}
+                if block != 0:
+                    queries[alias]["block"] = f""" number: {block}"""
+            try:
+                return (
+                    dex,
+                    aliases,
+                    connector.get_aliased_results(
+                        network=network,
+                        query_name="tokens",
+                        queries=queries,
+                        batch_size=batch_size,
+                    )
+                    if queries
+                    else {},
+                )
+            except Exception as e:
+                logging.getLogger(LOG_NAME).exception(
+                    f" Unexpected error while getting {network}'s token prices from {dex} subgraph. error-> {e}"
+                )
+                # not tried
+                return dex, {}, {}
+
+        # query all connectors concurrently
+        responses = {}
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(len(thegraph_connectors), 1)
+        ) as ex:
+            for dex, aliases, data in ex.map(
+                lambda x: _query_connector(*x), thegraph_connectors.items()
+            ):
+                responses[dex] = (aliases, data)
+
+        # map results back, preserving connectors order
+        for dex, (aliases, data) in (
+            (dex, responses[dex]) for dex in thegraph_connectors.keys()
+        ):
+            for alias, item in aliases.items():
+                _price, _source, _failed_sources = prices.get(item, (None, None, []))
+                if _price:
+                    continue
+                if alias not in data:
+                    # not answered: not a failed source
+                    prices.setdefault(item, (None, None, _failed_sources))
+                    continue
+                try:
+                    _price = self._calculate_thegraph_token_price(data[alias][0])
+                except (KeyError, IndexError, TypeError, ValueError, ZeroDivisionError):
+                    _price = 0
+                if _price:
+                    prices[item] = (_price, f"thegraph_{dex}", _failed_sources)
+                    if self.cache is not None and item[1]:
+                        self.cache.add_data(
+                            chain_id=network,
+                            address=item[0],
+                            block=item[1],
+                            key="USD",
+                            data=_price,
+                            save2file=False,
+                        )
+                else:
+                    prices[item] = (None, None, _failed_sources + [f"thegraph_{dex}"])
+
+        if self.cache is not None and any(
+            (x[1] or "").startswith("thegraph_") for x in prices.values()
+        ):
+            # save new prices to disk once
+            self.cache._save_tofile()
+
+        return prices
 
     def _get_price_from_thegraph(
         self,
@@ -192,19 +371,24 @@ class price_scraper:
 
         _where_query = f""" id: "{token_id}" """
 
+        # thegraph_query_error is raised when the subgraph does not answer
         if block != 0:
             # get price at block
             _block_query = f""" number: {block}"""
-            _data = thegraph_connector.get_all_results(
-                network=network,
-                query_name="tokens",
-                where=_where_query,
-                block=_block_query,
+            _data = list(
+                thegraph_connector.iter_all_results(
+                    network=network,
+                    query_name="tokens",
+                    where=_where_query,
+                    block=_block_query,
+                )
             )
         else:
             # get current block price
-            _data = thegraph_connector.get_all_results(
-                network=network, query_name="tokens", where=_where_query
+            _data = list(
+                thegraph_connector.iter_all_results(
+                    network=network, query_name="tokens", where=_where_query
+                )
             )
 
         # process query
@@ -213,26 +397,7 @@ class price_scraper:
             _data = _data[0]
 
             token_symbol = _data["symbol"]
-            # decide what to use to get to price ( value or volume )
-            if (
-                float(_data["totalValueLockedUSD"]) > 0
-                and float(_data["totalValueLocked"]) > 0
-            ):
-                # get unit usd price from value locked
-                _price = float(_data["totalValueLockedUSD"]) / float(
-                    _data["totalValueLocked"]
-                )
-            elif (
-                "volume" in _data
-                and float(_data["volume"]) > 0
-                and "volumeUSD" in _data
-                and float(_data["volumeUSD"]) > 0
-            ):
-                # get unit usd price from volume
-                _price = float(_data["volumeUSD"]) / float(_data["volume"])
-            else:
-                # no way
-                _price = 0
+            _price = self._calculate_thegraph_token_price(_data)
 
             # TODO: decide on certain circumstances (DAI USDC...)
             # if _price == 0:
@@ -275,6 +440,36 @@ class price_scraper:
         # return result
         return _price
 
+    @staticmethod
+    def _calculate_thegraph_token_price(token: dict) -> float:
+        """token usd price from subgraph token data
+
+        Args:
+            token (dict): subgraph token item
+
+        Returns:
+            float: price or zero
+        """
+        # decide what to use to get to price ( value or volume )
+        if (
+            float(token["totalValueLockedUSD"]) > 0
+            and float(token["totalValueLocked"]) > 0
+        ):
+            # get unit usd price from value locked
+            return float(token["totalValueLockedUSD"]) / float(
+                token["totalValueLocked"]
+            )
+        elif (
+            "volume" in token
+            and float(token["volume"]) > 0
+            and "volumeUSD" in token
+            and float(token["volumeUSD"]) > 0
+        ):
+            # get unit usd price from volume
+            return float(token["volumeUSD"]) / float(token["volume"])
+        # no way
+        return 0
+
     def _get_price_from_coingecko(
         self, network: str, token_id: str, block: int, of: str
     ) -> float:
@@ -3,6 +3,7 @@ import logging
 
 from web3 import Web3
 from bins.configuration import STATIC_REGISTRY_ADDRESSES
+from bins.general.metrics_utilities import rpc_accounting
 from bins.w3.onchain_utilities.basic import erc20
 from bins.w3.onchain_utilities.protocols import (
     gamma_hypervisor,
@@ -138,23 +139,30 @@ def build_db_hypervisor(
     custom_web3Url: str | None = None,
     cached: bool = True,
 ) -> dict():
-    try:
-        hypervisor = build_hypervisor(
-            network=network,
-            dex=dex,
-            block=block,
-            hypervisor_address=address,
-            custom_web3=custom_web3,
-            custom_web3Url=custom_web3Url,
-            cached=cached,
-        )
+    # rpc calls are accounted to the status ( rpc_budget_exceeded is raised in "raise" budget mode)
+    with rpc_accounting(
+        stage="static" if static_mode else "status",
+        network=network,
+        address=address,
+        block=block,
+    ):
+        try:
+            hypervisor = build_hypervisor(
+                network=network,
+                dex=dex,
+                block=block,
+                hypervisor_address=address,
+                custom_web3=custom_web3,
+                custom_web3Url=custom_web3Url,
+                cached=cached,
+            )
 
-        # return converted hypervisor
-        return hypervisor.as_dict(convert_bint=True, static_mode=static_mode)
+            # return converted hypervisor
+            return hypervisor.as_dict(convert_bint=True, static_mode=static_mode)
 
-    except Exception as e:
-        logging.getLogger(__name__).exception(
-            f" Unexpected error while converting {network}'s hypervisor {address} [dex: {dex}] at block {block}] to dictionary ->    error:{e}"
-        )
+        except Exception as e:
+            logging.getLogger(__name__).exception(
+                f" Unexpected error while converting {network}'s hypervisor {address} [dex: {dex}] at block {block}] to dictionary ->    error:{e}"
+            )
 
     return None
@@ -1 +1,8 @@
-from bins.w3.onchain_utilities import basic, collectors, exchanges, protocols, rewarders
+from bins.w3.onchain_utilities import (
+    basic,
+    collectors,
+    exchanges,
+    protocols,
+    rewarders,
+    simulators,
+)
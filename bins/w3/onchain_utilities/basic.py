@@ -3,15 +3,29 @@ import random
 import sys
 import math
 import datetime as dt
+import threading
+import time
 
+from contextlib import contextmanager
 from decimal import Decimal
+from typing import Callable
+from urllib.parse import urlparse
+from eth_abi import abi
 from web3 import Web3, exceptions
+from web3._utils.abi import get_abi_output_types
 from web3.contract import Contract
 from web3.middleware import geth_poa_middleware, simple_cache_middleware
 
-from bins.configuration import CONFIGURATION, WEB3_CHAIN_IDS
+from bins.configuration import CONFIGURATION, WEB3_CHAIN_IDS, MULTICALL3_ADDRESSES
 from bins.general import file_utilities
+from bins.general.metrics_utilities import METRICS, record_rpc_call
 from bins.cache import cache_utilities
+from bins.w3 import rpc_replay_helper
+
+# index based getters scanned by call_function_indexed
+#   {<chain id>_<address>_<function name>: {"last_index":, "results": {<index>: result}, "failed": set, "validated": timestamp}}
+_INDEXED_SCANS = {}
+_INDEXED_SCANS_LOCK = threading.Lock()
 
 
 class web3wrap:
@@ -74,9 +88,10 @@ class web3wrap:
     def setup_w3(self, network: str, web3Url: str | None = None) -> Web3:
         # create Web3 helper
         result = Web3(
-            Web3.HTTPProvider(
-                web3Url or CONFIGURATION["sources"]["web3Providers"][network],
-                request_kwargs={"timeout": 60},
+            rpc_replay_helper.build_provider(
+                network=network,
+                web3Url=web3Url or CONFIGURATION["sources"]["web3Providers"][network],
+                timeout=60,
             )
         )
         # add simple cache module
@@ -472,14 +487,19 @@ class web3wrap:
                     address=self._address, abi=self._abi
                 )
                 # execute function
-                return getattr(contract.functions, function_name)(*args).call(
-                    block_identifier=self.block
-                )
+                with self._rpc_metrics(method=function_name, rpcUrl=rpcUrl):
+                    return getattr(contract.functions, function_name)(*args).call(
+                        block_identifier=self.block
+                    )
 
             except Exception as e:
                 # not working rpc
+                # lazy formatting: called for every rpc failure
                 logging.getLogger(__name__).debug(
-                    f"    can't call function {function_name} using {rpcUrl} rpc: {e}"
+                    "    can't call function %s using %s rpc: %s",
+                    function_name,
+                    rpcUrl,
+                    e,
                 )
 
         # no rpcUrl worked
@@ -515,6 +535,180 @@ class web3wrap:
 
         return None
 
+    def call_function_batch(
+        self,
+        function_name: str,
+        args_list: list[tuple],
+        rpcKey_names: list[str] | None = None,
+        batch_size: int = 500,
+    ) -> list:
+        """Call the same contract function with different arguments using multicall3 aggregated calls
+            ( one RPC round-trip per batch_size calls ).
+            Falls back to one call at a time when multicall3 is not available (network or block)
+
+        Args:
+            function_name (str): contract function name to call
+            args_list (list[tuple]): list of function arguments, one item per call
+            rpcKey_names (list[str] | None, optional): private or public or whatever is placed in config w3Providers. Defaults to None.
+            batch_size (int, optional): maximum calls aggregated in one RPC request. Defaults to 500.
+
+        Returns:
+            list: results in the same order as args_list ( None when the call failed )
+        """
+        if not args_list:
+            return []
+
+        result = []
+        for i in range(0, len(args_list), batch_size):
+            chunk = args_list[i : i + batch_size]
+            if (
+                chunk_result := self._call_function_multicall(
+                    function_name, chunk, rpcKey_names
+                )
+            ) is None:
+                logging.getLogger(__name__).debug(
+                    " multicall not available for %s on %s at block %s. Calling one by one",
+                    function_name,
+                    self._network,
+                    self.block,
+                )
+                chunk_result = [
+                    self.call_function_autoRpc(function_name, rpcKey_names, *args)
+                    for args in chunk
+                ]
+            result += chunk_result
+
+        return result
+
+    def call_function_indexed(
+        self, function_name: str, counter: int, revalidate_secs: int = 60 * 60
+    ) -> dict:
+        """Call an index based getter ( like registry hypeByIndex ) for indexes 0 to counter, incrementally:
+            only indexes above the last one scanned and the ones that failed before are queried ( one aggregated call ).
+            All indexes are read again every revalidate_secs, as results may change ( deregistered hypervisors ).
+            Scans are kept in memory while the app is running.
+
+        Args:
+            function_name (str): contract function receiving the index
+            counter (int): last index
+            revalidate_secs (int, optional): seconds between full scans. Defaults to 1 hour.
+
+        Returns:
+            dict: {<index>: result} of the indexes not failing
+        """
+        key = f"{self._chain_id}_{self.address.lower()}_{function_name}"
+        with _INDEXED_SCANS_LOCK:
+            scan = _INDEXED_SCANS.setdefault(
+                key, {"last_index": -1, "results": {}, "failed": set(), "validated": 0}
+            )
+            full_scan = time.time() - scan["validated"] > revalidate_secs
+            to_query = (
+                list(range(counter + 1))
+                if full_scan
+                else sorted(
+                    {i for i in scan["failed"] if i <= counter}
+                    | set(range(scan["last_index"] + 1, counter + 1))
+                )
+            )
+
+        results = self.call_function_batch(function_name, [(i,) for i in to_query])
+
+        with _INDEXED_SCANS_LOCK:
+            for i, result in zip(to_query, results):
+                if result is None:
+                    # out of bounds or reverted: arbitrum and mainnet have diff ways of indexing (+1 or 0)
+                    scan["failed"].add(i)
+                    scan["results"].pop(i, None)
+                else:
+                    scan["failed"].discard(i)
+                    scan["results"][i] = result
+            scan["last_index"] = max(scan["last_index"], counter)
+            if full_scan:
+                scan["validated"] = time.time()
+
+            if failed := [i for i in to_query if i in scan["failed"]]:
+                logging.getLogger(__name__).debug(
+                    f" {function_name} failed for indexes {failed} of {self._network} {self.address}"
+                )
+            return {i: x for i, x in scan["results"].items() if i <= counter}
+
+    def _call_function_multicall(
+        self, function_name: str, args_list: list[tuple], rpcKey_names: list[str] | None
+    ) -> list | None:
+        if self._network not in MULTICALL3_ADDRESSES:
+            return None
+
+        calls = [
+            (
+                self._address,
+                True,
+                self._contract.encodeABI(fn_name=function_name, args=list(args)),
+            )
+            for args in args_list
+        ]
+        output_types = get_abi_output_types(
+            self._contract.get_function_by_name(function_name).abi
+        )
+
+        for rpcUrl in self.get_rpcUrls(rpcKey_names=rpcKey_names):
+            try:
+                chain_connection = self.setup_w3(network=self._network, web3Url=rpcUrl)
+                multicall = chain_connection.eth.contract(
+                    address=Web3.toChecksumAddress(MULTICALL3_ADDRESSES[self._network]),
+                    abi=file_utilities.load_json(
+                        filename="multicall3", folder_path="data/abi/multicall"
+                    ),
+                )
+                with self._rpc_metrics(method="aggregate3", rpcUrl=rpcUrl):
+                    results = multicall.functions.aggregate3(calls).call(
+                        block_identifier=self.block
+                    )
+                self._w3 = chain_connection
+                return [
+                    self._decode_call_result(output_types, returnData)
+                    if success and returnData
+                    else None
+                    for success, returnData in results
+                ]
+            except Exception as e:
+                logging.getLogger(__name__).debug(
+                    "    can't multicall function %s using %s rpc: %s",
+                    function_name,
+                    rpcUrl,
+                    e,
+                )
+
+        return None
+
+    @contextmanager
+    def _rpc_metrics(self, method: str, rpcUrl: str):
+        """count and time one rpc call ( endpoint label is the url host so keys in paths are not exposed)"""
+        labels = {
+            "network": self._network,
+            "method": method,
+            "endpoint": urlparse(rpcUrl).netloc,
+        }
+        _start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            METRICS.inc("rpc_calls_total", result="error", **labels)
+            raise
+        else:
+            METRICS.inc("rpc_calls_total", result="ok", **labels)
+        finally:
+            _seconds = time.perf_counter() - _start
+            METRICS.observe("rpc_call_seconds", _seconds, **labels)
+            record_rpc_call(method=method, seconds=_seconds)
+
+    def _decode_call_result(self, output_types: list[str], data: bytes):
+        """decode returned data the same way contract function calls return it"""
+        values = [
+            Web3.toChecksumAddress(value) if _type == "address" else value
+            for _type, value in zip(output_types, abi.decode(output_types, data))
+        ]
+        return values[0] if len(values) == 1 else values
+
     def get_rpcUrls(
         self, rpcKey_names: list[str] | None = None, shuffle: bool = True
     ) -> list[str]:
@@ -595,6 +789,79 @@ class web3wrap:
 
         return None
 
+    def _getCode(self, address: str, block: int | str = "latest") -> bytes | None:
+        """Get contract code at block
+
+        Args:
+            address (str): contract address
+            block (int | str, optional): block number or 'latest'. Defaults to "latest".
+
+        Returns:
+            bytes | None: code ( empty when not deployed) or None when no rpc could answer
+        """
+        # get a list of rpc urls
+        rpcUrls = self.get_rpcUrls()
+        # execute query till it works
+        for rpcUrl in rpcUrls:
+            try:
+                _w3 = self.setup_w3(network=self._network, web3Url=rpcUrl)
+                return _w3.eth.get_code(
+                    Web3.toChecksumAddress(address), block_identifier=block
+                )
+            except Exception as e:
+                logging.getLogger(__name__).debug(
+                    f" error getting code using {rpcUrl} rpc: {e}"
+                )
+                continue
+
+        return None
+
+    def find_contract_creation_block(
+        self, address: str, nearest_known_block: Callable | None = None
+    ) -> int | None:
+        """Binary search the first block where the contract has code ( needs archive rpc nodes)
+
+        Args:
+            address (str): contract address
+            nearest_known_block (Callable | None, optional): function(block, lo, hi) returning the known block
+                            nearest to block within [lo, hi) or None, used as search midpoint. Defaults to None.
+
+        Returns:
+            int | None: creation block or None when not found
+        """
+
+        def _has_code(block: int) -> bool:
+            if (code := self._getCode(address=address, block=block)) is None:
+                raise ValueError(f" No rpc could return {address} code at block {block}")
+            return len(code) > 0
+
+        try:
+            if not (latest := self._getBlockData("latest")) or not _has_code(
+                latest.number
+            ):
+                return None
+
+            # first block with code in [lo, hi]
+            lo, hi = 0, latest.number
+            while lo < hi:
+                mid = (lo + hi) // 2
+                # prefer the nearest known block as midpoint
+                if nearest_known_block and (
+                    (known := nearest_known_block(mid, lo, hi)) is not None
+                ):
+                    mid = known
+                if _has_code(mid):
+                    hi = mid
+                else:
+                    lo = mid + 1
+            return hi
+
+        except Exception as e:
+            logging.getLogger(__name__).error(
+                f" Could not find {self._network}'s {address} creation block onchain: {e}"
+            )
+            return None
+
 
 class erc20(web3wrap):
     # SETUP
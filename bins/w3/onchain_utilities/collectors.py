@@ -9,6 +9,7 @@ from web3 import Web3
 from web3.middleware import geth_poa_middleware, simple_cache_middleware
 
 from bins.configuration import CONFIGURATION
+from bins.w3 import rpc_replay_helper
 from bins.w3.onchain_utilities.basic import erc20
 from bins.w3.onchain_utilities.protocols import gamma_hypervisor
 
@@ -61,9 +62,10 @@ class data_collector:
     def setup_w3(self, network: str):
         # create Web3 helper
         self._w3 = Web3(
-            Web3.HTTPProvider(
-                CONFIGURATION["sources"]["web3Providers"][network],
-                request_kwargs={"timeout": 120},
+            rpc_replay_helper.build_provider(
+                network=network,
+                web3Url=CONFIGURATION["sources"]["web3Providers"][network],
+                timeout=120,
             )
         )
         # add simple cache module
@@ -1621,20 +1621,8 @@ class gamma_hypervisor_registry(web3wrap):
         Returns:
            gamma_hypervisor
         """
-        total_qtty = self.counter + 1  # index positions ini=0 end=counter
-        for i in range(total_qtty):
+        for hypervisor_id in self.get_hypervisors_addresses():
             try:
-                hypervisor_id, idx = self.hypeByIndex(index=i)
-
-                # filter blacklisted hypes
-                if idx == 0 or (
-                    self._network in self.__blacklist_addresses
-                    and hypervisor_id.lower()
-                    in self.__blacklist_addresses[self._network]
-                ):
-                    # hypervisor is blacklisted: loop
-                    continue
-
                 # build hypervisor
                 hypervisor = gamma_hypervisor(
                     address=hypervisor_id,
@@ -1657,37 +1645,36 @@ class gamma_hypervisor_registry(web3wrap):
         Returns:
            list of addresses
         """
-
-        total_qtty = self.counter + 1  # index positions ini=0 end=counter
-
         result = []
-        for i in range(total_qtty):
-            try:
-                hypervisor_id, idx = self.hypeByIndex(index=i)
-
-                # filter erroneous and blacklisted hypes
-                if idx == 0 or (
-                    self._network in self.__blacklist_addresses
-                    and hypervisor_id.lower()
-                    in self.__blacklist_addresses[self._network]
-                ):
-                    # hypervisor is blacklisted: loop
-                    continue
-
-                result.append(hypervisor_id)
-            except TypeError as e:
-                # hype index is out of bounds
-                logging.getLogger(__name__).debug(
-                    f" Hypervisor index used to call hypeByIndex is out of bounds for {self._network} {self.address}  error-> {e} "
-                )
-            except Exception as e:
-                # executiuon reverted:  arbitrum and mainnet have diff ways of indexing (+1 or 0)
-                logging.getLogger(__name__).warning(
-                    f" Error while retrieving addresses from registry {self._network} {self.address}  error-> {e} "
-                )
+        for index, hypervisor_id, idx in self.get_registry_entries():
+            # filter erroneous and blacklisted hypes
+            if idx == 0 or (
+                self._network in self.__blacklist_addresses
+                and hypervisor_id.lower() in self.__blacklist_addresses[self._network]
+            ):
+                # hypervisor is blacklisted: loop
+                continue
+
+            result.append(hypervisor_id)
 
         return result
 
+    def get_registry_entries(self) -> list[tuple[int, str, int]]:
+        """Retrieve all registry positions up to counter, using aggregated calls.
+            Only positions above the last one scanned ( and failed ones ) are queried on subsequent calls
+
+        Returns:
+            list[tuple[int, str, int]]: [ (registry position, hype address, index) ]
+        """
+        return [
+            (i, data[0], data[1])
+            for i, data in sorted(
+                self.call_function_indexed(
+                    function_name="hypeByIndex", counter=self.counter
+                ).items()
+            )
+        ]
+
     def apply_blacklist(self, blacklist: list[str]):
         """Save filters to be applied to the registry
 
@@ -1,4 +1,3 @@
-import contextlib
 import logging
 from web3 import Web3
 
@@ -26,6 +25,75 @@ class gamma_rewarder(web3wrap):
         """
         return {}
 
+    # Rewards timeline
+    def get_change_blocks(
+        self,
+        block_ini: int,
+        block_end: int,
+        refIds: list[int] | None = None,
+        max_blocks: int = 5000,
+    ) -> list[int]:
+        """Blocks where the rewarder emitted events that may change its rewards data ( rates, allocations, staked qtty ).
+            Rewards data at any block is the same as at the last change block before it.
+
+        Args:
+            block_ini (int): from this block (inclusive)
+            block_end (int): to this block (inclusive)
+            refIds (list[int] | None, optional): only events of these pool ids ( or not pool specific ) are considered. Defaults to None.
+            max_blocks (int, optional): maximum qtty of blocks for each log query. Defaults to 5000.
+
+        Returns:
+            list[int]: sorted blocks
+        """
+        refId_topic_positions = self._get_refId_topic_positions() if refIds else {}
+
+        result = set()
+        for event in self.get_chunked_events(
+            eventfilter={
+                "fromBlock": block_ini,
+                "toBlock": block_end,
+                "address": self._get_change_addresses(refIds=refIds),
+            },
+            max_blocks=max_blocks,
+        ):
+            if refIds and event.address.lower() == self.address.lower():
+                position = refId_topic_positions.get(event.topics[0].hex())
+                if (
+                    position is not None
+                    and int(event.topics[position].hex(), 16) not in refIds
+                ):
+                    # event of another pool
+                    continue
+            result.add(event.blockNumber)
+
+        return sorted(result)
+
+    def _get_change_addresses(self, refIds: list[int] | None = None) -> list[str]:
+        """Contract addresses emitting events that may change rewards data"""
+        return [self.address]
+
+    def _get_refId_topic_positions(self) -> dict:
+        """{ <event topic>: <topic position of its indexed pool id> }
+        Events changing allocation points ( Add, Set, LogSetPool...) are not included:
+            they change the totalAllocPoint shared by all pools, so they are kept for any pool id
+        """
+        result = {}
+        for item in self._abi:
+            if item.get("type") != "event":
+                continue
+            if any(
+                x["name"].lstrip("_").lower() == "allocpoint" for x in item["inputs"]
+            ):
+                continue
+            indexed = [x for x in item["inputs"] if x.get("indexed")]
+            for i, _input in enumerate(indexed):
+                if _input["name"] in ["pid", "_pid"]:
+                    topic = Web3.keccak(
+                        text=f'{item["name"]}({",".join(x["type"] for x in item["inputs"])})'
+                    ).hex()
+                    result[topic] = i + 1
+        return result
+
 
 # rewarders
 
@@ -605,19 +673,8 @@ class gamma_masterchef_registry(web3wrap):
         Returns:
            masterchefV2 contract
         """
-        total_qtty = self.counter + 1  # index positions ini=0 end=counter
-        for i in range(total_qtty):
+        for address in self.get_masterchef_addresses():
             try:
-                address, idx = self.hypeByIndex(index=i)
-
-                # filter blacklisted hypes
-                if idx == 0 or (
-                    self._network in self.__blacklist_addresses
-                    and address.lower() in self.__blacklist_addresses[self._network]
-                ):
-                    # hypervisor is blacklisted: loop
-                    continue
-
                 yield gamma_masterchef_v1(
                     address=address,
                     network=self._network,
@@ -636,27 +693,36 @@ class gamma_masterchef_registry(web3wrap):
         Returns:
            list of addresses
         """
-
-        total_qtty = self.counter + 1  # index positions ini=0 end=counter
-
         result = []
-        for i in range(total_qtty):
-            # executiuon reverted:  arbitrum and mainnet have diff ways of indexing (+1 or 0)
-            with contextlib.suppress(Exception):
-                address, idx = self.hypeByIndex(index=i)
-
-                # filter erroneous and blacklisted hypes
-                if idx == 0 or (
-                    self._network in self.__blacklist_addresses
-                    and address.lower() in self.__blacklist_addresses[self._network]
-                ):
-                    # hypervisor is blacklisted: loop
-                    continue
+        for index, address, idx in self.get_registry_entries():
+            # filter erroneous and blacklisted hypes
+            if idx == 0 or (
+                self._network in self.__blacklist_addresses
+                and address.lower() in self.__blacklist_addresses[self._network]
+            ):
+                # hypervisor is blacklisted: loop
+                continue
 
-                result.append(address)
+            result.append(address)
 
         return result
 
+    def get_registry_entries(self) -> list[tuple[int, str, int]]:
+        """Retrieve all registry positions up to counter, using aggregated calls.
+            Only positions above the last one scanned ( and failed ones ) are queried on subsequent calls
+
+        Returns:
+            list[tuple[int, str, int]]: [ (registry position, masterchef address, index) ]
+        """
+        return [
+            (i, data[0], data[1])
+            for i, data in sorted(
+                self.call_function_indexed(
+                    function_name="hypeByIndex", counter=self.counter
+                ).items()
+            )
+        ]
+
 
 # Zyberswap
 
@@ -1113,6 +1179,13 @@ class zyberswap_masterchef_v1(gamma_rewarder):
         """
         return self.call_function_autoRpc("zyberPerSec")
 
+    def _get_change_addresses(self, refIds: list[int] | None = None) -> list[str]:
+        """masterchef and the extra rewarder contracts of the pools"""
+        result = [self.address]
+        for pid in refIds or []:
+            result += [Web3.toChecksumAddress(x) for x in self.poolRewarders(pid)]
+        return result
+
     # get all rewards
     def get_rewards(
         self,
@@ -0,0 +1,692 @@
+import logging
+import bisect
+
+from decimal import Decimal
+from eth_abi import abi
+from hexbytes import HexBytes
+from web3 import Web3
+
+from bins.formulas import dex_formulas
+from bins.w3.onchain_utilities.exchanges import univ3_pool
+
+
+class univ3_pool_simulator:
+    """Event sourced uniswap v3 pool state.
+    Replays Initialize/Swap/Mint/Burn/Collect/SetFeeProtocol logs of a pool, keeping
+    global fee growth, initialized ticks ( feeGrowthOutside ) and positions in memory,
+    so uncollected fees and position amounts can be answered at any block without eth_calls.
+
+    Two starting points:
+        snapshot=True:   pool state is read once at the <pool> helper block. Initialized ticks are loaded
+                         from tickBitmap words as needed ( only when the price or a position moves into an unseen word ),
+                         and positions are loaded the first time they are seen.
+        snapshot=False:  <pool> helper block must be a block before pool creation. Everything is rebuilt from events
+                         and no further calls are made.
+
+    IMPORTANT: amounts returned have no decimal conversion unless inDecimal is set
+    """
+
+    topics = {
+        "initialize": "0x98636036cb66a9c19a37435efc1e90142190214e8abeb821bdba3f2990dd4c95",
+        "swap": "0xc42079f94a6350d7e6235f29174924f928cc2ac818eb64fed8004e115fbcca67",
+        "mint": "0x7a53080ba414158be7ec69b987b5fb7d07dee101fe85488f0853ae16239d0bde",
+        "burn": "0x0c396cd989a39f4459b5fa1aed6a9a8dcdbc45908acfd67e028cd568da98982c",
+        "collect": "0x70935338e69775456a85ddef226c395fb668b63fa0115f5f20610b388e6ca9c0",
+        "setFeeProtocol": "0x973d8d92bb299f4af6ce49b52a8adb85ae46b9f214c4c4fc06ac77401237b133",
+    }
+    topics_data_decoders = {
+        "initialize": ["uint160", "int24"],
+        "swap": ["int256", "int256", "uint160", "uint128", "int24"],
+        "mint": ["address", "uint128", "uint256", "uint256"],
+        "burn": ["uint128", "uint256", "uint256"],
+        "collect": ["address", "uint128", "uint128"],
+        "setFeeProtocol": ["uint8", "uint8", "uint8", "uint8"],
+    }
+
+    # SETUP
+    def __init__(self, pool: univ3_pool, snapshot: bool = True):
+        """
+
+        Args:
+            pool (univ3_pool): pool helper. Its block is the simulation starting point
+            snapshot (bool, optional): load starting state from chain ( else, replay from pool creation ). Defaults to True.
+        """
+        self._pool = pool
+        self._snapshot = snapshot
+        self._topics_reversed = {v: k for k, v in self.topics.items()}
+
+        self.block = pool.block
+
+        # immutables
+        self.fee = pool.fee
+        self.tickSpacing = pool.tickSpacing
+        self._decimals_token0 = None
+        self._decimals_token1 = None
+
+        # state
+        self.sqrtPriceX96 = 0
+        self.tick = 0
+        self.feeProtocol = 0
+        self.liquidity = 0
+        self.feeGrowthGlobal0X128 = 0
+        self.feeGrowthGlobal1X128 = 0
+        self.protocolFees = [0, 0]
+
+        # { tick: {liquidityGross, liquidityNet, feeGrowthOutside0X128, feeGrowthOutside1X128} }
+        self._ticks = {}
+        # sorted list of initialized ticks
+        self._initialized_ticks = []
+        # tickBitmap words already loaded from chain
+        self._loaded_words = set()
+        # { (owner, tickLower, tickUpper): {liquidity, feeGrowthInside0LastX128, ... tokensOwed1} }
+        self._positions = {}
+
+        if snapshot:
+            self._load_snapshot()
+
+    def _load_snapshot(self):
+        slot0 = self._pool.slot0
+        self.sqrtPriceX96 = slot0["sqrtPriceX96"]
+        self.tick = slot0["tick"]
+        self.feeProtocol = slot0["feeProtocol"]
+        self.liquidity = self._pool.liquidity
+        self.feeGrowthGlobal0X128 = self._pool.feeGrowthGlobal0X128
+        self.feeGrowthGlobal1X128 = self._pool.feeGrowthGlobal1X128
+
+        # load the word of the current tick
+        self._load_words(
+            words=[self._word_position(self.tick)], block=self.block
+        )
+
+    # PROPERTIES
+    @property
+    def address(self) -> str:
+        return self._pool.address
+
+    @property
+    def network(self) -> str:
+        return self._pool._network
+
+    @property
+    def decimals_token0(self) -> int:
+        if self._decimals_token0 is None:
+            self._decimals_token0 = self._pool.token0.decimals
+        return self._decimals_token0
+
+    @property
+    def decimals_token1(self) -> int:
+        if self._decimals_token1 is None:
+            self._decimals_token1 = self._pool.token1.decimals
+        return self._decimals_token1
+
+    # PUBLIC
+    def track_position(self, ownerAddress: str, tickLower: int, tickUpper: int):
+        """Make sure a position ( and its ticks ) is known by the simulator at its current block.
+            Only needed in snapshot mode, for positions not yet touched by any replayed event
+
+        Args:
+            ownerAddress (str):
+            tickLower (int):
+            tickUpper (int):
+        """
+        self._get_position(
+            owner=ownerAddress, tickLower=tickLower, tickUpper=tickUpper, block=self.block
+        )
+
+    def replay(self, block_end: int, max_blocks: int = 2000):
+        """Process all pool events from current simulator block +1 to block_end ( inclusive )
+
+        Args:
+            block_end (int):
+            max_blocks (int, optional): maximum qtty of blocks for each log query. Defaults to 2000.
+        """
+        for event in self._events_generator(block_end=block_end, max_blocks=max_blocks):
+            self.process_event(event)
+        self.block = block_end
+
+    def states_generator(self, blocks: list[int], max_blocks: int = 2000):
+        """Replay events yielding the simulator each time a block of the list is reached
+            ( the state at a block includes all its events, same as an eth_call at that block )
+
+        Args:
+            blocks (list[int]): blocks to stop at
+            max_blocks (int, optional): maximum qtty of blocks for each log query. Defaults to 2000.
+
+        Yields:
+            univ3_pool_simulator: self, with .block set to the reached block
+        """
+        blocks = sorted(x for x in set(blocks) if x >= self.block)
+        if not blocks:
+            return
+
+        idx = 0
+        for event in self._events_generator(block_end=blocks[-1], max_blocks=max_blocks):
+            # yield every block reached before this event
+            while idx < len(blocks) and blocks[idx] < event.blockNumber:
+                self.block = blocks[idx]
+                yield self
+                idx += 1
+            self.process_event(event)
+
+        # remaining blocks
+        while idx < len(blocks):
+            self.block = blocks[idx]
+            yield self
+            idx += 1
+
+    def process_event(self, event):
+        """Apply a raw pool log to the state
+
+        Args:
+            event: web3 log entry ( from eth.filter(..).get_all_entries() )
+        """
+        topic = self._topics_reversed.get(HexBytes(event.topics[0]).hex())
+        if topic is None:
+            return
+
+        data = abi.decode(self.topics_data_decoders[topic], HexBytes(event.data))
+        block = event.blockNumber
+
+        if topic == "swap":
+            self._swap(
+                amount0=data[0],
+                amount1=data[1],
+                sqrtPriceX96=data[2],
+                liquidity=data[3],
+                tick=data[4],
+                block=block,
+            )
+        elif topic == "mint":
+            self._modify_position(
+                owner=self._topic_to_address(event.topics[1]),
+                tickLower=self._topic_to_int(event.topics[2]),
+                tickUpper=self._topic_to_int(event.topics[3]),
+                liquidityDelta=data[1],
+                block=block,
+            )
+        elif topic == "burn":
+            position = self._modify_position(
+                owner=self._topic_to_address(event.topics[1]),
+                tickLower=self._topic_to_int(event.topics[2]),
+                tickUpper=self._topic_to_int(event.topics[3]),
+                liquidityDelta=-data[0],
+                block=block,
+            )
+            position["tokensOwed0"] += data[1]
+            position["tokensOwed1"] += data[2]
+        elif topic == "collect":
+            position = self._get_position(
+                owner=self._topic_to_address(event.topics[1]),
+                tickLower=self._topic_to_int(event.topics[2]),
+                tickUpper=self._topic_to_int(event.topics[3]),
+                block=block,
+            )
+            position["tokensOwed0"] -= data[1]
+            position["tokensOwed1"] -= data[2]
+        elif topic == "initialize":
+            self.sqrtPriceX96 = data[0]
+            self.tick = data[1]
+        elif topic == "setFeeProtocol":
+            self.feeProtocol = data[2] + (data[3] << 4)
+
+    def position(self, ownerAddress: str, tickLower: int, tickUpper: int) -> dict:
+        """same as univ3_pool.position
+
+        Returns:
+           dict:   liquidity, feeGrowthInside0LastX128, feeGrowthInside1LastX128, tokensOwed0, tokensOwed1
+        """
+        return self._get_position(
+            owner=ownerAddress, tickLower=tickLower, tickUpper=tickUpper, block=self.block
+        ).copy()
+
+    def ticks(self, tick: int) -> dict:
+        """same as univ3_pool.ticks ( only fee and liquidity related fields )"""
+        self._load_words(words=[self._word_position(tick)], block=self.block)
+        return self._ticks.get(tick, self._empty_tick()).copy()
+
+    def get_qtty_depoloyed(
+        self, ownerAddress: str, tickUpper: int, tickLower: int, inDecimal: bool = True
+    ) -> dict:
+        """Quantity of tokens currently deployed ( same result as univ3_pool.get_qtty_depoloyed )
+
+        Returns:
+           dict: { "qtty_token0", "qtty_token1", "fees_owed_token0", "fees_owed_token1" }
+        """
+        pos = self.position(
+            ownerAddress=ownerAddress, tickLower=tickLower, tickUpper=tickUpper
+        )
+        result = {}
+        (
+            result["qtty_token0"],
+            result["qtty_token1"],
+        ) = dex_formulas.LiquidityAmounts.getAmountsForLiquidity(
+            self.sqrtPriceX96,
+            dex_formulas.TickMath.getSqrtRatioAtTick(tickLower),
+            dex_formulas.TickMath.getSqrtRatioAtTick(tickUpper),
+            pos["liquidity"],
+        )
+        result["fees_owed_token0"] = pos["tokensOwed0"]
+        result["fees_owed_token1"] = pos["tokensOwed1"]
+
+        if inDecimal:
+            for key in result:
+                decimals = (
+                    self.decimals_token0 if key.endswith("0") else self.decimals_token1
+                )
+                result[key] = Decimal(result[key]) / Decimal(10**decimals)
+
+        return result
+
+    def get_fees_uncollected(
+        self, ownerAddress: str, tickUpper: int, tickLower: int, inDecimal: bool = True
+    ) -> dict:
+        """Fees not collected nor yet owed to the position ( same result as univ3_pool.get_fees_uncollected )
+
+        Returns:
+            dict: { "qtty_token0", "qtty_token1" }
+        """
+        pos = self.position(
+            ownerAddress=ownerAddress, tickLower=tickLower, tickUpper=tickUpper
+        )
+        ticks_lower = self.ticks(tickLower)
+        ticks_upper = self.ticks(tickUpper)
+
+        result = {}
+        (
+            result["qtty_token0"],
+            result["qtty_token1"],
+        ) = dex_formulas.get_uncollected_fees_vGammawire(
+            fee_growth_global_0=self.feeGrowthGlobal0X128,
+            fee_growth_global_1=self.feeGrowthGlobal1X128,
+            tick_current=self.tick,
+            tick_lower=tickLower,
+            tick_upper=tickUpper,
+            fee_growth_outside_0_lower=ticks_lower["feeGrowthOutside0X128"],
+            fee_growth_outside_1_lower=ticks_lower["feeGrowthOutside1X128"],
+            fee_growth_outside_0_upper=ticks_upper["feeGrowthOutside0X128"],
+            fee_growth_outside_1_upper=ticks_upper["feeGrowthOutside1X128"],
+            liquidity=pos["liquidity"],
+            fee_growth_inside_last_0=pos["feeGrowthInside0LastX128"],
+            fee_growth_inside_last_1=pos["feeGrowthInside1LastX128"],
+        )
+
+        if inDecimal:
+            result["qtty_token0"] = Decimal(result["qtty_token0"]) / Decimal(
+                10**self.decimals_token0
+            )
+            result["qtty_token1"] = Decimal(result["qtty_token1"]) / Decimal(
+                10**self.decimals_token1
+            )
+
+        return result
+
+    def get_total_amounts(
+        self,
+        ownerAddress: str,
+        positions: list[tuple[int, int]],
+        balance_token0: int = 0,
+        balance_token1: int = 0,
+    ) -> dict:
+        """gamma hypervisor getTotalAmounts equivalent:  idle balances + ( liquidity amounts + tokens owed ) of each position
+
+        Args:
+            ownerAddress (str): hypervisor address
+            positions (list[tuple[int, int]]): [(baseLower, baseUpper), (limitLower, limitUpper)]
+            balance_token0 (int, optional): hypervisor token0 balance. Defaults to 0.
+            balance_token1 (int, optional): hypervisor token1 balance. Defaults to 0.
+
+        Returns:
+            dict: { "total0", "total1" }  (no decimal conversion)
+        """
+        total0 = balance_token0
+        total1 = balance_token1
+        for tickLower, tickUpper in positions:
+            deployed = self.get_qtty_depoloyed(
+                ownerAddress=ownerAddress,
+                tickUpper=tickUpper,
+                tickLower=tickLower,
+                inDecimal=False,
+            )
+            total0 += deployed["qtty_token0"] + deployed["fees_owed_token0"]
+            total1 += deployed["qtty_token1"] + deployed["fees_owed_token1"]
+
+        return {"total0": total0, "total1": total1}
+
+    # STATE TRANSITIONS
+    def _swap(
+        self,
+        amount0: int,
+        amount1: int,
+        sqrtPriceX96: int,
+        liquidity: int,
+        tick: int,
+        block: int,
+    ):
+        """Walk the swap step by step ( same steps as the pool contract ) to distribute fees"""
+        zeroForOne = amount0 > 0
+        amount_in = amount0 if zeroForOne else amount1
+        feeProtocol = self.feeProtocol % 16 if zeroForOne else self.feeProtocol >> 4
+
+        consumed = 0
+        current_liquidity = self.liquidity
+        current_sqrtPrice = self.sqrtPriceX96
+        current_tick = self.tick
+
+        # safety net against inconsistent states
+        max_steps = 10000
+        while (current_sqrtPrice != sqrtPriceX96 or current_tick != tick) and max_steps:
+            max_steps -= 1
+
+            tickNext, initialized = self._next_initialized_tick_within_one_word(
+                tick=current_tick, lte=zeroForOne, block=block
+            )
+            tickNext = max(
+                dex_formulas.TickMath.MIN_TICK,
+                min(tickNext, dex_formulas.TickMath.MAX_TICK),
+            )
+            sqrtPriceNext = dex_formulas.TickMath.getSqrtRatioAtTick(tickNext)
+            sqrtPriceTarget = (
+                max(sqrtPriceNext, sqrtPriceX96)
+                if zeroForOne
+                else min(sqrtPriceNext, sqrtPriceX96)
+            )
+
+            if zeroForOne:
+                step_in = dex_formulas.SqrtPriceMath.getAmount0Delta(
+                    sqrtPriceTarget, current_sqrtPrice, current_liquidity, True
+                )
+            else:
+                step_in = dex_formulas.SqrtPriceMath.getAmount1Delta(
+                    current_sqrtPrice, sqrtPriceTarget, current_liquidity, True
+                )
+
+            if sqrtPriceTarget == sqrtPriceNext:
+                step_fee = dex_formulas.mulDivRoundingUp(
+                    step_in, self.fee, 1000000 - self.fee
+                )
+            else:
+                # last step: whatever is left of the input is fee
+                step_fee = amount_in - consumed - step_in
+                if step_fee < 0:
+                    logging.getLogger(__name__).debug(
+                        f" negative swap fee remainder {step_fee} at block {block} for pool {self.address}. Using zero"
+                    )
+                    step_fee = 0
+
+            consumed += step_in + step_fee
+            self._accrue_fee(
+                fee_amount=step_fee,
+                liquidity=current_liquidity,
+                zeroForOne=zeroForOne,
+                feeProtocol=feeProtocol,
+            )
+
+            if sqrtPriceTarget == sqrtPriceNext:
+                if initialized:
+                    liquidityNet = self._cross(tickNext)
+                    current_liquidity += -liquidityNet if zeroForOne else liquidityNet
+                current_tick = tickNext - 1 if zeroForOne else tickNext
+            else:
+                current_tick = tick
+            current_sqrtPrice = sqrtPriceTarget
+
+        if not max_steps:
+            logging.getLogger(__name__).error(
+                f" swap at block {block} could not be replayed for pool {self.address}. State may be inconsistent from now on"
+            )
+        if current_liquidity != liquidity:
+            logging.getLogger(__name__).debug(
+                f" replayed liquidity {current_liquidity} differs from swap event liquidity {liquidity} at block {block} for pool {self.address}"
+            )
+
+        # event values are authoritative
+        self.sqrtPriceX96 = sqrtPriceX96
+        self.tick = tick
+        self.liquidity = liquidity
+
+    def _accrue_fee(
+        self, fee_amount: int, liquidity: int, zeroForOne: bool, feeProtocol: int
+    ):
+        if feeProtocol > 0:
+            delta = fee_amount // feeProtocol
+            fee_amount -= delta
+            self.protocolFees[0 if zeroForOne else 1] += delta
+
+        if liquidity > 0:
+            growth = dex_formulas.mulDiv(fee_amount, dex_formulas.X128, liquidity)
+            if zeroForOne:
+                self.feeGrowthGlobal0X128 = (
+                    self.feeGrowthGlobal0X128 + growth
+                ) % dex_formulas.X256
+            else:
+                self.feeGrowthGlobal1X128 = (
+                    self.feeGrowthGlobal1X128 + growth
+                ) % dex_formulas.X256
+
+    def _cross(self, tick: int) -> int:
+        info = self._ticks[tick]
+        info["feeGrowthOutside0X128"] = dex_formulas.subIn256(
+            self.feeGrowthGlobal0X128, info["feeGrowthOutside0X128"]
+        )
+        info["feeGrowthOutside1X128"] = dex_formulas.subIn256(
+            self.feeGrowthGlobal1X128, info["feeGrowthOutside1X128"]
+        )
+        return info["liquidityNet"]
+
+    def _modify_position(
+        self,
+        owner: str,
+        tickLower: int,
+        tickUpper: int,
+        liquidityDelta: int,
+        block: int,
+    ) -> dict:
+        position = self._get_position(
+            owner=owner, tickLower=tickLower, tickUpper=tickUpper, block=block
+        )
+
+        flippedLower = flippedUpper = False
+        if liquidityDelta != 0:
+            flippedLower = self._update_tick(tickLower, liquidityDelta, upper=False)
+            flippedUpper = self._update_tick(tickUpper, liquidityDelta, upper=True)
+
+        inside0, inside1 = self._get_fee_growth_inside(tickLower, tickUpper)
+
+        # position.update
+        position["tokensOwed0"] += dex_formulas.mulDiv(
+            dex_formulas.subIn256(inside0, position["feeGrowthInside0LastX128"]),
+            position["liquidity"],
+            dex_formulas.X128,
+        )
+        position["tokensOwed1"] += dex_formulas.mulDiv(
+            dex_formulas.subIn256(inside1, position["feeGrowthInside1LastX128"]),
+            position["liquidity"],
+            dex_formulas.X128,
+        )
+        position["liquidity"] += liquidityDelta
+        position["feeGrowthInside0LastX128"] = inside0
+        position["feeGrowthInside1LastX128"] = inside1
+
+        # clear ticks no longer needed
+        if liquidityDelta < 0:
+            if flippedLower:
+                self._clear_tick(tickLower)
+            if flippedUpper:
+                self._clear_tick(tickUpper)
+
+        # active liquidity
+        if tickLower <= self.tick < tickUpper:
+            self.liquidity += liquidityDelta
+
+        return position
+
+    def _update_tick(self, tick: int, liquidityDelta: int, upper: bool) -> bool:
+        info = self._ticks.get(tick) or self._empty_tick()
+
+        liquidityGrossBefore = info["liquidityGross"]
+        liquidityGrossAfter = liquidityGrossBefore + liquidityDelta
+
+        if liquidityGrossBefore == 0:
+            # by convention, all growth before a tick was initialized happened below it
+            if tick <= self.tick:
+                info["feeGrowthOutside0X128"] = self.feeGrowthGlobal0X128
+                info["feeGrowthOutside1X128"] = self.feeGrowthGlobal1X128
+            bisect.insort(self._initialized_ticks, tick)
+
+        info["liquidityGross"] = liquidityGrossAfter
+        info["liquidityNet"] += -liquidityDelta if upper else liquidityDelta
+        self._ticks[tick] = info
+
+        return (liquidityGrossAfter == 0) != (liquidityGrossBefore == 0)
+
+    def _clear_tick(self, tick: int):
+        self._ticks.pop(tick, None)
+        idx = bisect.bisect_left(self._initialized_ticks, tick)
+        if idx < len(self._initialized_ticks) and self._initialized_ticks[idx] == tick:
+            self._initialized_ticks.pop(idx)
+
+    def _get_fee_growth_inside(self, tickLower: int, tickUpper: int) -> tuple[int, int]:
+        lower = self._ticks.get(tickLower) or self._empty_tick()
+        upper = self._ticks.get(tickUpper) or self._empty_tick()
+
+        result = []
+        for global_growth, key in (
+            (self.feeGrowthGlobal0X128, "feeGrowthOutside0X128"),
+            (self.feeGrowthGlobal1X128, "feeGrowthOutside1X128"),
+        ):
+            below = (
+                lower[key]
+                if self.tick >= tickLower
+                else dex_formulas.subIn256(global_growth, lower[key])
+            )
+            above = (
+                upper[key]
+                if self.tick < tickUpper
+                else dex_formulas.subIn256(global_growth, upper[key])
+            )
+            result.append(
+                dex_formulas.subIn256(dex_formulas.subIn256(global_growth, below), above)
+            )
+
+        return result[0], result[1]
+
+    # HELPERS
+    def _events_generator(self, block_end: int, max_blocks: int):
+        if block_end <= self.block:
+            return
+        yield from self._pool.get_chunked_events(
+            eventfilter={
+                "fromBlock": self.block + 1,
+                "toBlock": block_end,
+                "address": self.address,
+                "topics": [list(self.topics.values())],
+            },
+            max_blocks=max_blocks,
+        )
+
+    def _next_initialized_tick_within_one_word(
+        self, tick: int, lte: bool, block: int
+    ) -> tuple[int, bool]:
+        """same as TickBitmap.nextInitializedTickWithinOneWord, using the in-memory initialized tick list"""
+        compressed = tick // self.tickSpacing
+
+        if lte:
+            word_start = ((compressed >> 8) << 8) * self.tickSpacing
+            self._load_words(words=[compressed >> 8], block=block)
+            idx = (
+                bisect.bisect_right(self._initialized_ticks, compressed * self.tickSpacing)
+                - 1
+            )
+            if idx >= 0 and self._initialized_ticks[idx] >= word_start:
+                return self._initialized_ticks[idx], True
+            return word_start, False
+
+        compressed += 1
+        word_end = (((compressed >> 8) << 8) + 255) * self.tickSpacing
+        self._load_words(words=[compressed >> 8], block=block)
+        idx = bisect.bisect_left(self._initialized_ticks, compressed * self.tickSpacing)
+        if (
+            idx < len(self._initialized_ticks)
+            and self._initialized_ticks[idx] <= word_end
+        ):
+            return self._initialized_ticks[idx], True
+        return word_end, False
+
+    def _word_position(self, tick: int) -> int:
+        return (tick // self.tickSpacing) >> 8
+
+    def _load_words(self, words: list[int], block: int):
+        """Load initialized ticks of tickBitmap words from chain, state before <block> ( snapshot mode only )"""
+        if not self._snapshot:
+            return
+
+        for word in words:
+            if word in self._loaded_words:
+                continue
+            self._loaded_words.add(word)
+
+            self._pool.block = self._chain_block(block)
+            bitmap = self._pool.tickBitmap(word)
+            for bit in range(256):
+                if not (bitmap >> bit) & 1:
+                    continue
+                tick = ((word << 8) + bit) * self.tickSpacing
+                if tick in self._ticks:
+                    # already modified by replayed events
+                    continue
+                info = self._pool.ticks(tick)
+                self._ticks[tick] = {
+                    "liquidityGross": info["liquidityGross"],
+                    "liquidityNet": info["liquidityNet"],
+                    "feeGrowthOutside0X128": info["feeGrowthOutside0X128"],
+                    "feeGrowthOutside1X128": info["feeGrowthOutside1X128"],
+                }
+                bisect.insort(self._initialized_ticks, tick)
+
+    def _get_position(
+        self, owner: str, tickLower: int, tickUpper: int, block: int
+    ) -> dict:
+        key = (owner.lower(), tickLower, tickUpper)
+        if key not in self._positions:
+            # make sure ticks are known before touching the position
+            self._load_words(
+                words=[self._word_position(tickLower), self._word_position(tickUpper)],
+                block=block,
+            )
+            if self._snapshot:
+                self._pool.block = self._chain_block(block)
+                self._positions[key] = self._pool.position(
+                    ownerAddress=Web3.toChecksumAddress(owner.lower()),
+                    tickLower=tickLower,
+                    tickUpper=tickUpper,
+                )
+            else:
+                self._positions[key] = {
+                    "liquidity": 0,
+                    "feeGrowthInside0LastX128": 0,
+                    "feeGrowthInside1LastX128": 0,
+                    "tokensOwed0": 0,
+                    "tokensOwed1": 0,
+                }
+        return self._positions[key]
+
+    def _chain_block(self, block: int) -> int:
+        """block to query chain state at:  simulator block itself or the one before an event being replayed"""
+        return block if block <= self.block else block - 1
+
+    @staticmethod
+    def _empty_tick() -> dict:
+        return {
+            "liquidityGross": 0,
+            "liquidityNet": 0,
+            "feeGrowthOutside0X128": 0,
+            "feeGrowthOutside1X128": 0,
+        }
+
+    @staticmethod
+    def _topic_to_int(topic) -> int:
+        return int.from_bytes(HexBytes(topic), "big", signed=True)
+
+    @staticmethod
+    def _topic_to_address(topic) -> str:
+        return "0x" + HexBytes(topic)[-20:].hex().removeprefix("0x")
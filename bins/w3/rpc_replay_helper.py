@@ -0,0 +1,267 @@
+### Record / replay ######################
+#   record: JSON-RPC ( and http_client json ) responses are saved to fixture files while talking to the real endpoints
+#   replay: the same calls are answered from the fixture files, with optional latency injection, so
+#           on-chain code can be benchmarked offline and reproducibly
+import json
+import logging
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from web3 import Web3
+from web3.providers import BaseProvider
+
+from bins.general.http_utilities import HTTP_CLIENT
+
+
+class rpc_fixture:
+    def __init__(
+        self,
+        folder: str,
+        name: str,
+        latency: float = 0,
+        latency_jitter: float = 0,
+    ):
+        """JSON-RPC responses saved in <folder>/<name>.json keyed by method and params
+
+        Args:
+            folder (str): fixtures folder
+            name (str): fixture name ( network name or "http")
+            latency (float, optional): seconds added to each replayed call. Defaults to 0.
+            latency_jitter (float, optional): random seconds ( 0 to jitter) added to each replayed call. Defaults to 0.
+        """
+        self.filename = os.path.join(folder, f"{name}.json")
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+        self._responses = {}
+        if os.path.exists(self.filename):
+            with open(self.filename, "r", encoding="utf8") as f:
+                self._responses = json.load(f)
+
+    @staticmethod
+    def key(method: str, params) -> str:
+        return f"{method}:{json.dumps(params, sort_keys=True, default=str)}"
+
+    def get(self, method: str, params) -> dict | None:
+        """recorded response or None"""
+        response = self._responses.get(self.key(method, params))
+        with self.lock:
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if response is None:
+            logging.getLogger(__name__).debug(
+                f" {method} call not found in {self.filename} fixture"
+            )
+        return response
+
+    def set(self, method: str, params, response: dict):
+        with self.lock:
+            self._responses[self.key(method, params)] = response
+
+    def wait(self):
+        """injected latency"""
+        if seconds := self.latency + random.uniform(0, self.latency_jitter):
+            time.sleep(seconds)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.filename) or ".", exist_ok=True)
+        with self.lock:
+            with open(self.filename, "w", encoding="utf8") as f:
+                json.dump(self._responses, f, sort_keys=True)
+
+    def __len__(self) -> int:
+        return len(self._responses)
+
+
+def _not_recorded(method: str, request_id=0) -> dict:
+    return {
+        "jsonrpc": "2.0",
+        "id": request_id,
+        "error": {"code": -32000, "message": f"{method} call not recorded"},
+    }
+
+
+class recording_provider(Web3.HTTPProvider):
+    """http provider saving every response to a fixture"""
+
+    def __init__(self, endpoint_uri: str, fixture: rpc_fixture, **kwargs):
+        super().__init__(endpoint_uri, **kwargs)
+        self.fixture = fixture
+
+    def make_request(self, method, params):
+        response = super().make_request(method, params)
+        self.fixture.set(method, params, response)
+        return response
+
+
+class replay_provider(BaseProvider):
+    """provider answering from a fixture ( not recorded calls return a JSON-RPC error)"""
+
+    def __init__(self, fixture: rpc_fixture):
+        self.fixture = fixture
+
+    def make_request(self, method, params):
+        self.fixture.wait()
+        return self.fixture.get(method, params) or _not_recorded(method)
+
+    def isConnected(self) -> bool:
+        return True
+
+
+# REPLAY CONFIGURATION
+REPLAY = {
+    "mode": None,  # None, "record" or "replay"
+    "folder": os.path.join("tests", "fixtures", "rpc"),
+    "latency": 0,
+    "latency_jitter": 0,
+}
+_FIXTURES = {}  # {<network>: rpc_fixture}
+_FIXTURES_LOCK = threading.Lock()
+
+
+def configure_replay(
+    mode: str | None,
+    folder: str | None = None,
+    latency: float = 0,
+    latency_jitter: float = 0,
+):
+    """set the record/replay mode of web3 providers and the http client
+
+    Args:
+        mode (str | None): None ( real endpoints ), "record" or "replay"
+        folder (str | None, optional): fixtures folder. Defaults to tests/fixtures/rpc.
+        latency (float, optional): seconds added to each replayed call. Defaults to 0.
+        latency_jitter (float, optional): random seconds added to each replayed call. Defaults to 0.
+    """
+    if mode not in [None, "record", "replay"]:
+        raise ValueError(f" Unknown replay mode {mode}")
+
+    with _FIXTURES_LOCK:
+        REPLAY["mode"] = mode
+        REPLAY["folder"] = folder or REPLAY["folder"]
+        REPLAY["latency"] = latency
+        REPLAY["latency_jitter"] = latency_jitter
+        _FIXTURES.clear()
+
+    # json apis ( thegraph, geckoterminal ... )
+    HTTP_CLIENT.fixture = get_fixture("http") if mode else None
+    HTTP_CLIENT.replay = mode == "replay"
+
+
+def get_fixture(name: str) -> rpc_fixture:
+    with _FIXTURES_LOCK:
+        if name not in _FIXTURES:
+            _FIXTURES[name] = rpc_fixture(
+                folder=REPLAY["folder"],
+                name=name,
+                latency=REPLAY["latency"],
+                latency_jitter=REPLAY["latency_jitter"],
+            )
+        return _FIXTURES[name]
+
+
+def get_fixtures() -> dict[str, rpc_fixture]:
+    """fixtures in use {<name>: rpc_fixture}"""
+    with _FIXTURES_LOCK:
+        return dict(_FIXTURES)
+
+
+def save_fixtures():
+    """save recorded fixtures to disk"""
+    for fixture in get_fixtures().values():
+        fixture.save()
+        logging.getLogger(__name__).info(
+            f" {len(fixture)} responses saved to {fixture.filename}"
+        )
+
+
+def build_provider(network: str, web3Url: str, timeout: int = 60) -> BaseProvider:
+    """web3 provider of the network depending on the configured replay mode
+
+    Args:
+        network (str):
+        web3Url (str):
+        timeout (int, optional): seconds. Defaults to 60.
+
+    Returns:
+        BaseProvider:
+    """
+    if REPLAY["mode"] == "replay":
+        return replay_provider(fixture=get_fixture(network))
+    if REPLAY["mode"] == "record":
+        return recording_provider(
+            web3Url,
+            fixture=get_fixture(network),
+            request_kwargs={"timeout": timeout},
+        )
+    return Web3.HTTPProvider(web3Url, request_kwargs={"timeout": timeout})
+
+
+def start_replay_server(
+    network: str,
+    port: int,
+    host: str = "127.0.0.1",
+    upstream: str | None = None,
+) -> ThreadingHTTPServer:
+    """JSON-RPC server answering from the network fixture in a background thread.
+        When upstream is set, calls are forwarded and recorded ( recording proxy ).
+        Point the w3Providers configuration at http://<host>:<port> to use it from other processes.
+
+    Args:
+        network (str): fixture name
+        port (int):
+        host (str, optional): . Defaults to "127.0.0.1".
+        upstream (str | None, optional): real JSON-RPC url. Defaults to None.
+
+    Returns:
+        ThreadingHTTPServer: call save_fixtures() after shutdown to keep recordings
+    """
+    fixture = get_fixture(network)
+    session = requests.Session()
+
+    def _answer(call: dict) -> dict:
+        method, params = call.get("method"), call.get("params", [])
+        if upstream:
+            response = session.post(upstream, json=call, timeout=60).json()
+            fixture.set(method, params, response)
+        else:
+            fixture.wait()
+            response = fixture.get(method, params) or _not_recorded(method)
+        return {**response, "id": call.get("id", 0)}
+
+    class _handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            result = (
+                [_answer(call) for call in body]
+                if isinstance(body, list)
+                else _answer(body)
+            )
+            data = json.dumps(result).encode("utf8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), _handler)
+    threading.Thread(
+        target=server.serve_forever, name=f"rpc_replay_{network}", daemon=True
+    ).start()
+    logging.getLogger(__name__).info(
+        f" {'Recording' if upstream else 'Replaying'} {network} JSON-RPC at http://{host}:{server.server_address[1]}"
+    )
+    return server
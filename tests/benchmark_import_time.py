@@ -0,0 +1,160 @@
+import sys
+import os
+import logging
+import subprocess
+from pathlib import Path
+
+# append parent directory pth
+CURRENT_FOLDER = os.path.dirname(os.path.realpath(__file__))
+PARENT_FOLDER = os.path.dirname(CURRENT_FOLDER)
+sys.path.append(PARENT_FOLDER)
+
+# this script does not import bins.configuration: it parses the command line at import time,
+# and its import time is what is being measured ( in a subprocess )
+
+# modules the startup ( configuration and command line parsing) must not import
+HEAVY_MODULES = [
+    "web3",
+    "pymongo",
+    "tqdm",
+    "pycoingecko",
+    "polars",
+    "apps",
+    "bins.apis.thegraph_utilities",
+]
+# maximum seconds importing tool_me ( startup ) and each command module
+STARTUP_BUDGET = 1.0
+COMMAND_BUDGETS = {
+    "db_feed": 5.0,
+    "service": 5.0,
+    "check": 5.0,
+    "analysis": 5.0,
+}
+
+
+def import_time(code: str, argv: list[str]) -> dict:
+    """execute code in a new interpreter using -X importtime
+
+    Args:
+        code (str): python code to execute
+        argv (list[str]): sys.argv of the subprocess ( bins.configuration parses it at import)
+
+    Returns:
+        dict: {"seconds": total import seconds, "modules": {<module>: cumulative seconds} }
+    """
+    process = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            f"import sys; sys.argv = {argv!r}; {code}",
+        ],
+        cwd=PARENT_FOLDER,
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f" {code} failed: {process.stderr[-2000:]}")
+
+    # import time: self [us] | cumulative | imported package
+    modules = {}
+    seconds = 0
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _self, cumulative, name = line[len("import time:") :].split("|")
+        modules[name.strip()] = int(cumulative) / 1_000_000
+        # top level imports include their children ( nested ones are indented)
+        if not name[1:].startswith(" "):
+            seconds += int(cumulative) / 1_000_000
+
+    return {"seconds": seconds, "modules": modules}
+
+
+def check_startup(argv: list[str]) -> list[str]:
+    """import tool_me ( without executing any command ) and return problems found"""
+    result = import_time(code="import tool_me", argv=argv)
+    problems = [
+        f" startup imports {module}"
+        for module in HEAVY_MODULES
+        if module in result["modules"]
+    ]
+    if result["seconds"] > STARTUP_BUDGET:
+        problems.append(
+            f" startup took {result['seconds']:.3f} seconds ( budget {STARTUP_BUDGET})"
+        )
+
+    logging.getLogger(__name__).info(
+        f" startup: {result['seconds']:.3f} seconds {len(result['modules'])} modules"
+    )
+    _log_slowest(result)
+    return problems
+
+
+def check_command(name: str, argv: list[str]) -> list[str]:
+    """import tool_me and the command module and return problems found"""
+    result = import_time(
+        code=f"import tool_me; tool_me.load_command({name!r})", argv=argv
+    )
+    problems = []
+    if result["seconds"] > COMMAND_BUDGETS[name]:
+        problems.append(
+            f" {name} command took {result['seconds']:.3f} seconds ( budget {COMMAND_BUDGETS[name]})"
+        )
+
+    logging.getLogger(__name__).info(
+        f" {name} command: {result['seconds']:.3f} seconds {len(result['modules'])} modules"
+    )
+    _log_slowest(result)
+    return problems
+
+
+def _log_slowest(result: dict, top: int = 10):
+    for module, seconds in sorted(
+        result["modules"].items(), key=lambda x: x[1], reverse=True
+    )[:top]:
+        logging.getLogger(__name__).debug(f"     {seconds:>8.3f}s  {module}")
+
+
+def run_checks(config: str | None = None) -> list[str]:
+    """measure startup and command import times
+
+    Args:
+        config (str | None, optional): configuration file. Defaults to config.yaml.
+
+    Returns:
+        list[str]: problems found ( empty when all checks pass)
+    """
+    base_argv = ["tool_me.py"] + (["--config", config] if config else [])
+    problems = check_startup(argv=base_argv + ["--check", "prices"])
+    for name, argv in [
+        ("db_feed", ["--db_feed", "operations"]),
+        ("service", ["--service", "local"]),
+        ("check", ["--check", "prices"]),
+        ("analysis", ["--analysis", "ethereum"]),
+    ]:
+        problems += check_command(name=name, argv=base_argv + argv)
+
+    for problem in problems:
+        logging.getLogger(__name__).error(problem)
+    return problems
+
+
+# START ####################################################################################################################
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    ##### main ######
+    __module_name = Path(os.path.abspath(__file__)).stem
+    logging.getLogger(__name__).info(
+        f" Start {__module_name}   ----------------------> "
+    )
+
+    # exit code 1 when a regression is found ( usable in ci )
+    _problems = run_checks(config=sys.argv[1] if len(sys.argv) > 1 else None)
+
+    logging.getLogger(__name__).info(
+        f" Exit {__module_name}    <----------------------"
+    )
+    sys.exit(1 if _problems else 0)
@@ -0,0 +1,218 @@
+import sys
+import os
+import logging
+import statistics
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+# append parent directory pth
+CURRENT_FOLDER = os.path.dirname(os.path.realpath(__file__))
+PARENT_FOLDER = os.path.dirname(CURRENT_FOLDER)
+sys.path.append(PARENT_FOLDER)
+
+from bins.configuration import CONFIGURATION, STATIC_REGISTRY_ADDRESSES
+from bins.general import general_utilities
+from bins.general.metrics_utilities import rpc_accounting
+from bins.mixed.price_utilities import price_scraper
+from bins.w3 import rpc_replay_helper
+from bins.w3.builders import build_db_hypervisor
+from bins.w3.onchain_data_helper import onchain_data_helper2
+from bins.w3.onchain_utilities.rewarders import gamma_masterchef_registry
+
+FIXTURES_FOLDER = os.path.join(CURRENT_FOLDER, "fixtures", "rpc")
+# fixtures the benchmarks replay ( networks and json apis )
+FIXTURE_NAMES = ["ethereum", "polygon", "http"]
+
+
+# BENCHMARK HELPERS
+def benchmark(name: str, func, rounds: int = 5, rpc_budget: int | None = None) -> dict:
+    """time <rounds> executions of func, accounting its rpc calls
+
+    Args:
+        name (str): benchmark name
+        func (callable): function to time ( no arguments )
+        rounds (int, optional): . Defaults to 5.
+        rpc_budget (int | None, optional): fail when one round uses more rpc calls. Defaults to None.
+
+    Returns:
+        dict: name, rounds, min, median, mean, max ( seconds ) and rpc calls per round
+    """
+    times = []
+    calls = []
+    for _ in range(rounds):
+        with rpc_accounting(
+            stage=f"benchmark_{name}", budget=rpc_budget, on_exceed="raise"
+        ) as accounting:
+            _start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - _start)
+        calls.append(accounting.calls)
+
+    result = {
+        "name": name,
+        "rounds": rounds,
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.mean(times),
+        "max": max(times),
+        "rpc_calls": max(calls),
+    }
+    logging.getLogger(__name__).info(
+        " {name:<25} min {min:.4f}s  median {median:.4f}s  mean {mean:.4f}s  max {max:.4f}s  rpc calls {rpc_calls}".format(
+            **result
+        )
+    )
+    return result
+
+
+# BENCHMARKS
+def bench_build_db_hypervisor(network: str, dex: str, address: str, block: int):
+    return benchmark(
+        "build_db_hypervisor",
+        lambda: build_db_hypervisor(
+            address=address, network=network, block=block, dex=dex, cached=False
+        ),
+    )
+
+
+def bench_operations_generator(
+    network: str, addresses: list[str], block_ini: int, block_end: int
+):
+    helper = onchain_data_helper2(protocol="gamma")
+    return benchmark(
+        "operations_generator",
+        lambda: list(
+            helper.operations_generator(
+                addresses=addresses,
+                network=network,
+                block_ini=block_ini,
+                block_end=block_end,
+            )
+        ),
+    )
+
+
+def bench_get_price(network: str, token_address: str, block: int):
+    # coingecko uses its own client ( not recorded)
+    helper = price_scraper(cache=False, coingecko=False)
+    return benchmark(
+        "price_scraper.get_price",
+        lambda: helper.get_price(network=network, token_id=token_address, block=block),
+    )
+
+
+def bench_rewarders(network: str, dex: str, block: int):
+    address = STATIC_REGISTRY_ADDRESSES[network]["MasterChefV2Registry"][dex]
+    return benchmark(
+        "masterchef_registry",
+        lambda: gamma_masterchef_registry(
+            address=address, network=network, block=block
+        ).get_registry_entries(),
+    )
+
+
+def run_benchmarks(
+    mode: str = "replay",
+    latency: float = 0,
+    latency_jitter: float = 0,
+) -> list[dict]:
+    """run all benchmarks
+
+    Args:
+        mode (str, optional): "record" ( live endpoints, saving fixtures) or "replay" ( offline). Defaults to "replay".
+        latency (float, optional): seconds added to each replayed call. Defaults to 0.
+        latency_jitter (float, optional): random seconds added to each replayed call. Defaults to 0.
+
+    Raises:
+        FileNotFoundError: replaying without recorded fixtures
+        RuntimeError: replayed calls not found in the fixtures ( results would not be comparable)
+
+    Returns:
+        list[dict]: benchmark results
+    """
+    if mode == "replay" and (
+        missing := [
+            x
+            for x in FIXTURE_NAMES
+            if not os.path.exists(os.path.join(FIXTURES_FOLDER, f"{x}.json"))
+        ]
+    ):
+        raise FileNotFoundError(
+            f" {missing} fixtures not found in {FIXTURES_FOLDER}. Record them first: run_benchmarks(mode='record')"
+        )
+
+    rpc_replay_helper.configure_replay(
+        mode=mode,
+        folder=FIXTURES_FOLDER,
+        latency=latency,
+        latency_jitter=latency_jitter,
+    )
+
+    result = [
+        bench_build_db_hypervisor(
+            network="ethereum",
+            dex="uniswapv3",
+            address="0xa3ecb6e941e773c6568052a509a04cf455a752ae",
+            block=16505177,
+        ),
+        bench_operations_generator(
+            network="ethereum",
+            addresses=["0xa3ecb6e941e773c6568052a509a04cf455a752ae"],
+            block_ini=16500000,
+            block_end=16505177,
+        ),
+        bench_get_price(
+            network="ethereum",
+            token_address="0xc02aaa39b223fe8d0a0e5c4f27ead9083c756cc2",
+            block=16505177,
+        ),
+        bench_rewarders(network="polygon", dex="uniswapv3", block=40000000),
+    ]
+
+    if mode == "record":
+        rpc_replay_helper.save_fixtures()
+    else:
+        misses = 0
+        for name, fixture in rpc_replay_helper.get_fixtures().items():
+            logging.getLogger(__name__).info(
+                f" {name} fixture: {fixture.hits} hits {fixture.misses} misses"
+            )
+            misses += fixture.misses
+        if misses:
+            raise RuntimeError(
+                f" {misses} calls not recorded in {FIXTURES_FOLDER} fixtures. Record them again: run_benchmarks(mode='record')"
+            )
+
+    return result
+
+
+# START ####################################################################################################################
+if __name__ == "__main__":
+    os.chdir(PARENT_FOLDER)
+
+    ##### main ######
+    __module_name = Path(os.path.abspath(__file__)).stem
+    logging.getLogger(__name__).info(
+        f" Start {__module_name}   ----------------------> "
+    )
+
+    # start time log
+    _startime = datetime.now(timezone.utc)
+
+    # record fixtures once using live endpoints
+    # run_benchmarks(mode="record")
+
+    # offline benchmarks ( fail when fixtures are missing or incomplete )
+    run_benchmarks(mode="replay")
+    # offline benchmarks simulating a 50ms rpc provider
+    # run_benchmarks(mode="replay", latency=0.05, latency_jitter=0.02)
+
+    # end time log
+    logging.getLogger(__name__).info(
+        f" took {general_utilities.log_time_passed.get_timepassed_string(_startime)} to complete"
+    )
+
+    logging.getLogger(__name__).info(
+        f" Exit {__module_name}    <----------------------"
+    )
@@ -0,0 +1,560 @@
+import sys
+import os
+import logging
+import random
+import resource
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+# append parent directory pth
+CURRENT_FOLDER = os.path.dirname(os.path.realpath(__file__))
+PARENT_FOLDER = os.path.dirname(CURRENT_FOLDER)
+sys.path.append(PARENT_FOLDER)
+
+from bins.configuration import CONFIGURATION
+from bins.general import general_utilities
+from bins.converters.onchain import (
+    convert_hypervisor_toStorage,
+    convert_operation_toStorage,
+)
+from bins.database.common.db_collections_common import database_local, database_global
+from bins.database.db_user_status import user_status_hypervisor_builder
+from bins.database.db_user_operations import user_operations_hypervisor_builder
+from bins.database.db_raw_direct_info import direct_db_hypervisor_info
+
+# synthetic data is saved under this network name: use a throwaway mongod
+# ( i.e. mongod --dbpath <tmpfs folder> ) as usd prices go to the "global" database
+NETWORK = "benchmark"
+PROTOCOL = "gamma"
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+# operation topic: weight
+TOPIC_WEIGHTS = {
+    "deposit": 35,
+    "withdraw": 20,
+    "transfer": 20,
+    "rebalance": 15,
+    "zeroBurn": 10,
+}
+
+
+# SYNTHETIC DATA
+def _address(rnd: random.Random) -> str:
+    return f"0x{rnd.getrandbits(160):040x}"
+
+
+def _token(rnd: random.Random, symbol: str, decimals: int) -> dict:
+    return {
+        "address": _address(rnd),
+        "decimals": decimals,
+        "symbol": symbol,
+        "totalSupply": str(10 ** (decimals + 9)),
+    }
+
+
+def _static(rnd: random.Random, index: int) -> dict:
+    token0 = _token(rnd, f"TKA{index}", 18)
+    token1 = _token(rnd, f"TKB{index}", 6)
+    return {
+        "address": _address(rnd),
+        "decimals": 18,
+        "symbol": f"xTKA{index}-TKB{index}",
+        "name": f"Benchmark hypervisor {index}",
+        "totalSupply": "0",
+        "fee": 10,
+        "dex": "uniswapv3",
+        "deposit0Max": str(10**30),
+        "deposit1Max": str(10**30),
+        "pool": {
+            "address": _address(rnd),
+            "fee": 500,
+            "tickSpacing": "10",
+            "dex": "uniswapv3",
+            "token0": token0,
+            "token1": token1,
+            "protocolFees": ["0", "0"],
+        },
+    }
+
+
+class _hypervisor_simulator:
+    def __init__(self, rnd: random.Random, static: dict, holders: int):
+        """Minimal hypervisor accounting producing consistent operations, status and prices"""
+        self.rnd = rnd
+        self.static = static
+        self.holders = [_address(rnd) for _ in range(holders)]
+        self.balances = {}
+
+        self.supply = 0
+        self.total0 = 0
+        self.total1 = 0
+        self.fees0 = 0
+        self.fees1 = 0
+        self.tick = rnd.randint(-200000, 200000)
+        self.price0 = rnd.uniform(1, 3000)
+        self.price1 = rnd.uniform(0.5, 2)
+
+        self.block = 1_000_000
+        self.timestamp = 1_600_000_000
+        self.tx = 0
+
+    def _operation(self, topic: str, logIndex: int, **fields) -> dict:
+        txhash = f"0x{self.tx:064x}"
+        return {
+            "id": f"{logIndex}_{txhash}",
+            "transactionHash": txhash,
+            "blockHash": f"0x{self.block:064x}",
+            "blockNumber": self.block,
+            "address": self.static["address"],
+            "timestamp": self.timestamp,
+            "decimals_token0": self.static["pool"]["token0"]["decimals"],
+            "decimals_token1": self.static["pool"]["token1"]["decimals"],
+            "decimals_contract": self.static["decimals"],
+            "topic": topic,
+            "logIndex": logIndex,
+            **{k: str(v) if isinstance(v, int) else v for k, v in fields.items()},
+        }
+
+    def status(self, block: int, timestamp: int) -> dict:
+        deployed0 = self.total0 * 9 // 10
+        deployed1 = self.total1 * 9 // 10
+        pool = {
+            **self.static["pool"],
+            "block": block,
+            "timestamp": timestamp,
+            "feeGrowthGlobal0X128": str(2**128 + self.fees0 * 2**64),
+            "feeGrowthGlobal1X128": str(2**128 + self.fees1 * 2**64),
+            "liquidity": str(10**24),
+            "maxLiquidityPerTick": str(2**107),
+            "slot0": {
+                "sqrtPriceX96": str(2**96),
+                "tick": str(self.tick),
+                "observationIndex": "1",
+                "observationCardinality": "100",
+                "observationCardinalityNext": "100",
+                "feeProtocol": 0,
+                "unlocked": True,
+            },
+        }
+        pool["token0"] = {**pool["token0"], "block": block, "timestamp": timestamp}
+        pool["token1"] = {**pool["token1"], "block": block, "timestamp": timestamp}
+        return {
+            **self.static,
+            "id": f"{self.static['address']}_{block}",
+            "block": block,
+            "timestamp": timestamp,
+            "totalSupply": str(self.supply),
+            "pool": pool,
+            "baseLower": str(self.tick - 600),
+            "baseUpper": str(self.tick + 600),
+            "limitLower": str(self.tick),
+            "limitUpper": str(self.tick + 600),
+            "currentTick": str(self.tick),
+            "tickSpacing": "10",
+            "maxTotalSupply": "0",
+            "totalAmounts": {"total0": str(self.total0), "total1": str(self.total1)},
+            "tvl": {
+                "parked_token0": str(self.total0 - deployed0),
+                "parked_token1": str(self.total1 - deployed1),
+                "deployed_token0": str(deployed0),
+                "deployed_token1": str(deployed1),
+                "fees_owed_token0": "0",
+                "fees_owed_token1": "0",
+                "tvl_token0": str(self.total0 + self.fees0),
+                "tvl_token1": str(self.total1 + self.fees1),
+            },
+            "qtty_depoloyed": {
+                "qtty_token0": str(deployed0),
+                "qtty_token1": str(deployed1),
+                "fees_owed_token0": "0",
+                "fees_owed_token1": "0",
+            },
+            "fees_uncollected": {
+                "qtty_token0": str(self.fees0),
+                "qtty_token1": str(self.fees1),
+            },
+            "basePosition": {
+                "liquidity": str(10**20),
+                "amount0": str(deployed0 * 2 // 3),
+                "amount1": str(deployed1 * 2 // 3),
+            },
+            "limitPosition": {
+                "liquidity": str(10**19),
+                "amount0": str(deployed0 // 3),
+                "amount1": str(deployed1 // 3),
+            },
+        }
+
+    def prices(self, block: int) -> list[dict]:
+        return [
+            {
+                "id": f"{NETWORK}_{block}_{token['address']}",
+                "network": NETWORK,
+                "block": block,
+                "address": token["address"],
+                "price": price,
+            }
+            for token, price in [
+                (self.static["pool"]["token0"], self.price0),
+                (self.static["pool"]["token1"], self.price1),
+            ]
+        ]
+
+    def step(self) -> tuple[list[dict], list[dict], list[dict]]:
+        """advance some blocks and execute one random operation
+
+        Returns:
+            tuple[list[dict], list[dict], list[dict]]: operations, status ( block-1 and block ), prices
+        """
+        blocks = self.rnd.randint(2, 50)
+        self.block += blocks
+        self.timestamp += blocks * 12
+        self.tx += 1
+        self.price0 *= self.rnd.uniform(0.98, 1.02)
+        self.price1 *= self.rnd.uniform(0.999, 1.001)
+        # fees accrue between operations
+        self.fees0 += self.total0 // 10_000
+        self.fees1 += self.total1 // 10_000
+
+        status = [self.status(block=self.block - 1, timestamp=self.timestamp - 12)]
+        holders = [x for x, shares in self.balances.items() if shares > 0]
+        topic = self.rnd.choices(
+            list(TOPIC_WEIGHTS.keys()), weights=list(TOPIC_WEIGHTS.values())
+        )[0]
+        if topic in ["withdraw", "transfer"] and not holders:
+            topic = "deposit"
+
+        if topic == "deposit":
+            to = self.rnd.choice(self.holders)
+            qtty0 = self.rnd.randint(1, 100) * 10**18
+            qtty1 = (
+                qtty0 * self.total1 // self.total0
+                if self.total0
+                else self.rnd.randint(1, 100) * 10**6
+            )
+            shares = qtty0 * self.supply // self.total0 if self.total0 else qtty0
+            operations = [
+                self._operation("transfer", 0, src=ZERO_ADDRESS, dst=to, qtty=shares),
+                self._operation(
+                    "deposit",
+                    1,
+                    sender=to,
+                    to=to,
+                    shares=shares,
+                    qtty_token0=qtty0,
+                    qtty_token1=qtty1,
+                ),
+            ]
+            self.balances[to] = self.balances.get(to, 0) + shares
+            self.supply += shares
+            self.total0 += qtty0
+            self.total1 += qtty1
+
+        elif topic == "withdraw":
+            holder = self.rnd.choice(holders)
+            shares = self.balances[holder] // self.rnd.choice([1, 2, 4])
+            qtty0 = self.total0 * shares // self.supply
+            qtty1 = self.total1 * shares // self.supply
+            operations = [
+                self._operation(
+                    "transfer", 0, src=holder, dst=ZERO_ADDRESS, qtty=shares
+                ),
+                self._operation(
+                    "withdraw",
+                    1,
+                    sender=holder,
+                    to=holder,
+                    shares=shares,
+                    qtty_token0=qtty0,
+                    qtty_token1=qtty1,
+                ),
+            ]
+            self.balances[holder] -= shares
+            self.supply -= shares
+            self.total0 -= qtty0
+            self.total1 -= qtty1
+
+        elif topic == "transfer":
+            src = self.rnd.choice(holders)
+            dst = self.rnd.choice(self.holders)
+            shares = self.balances[src] // 2
+            operations = [
+                self._operation("transfer", 0, src=src, dst=dst, qtty=shares)
+            ]
+            self.balances[src] -= shares
+            self.balances[dst] = self.balances.get(dst, 0) + shares
+
+        else:
+            # fees are collected and compounded
+            self.total0 += self.fees0
+            self.total1 += self.fees1
+            if topic == "rebalance":
+                self.tick += self.rnd.randint(-600, 600)
+                fields = {
+                    "tick": self.tick,
+                    "totalAmount0": self.total0,
+                    "totalAmount1": self.total1,
+                }
+            else:
+                fields = {"fee": 10}
+            operations = [
+                self._operation(
+                    topic, 0, qtty_token0=self.fees0, qtty_token1=self.fees1, **fields
+                )
+            ]
+            self.fees0 = 0
+            self.fees1 = 0
+
+        status.append(self.status(block=self.block, timestamp=self.timestamp))
+        return (
+            operations,
+            status,
+            self.prices(self.block - 1) + self.prices(self.block),
+        )
+
+
+def generate_dataset(
+    hypervisors: int = 5, holders: int = 50, operations: int = 500, seed: int = 0
+):
+    """Yield the synthetic dataset of each hypervisor
+
+    Args:
+        hypervisors (int, optional): . Defaults to 5.
+        holders (int, optional): addresses per hypervisor. Defaults to 50.
+        operations (int, optional): operations ( transactions ) per hypervisor. Defaults to 500.
+        seed (int, optional): random seed ( same seed, same data ). Defaults to 0.
+
+    Returns:
+        generator: {"static": dict, "operations": list, "status": list, "prices": list}
+    """
+    rnd = random.Random(seed)
+    for index in range(hypervisors):
+        simulator = _hypervisor_simulator(
+            rnd=rnd, static=_static(rnd, index), holders=holders
+        )
+        result = {"static": None, "operations": [], "status": [], "prices": []}
+        for _ in range(operations):
+            _operations, _status, _prices = simulator.step()
+            result["operations"] += _operations
+            result["status"] += _status
+            result["prices"] += _prices
+
+        result["static"] = {
+            **simulator.static,
+            "id": simulator.static["address"],
+            "block": result["status"][0]["block"],
+            "timestamp": result["status"][0]["timestamp"],
+        }
+        yield result
+
+
+def load_dataset(**kwargs) -> list[str]:
+    """Replace the benchmark database content with a new synthetic dataset
+
+    Args:
+        kwargs: generate_dataset arguments
+
+    Returns:
+        list[str]: hypervisor addresses
+    """
+    mongo_url = CONFIGURATION["sources"]["database"]["mongo_server_url"]
+    local_db = database_local(mongo_url=mongo_url, db_name=f"{NETWORK}_{PROTOCOL}")
+    global_db = database_global(mongo_url=mongo_url)
+
+    clean_database()
+
+    addresses = []
+    for dataset in generate_dataset(**kwargs):
+        local_db.replace_items_to_database(
+            data=[dataset["static"]], collection_name="static"
+        )
+        local_db.replace_items_to_database(
+            data=[convert_operation_toStorage(x) for x in dataset["operations"]],
+            collection_name="operations",
+        )
+        local_db.replace_items_to_database(
+            data=[convert_hypervisor_toStorage(x) for x in dataset["status"]],
+            collection_name="status",
+        )
+        global_db.replace_items_to_database(
+            data=dataset["prices"], collection_name="usd_prices"
+        )
+        addresses.append(dataset["static"]["address"])
+        logging.getLogger(__name__).info(
+            f" loaded {dataset['static']['address']}: {len(dataset['operations'])} operations {len(dataset['status'])} status {len(dataset['prices'])} prices"
+        )
+
+    return addresses
+
+
+def clean_database(collections: list[str] | None = None):
+    """delete benchmark data
+
+    Args:
+        collections (list[str] | None, optional): local collections. Defaults to all data, usd prices included.
+    """
+    mongo_url = CONFIGURATION["sources"]["database"]["mongo_server_url"]
+    local_db = database_local(mongo_url=mongo_url, db_name=f"{NETWORK}_{PROTOCOL}")
+    for collection_name in collections or [
+        "static",
+        "operations",
+        "status",
+        "user_status",
+        "user_operations",
+    ]:
+        local_db.delete_items(collection_name=collection_name, find={})
+    if not collections:
+        database_global(mongo_url=mongo_url).delete_items(
+            collection_name="usd_prices", find={"network": NETWORK}
+        )
+
+
+# BENCHMARKS
+def benchmark(name: str, func, items: int, setup=None) -> dict:
+    """time func and measure its peak memory in a second run
+
+    Args:
+        name (str):
+        func (callable): no arguments
+        items (int): items processed by func ( throughput )
+        setup (callable, optional): executed before each run ( not timed ). Defaults to None.
+
+    Returns:
+        dict: name, seconds, items, items_sec, peak_mb ( python allocations ), maxrss_mb ( process )
+    """
+    if setup:
+        setup()
+    _start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - _start
+
+    # tracemalloc slows execution: measure memory apart
+    if setup:
+        setup()
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    result = {
+        "name": name,
+        "seconds": seconds,
+        "items": items,
+        "items_sec": items / seconds if seconds else 0,
+        "peak_mb": peak / 1024**2,
+        # linux reports kilobytes
+        "maxrss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+    logging.getLogger(__name__).info(
+        " {name:<30} {seconds:>9.2f}s  {items:>7} items  {items_sec:>9.1f} items/s  peak {peak_mb:>8.1f} MB  maxrss {maxrss_mb:>8.1f} MB".format(
+            **result
+        )
+    )
+    return result
+
+
+def run_benchmarks(
+    hypervisors: int = 5,
+    holders: int = 50,
+    operations: int = 500,
+    seed: int = 0,
+    mongo_url: str | None = None,
+    clean: bool = True,
+) -> list[dict]:
+    """load a synthetic dataset and benchmark the user status, user operations and returns builders
+
+    Args:
+        hypervisors (int, optional): . Defaults to 5.
+        holders (int, optional): addresses per hypervisor. Defaults to 50.
+        operations (int, optional): operations per hypervisor. Defaults to 500.
+        seed (int, optional): . Defaults to 0.
+        mongo_url (str | None, optional): throwaway mongod url. Defaults to configuration's.
+        clean (bool, optional): delete benchmark data at the end. Defaults to True.
+
+    Returns:
+        list[dict]: benchmark results
+    """
+    if mongo_url:
+        CONFIGURATION["sources"]["database"]["mongo_server_url"] = mongo_url
+
+    _start = time.perf_counter()
+    addresses = load_dataset(
+        hypervisors=hypervisors, holders=holders, operations=operations, seed=seed
+    )
+    logging.getLogger(__name__).info(
+        f" dataset loaded in {time.perf_counter() - _start:.1f} seconds"
+    )
+
+    items = hypervisors * operations
+    result = [
+        benchmark(
+            "user_operations_builder",
+            lambda: [
+                user_operations_hypervisor_builder(
+                    hypervisor_address=address, network=NETWORK, protocol=PROTOCOL
+                )._process_operations()
+                for address in addresses
+            ],
+            items=items,
+            setup=lambda: clean_database(collections=["user_operations"]),
+        ),
+        benchmark(
+            "user_status_builder",
+            lambda: [
+                user_status_hypervisor_builder(
+                    hypervisor_address=address, network=NETWORK, protocol=PROTOCOL
+                )._process_operations()
+                for address in addresses
+            ],
+            items=items,
+            setup=lambda: clean_database(collections=["user_status"]),
+        ),
+        benchmark(
+            "get_feeReturn_and_IL",
+            lambda: [
+                direct_db_hypervisor_info(
+                    hypervisor_address=address, network=NETWORK, protocol=PROTOCOL
+                ).get_feeReturn_and_IL(
+                    ini_date=datetime.fromtimestamp(0, timezone.utc),
+                    end_date=datetime.now(timezone.utc),
+                )
+                for address in addresses
+            ],
+            items=items,
+        ),
+    ]
+
+    if clean:
+        clean_database()
+
+    return result
+
+
+# START ####################################################################################################################
+if __name__ == "__main__":
+    os.chdir(PARENT_FOLDER)
+
+    ##### main ######
+    __module_name = Path(os.path.abspath(__file__)).stem
+    logging.getLogger(__name__).info(
+        f" Start {__module_name}   ----------------------> "
+    )
+
+    # start time log
+    _startime = datetime.now(timezone.utc)
+
+    # small
+    run_benchmarks(hypervisors=5, holders=50, operations=500)
+    # large
+    # run_benchmarks(hypervisors=20, holders=1000, operations=5000)
+
+    # end time log
+    logging.getLogger(__name__).info(
+        f" took {general_utilities.log_time_passed.get_timepassed_string(_startime)} to complete"
+    )
+
+    logging.getLogger(__name__).info(
+        f" Exit {__module_name}    <----------------------"
+    )
@@ -0,0 +1,260 @@
+import sys
+import os
+import logging
+import copy
+from datetime import datetime, timezone
+from decimal import Decimal
+from pathlib import Path
+
+import bson
+from bson.decimal128 import Decimal128
+
+# append parent directory pth
+CURRENT_FOLDER = os.path.dirname(os.path.realpath(__file__))
+PARENT_FOLDER = os.path.dirname(CURRENT_FOLDER)
+sys.path.append(PARENT_FOLDER)
+
+from bins.configuration import CONFIGURATION
+from bins.general import general_utilities
+from bins.converters.onchain import (
+    HYPERVISOR_NUMERIC_FIELDS,
+    OPERATION_NUMERIC_FIELDS,
+    STORAGE_SCHEMA_VERSION,
+    convert_hypervisor_toStorage,
+    convert_operation_toStorage,
+)
+from bins.database.common.db_collections_common import database_local
+from bins.database.common.db_managers import CODEC_OPTIONS
+
+# throwaway database used by the database checks
+TEST_DB_NAME = "test_storage_schema"
+
+
+# DOCUMENTS
+def _operation(index: int, qtty: int, tick: int) -> dict:
+    """operation as saved by the feeder ( python ints )"""
+    return {
+        "id": f"{index}_0x{index:064x}",
+        "address": "0x0000000000000000000000000000000000000001",
+        "blockNumber": 1_000_000 + index,
+        "topic": "deposit",
+        "shares": qtty // 2,
+        "qtty_token0": qtty,
+        "qtty_token1": qtty // 3,
+        "lowerTick": tick,
+        "upperTick": tick + 600,
+    }
+
+
+def _as_legacy(item: dict) -> dict:
+    """schema version 1 document: all integers as strings"""
+    if isinstance(item, dict):
+        return {k: _as_legacy(v) for k, v in item.items()}
+    if isinstance(item, list):
+        return [_as_legacy(x) for x in item]
+    if isinstance(item, int) and not isinstance(item, bool):
+        return str(item)
+    return item
+
+
+def _as_schema_2(item: dict) -> dict:
+    """schema version 2 document: smallest type holding each value ( int64, Decimal128 or string )"""
+    if isinstance(item, dict):
+        return {k: _as_schema_2(v) for k, v in item.items()}
+    if isinstance(item, list):
+        return [_as_schema_2(x) for x in item]
+    if isinstance(item, int) and not isinstance(item, bool):
+        if -(2**63) <= item < 2**63:
+            return item
+        return Decimal128(str(item)) if len(str(abs(item))) <= 34 else str(item)
+    return item
+
+
+def _status(index: int, liquidity: int, tick: int) -> dict:
+    """partial hypervisor status as saved by the feeder ( python ints )"""
+    return {
+        "id": f"0x0000000000000000000000000000000000000001_{1_000_000 + index}",
+        "address": "0x0000000000000000000000000000000000000001",
+        "block": 1_000_000 + index,
+        "currentTick": tick,
+        "totalSupply": liquidity // 2,
+        "maxTotalSupply": 2**256 - 1,
+        "basePosition": {"liquidity": liquidity, "amount0": 0, "amount1": 10**30},
+        "pool": {
+            "liquidity": liquidity,
+            "feeGrowthGlobal0X128": 2**200,
+            "protocolFees": [0, 10**19],
+            "slot0": {"sqrtPriceX96": 2**150, "tick": tick},
+        },
+    }
+
+
+def _get(item: dict, field: str):
+    for part in field.split("."):
+        if isinstance(item, list):
+            item = item[int(part)] if int(part) < len(item) else None
+        elif isinstance(item, dict):
+            item = item.get(part)
+        if item is None:
+            return None
+    return item
+
+
+def _numeric(value) -> int:
+    if isinstance(value, Decimal128):
+        value = value.to_decimal()
+    return int(value)
+
+
+# CHECKS
+def test_same_types(converter, fields: dict, items: list[dict]):
+    """new, legacy and schema 2 documents are converted to the same value and type per field,
+    without modifying the original documents"""
+    for item in items:
+        originals = [item, _as_legacy(item), _as_schema_2(item)]
+        copies = copy.deepcopy(originals)
+        converted = [converter(x) for x in originals]
+
+        assert originals == copies, " converter modified its input"
+        for result in converted:
+            assert result["schema_version"] == STORAGE_SCHEMA_VERSION
+            for field in fields:
+                if (value := _get(item, field)) is None:
+                    continue
+                assert type(_get(result, field)) is type(
+                    _get(converted[0], field)
+                ), f" {field} type differs: {type(_get(result, field))}"
+                assert _numeric(_get(result, field)) == value, f" {field} value differs"
+
+    logging.getLogger(__name__).info(
+        f" {converter.__name__}: same types for {len(items)} new, legacy and schema 2 documents"
+    )
+
+
+def test_bson_roundtrip(converter, fields: dict, items: list[dict]):
+    """converted documents are read back ( Decimal128 as Decimal ) with the exact original values"""
+    for item in items:
+        decoded = bson.decode(
+            bson.encode(converter(item), codec_options=CODEC_OPTIONS),
+            codec_options=CODEC_OPTIONS,
+        )
+        for field in fields:
+            if (value := _get(item, field)) is None:
+                continue
+            assert isinstance(
+                _get(decoded, field), (int, Decimal, str)
+            ), f" {field} decoded as {type(_get(decoded, field))}"
+            assert _numeric(_get(decoded, field)) == value, f" {field} value differs"
+
+    logging.getLogger(__name__).info(
+        f" {converter.__name__}: {len(items)} documents round trip exactly"
+    )
+
+
+def test_migrated_vs_new(items: list[dict], sort_field: str = "qtty_token0"):
+    """operations saved as legacy documents and migrated sort and query the same as new ones
+    ( needs a mongo server: uses the configured one with a throwaway database )"""
+    mongo_url = CONFIGURATION["sources"]["database"]["mongo_server_url"]
+    local_db = database_local(mongo_url=mongo_url, db_name=TEST_DB_NAME)
+    local_db.delete_items(collection_name="operations", find={})
+
+    try:
+        # half the items saved at schema 1, the other half at schema 2, then migrated
+        middle = len(items) // 2
+        local_db.replace_items_to_database(
+            data=[_as_legacy(x) for x in items[:middle]]
+            + [_as_schema_2(x) for x in items[middle:]],
+            collection_name="operations",
+        )
+        migrated = local_db.migrate_items(
+            collection_name="operations", converter=convert_operation_toStorage
+        )
+        assert migrated == len(items), f" {migrated} of {len(items)} items migrated"
+
+        # same items saved as new documents, in another collection
+        local_db.replace_items_to_database(
+            data=[convert_operation_toStorage(x) for x in items],
+            collection_name="operations_new",
+        )
+
+        threshold = sorted(x[sort_field] for x in items)[middle]
+        for collection_name in ["operations", "operations_new"]:
+            # sort
+            result = [
+                _numeric(x[sort_field])
+                for x in local_db.get_items_from_database(
+                    collection_name=collection_name, find={}, sort=[(sort_field, 1)]
+                )
+            ]
+            assert result == sorted(
+                x[sort_field] for x in items
+            ), f" {collection_name} sorted differently"
+
+            # range query
+            result = local_db.get_items_from_database(
+                collection_name=collection_name,
+                find={sort_field: {"$gte": Decimal128(str(threshold))}},
+            )
+            assert len(result) == len(
+                [x for x in items if x[sort_field] >= threshold]
+            ), f" {collection_name} range query differs"
+
+        logging.getLogger(__name__).info(
+            f" {len(items)} migrated and new operations sort and query the same"
+        )
+    finally:
+        local_db.delete_items(collection_name="operations", find={})
+        local_db.delete_items(collection_name="operations_new", find={})
+
+
+if __name__ == "__main__":
+    os.chdir(PARENT_FOLDER)
+
+    ##### main ######
+    __module_name = Path(os.path.abspath(__file__)).stem
+    logging.getLogger(__name__).info(
+        f" Start {__module_name}   ----------------------> "
+    )
+
+    # start time log
+    _startime = datetime.now(timezone.utc)
+
+    # values around the int64 limit and up to 34 digits
+    operations = [
+        _operation(index=i, qtty=qtty, tick=tick)
+        for i, (qtty, tick) in enumerate(
+            [
+                (0, -887272),
+                (1, -600),
+                (10**18, 0),
+                (2**63 - 1, 600),
+                (2**63, 60),
+                (10**33, 887272),
+                (10**34 - 1, -60),
+                (5 * 10**20, 1200),
+            ]
+        )
+    ]
+    status = [
+        _status(index=i, liquidity=liquidity, tick=tick)
+        for i, (liquidity, tick) in enumerate(
+            [(0, -887272), (10**20, 0), (2**64, 600), (10**33, 887272)]
+        )
+    ]
+
+    test_same_types(convert_operation_toStorage, OPERATION_NUMERIC_FIELDS, operations)
+    test_same_types(convert_hypervisor_toStorage, HYPERVISOR_NUMERIC_FIELDS, status)
+    test_bson_roundtrip(
+        convert_operation_toStorage, OPERATION_NUMERIC_FIELDS, operations
+    )
+    test_bson_roundtrip(convert_hypervisor_toStorage, HYPERVISOR_NUMERIC_FIELDS, status)
+    test_migrated_vs_new(items=operations)
+
+    # end time log
+    logging.getLogger(__name__).info(
+        f" took {general_utilities.log_time_passed.get_timepassed_string(_startime)} to complete"
+    )
+
+    logging.getLogger(__name__).info(
+        f" Exit {__module_name}    <----------------------"
+    )
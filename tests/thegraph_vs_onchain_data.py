@@ -183,6 +183,47 @@ def test_thegraph_vs_onchain_data_fees(
     return result, sorted_keys
 
 
+def test_thegraph_pagination(
+    network: str = "ethereum", dex: str = "uniswapv3", block: int = 0
+):
+    """Compare hypervisors retrieved using skip, id cursor and parallel id cursor pagination
+
+    Args:
+       block (int): force block number. when 0, the subgraph latest block is used
+    """
+    gamma_helper = thegraph_utilities.gamma_scraper(
+        cache=False, cache_savePath="data/cache", convert=False
+    )
+    kwargs = {"block": """ number:{} """.format(block)} if block else {}
+
+    results = {
+        name: {
+            x["id"]
+            for x in gamma_helper.get_all_results(
+                network=network,
+                query_name=f"uniswapV3Hypervisors_{dex}",
+                **kwargs,
+                **pagination,
+            )
+        }
+        for name, pagination in {
+            "skip": {},
+            "cursor": {"cursor": "id"},
+            "parallel": {"cursor": "id", "parallel": 4},
+        }.items()
+    }
+
+    for name, ids in results.items():
+        if ids != results["skip"]:
+            logging.getLogger(__name__).error(
+                f" {network}'s {dex} {name} pagination differs from skip: {len(ids - results['skip'])} extra {len(results['skip'] - ids)} missing hypervisors"
+            )
+        else:
+            logging.getLogger(__name__).info(
+                f" {network}'s {dex} {name} pagination OK: {len(ids)} hypervisors"
+            )
+
+
 def test_thegraph_vs_onchain_data_fees_save_csv(
     protocol: str = "gamma",
     network: str = "ethereum",
@@ -853,6 +894,8 @@ if __name__ == "__main__":
         hypervisor_address="0x35abccd8e577607275647edab08c537fa32cc65e",
     )
 
+    # test_thegraph_pagination(network="ethereum", dex="uniswapv3", block=16718556)
+
     # test_thegraph_vs_onchain_data_fees_find(
     #     block_list=[
     #         x for x in range(38945271 - 15, 38969202, 1)
@@ -1,6 +1,8 @@
+import atexit
 import os
 import sys
 import logging
+import importlib
 from datetime import datetime, timezone
 
 from bins.log import log_helper
@@ -11,12 +13,32 @@ os.chdir(os.path.dirname(os.path.realpath(__file__)))
 
 from bins.configuration import CONFIGURATION
 from bins.general.general_utilities import log_time_passed, convert_string_datetime
-from apps import (
-    database_feeder,
-    database_feeder_service,
-    database_checker,
-    database_analysis,
-)
+from bins.general.metrics_utilities import METRICS
+
+# command line option: app module ( imported only when its command is executed,
+#   so each command loads its own dependencies only )
+COMMANDS = {
+    "db_feed": "apps.database_feeder",
+    "service": "apps.database_feeder_service",
+    "service_network": "apps.database_feeder_service",
+    "check": "apps.database_checker",
+    "analysis": "apps.database_analysis",
+}
+
+
+def load_command(name: str):
+    """import the app module of a command line option"""
+    return importlib.import_module(COMMANDS[name])
+
+
+def save_metrics():
+    """save run metrics to the log folder"""
+    try:
+        METRICS.dump_json(
+            filename=os.path.join(CONFIGURATION["logs"]["save_path"], "metrics.json")
+        )
+    except Exception as e:
+        logging.getLogger(__name__).error(f" Can't save metrics. Error: {e} ")
 
 
 # START ####################################################################################################################
@@ -33,6 +55,9 @@ if __name__ == "__main__":
     # start time log
     _startime = datetime.now(timezone.utc)
 
+    # save run metrics on any exit ( errors and interrupted services included )
+    atexit.register(save_metrics)
+
     # cml debug mode ?
     if CONFIGURATION["_custom_"]["cml_parameters"].debug:
         try:
@@ -43,6 +68,15 @@ if __name__ == "__main__":
         except Exception as e:
             logging.getLogger(__name__).error(f" Can't set cml debug mode. Error: {e} ")
 
+    # serve metrics while running
+    if CONFIGURATION["_custom_"]["cml_parameters"].metrics_port:
+        try:
+            METRICS.start_http_server(
+                port=CONFIGURATION["_custom_"]["cml_parameters"].metrics_port
+            )
+        except OSError as e:
+            logging.getLogger(__name__).error(f" Can't serve metrics. Error: {e} ")
+
     # convert datetimes if exist
     if CONFIGURATION["_custom_"]["cml_parameters"].ini_datetime:
         # convert to datetime
@@ -72,26 +106,30 @@ if __name__ == "__main__":
     # choose the first of the  parsed options
     if CONFIGURATION["_custom_"]["cml_parameters"].db_feed:
         # database feeder:  --db_feed
-        database_feeder.main(option=CONFIGURATION["_custom_"]["cml_parameters"].db_feed)
+        load_command("db_feed").main(
+            option=CONFIGURATION["_custom_"]["cml_parameters"].db_feed
+        )
     elif CONFIGURATION["_custom_"]["cml_parameters"].service:
         # service loop  --service
-        database_feeder_service.main(
+        load_command("service").main(
             option=CONFIGURATION["_custom_"]["cml_parameters"].service
         )
     elif CONFIGURATION["_custom_"]["cml_parameters"].service_network:
         # service loop specific  --service_network
-        database_feeder_service.main(
+        load_command("service_network").main(
             option="network",
             network=CONFIGURATION["_custom_"]["cml_parameters"].service_network,
             protocol="gamma",
         )
     elif CONFIGURATION["_custom_"]["cml_parameters"].check:
         # checks   --check
-        database_checker.main(option=CONFIGURATION["_custom_"]["cml_parameters"].check)
+        load_command("check").main(
+            option=CONFIGURATION["_custom_"]["cml_parameters"].check
+        )
 
     elif CONFIGURATION["_custom_"]["cml_parameters"].analysis:
         # analysis   --analysis
-        database_analysis.main(
+        load_command("analysis").main(
             option=CONFIGURATION["_custom_"]["cml_parameters"].analysis
         )
 